@@ -4,7 +4,6 @@ Production monitoring and analytics system
 """
 
 import time
-import psutil
 import asyncio
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
@@ -12,6 +11,8 @@ from collections import deque, defaultdict
 import logging
 import json
 
+from core.host_metrics import host_metrics
+
 logger = logging.getLogger(__name__)
 
 class MetricsCollector:
@@ -64,21 +65,22 @@ class MetricsCollector:
             try:
                 await asyncio.sleep(60)  # Collect every minute
                 
+                host = host_metrics()
                 metrics = {
                     "timestamp": datetime.utcnow().isoformat(),
-                    "cpu_percent": psutil.cpu_percent(interval=1),
+                    "cpu_percent": host.cpu_percent,
                     "memory": {
-                        "percent": psutil.virtual_memory().percent,
-                        "available": psutil.virtual_memory().available,
-                        "used": psutil.virtual_memory().used
+                        "percent": host.memory_percent,
+                        "available": host.memory_available,
+                        "used": host.memory_used
                     },
                     "disk": {
-                        "percent": psutil.disk_usage('/').percent,
-                        "free": psutil.disk_usage('/').free
+                        "percent": host.disk_percent,
+                        "free": host.disk_free
                     },
                     "network": {
-                        "bytes_sent": psutil.net_io_counters().bytes_sent,
-                        "bytes_recv": psutil.net_io_counters().bytes_recv
+                        "bytes_sent": host.net_bytes_sent,
+                        "bytes_recv": host.net_bytes_recv
                     }
                 }
                 
@@ -342,10 +344,11 @@ class HealthChecker:
         checks["checks"]["external_services"] = await self.check_external_services()
         
         # System resources check
+        host = host_metrics()
         checks["checks"]["system"] = {
-            "cpu_percent": psutil.cpu_percent(),
-            "memory_percent": psutil.virtual_memory().percent,
-            "disk_percent": psutil.disk_usage('/').percent
+            "cpu_percent": host.cpu_percent,
+            "memory_percent": host.memory_percent,
+            "disk_percent": host.disk_percent
         }
         
         # Determine overall status
@@ -21,6 +21,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from core.host_metrics import host_metrics
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -142,17 +144,12 @@ class SelfHealingSystem:
         """Monitor system resources"""
         while self.is_running:
             try:
-                # CPU monitoring
-                cpu_percent = psutil.cpu_percent(interval=1)
+                # Latest sample from the shared host sampler (no blocking CPU window)
+                host = host_metrics()
+                cpu_percent = host.cpu_percent
                 self.metrics["cpu_usage"].append(cpu_percent)
-                
-                # Memory monitoring
-                memory = psutil.virtual_memory()
-                self.metrics["memory_usage"].append(memory.percent)
-                
-                # Disk monitoring
-                disk = psutil.disk_usage('/')
-                self.metrics["disk_usage"].append(disk.percent)
+                self.metrics["memory_usage"].append(host.memory_percent)
+                self.metrics["disk_usage"].append(host.disk_percent)
                 
                 # Check thresholds
                 if cpu_percent > self.thresholds["cpu_critical"]:
@@ -160,19 +157,19 @@ class SelfHealingSystem:
                 elif cpu_percent > self.thresholds["cpu_warning"]:
                     await self.handle_cpu_warning(cpu_percent)
                 
-                if memory.percent > self.thresholds["memory_critical"]:
-                    await self.handle_memory_critical(memory.percent)
-                elif memory.percent > self.thresholds["memory_warning"]:
-                    await self.handle_memory_warning(memory.percent)
+                if host.memory_percent > self.thresholds["memory_critical"]:
+                    await self.handle_memory_critical(host.memory_percent)
+                elif host.memory_percent > self.thresholds["memory_warning"]:
+                    await self.handle_memory_warning(host.memory_percent)
                 
-                if disk.percent > self.thresholds["disk_critical"]:
-                    await self.handle_disk_critical(disk.percent)
+                if host.disk_percent > self.thresholds["disk_critical"]:
+                    await self.handle_disk_critical(host.disk_percent)
                 
                 # Store metrics in database
                 await self.store_metrics("system_resources", {
                     "cpu": cpu_percent,
-                    "memory": memory.percent,
-                    "disk": disk.percent
+                    "memory": host.memory_percent,
+                    "disk": host.disk_percent
                 })
                 
                 # Keep only last 1000 metrics
@@ -26,6 +26,12 @@ except Exception as exc:  # pragma: no cover - fallback for misconfigured enviro
     _settings_import_error = exc
 
 from app.core.exceptions import RateLimitError
+from middleware.path_classifier import (
+    API_KEY_PUBLIC_MATCHER,
+    DEFAULT_PUBLIC_PATHS,
+    PathMatcher,
+    get_path_class,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -55,27 +61,6 @@ class _CachedAPIKey:
     tenant_id: Optional[str] = None
 
 
-# Keep aligned with middleware.authentication.DEFAULT_EXEMPT_PATHS.
-DEFAULT_PUBLIC_PATHS: Sequence[str] = (
-    "/health",
-    "/api/v1/health",
-    "/ready",
-    "/api/v1/ready",
-    "/docs",
-    "/redoc",
-    "/openapi.json",
-    "/api/v1/erp/public",
-    "/api/v1/products/public",
-    "/api/v1/stripe/webhook",
-    "/api/v1/webhooks/stripe",
-    "/api/v1/webhooks/render",
-    "/api/v1/revenue/webhook",
-    "/webhook/stripe",
-    "/api/v1/gumroad-revenue/webhook/gumroad",  # Gumroad sale pings - no auth header
-    "/api/v1/logs/vercel",  # Vercel log drain - no auth needed
-    "/api/v1/logs/render",  # Render log drain - no auth needed
-)
-
 class RateLimitMiddleware(BaseHTTPMiddleware):
     """
     DEPRECATED: This middleware is unused. The application uses middleware/rate_limiter.py instead.
@@ -181,16 +166,38 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
         self.public_paths: Sequence[str] = (
             tuple(public_paths) if public_paths is not None else DEFAULT_PUBLIC_PATHS
         )
+        self._uses_default_paths = public_paths is None
+        self._public_matcher = (
+            API_KEY_PUBLIC_MATCHER
+            if self._uses_default_paths
+            else PathMatcher(prefixes=self.public_paths)
+        )
         self.cache_ttl = max(cache_ttl_seconds, 1)
         self.usage_touch_interval = max(usage_touch_interval_seconds, 1)
         self.max_cache_entries = max_cache_entries if max_cache_entries > 0 else 512
         self._cache: "OrderedDict[str, _CachedAPIKey]" = OrderedDict()
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        rejection = await self.authenticate(request)
+        if rejection is not None:
+            return rejection
+        return await call_next(request)
+
+    def _is_public(self, request: Request) -> bool:
+        path = request.url.path
+        if self._uses_default_paths:
+            return get_path_class(request.scope, path).api_key_public
+        return self._public_matcher.matches(path)
+
+    async def authenticate(self, request: Request) -> Optional[Response]:
+        """Validate any API key on the request; return a response only to reject it.
+
+        Shared by ``dispatch`` and the pure-ASGI request pipeline.
+        """
         # Skip validation for public paths
-        if any(request.url.path.startswith(path) for path in self.public_paths):
+        if self._is_public(request):
             logger.debug("Skipping API key validation for public path %s", request.url.path)
-            return await call_next(request)
+            return None
 
         # Check for API key
         api_key = self._extract_api_key(request)
@@ -223,7 +230,7 @@ class APIKeyMiddleware(BaseHTTPMiddleware):
                     headers={"WWW-Authenticate": "ApiKey"},
                 )
 
-        return await call_next(request)
+        return None
 
     def _extract_api_key(self, request: Request) -> Optional[str]:
         """Extract API key from request headers."""
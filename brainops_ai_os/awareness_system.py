@@ -20,9 +20,10 @@ from enum import Enum
 from dataclasses import dataclass, field
 from collections import deque
 import asyncpg
-import psutil
 import httpx
 
+from core.host_metrics import host_metrics
+
 if TYPE_CHECKING:
     from .metacognitive_controller import MetacognitiveController
 
@@ -310,20 +311,19 @@ class AwarenessSystem:
         """Monitor system health metrics"""
         while not self._shutdown.is_set():
             try:
-                # Collect system metrics
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                disk = psutil.disk_usage("/")
+                # Latest sample from the shared host sampler (no blocking CPU window)
+                host = host_metrics()
+                cpu_percent = host.cpu_percent
 
                 reading = SensorReading(
                     sensor_type=SensorType.SYSTEM_HEALTH,
                     timestamp=datetime.now(),
                     value={
                         "cpu_percent": cpu_percent,
-                        "memory_percent": memory.percent,
-                        "memory_available_mb": memory.available / (1024 * 1024),
-                        "disk_percent": disk.percent,
-                        "disk_free_gb": disk.free / (1024 * 1024 * 1024),
+                        "memory_percent": host.memory_percent,
+                        "memory_available_mb": host.memory_available / (1024 * 1024),
+                        "disk_percent": host.disk_percent,
+                        "disk_free_gb": host.disk_free / (1024 * 1024 * 1024),
                     },
                 )
 
@@ -347,22 +347,22 @@ class AwarenessSystem:
                     )
 
                 if self._check_sustained_breach(
-                    "memory", memory.percent, ALERT_THRESHOLDS["memory_percent"]
+                    "memory", host.memory_percent, ALERT_THRESHOLDS["memory_percent"]
                 ):
                     await self._generate_alert(
                         AlertSeverity.WARNING,
                         "high_memory",
-                        f"Memory usage at {memory.percent}% (>{ALERT_THRESHOLDS['memory_percent']}% sustained)",
+                        f"Memory usage at {host.memory_percent}% (>{ALERT_THRESHOLDS['memory_percent']}% sustained)",
                         reading.value,
                     )
 
                 if self._check_sustained_breach(
-                    "disk", disk.percent, ALERT_THRESHOLDS["disk_percent"]
+                    "disk", host.disk_percent, ALERT_THRESHOLDS["disk_percent"]
                 ):
                     await self._generate_alert(
                         AlertSeverity.WARNING,
                         "low_disk",
-                        f"Disk usage at {disk.percent}% (>{ALERT_THRESHOLDS['disk_percent']}% sustained)",
+                        f"Disk usage at {host.disk_percent}% (>{ALERT_THRESHOLDS['disk_percent']}% sustained)",
                         reading.value,
                     )
 
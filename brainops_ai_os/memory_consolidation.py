@@ -0,0 +1,541 @@
+"""
+BrainOps AI OS - Memory Consolidation Engine
+
+Finds and merges near-duplicate memories without comparing every pair:
+- SimHash LSH: random-hyperplane signatures cut into bands; memories sharing a
+  band bucket are candidates, everything else is never compared
+- Candidates are pre-filtered on full-signature Hamming distance, then checked
+  with exact cosine similarity in vectorized numpy
+- Signatures are persisted (unified_memory_lsh) so each run only hashes and
+  compares memories created since the resume cursor
+- Each page of new memories is merged in one transaction together with the
+  cursor advance, so an interrupted run resumes where it stopped
+"""
+
+import logging
+import math
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.95
+
+# 40 bands of 24 bits: a pair at cosine 0.95 lands in a shared bucket with
+# probability ~0.96, a pair at cosine 0.97 with ~0.998, while unrelated pairs
+# (cosine ~0) share one in ~1 of 420,000 cases - few enough that candidate
+# counts stay close to linear in the number of memories.
+LSH_BANDS = 40
+LSH_BITS = 24
+LSH_SEED = 20261016
+
+# Pairs within a bucket are generated between members at most this far apart
+# in bucket order, so buckets of up to MAX_BUCKET_OFFSET + 1 members are
+# compared in full. In a larger bucket, members further apart are never paired
+# there and a duplicate pair is only found if another band buckets it; such
+# buckets are counted and reported as oversized_buckets.
+MAX_BUCKET_OFFSET = 64
+
+# Set bits per byte value, for signature Hamming distances.
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+# Signatures differ in arccos(cos)/pi of their bits in expectation; candidates
+# further apart than mean + HAMMING_SIGMAS standard deviations are dropped.
+HAMMING_SIGMAS = 4.0
+
+CURSOR_NAME = "near_duplicates"
+ADVISORY_LOCK_KEY = 7_240_161_025
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Unit-length float32 rows; all-zero rows stay zero."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class SimHashLSH:
+    """Banded random-hyperplane hashing for cosine similarity."""
+
+    def __init__(
+        self,
+        dim: int,
+        bands: int = LSH_BANDS,
+        bits: int = LSH_BITS,
+        seed: int = LSH_SEED,
+    ):
+        if not 0 < bits <= 32:
+            raise ValueError("bits per band must be between 1 and 32")
+        self.dim = dim
+        self.bands = bands
+        self.bits = bits
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((bands * bits, dim)).astype(np.float32)
+        self._weights = np.left_shift(np.int64(1), np.arange(bits, dtype=np.int64))
+        self._band_ids = np.left_shift(np.arange(bands, dtype=np.int64), 32)
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the hash family; persisted keys are only valid under the same one."""
+        return f"simhash:{self.dim}:{self.bands}x{self.bits}:{self.seed}"
+
+    @property
+    def signature_bits(self) -> int:
+        return self.bands * self.bits
+
+    def hash(self, vectors: np.ndarray, chunk: int = 65536) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Band keys and packed signatures for each row.
+
+        Keys are ``band << 32 | bucket`` so every band's buckets are distinct
+        values in one bigint column.
+        """
+        n = len(vectors)
+        keys = np.empty((n, self.bands), dtype=np.int64)
+        signatures = np.empty((n, (self.signature_bits + 7) // 8), dtype=np.uint8)
+        for start in range(0, n, chunk):
+            bits = (vectors[start:start + chunk] @ self.planes.T) > 0
+            banded = bits.reshape(len(bits), self.bands, self.bits).astype(np.int64)
+            keys[start:start + chunk] = (banded @ self._weights) | self._band_ids
+            signatures[start:start + chunk] = np.packbits(bits, axis=1)
+        return keys, signatures
+
+    def max_hamming(self, threshold: float, sigmas: float = HAMMING_SIGMAS) -> int:
+        """Largest signature distance kept for pairs at or above threshold."""
+        p = math.acos(max(-1.0, min(1.0, threshold))) / math.pi
+        n = self.signature_bits
+        return int(math.ceil(n * p + sigmas * math.sqrt(n * p * (1 - p))))
+
+
+def candidate_pairs(
+    keys: np.ndarray,
+    new: Optional[np.ndarray] = None,
+    max_offset: int = MAX_BUCKET_OFFSET,
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Index pairs (i < j) sharing a bucket in any band, deduplicated, and the
+    number of buckets with more than max_offset + 1 members (not compared in
+    full).
+
+    With *new*, only pairs involving at least one new row are returned: pairs
+    of already-indexed rows were compared by an earlier run.
+    """
+    n = len(keys)
+    codes = []
+    oversized = 0
+    for band in range(keys.shape[1]):
+        order = np.argsort(keys[:, band], kind="stable")
+        ordered = keys[order, band]
+        for offset in range(1, min(max_offset, n - 1) + 1):
+            same = ordered[:-offset] == ordered[offset:]
+            if not same.any():
+                break
+            a = order[:-offset][same]
+            b = order[offset:][same]
+            codes.append(np.minimum(a, b) * n + np.maximum(a, b))
+        else:
+            if n > max_offset + 1:
+                beyond = ordered[:-max_offset - 1] == ordered[max_offset + 1:]
+                oversized += len(np.unique(ordered[:-max_offset - 1][beyond]))
+    if not codes:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, oversized
+
+    codes = np.unique(np.concatenate(codes))
+    i, j = np.divmod(codes, n)
+    if new is not None:
+        keep = new[i] | new[j]
+        i, j = i[keep], j[keep]
+    return i, j, oversized
+
+
+def hamming_filter(
+    signatures: np.ndarray,
+    i: np.ndarray,
+    j: np.ndarray,
+    max_distance: int,
+    chunk: int = 1 << 20,
+) -> np.ndarray:
+    """Mask of pairs whose signatures differ in at most max_distance bits."""
+    keep = np.empty(len(i), dtype=bool)
+    for start in range(0, len(i), chunk):
+        a = signatures[i[start:start + chunk]]
+        b = signatures[j[start:start + chunk]]
+        distance = _POPCOUNT[a ^ b].sum(axis=1, dtype=np.int32)
+        keep[start:start + chunk] = distance <= max_distance
+    return keep
+
+
+def cosine_pairs(
+    vectors: np.ndarray,
+    i: np.ndarray,
+    j: np.ndarray,
+    chunk: int = 16384,
+) -> np.ndarray:
+    """Cosine similarity of each (i, j) pair of unit rows."""
+    similarity = np.empty(len(i), dtype=np.float32)
+    for start in range(0, len(i), chunk):
+        a = vectors[i[start:start + chunk]]
+        b = vectors[j[start:start + chunk]]
+        similarity[start:start + chunk] = np.einsum("ij,ij->i", a, b)
+    return similarity
+
+
+def near_duplicate_pairs(
+    vectors: np.ndarray,
+    lsh: SimHashLSH,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """All pairs of unit rows with cosine >= threshold that LSH surfaces."""
+    keys, signatures = lsh.hash(vectors)
+    i, j, _ = candidate_pairs(keys)
+    keep = hamming_filter(signatures, i, j, lsh.max_hamming(threshold))
+    i, j = i[keep], j[keep]
+    similarity = cosine_pairs(vectors, i, j)
+    keep = similarity >= threshold
+    return i[keep], j[keep], similarity[keep]
+
+
+def _rank(row) -> Tuple[float, bool, Any]:
+    """Sort key choosing the canonical memory: most important, then oldest."""
+    return (-(row["importance_score"] or 0.0), row["created_at"] is None, row["created_at"])
+
+
+def merge_groups(
+    i: Sequence[int],
+    j: Sequence[int],
+    rank: Sequence[Any],
+) -> Dict[int, List[int]]:
+    """
+    Connected components of the duplicate pairs, as canonical -> duplicates.
+
+    The canonical row of each component is the one with the lowest rank.
+    """
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(i, j):
+        ra, rb = find(int(a)), find(int(b))
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+
+    components: Dict[int, List[int]] = {}
+    for x in list(parent):
+        components.setdefault(find(x), []).append(x)
+
+    groups = {}
+    for members in components.values():
+        members.sort(key=lambda x: rank[x])
+        groups[members[0]] = members[1:]
+    return groups
+
+
+class MemoryConsolidator:
+    """Resumable near-duplicate merge over unified_ai_memory."""
+
+    def __init__(
+        self,
+        pool: Optional[asyncpg.Pool] = None,
+        *,
+        threshold: Optional[float] = None,
+        page_size: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        settle_seconds: Optional[float] = None,
+    ):
+        self.pool = pool
+        self.threshold = threshold or float(
+            os.getenv("UNIFIED_MEMORY_CONSOLIDATION_THRESHOLD", str(DEFAULT_THRESHOLD))
+        )
+        self.page_size = page_size or int(
+            os.getenv("UNIFIED_MEMORY_CONSOLIDATION_PAGE", "2000")
+        )
+        self.max_seconds = max_seconds or float(
+            os.getenv("UNIFIED_MEMORY_CONSOLIDATION_MAX_SECONDS", "600")
+        )
+        # Rows newer than this are left for the next run, so an insert that
+        # commits late cannot land behind the cursor.
+        self.settle_seconds = (
+            settle_seconds
+            if settle_seconds is not None
+            else float(os.getenv("UNIFIED_MEMORY_CONSOLIDATION_SETTLE_SECONDS", "300"))
+        )
+        self._lsh: Optional[SimHashLSH] = None
+        self._stats: Dict[str, Any] = {
+            "runs": 0,
+            "runs_skipped_locked": 0,
+            "pages": 0,
+            "memories_indexed": 0,
+            "candidate_pairs": 0,
+            "oversized_buckets": 0,
+            "verified_pairs": 0,
+            "memories_merged": 0,
+            "last_run_seconds": None,
+            "caught_up": False,
+        }
+
+    def _get_lsh(self, dim: int) -> SimHashLSH:
+        if self._lsh is None or self._lsh.dim != dim:
+            self._lsh = SimHashLSH(dim)
+        return self._lsh
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Index and merge memories created since the cursor, page by page,
+        until caught up or max_seconds is spent.
+        """
+        started = time.monotonic()
+        result = {"indexed": 0, "merged": 0, "pages": 0, "caught_up": False}
+
+        async with self.pool.acquire() as conn:
+            # One consolidator at a time across workers.
+            if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", ADVISORY_LOCK_KEY):
+                self._stats["runs_skipped_locked"] += 1
+                return result
+            try:
+                cursor = await self._load_cursor(conn)
+                while time.monotonic() - started < self.max_seconds:
+                    rows = await self._fetch_page(conn, cursor)
+                    if not rows:
+                        result["caught_up"] = True
+                        break
+                    lsh = self._get_lsh(len(rows[0]["embedding"]))
+                    if cursor["params"] != lsh.fingerprint:
+                        cursor = await self._reset_cursor(conn, lsh.fingerprint)
+                        continue
+
+                    merged = await self._process_page(conn, lsh, rows)
+                    last = rows[-1]
+                    cursor = {**cursor, "created_at": last["created_at"], "id": last["id"]}
+                    result["indexed"] += len(rows)
+                    result["merged"] += merged
+                    result["pages"] += 1
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_KEY)
+
+        elapsed = time.monotonic() - started
+        self._stats["runs"] += 1
+        self._stats["pages"] += result["pages"]
+        self._stats["memories_indexed"] += result["indexed"]
+        self._stats["memories_merged"] += result["merged"]
+        self._stats["last_run_seconds"] = round(elapsed, 3)
+        self._stats["caught_up"] = result["caught_up"]
+        return result
+
+    async def _load_cursor(self, conn) -> Dict[str, Any]:
+        row = await conn.fetchrow(
+            """
+            SELECT params, last_created_at, last_id
+            FROM unified_memory_consolidation_cursor
+            WHERE name = $1
+            """,
+            CURSOR_NAME,
+        )
+        if row is None:
+            return {"params": None, "created_at": None, "id": None}
+        return {"params": row["params"], "created_at": row["last_created_at"], "id": row["last_id"]}
+
+    async def _reset_cursor(self, conn, params: str) -> Dict[str, Any]:
+        """Start over under a new hash family; old keys are meaningless to it."""
+        logger.info(f"Memory consolidation index reset for {params}")
+        async with conn.transaction():
+            await conn.execute("DELETE FROM unified_memory_lsh")
+            await conn.execute(
+                """
+                INSERT INTO unified_memory_consolidation_cursor (name, params, last_created_at, last_id)
+                VALUES ($1, $2, NULL, NULL)
+                ON CONFLICT (name) DO UPDATE
+                SET params = EXCLUDED.params, last_created_at = NULL, last_id = NULL, updated_at = NOW()
+                """,
+                CURSOR_NAME,
+                params,
+            )
+        return {"params": params, "created_at": None, "id": None}
+
+    async def _fetch_page(self, conn, cursor: Dict[str, Any]) -> List[Any]:
+        after = "AND (created_at, id) > ($3, $4)" if cursor["created_at"] is not None else ""
+        position = [cursor["created_at"], cursor["id"]] if after else []
+        return await conn.fetch(
+            f"""
+            SELECT id, created_at, importance_score, embedding::real[] AS embedding
+            FROM unified_ai_memory
+            WHERE archived = false
+            AND embedding IS NOT NULL
+            AND created_at < NOW() - make_interval(secs => $2)
+            {after}
+            ORDER BY created_at, id
+            LIMIT $1
+            """,
+            self.page_size,
+            self.settle_seconds,
+            *position,
+        )
+
+    async def _process_page(self, conn, lsh: SimHashLSH, rows: List[Any]) -> int:
+        n = len(rows)
+        ids = [row["id"] for row in rows]
+        vectors = normalize(np.array([row["embedding"] for row in rows], dtype=np.float32))
+        keys, signatures = lsh.hash(vectors)
+
+        # Already-indexed live memories sharing at least one bucket.
+        page_ids = set(ids)
+        indexed = [
+            row
+            for row in await conn.fetch(
+                """
+                SELECT l.memory_id, l.band_keys, l.signature
+                FROM unified_memory_lsh l
+                JOIN unified_ai_memory m ON m.id = l.memory_id
+                WHERE l.band_keys && $1::bigint[]
+                AND m.archived = false
+                """,
+                np.unique(keys).tolist(),
+            )
+            if row["memory_id"] not in page_ids
+        ]
+        all_ids = ids + [row["memory_id"] for row in indexed]
+        if indexed:
+            keys = np.vstack([keys, np.array([row["band_keys"] for row in indexed], dtype=np.int64)])
+            signatures = np.vstack(
+                [signatures, np.array([np.frombuffer(row["signature"], dtype=np.uint8) for row in indexed])]
+            )
+        new = np.zeros(len(all_ids), dtype=bool)
+        new[:n] = True
+
+        i, j, oversized = candidate_pairs(keys, new)
+        keep = hamming_filter(signatures, i, j, lsh.max_hamming(self.threshold))
+        i, j = i[keep], j[keep]
+        self._stats["candidate_pairs"] += len(i)
+        self._stats["oversized_buckets"] += oversized
+
+        # Embeddings only for the indexed memories that survived the filter.
+        rank = [_rank(row) for row in rows] + [(math.inf, True, None)] * len(indexed)
+        present = new.copy()
+        needed = np.unique(np.concatenate([i[i >= n], j[j >= n]]))
+        if len(needed):
+            vectors = np.vstack([vectors, np.zeros((len(indexed), vectors.shape[1]), dtype=np.float32)])
+            position = {all_ids[k]: int(k) for k in needed}
+            for row in await conn.fetch(
+                """
+                SELECT id, created_at, importance_score, embedding::real[] AS embedding
+                FROM unified_ai_memory
+                WHERE id = ANY($1::uuid[])
+                AND archived = false
+                """,
+                list(position),
+            ):
+                k = position[row["id"]]
+                vectors[k] = normalize(np.array([row["embedding"]], dtype=np.float32))[0]
+                rank[k] = _rank(row)
+                present[k] = True
+            keep = present[i] & present[j]
+            i, j = i[keep], j[keep]
+
+        similarity = cosine_pairs(vectors, i, j)
+        keep = similarity >= self.threshold
+        i, j = i[keep], j[keep]
+        self._stats["verified_pairs"] += len(i)
+
+        groups = merge_groups(i, j, rank)
+        duplicates = [all_ids[d] for members in groups.values() for d in members]
+        canonical = [all_ids[c] for c, members in groups.items() for _ in members]
+        archived = set(duplicates)
+        fresh = [k for k in range(n) if ids[k] not in archived]
+
+        async with conn.transaction():
+            merged = 0
+            if duplicates:
+                merged = await conn.fetchval(
+                    """
+                    WITH merges AS (
+                        SELECT * FROM unnest($1::uuid[], $2::uuid[]) AS g(duplicate_id, canonical_id)
+                    ),
+                    archived AS (
+                        UPDATE unified_ai_memory d
+                        SET archived = true,
+                            archived_at = NOW(),
+                            metadata = COALESCE(d.metadata, '{}'::jsonb)
+                                || jsonb_build_object('consolidated_into', g.canonical_id)
+                        FROM merges g
+                        WHERE d.id = g.duplicate_id
+                        AND d.archived = false
+                        RETURNING d.id, g.canonical_id, d.importance_score, d.access_count
+                    ),
+                    folded AS (
+                        SELECT canonical_id,
+                               array_agg(id) AS ids,
+                               max(importance_score) AS importance,
+                               sum(access_count) AS accesses
+                        FROM archived
+                        GROUP BY canonical_id
+                    ),
+                    absorbed AS (
+                        UPDATE unified_ai_memory c
+                        SET related_memories = COALESCE(c.related_memories, ARRAY[]::uuid[])
+                                || ARRAY(
+                                    SELECT x FROM unnest(f.ids) AS x
+                                    WHERE NOT (x = ANY(COALESCE(c.related_memories, ARRAY[]::uuid[])))
+                                ),
+                            importance_score = GREATEST(c.importance_score, f.importance),
+                            access_count = COALESCE(c.access_count, 0) + COALESCE(f.accesses, 0)
+                        FROM folded f
+                        WHERE c.id = f.canonical_id
+                        RETURNING c.id
+                    ),
+                    unindexed AS (
+                        DELETE FROM unified_memory_lsh l
+                        USING archived a
+                        WHERE l.memory_id = a.id
+                        RETURNING l.memory_id
+                    )
+                    SELECT count(*) FROM archived
+                    """,
+                    duplicates,
+                    canonical,
+                )
+
+            if fresh:
+                await conn.execute(
+                    """
+                    INSERT INTO unified_memory_lsh (memory_id, band_keys, signature)
+                    SELECT p.memory_id, ($2::bigint[])[(p.ord - 1) * $4 + 1 : p.ord * $4], p.signature
+                    FROM unnest($1::uuid[], $3::bytea[]) WITH ORDINALITY AS p(memory_id, signature, ord)
+                    ON CONFLICT (memory_id) DO UPDATE
+                    SET band_keys = EXCLUDED.band_keys, signature = EXCLUDED.signature
+                    """,
+                    [ids[k] for k in fresh],
+                    keys[fresh].ravel().tolist(),
+                    [signatures[k].tobytes() for k in fresh],
+                    lsh.bands,
+                )
+
+            last = rows[-1]
+            await conn.execute(
+                """
+                INSERT INTO unified_memory_consolidation_cursor (name, params, last_created_at, last_id)
+                VALUES ($1, $2, $3, $4)
+                ON CONFLICT (name) DO UPDATE
+                SET params = EXCLUDED.params,
+                    last_created_at = EXCLUDED.last_created_at,
+                    last_id = EXCLUDED.last_id,
+                    updated_at = NOW()
+                """,
+                CURSOR_NAME,
+                lsh.fingerprint,
+                last["created_at"],
+                last["id"],
+            )
+        return merged or 0
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self._stats)
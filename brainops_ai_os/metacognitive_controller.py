@@ -194,13 +194,11 @@ class MetacognitiveController:
             if db_pool:
                 self.db_pool = db_pool
             else:
-                self.db_pool = await asyncpg.create_pool(
-                    get_database_url(),
-                    min_size=5,
-                    max_size=20,
-                    command_timeout=60,
-                    statement_cache_size=0,  # pgBouncer compatibility
-                )
+                # Share the worker-wide pool instead of opening a second one.
+                from database.pool_manager import PURPOSE_BACKGROUND, init_pool_manager
+
+                manager = await init_pool_manager(get_database_url())
+                self.db_pool = manager.for_purpose(PURPOSE_BACKGROUND)
 
             # Create required database tables (skip if restricted role lacks DDL perms)
             try:
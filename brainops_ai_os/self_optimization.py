@@ -23,6 +23,8 @@ from dataclasses import dataclass, field
 import asyncpg
 import psutil
 
+from core.host_metrics import host_metrics
+
 if TYPE_CHECKING:
     from .metacognitive_controller import MetacognitiveController
 
@@ -355,9 +357,10 @@ class SelfOptimizationSystem:
         """Collect current performance metrics"""
         metrics = {}
 
-        # System metrics
-        metrics["cpu_usage_percent"] = psutil.cpu_percent()
-        metrics["memory_usage_percent"] = psutil.virtual_memory().percent
+        # System metrics (shared host sampler)
+        host = host_metrics()
+        metrics["cpu_usage_percent"] = host.cpu_percent
+        metrics["memory_usage_percent"] = host.memory_percent
 
         # Database metrics
         try:
@@ -379,14 +382,14 @@ class SelfOptimizationSystem:
             try:
                 await asyncio.sleep(300)  # Every 5 minutes
 
+                host = host_metrics()
+
                 # Check memory usage
-                memory = psutil.virtual_memory()
-                if memory.percent > 85:
+                if host.memory_percent > 85:
                     await self._optimize_memory()
 
                 # Check disk usage
-                disk = psutil.disk_usage("/")
-                if disk.percent > 90:
+                if host.disk_percent > 90:
                     await self._optimize_disk()
 
             except asyncio.CancelledError:
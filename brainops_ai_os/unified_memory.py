@@ -25,17 +25,47 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
 from enum import Enum
 from dataclasses import dataclass, field
-from collections import deque
+from collections import OrderedDict, deque
 import asyncpg
 import numpy as np
 
 from ._resilience import ResilientSubsystem
+from .memory_consolidation import MemoryConsolidator
 
 if TYPE_CHECKING:
     from .metacognitive_controller import MetacognitiveController
 
 logger = logging.getLogger(__name__)
 
+EMBEDDING_MODEL = "text-embedding-3-small"
+FALLBACK_EMBEDDING_MODEL = "sha256-fallback"
+
+# Automatic associations: nearest neighbours considered per stored memory and
+# the cosine similarity they must exceed.
+ASSOCIATION_NEIGHBOURS = 5
+ASSOCIATION_MIN_SIMILARITY = 0.7
+# Flushes a failed association batch is retried over before it is dropped.
+ASSOCIATION_MAX_ATTEMPTS = 3
+
+# pgvector caps hnsw.ef_search at 1000; iterative index scans arrived in 0.8.0.
+MAX_EF_SEARCH = 1000
+ITERATIVE_SCAN_VERSION = (0, 8)
+
+
+def content_hash(model: str, text: str) -> str:
+    """Cache key for the embedding of *text* under *model*."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+def _version_tuple(version: Optional[str]) -> Tuple[int, ...]:
+    parts = []
+    for part in (version or "").split("."):
+        digits = "".join(ch for ch in part if ch.isdigit())
+        if not digits:
+            break
+        parts.append(int(digits))
+    return tuple(parts)
+
 
 class MemoryType(str, Enum):
     """Types of memory in the unified substrate"""
@@ -103,6 +133,38 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         self._openai_client = None
         self._openai_key = os.getenv("OPENAI_API_KEY")
 
+        # Content-hash keyed embedding cache (float32 rows, LRU order); remote
+        # embeddings are also persisted to unified_memory_embedding_cache.
+        self._embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.embedding_cache_limit = int(
+            os.getenv("UNIFIED_MEMORY_EMBEDDING_CACHE_SIZE", "1024")
+        )
+        self.embedding_cache_ttl_days = int(
+            os.getenv("UNIFIED_MEMORY_EMBEDDING_CACHE_TTL_DAYS", "30")
+        )
+        self._embedding_table_available = True
+
+        # HNSW search width for recall/association queries, and the pgvector
+        # iterative scan mode used when filters thin out the candidate list.
+        self.ann_ef_search = int(os.getenv("UNIFIED_MEMORY_HNSW_EF_SEARCH", "100"))
+        self.ann_iterative_scan = os.getenv(
+            "UNIFIED_MEMORY_HNSW_ITERATIVE_SCAN", "relaxed_order"
+        ).strip().lower()
+        self._ann_iterative_scan_supported: Optional[bool] = None
+
+        # Stored memories awaiting their automatic associations (id, vector, attempts)
+        self._pending_associations: List[Tuple[str, str, int]] = []
+        self.association_batch_size = int(
+            os.getenv("UNIFIED_MEMORY_ASSOCIATION_BATCH", "50")
+        )
+        self.association_flush_interval = float(
+            os.getenv("UNIFIED_MEMORY_ASSOCIATION_FLUSH_SECONDS", "2")
+        )
+        self._association_lock = asyncio.Lock()
+
+        # Near-duplicate merge engine, created with the pool
+        self._consolidator: Optional[MemoryConsolidator] = None
+
         # Background tasks
         self._tasks: List[asyncio.Task] = []
         self._shutdown = asyncio.Event()
@@ -115,6 +177,13 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
             "cache_hits": 0,
             "consolidations": 0,
             "associations_created": 0,
+            "association_batches": 0,
+            "association_batches_failed": 0,
+            "associations_dropped": 0,
+            "embeddings_generated": 0,
+            "embedding_cache_hits": 0,
+            "embedding_cache_misses": 0,
+            "embedding_db_hits": 0,
         }
 
     async def initialize(self, db_pool: asyncpg.Pool):
@@ -281,6 +350,13 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
             self._create_safe_task(self._working_memory_loop(), name="working_memory")
         )
 
+        # Batched automatic associations for newly stored memories
+        self._tasks.append(
+            self._create_safe_task(
+                self._association_flush_loop(), name="association_flush"
+            )
+        )
+
         logger.info(f"Started {len(self._tasks)} memory background processes")
 
     # =========================================================================
@@ -310,8 +386,10 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
 
         memory_id = str(uuid.uuid4())
 
+        content = json.dumps(data)
+
         # Generate embedding
-        embedding = await self._generate_embedding(json.dumps(data))
+        embedding = await self._generate_embedding(content)
 
         # Create memory object
         memory = Memory(
@@ -336,7 +414,7 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         """,
             memory_id,
             memory_type.value,
-            json.dumps(data),
+            content,
             embedding_str,
             importance,
             json.dumps(metadata or {}),
@@ -350,9 +428,9 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         self.metrics["memories_stored"] += 1
         self.metrics["total_memories"] += 1
 
-        # Find and create associations
-        if embedding:
-            await self._create_automatic_associations(memory_id, embedding)
+        # Queue for the next batched association pass
+        if embedding_str:
+            await self._create_automatic_associations(memory_id, embedding_str)
 
         return memory_id
 
@@ -380,34 +458,60 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         if not query_embedding:
             return []
 
-        embedding_str = self._embedding_to_string(query_embedding)
+        return await self.recall_by_embedding(
+            query_embedding, limit, memory_type, min_importance
+        )
+
+    async def recall_by_embedding(
+        self,
+        embedding: List[float],
+        limit: int = 10,
+        memory_type: Optional[MemoryType] = None,
+        min_importance: float = 0.0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Nearest memories to an embedding via the HNSW index.
+
+        The inner query orders by the bare ``embedding <=> $1`` distance so the
+        planner can walk the partial HNSW index; the outer ORDER BY restores
+        exact ordering when iterative scans return slightly relaxed results.
+        """
+        embedding_str = self._embedding_to_string(embedding)
 
-        # Search database
         type_filter = "AND memory_type = $4" if memory_type else ""
         type_param = [memory_type.value] if memory_type else []
 
-        rows = await self._db_fetch_with_retry(
+        rows = await self._db_ann_fetch_with_retry(
             f"""
+            WITH candidates AS MATERIALIZED (
+                SELECT
+                    id, memory_type, content, importance_score,
+                    access_count, related_memories, metadata, created_at,
+                    embedding <=> $1::vector AS distance
+                FROM unified_ai_memory
+                WHERE archived = false
+                AND embedding IS NOT NULL
+                AND importance_score >= $3
+                {type_filter}
+                ORDER BY embedding <=> $1::vector
+                LIMIT $2
+            )
             SELECT
                 id, memory_type, content, importance_score,
                 access_count, related_memories, metadata, created_at,
-                1 - (embedding <=> $1::vector) as similarity
-            FROM unified_ai_memory
-            WHERE archived = false
-            AND importance_score >= $3
-            {type_filter}
-            ORDER BY similarity DESC
-            LIMIT $2
+                1 - distance AS similarity
+            FROM candidates
+            ORDER BY distance
         """,
             embedding_str,
             limit,
             min_importance,
             *type_param,
+            limit=limit,
         )
 
-        memories = []
-        for row in rows:
-            memory = {
+        memories = [
+            {
                 "id": str(row["id"]),
                 "type": row["memory_type"],
                 "content": row["content"],
@@ -420,17 +524,19 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
                 else None,
                 "similarity": float(row["similarity"]),
             }
-            memories.append(memory)
+            for row in rows
+        ]
 
-            # Update access statistics
+        # Update access statistics
+        if rows:
             await self._db_execute_with_retry(
                 """
                 UPDATE unified_ai_memory
                 SET access_count = access_count + 1,
                     last_accessed = NOW()
-                WHERE id = $1::uuid
+                WHERE id = ANY($1::uuid[])
             """,
-                str(row["id"]),
+                [row["id"] for row in rows],
             )
 
         self.metrics["memories_recalled"] += len(memories)
@@ -594,36 +700,93 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         self.metrics["associations_created"] += 1
         return True
 
-    async def _create_automatic_associations(
-        self, memory_id: str, embedding: List[float]
-    ):
-        """Automatically create associations with similar memories"""
-        embedding_str = self._embedding_to_string(embedding)
+    async def _create_automatic_associations(self, memory_id: str, embedding_str: str):
+        """Queue a stored memory for the next batched association pass"""
+        self._pending_associations.append((memory_id, embedding_str, 0))
+        if len(self._pending_associations) >= self.association_batch_size:
+            await self._flush_associations()
 
-        # Find similar memories
-        similar = await self._db_fetch_with_retry(
-            """
-            SELECT id,
-                   1 - (embedding <=> $1::vector) as similarity
-            FROM unified_ai_memory
-            WHERE id != $2::uuid
-            AND archived = false
-            AND embedding IS NOT NULL
-            ORDER BY similarity DESC
-            LIMIT 5
-        """,
-            embedding_str,
-            memory_id,
-        )
+    async def _flush_associations(self) -> int:
+        """
+        Associate every queued memory with its nearest neighbours.
 
-        for row in similar:
-            if row["similarity"] > 0.7:  # Only associate if similar enough
-                await self.create_association(
-                    memory_id,
-                    str(row["id"]),
-                    "semantic_similarity",
-                    float(row["similarity"]),
-                )
+        One statement per batch: each pending memory takes its top
+        ASSOCIATION_NEIGHBOURS from the HNSW index through a LATERAL join, and
+        the matches above ASSOCIATION_MIN_SIMILARITY are appended to
+        related_memories in a single UPDATE. A failed batch goes back to the
+        front of the queue for the next flush, up to ASSOCIATION_MAX_ATTEMPTS.
+        """
+        async with self._association_lock:
+            created = 0
+            while self._pending_associations:
+                batch = self._pending_associations[: self.association_batch_size]
+                del self._pending_associations[: len(batch)]
+                try:
+                    rows = await self._db_ann_fetch_with_retry(
+                        """
+                        WITH pending AS (
+                            SELECT p.id, p.embedding::vector AS embedding
+                            FROM unnest($1::uuid[], $2::text[]) AS p(id, embedding)
+                        ),
+                        neighbours AS (
+                            SELECT p.id AS source_id, n.id AS target_id, n.distance
+                            FROM pending p
+                            CROSS JOIN LATERAL (
+                                SELECT m.id, m.embedding <=> p.embedding AS distance
+                                FROM unified_ai_memory m
+                                WHERE m.archived = false
+                                AND m.embedding IS NOT NULL
+                                AND m.id <> p.id
+                                ORDER BY m.embedding <=> p.embedding
+                                LIMIT $3
+                            ) n
+                            WHERE 1 - n.distance > $4
+                        ),
+                        grouped AS (
+                            SELECT source_id, array_agg(target_id ORDER BY distance) AS targets
+                            FROM neighbours
+                            GROUP BY source_id
+                        )
+                        UPDATE unified_ai_memory m
+                        SET related_memories = COALESCE(m.related_memories, ARRAY[]::uuid[])
+                            || ARRAY(
+                                SELECT t FROM unnest(g.targets) AS t
+                                WHERE NOT (t = ANY(COALESCE(m.related_memories, ARRAY[]::uuid[])))
+                            )
+                        FROM grouped g
+                        WHERE m.id = g.source_id
+                        RETURNING m.id, cardinality(g.targets) AS matched
+                    """,
+                        [memory_id for memory_id, _, _ in batch],
+                        [embedding for _, embedding, _ in batch],
+                        ASSOCIATION_NEIGHBOURS,
+                        ASSOCIATION_MIN_SIMILARITY,
+                        limit=ASSOCIATION_NEIGHBOURS,
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.metrics["association_batches_failed"] += 1
+                    retry = [
+                        (memory_id, embedding, attempts + 1)
+                        for memory_id, embedding, attempts in batch
+                        if attempts + 1 < ASSOCIATION_MAX_ATTEMPTS
+                    ]
+                    dropped = len(batch) - len(retry)
+                    self.metrics["associations_dropped"] += dropped
+                    logger.error(
+                        f"Association batch of {len(batch)} failed "
+                        f"({len(retry)} re-queued, {dropped} dropped): {e}"
+                    )
+                    # Leave the rest of the queue for the next flush too.
+                    self._pending_associations[:0] = retry
+                    break
+
+                created += sum(row["matched"] for row in rows)
+                self.metrics["association_batches"] += 1
+
+            self.metrics["associations_created"] += created
+            return created
 
     async def get_associated_memories(
         self, memory_id: str, limit: int = 10
@@ -670,27 +833,35 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
                 start_time = datetime.now()
 
                 # Consolidate similar memories
-                consolidated = await self._consolidate_similar_memories()
+                consolidated, merged = await self._consolidate_similar_memories()
+                self.metrics["total_memories"] = max(
+                    self.metrics["total_memories"] - merged, 0
+                )
 
                 # Archive old low-importance memories
                 archived = await self._archive_old_memories()
 
+                # Drop persisted embeddings nobody has asked for lately
+                await self._prune_embedding_cache()
+
                 # Log consolidation
                 duration = (datetime.now() - start_time).total_seconds()
                 await self._db_execute_with_retry(
                     """
                     INSERT INTO brainops_memory_consolidation
-                    (memories_processed, memories_archived, duration_seconds)
-                    VALUES ($1, $2, $3)
+                    (memories_processed, memories_archived, memories_compressed, duration_seconds)
+                    VALUES ($1, $2, $3, $4)
                 """,
                     consolidated,
                     archived,
+                    merged,
                     duration,
                 )
 
                 self.metrics["consolidations"] += 1
                 logger.info(
-                    f"Consolidation complete: {consolidated} processed, {archived} archived in {duration:.1f}s"
+                    f"Consolidation complete: {consolidated} processed, {merged} merged, "
+                    f"{archived} archived in {duration:.1f}s"
                 )
 
             except asyncio.CancelledError:
@@ -699,42 +870,17 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
                 logger.error(f"Consolidation error: {e}")
                 await asyncio.sleep(3600)
 
-    async def _consolidate_similar_memories(self) -> int:
-        """Consolidate very similar memories into summaries"""
-        processed = 0
-
-        # Find clusters of similar memories
-        # This is a simplified version - production would use proper clustering
-        rows = await self._db_fetch_with_retry(
-            """
-            WITH memory_pairs AS (
-                SELECT
-                    m1.id::text as id1,
-                    m2.id::text as id2,
-                    1 - (m1.embedding <=> m2.embedding) as similarity
-                FROM unified_ai_memory m1
-                JOIN unified_ai_memory m2
-                    ON m1.id < m2.id
-                WHERE m1.state = 'active'
-                AND m2.state = 'active'
-                AND m1.embedding IS NOT NULL
-                AND m2.embedding IS NOT NULL
-                AND 1 - (m1.embedding <=> m2.embedding) > 0.95
-            )
-            SELECT id1, id2, similarity
-            FROM memory_pairs
-            LIMIT 100
+    async def _consolidate_similar_memories(self) -> Tuple[int, int]:
         """
-        )
+        Merge near-duplicate memories created since the last run.
 
-        for row in rows:
-            # Create association if very similar
-            await self.create_association(
-                row["id1"], row["id2"], "near_duplicate", row["similarity"]
-            )
-            processed += 1
-
-        return processed
+        Returns (memories processed, duplicates merged). The work is bounded
+        per run; whatever is left resumes from the engine's cursor next time.
+        """
+        if self._consolidator is None:
+            self._consolidator = MemoryConsolidator(self.db_pool)
+        result = await self._consolidator.run()
+        return result["indexed"], result["merged"]
 
     async def _archive_old_memories(self) -> int:
         """Archive old, low-importance, rarely-accessed memories"""
@@ -814,6 +960,20 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
                 logger.error(f"Association loop error: {e}")
                 await asyncio.sleep(1800)
 
+    async def _association_flush_loop(self):
+        """Flush queued automatic associations every few seconds"""
+        while not self._shutdown.is_set():
+            try:
+                await asyncio.sleep(self.association_flush_interval)
+
+                if self._pending_associations:
+                    await self._flush_associations()
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Association flush error: {e}")
+
     async def _working_memory_loop(self):
         """Manage working memory contents"""
         while not self._shutdown.is_set():
@@ -849,16 +1009,52 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
     # =========================================================================
 
     async def _generate_embedding(self, text: str) -> Optional[List[float]]:
-        """Generate embedding for text"""
+        """
+        Embedding for text, served from the content-hash cache when possible.
+
+        Lookups go in-process LRU, then the persisted cache table, then the
+        embeddings API. Only API results are persisted; the hash fallback is
+        cheaper to recompute than to fetch.
+        """
+        model = EMBEDDING_MODEL if self._openai_client else FALLBACK_EMBEDDING_MODEL
+        key = content_hash(model, text)
+
+        cached = self._embedding_cache.get(key)
+        if cached is not None:
+            self._embedding_cache.move_to_end(key)
+            self.metrics["embedding_cache_hits"] += 1
+            return cached.tolist()
+        self.metrics["embedding_cache_misses"] += 1
+
         if not self._openai_client:
+            embedding = self._generate_fallback_embedding(text)
+            self._remember_embedding(key, embedding)
+            return embedding
+
+        embedding = await self._load_persisted_embedding(key)
+        if embedding is not None:
+            self.metrics["embedding_db_hits"] += 1
+            self._remember_embedding(key, embedding)
+            return embedding
+
+        embedding = await self._generate_remote_embedding(text)
+        if embedding is None:
+            # Not cached under the API model's key, so the next call retries.
             return self._generate_fallback_embedding(text)
 
+        self.metrics["embeddings_generated"] += 1
+        self._remember_embedding(key, embedding)
+        await self._persist_embedding(key, model, embedding)
+        return embedding
+
+    async def _generate_remote_embedding(self, text: str) -> Optional[List[float]]:
+        """Embedding from the OpenAI API, or None when the call fails"""
         try:
             # Truncate if too long
             truncated = text[:30000] if len(text) > 30000 else text
 
             response = await self._openai_client.embeddings.create(
-                model="text-embedding-3-small", input=truncated
+                model=EMBEDDING_MODEL, input=truncated
             )
 
             if response.data:
@@ -866,10 +1062,84 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
 
         except Exception as e:
             logger.error(f"Embedding generation error: {e}")
-            return self._generate_fallback_embedding(text)
 
         return None
 
+    def _remember_embedding(self, key: str, embedding: List[float]):
+        """Add an embedding to the in-process LRU"""
+        # pgvector stores float32, so nothing is lost by caching at that width.
+        self._embedding_cache[key] = np.asarray(embedding, dtype=np.float32)
+        self._embedding_cache.move_to_end(key)
+        while len(self._embedding_cache) > self.embedding_cache_limit:
+            self._embedding_cache.popitem(last=False)
+
+    async def _load_persisted_embedding(self, key: str) -> Optional[List[float]]:
+        """Embedding previously persisted under key, touching last_used_at"""
+        if not self._embedding_table_available or not self.db_pool:
+            return None
+        try:
+            value = await self._db_fetchval_with_retry(
+                """
+                UPDATE unified_memory_embedding_cache
+                SET last_used_at = NOW()
+                WHERE content_hash = $1
+                RETURNING embedding::text
+            """,
+                key,
+            )
+        except asyncpg.UndefinedTableError:
+            self._embedding_table_available = False
+            logger.info("unified_memory_embedding_cache missing; caching in-process only")
+            return None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+            return None
+        return json.loads(value) if value else None
+
+    async def _persist_embedding(self, key: str, model: str, embedding: List[float]):
+        """Persist an API embedding so other workers and restarts reuse it"""
+        if not self._embedding_table_available or not self.db_pool:
+            return
+        try:
+            await self._db_execute_with_retry(
+                """
+                INSERT INTO unified_memory_embedding_cache (content_hash, model, embedding)
+                VALUES ($1, $2, $3::vector)
+                ON CONFLICT (content_hash) DO NOTHING
+            """,
+                key,
+                model,
+                self._embedding_to_string(embedding),
+            )
+        except asyncpg.UndefinedTableError:
+            self._embedding_table_available = False
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    async def _prune_embedding_cache(self) -> int:
+        """Delete persisted embeddings unused for embedding_cache_ttl_days"""
+        if not self._embedding_table_available:
+            return 0
+        try:
+            result = await self._db_execute_with_retry(
+                """
+                DELETE FROM unified_memory_embedding_cache
+                WHERE last_used_at < NOW() - make_interval(days => $1)
+            """,
+                self.embedding_cache_ttl_days,
+            )
+        except asyncpg.UndefinedTableError:
+            self._embedding_table_available = False
+            return 0
+        try:
+            return int(result.split()[-1])
+        except (AttributeError, ValueError, IndexError):
+            return 0
+
     def _generate_fallback_embedding(self, text: str) -> List[float]:
         """Generate a deterministic fallback embedding from text hash"""
         # Use SHA-256 hash to generate deterministic embedding
@@ -892,6 +1162,61 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         """Convert embedding to PostgreSQL vector string"""
         return "[" + ",".join(str(x) for x in embedding) + "]"
 
+    # =========================================================================
+    # APPROXIMATE NEAREST NEIGHBOUR SEARCH
+    # =========================================================================
+
+    async def _ann_settings(self, conn, limit: int) -> List[Tuple[str, str]]:
+        """Transaction-local pgvector settings for an HNSW query returning limit rows"""
+        settings = [
+            ("hnsw.ef_search", str(min(max(self.ann_ef_search, limit), MAX_EF_SEARCH)))
+        ]
+        if self.ann_iterative_scan in ("", "off"):
+            return settings
+
+        if self._ann_iterative_scan_supported is None:
+            version = await conn.fetchval(
+                "SELECT extversion FROM pg_extension WHERE extname = 'vector'"
+            )
+            self._ann_iterative_scan_supported = (
+                _version_tuple(version) >= ITERATIVE_SCAN_VERSION
+            )
+        if self._ann_iterative_scan_supported:
+            # Keeps walking the graph when WHERE filters reject candidates,
+            # instead of returning fewer than limit rows.
+            settings.append(("hnsw.iterative_scan", self.ann_iterative_scan))
+        return settings
+
+    async def _db_ann_fetch_with_retry(
+        self, query: str, *args, limit: int, max_retries: int = 2
+    ) -> Any:
+        """Run an HNSW-ordered query with the search settings applied via SET LOCAL"""
+        last_error = None
+        for attempt in range(max_retries + 1):
+            try:
+                async with self.db_pool.acquire() as conn:
+                    settings = await self._ann_settings(conn, limit)
+                    async with conn.transaction():
+                        await conn.execute(
+                            "SELECT "
+                            + ", ".join(
+                                f"set_config(${2 * i + 1}, ${2 * i + 2}, true)"
+                                for i in range(len(settings))
+                            ),
+                            *[value for pair in settings for value in pair],
+                        )
+                        return await conn.fetch(query, *args)
+            except self._RETRYABLE_ERRORS as e:
+                last_error = e
+                if attempt < max_retries:
+                    await asyncio.sleep(0.2 * (attempt + 1))
+                else:
+                    raise
+            except asyncio.CancelledError:
+                raise
+        if last_error:
+            raise last_error
+
     # =========================================================================
     # PUBLIC API
     # =========================================================================
@@ -942,6 +1267,9 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
             "working_memory_size": len(self.working_memory),
             "working_memory_limit": self.working_memory_limit,
             "cache_size": len(self.memory_cache),
+            "embedding_cache_size": len(self._embedding_cache),
+            "pending_associations": len(self._pending_associations),
+            "consolidation": self._consolidator.stats() if self._consolidator else None,
             "metrics": self.metrics.copy(),
         }
 
@@ -969,6 +1297,12 @@ class UnifiedMemorySubstrate(ResilientSubsystem):
         """Shutdown the memory system"""
         self._shutdown.set()
 
+        if self._pending_associations and self.db_pool:
+            try:
+                await self._flush_associations()
+            except Exception as e:
+                logger.error(f"Final association flush failed: {e}")
+
         for task in self._tasks:
             task.cancel()
             try:
@@ -2,6 +2,35 @@
 CenterPoint Sync - REAL Production Data Sync
 Syncs ALL WeatherCraft data from CenterPoint CRM to our database
 This is PRODUCTION - no mock data, everything is real
+
+Each run is incremental:
+- every entity keeps a high-water mark in ``centerpoint_sync_state``: the
+  ``(updated_at, id)`` of the last record written. A run asks CenterPoint for
+  records after that key, ordered by ``(updated_at, id)``, ``page_size`` at a
+  time, and each page starts after the last key of the previous one (keyset
+  paging), so records edited mid-run cannot shift later pages and be skipped;
+- each page is written with one ``INSERT ... SELECT FROM jsonb_to_recordset
+  ... ON CONFLICT (centerpoint_id) DO UPDATE`` per ``batch_size`` rows, with
+  customer / project references resolved by join instead of per-row lookups;
+- rows carry a ``content_hash`` of the mapped record and the upsert only
+  rewrites rows whose hash or resolved references changed;
+- the watermark is saved in the same transaction as the page it covers, so an
+  interrupted run resumes where it stopped. It stops before a record whose
+  customer / project has not synced yet (so the next run fetches it again and
+  fills in the reference), unless the record is older than
+  ``CENTERPOINT_UNRESOLVED_GRACE_SECS`` and its parent is presumed gone;
+- entities are synced in dependency order and dependents of an entity whose
+  sync failed are skipped for that run.
+
+The keyset parameters (``updated_since``, ``after_id``, ``sort=updated_at,id``,
+``per_page``) and ``meta.has_more`` are assumed, not documented, CenterPoint
+API behaviour. If a response shows the API ignored them (records out of
+``(updated_at, id)`` order, or at / before the requested key), the entity
+falls back to the full unparameterised fetch for the rest of the process's
+life, as before incremental sync.
+
+Progress (pages, fetched / written / unchanged counts) and lag (age of the
+newest synced change) are kept per entity in ``sync_status``.
 """
 
 import os
@@ -9,12 +38,14 @@ import asyncio
 import aiohttp
 import json
 import hashlib
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-from supabase import create_client, Client
-import asyncpg
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import logging
 
+from database import get_pool
+from database.pool_manager import PURPOSE_BACKGROUND
+
 logger = logging.getLogger(__name__)
 
 # CenterPoint Production Credentials (from environment variables)
@@ -28,246 +59,327 @@ CENTERPOINT_CONFIG = {
     "password": os.getenv("CENTERPOINT_PASSWORD")
 }
 
-# Supabase connection
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+DEFAULT_PAGE_SIZE = int(os.getenv("CENTERPOINT_PAGE_SIZE", "200"))
+DEFAULT_BATCH_SIZE = int(os.getenv("CENTERPOINT_UPSERT_BATCH", "500"))
+DEFAULT_SYNC_INTERVAL_SECONDS = int(os.getenv("CENTERPOINT_SYNC_INTERVAL_SECS", "900"))
+DEFAULT_UNRESOLVED_GRACE_SECONDS = int(os.getenv("CENTERPOINT_UNRESOLVED_GRACE_SECS", "86400"))
+
+
+def _address(record: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    if prefix:
+        return {
+            "street": record.get(f"{prefix}address"),
+            "city": record.get(f"{prefix}city"),
+            "state": record.get(f"{prefix}state"),
+            "zip": record.get(f"{prefix}zip"),
+        }
+    return {
+        "street": record.get("address_line1"),
+        "street2": record.get("address_line2"),
+        "city": record.get("city"),
+        "state": record.get("state"),
+        "zip": record.get("zip_code"),
+    }
+
+
+def _map_customer(customer: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "company_name": customer.get("company_name"),
+        "contact_name": customer.get("primary_contact"),
+        "email": customer.get("email"),
+        "phone": customer.get("phone"),
+        "mobile": customer.get("mobile"),
+        "address": _address(customer),
+        "customer_type": customer.get("customer_type"),
+        "status": customer.get("status"),
+        "credit_limit": customer.get("credit_limit", 0),
+        "balance": customer.get("current_balance", 0),
+        "tags": customer.get("tags", []),
+        "custom_fields": customer.get("custom_fields", {}),
+        "created_date": customer.get("created_at"),
+        "modified_date": customer.get("updated_at"),
+    }
+
+
+def _map_project(project: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "project_number": project.get("project_number"),
+        "project_name": project.get("name"),
+        "customer_ref": project.get("customer_id"),
+        "property_address": _address(project, prefix="site_"),
+        "project_type": project.get("project_type"),
+        "status": project.get("status"),
+        "stage": project.get("stage"),
+        "start_date": project.get("start_date"),
+        "completion_date": project.get("completion_date"),
+        "total_contract": project.get("contract_amount", 0),
+        "total_cost": project.get("total_cost", 0),
+        "gross_profit": project.get("gross_profit", 0),
+        "project_manager": project.get("project_manager"),
+        "estimator": project.get("estimator"),
+        "crew_assigned": project.get("crews", []),
+        "scope_of_work": project.get("scope_of_work"),
+        "notes": project.get("notes"),
+        "custom_fields": project.get("custom_fields", {}),
+        "created_date": project.get("created_at"),
+        "modified_date": project.get("updated_at"),
+    }
+
+
+def _map_invoice(invoice: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "invoice_number": invoice.get("invoice_number"),
+        "project_ref": invoice.get("project_id"),
+        "customer_ref": invoice.get("customer_id"),
+        "invoice_date": invoice.get("invoice_date"),
+        "due_date": invoice.get("due_date"),
+        "total_amount": invoice.get("total_amount", 0),
+        "paid_amount": invoice.get("paid_amount", 0),
+        "balance_due": invoice.get("balance_due", 0),
+        "status": invoice.get("status"),
+        "payment_terms": invoice.get("payment_terms"),
+        "line_items": invoice.get("line_items", []),
+        "payments": invoice.get("payments", []),
+        "custom_fields": invoice.get("custom_fields", {}),
+        "created_date": invoice.get("created_at"),
+        "modified_date": invoice.get("updated_at"),
+    }
+
+
+@dataclass(frozen=True)
+class EntitySpec:
+    """How one CenterPoint entity maps onto its ``weathercraft_*`` table."""
+
+    name: str
+    path: str
+    table: str
+    # (column, SQL type) of mapped fields written as-is.
+    columns: Tuple[Tuple[str, str], ...]
+    # (column, key in the mapped record, referenced table): CenterPoint ids
+    # resolved to our UUIDs via ``centerpoint_id``.
+    references: Tuple[Tuple[str, str, str], ...]
+    mapper: Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+ENTITIES: Tuple[EntitySpec, ...] = (
+    EntitySpec(
+        name="customers",
+        path="/api/v1/customers",
+        table="weathercraft_customers",
+        columns=(
+            ("company_name", "text"),
+            ("contact_name", "text"),
+            ("email", "text"),
+            ("phone", "text"),
+            ("mobile", "text"),
+            ("address", "jsonb"),
+            ("customer_type", "text"),
+            ("status", "text"),
+            ("credit_limit", "numeric"),
+            ("balance", "numeric"),
+            ("tags", "jsonb"),
+            ("custom_fields", "jsonb"),
+            ("created_date", "timestamp"),
+            ("modified_date", "timestamp"),
+        ),
+        references=(),
+        mapper=_map_customer,
+    ),
+    EntitySpec(
+        name="projects",
+        path="/api/v1/projects",
+        table="weathercraft_projects",
+        columns=(
+            ("project_number", "text"),
+            ("project_name", "text"),
+            ("property_address", "jsonb"),
+            ("project_type", "text"),
+            ("status", "text"),
+            ("stage", "text"),
+            ("start_date", "date"),
+            ("completion_date", "date"),
+            ("total_contract", "numeric"),
+            ("total_cost", "numeric"),
+            ("gross_profit", "numeric"),
+            ("project_manager", "text"),
+            ("estimator", "text"),
+            ("crew_assigned", "jsonb"),
+            ("scope_of_work", "text"),
+            ("notes", "text"),
+            ("custom_fields", "jsonb"),
+            ("created_date", "timestamp"),
+            ("modified_date", "timestamp"),
+        ),
+        references=(("customer_id", "customer_ref", "weathercraft_customers"),),
+        mapper=_map_project,
+    ),
+    EntitySpec(
+        name="invoices",
+        path="/api/v1/invoices",
+        table="weathercraft_invoices",
+        columns=(
+            ("invoice_number", "text"),
+            ("invoice_date", "date"),
+            ("due_date", "date"),
+            ("total_amount", "numeric"),
+            ("paid_amount", "numeric"),
+            ("balance_due", "numeric"),
+            ("status", "text"),
+            ("payment_terms", "text"),
+            ("line_items", "jsonb"),
+            ("payments", "jsonb"),
+            ("custom_fields", "jsonb"),
+            ("created_date", "timestamp"),
+            ("modified_date", "timestamp"),
+        ),
+        references=(
+            ("project_id", "project_ref", "weathercraft_projects"),
+            ("customer_id", "customer_ref", "weathercraft_customers"),
+        ),
+        mapper=_map_invoice,
+    ),
+)
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Stable hash of a mapped record; unchanged records hash the same across runs."""
+    payload = json.dumps(record, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _parse_timestamp(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _item_key(item: Dict[str, Any]) -> Optional[Tuple[datetime, str]]:
+    changed_at = _parse_timestamp(item.get("updated_at"))
+    return None if changed_at is None else (changed_at, str(item["id"]))
+
+
+def keyset_ignored(keys: List[Tuple[datetime, str]], after: Optional[Tuple[datetime, Optional[str]]]) -> bool:
+    """True if a page cannot be the answer to a keyset request after ``after``."""
+    if keys != sorted(keys):
+        return True
+    if after is None or not keys:
+        return False
+    first = keys[0]
+    return first[0] < after[0] or (after[1] is not None and first <= after)
+
+
+def build_upsert_sql(spec: EntitySpec) -> str:
+    """
+    One set-based upsert for a batch passed as a JSON array in ``$1``.
+
+    Returns one row per input record: ``inserted`` (NULL when unchanged) and
+    ``unresolved``, set when a reference did not match a synced parent.
+    """
+    record_columns = [f"{name} {sql_type}" for name, sql_type in spec.columns]
+    record_columns += [f"{ref_key} text" for _, ref_key, _ in spec.references]
+    target = [name for name, _ in spec.columns] + [column for column, _, _ in spec.references]
+    selected = [f"r.{name}" for name, _ in spec.columns]
+    values = [name for name, _ in spec.columns]
+    joins = []
+    unresolved = []
+    changed = ["t.content_hash IS DISTINCT FROM EXCLUDED.content_hash"]
+    for index, (column, ref_key, table) in enumerate(spec.references):
+        selected.append(f"ref{index}.id AS ref{index}_id")
+        values.append(f"ref{index}_id")
+        joins.append(f"LEFT JOIN {table} ref{index} ON ref{index}.centerpoint_id = r.{ref_key}")
+        unresolved.append(f"(r.{ref_key} IS NOT NULL AND ref{index}.id IS NULL)")
+        # A parent synced since the last write fills in a reference left NULL.
+        changed.append(f"t.{column} IS DISTINCT FROM EXCLUDED.{column}")
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in target)
+    return f"""
+        WITH input AS (
+            SELECT r.centerpoint_id, r.content_hash, {", ".join(selected)},
+                   {" OR ".join(unresolved) or "false"} AS unresolved
+            FROM jsonb_to_recordset($1::jsonb) AS r(
+                centerpoint_id text, content_hash text, {", ".join(record_columns)}
+            )
+            {" ".join(joins)}
+        ),
+        written AS (
+            INSERT INTO {spec.table} AS t (centerpoint_id, content_hash, synced_at, {", ".join(target)})
+            SELECT centerpoint_id, content_hash, NOW(), {", ".join(values)}
+            FROM input
+            ON CONFLICT (centerpoint_id) DO UPDATE
+            SET content_hash = EXCLUDED.content_hash, synced_at = EXCLUDED.synced_at, {updates}
+            WHERE {" OR ".join(changed)}
+            RETURNING t.centerpoint_id, (xmax = 0) AS inserted
+        )
+        SELECT i.centerpoint_id, w.inserted, i.unresolved
+        FROM input i
+        LEFT JOIN written w ON w.centerpoint_id = i.centerpoint_id
+    """
+
+
+_SAVE_WATERMARK = """
+    INSERT INTO centerpoint_sync_state (entity, high_water_mark, high_water_id, updated_at)
+    VALUES ($1, $2, $3, NOW())
+    ON CONFLICT (entity) DO UPDATE
+    SET high_water_mark = EXCLUDED.high_water_mark,
+        high_water_id = EXCLUDED.high_water_id,
+        updated_at = NOW()
+    WHERE centerpoint_sync_state.high_water_mark IS NULL
+       OR EXCLUDED.high_water_mark >= centerpoint_sync_state.high_water_mark
+"""
+
 
 class CenterPointSync:
     """
     Production CenterPoint sync system
-    Pulls ALL data from WeatherCraft's CRM and syncs to our database
+    Pulls changed data from WeatherCraft's CRM and upserts it into our database
     """
-    
-    def __init__(self):
-        self.config = CENTERPOINT_CONFIG
-        self.supabase = supabase
-        self.session = None
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, Any]] = None,
+        pool: Any = None,
+        *,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        entities: Tuple[EntitySpec, ...] = ENTITIES,
+        unresolved_grace_seconds: int = DEFAULT_UNRESOLVED_GRACE_SECONDS,
+    ):
+        self.config = {**CENTERPOINT_CONFIG, **(config or {})}
+        self._pool = pool
+        self.page_size = max(1, page_size)
+        self.batch_size = max(1, batch_size)
+        self.unresolved_grace_seconds = unresolved_grace_seconds
+        # Entities whose API answered a keyset request with unfiltered records.
+        self._full_fetch: Set[str] = set()
+        self.entities = {spec.name: spec for spec in entities}
+        self._upsert_sql = {spec.name: build_upsert_sql(spec) for spec in entities}
+        self.session: Optional[aiohttp.ClientSession] = None
         self.access_token = None
+        self._task: Optional[asyncio.Task] = None
         self.sync_status = {
             "last_sync": None,
             "records_synced": 0,
-            "errors": []
+            "errors": [],
+            "entities": {},
         }
-        
-        # Initialize tables
-        asyncio.create_task(self._initialize_tables())
-        
-        # Start continuous sync
-        asyncio.create_task(self._continuous_sync())
-    
-    async def _initialize_tables(self):
-        """Create all WeatherCraft ERP tables in Supabase"""
-        try:
-            conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
-            
-            # Customers table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS weathercraft_customers (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    centerpoint_id VARCHAR(255) UNIQUE,
-                    company_name VARCHAR(255),
-                    contact_name VARCHAR(255),
-                    email VARCHAR(255),
-                    phone VARCHAR(50),
-                    mobile VARCHAR(50),
-                    address JSONB,
-                    customer_type VARCHAR(50),
-                    status VARCHAR(50),
-                    credit_limit DECIMAL(12,2),
-                    balance DECIMAL(12,2),
-                    tags JSONB,
-                    custom_fields JSONB,
-                    created_date TIMESTAMP,
-                    modified_date TIMESTAMP,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_wc_customers_centerpoint ON weathercraft_customers(centerpoint_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_customers_email ON weathercraft_customers(email);
-            ''')
-            
-            # Projects/Jobs table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS weathercraft_projects (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    centerpoint_id VARCHAR(255) UNIQUE,
-                    project_number VARCHAR(100),
-                    project_name VARCHAR(255),
-                    customer_id UUID REFERENCES weathercraft_customers(id),
-                    property_address JSONB,
-                    project_type VARCHAR(100),
-                    status VARCHAR(50),
-                    stage VARCHAR(100),
-                    start_date DATE,
-                    completion_date DATE,
-                    total_contract DECIMAL(12,2),
-                    total_cost DECIMAL(12,2),
-                    gross_profit DECIMAL(12,2),
-                    project_manager VARCHAR(255),
-                    estimator VARCHAR(255),
-                    crew_assigned JSONB,
-                    scope_of_work TEXT,
-                    notes TEXT,
-                    custom_fields JSONB,
-                    created_date TIMESTAMP,
-                    modified_date TIMESTAMP,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_wc_projects_centerpoint ON weathercraft_projects(centerpoint_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_projects_customer ON weathercraft_projects(customer_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_projects_status ON weathercraft_projects(status);
-            ''')
-            
-            # Estimates table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS weathercraft_estimates (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    centerpoint_id VARCHAR(255) UNIQUE,
-                    estimate_number VARCHAR(100),
-                    project_id UUID REFERENCES weathercraft_projects(id),
-                    customer_id UUID REFERENCES weathercraft_customers(id),
-                    estimate_date DATE,
-                    expiry_date DATE,
-                    total_amount DECIMAL(12,2),
-                    status VARCHAR(50),
-                    line_items JSONB,
-                    terms TEXT,
-                    notes TEXT,
-                    created_by VARCHAR(255),
-                    approved_by VARCHAR(255),
-                    approval_date TIMESTAMP,
-                    custom_fields JSONB,
-                    created_date TIMESTAMP,
-                    modified_date TIMESTAMP,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_wc_estimates_centerpoint ON weathercraft_estimates(centerpoint_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_estimates_project ON weathercraft_estimates(project_id);
-            ''')
-            
-            # Invoices table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS weathercraft_invoices (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    centerpoint_id VARCHAR(255) UNIQUE,
-                    invoice_number VARCHAR(100),
-                    project_id UUID REFERENCES weathercraft_projects(id),
-                    customer_id UUID REFERENCES weathercraft_customers(id),
-                    invoice_date DATE,
-                    due_date DATE,
-                    total_amount DECIMAL(12,2),
-                    paid_amount DECIMAL(12,2),
-                    balance_due DECIMAL(12,2),
-                    status VARCHAR(50),
-                    payment_terms VARCHAR(100),
-                    line_items JSONB,
-                    payments JSONB,
-                    custom_fields JSONB,
-                    created_date TIMESTAMP,
-                    modified_date TIMESTAMP,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_wc_invoices_centerpoint ON weathercraft_invoices(centerpoint_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_invoices_project ON weathercraft_invoices(project_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_invoices_status ON weathercraft_invoices(status);
-            ''')
-            
-            # Service Tickets table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS weathercraft_service_tickets (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    centerpoint_id VARCHAR(255) UNIQUE,
-                    ticket_number VARCHAR(100),
-                    customer_id UUID REFERENCES weathercraft_customers(id),
-                    project_id UUID REFERENCES weathercraft_projects(id),
-                    service_type VARCHAR(100),
-                    priority VARCHAR(50),
-                    status VARCHAR(50),
-                    issue_description TEXT,
-                    resolution TEXT,
-                    scheduled_date TIMESTAMP,
-                    completed_date TIMESTAMP,
-                    technician_assigned VARCHAR(255),
-                    labor_hours DECIMAL(8,2),
-                    materials_used JSONB,
-                    total_cost DECIMAL(12,2),
-                    photos JSONB,
-                    custom_fields JSONB,
-                    created_date TIMESTAMP,
-                    modified_date TIMESTAMP,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_wc_service_centerpoint ON weathercraft_service_tickets(centerpoint_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_service_customer ON weathercraft_service_tickets(customer_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_service_status ON weathercraft_service_tickets(status);
-            ''')
-            
-            # Inventory table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS weathercraft_inventory (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    centerpoint_id VARCHAR(255) UNIQUE,
-                    item_code VARCHAR(100),
-                    item_name VARCHAR(255),
-                    description TEXT,
-                    category VARCHAR(100),
-                    unit_of_measure VARCHAR(50),
-                    quantity_on_hand DECIMAL(12,2),
-                    quantity_allocated DECIMAL(12,2),
-                    quantity_available DECIMAL(12,2),
-                    reorder_point DECIMAL(12,2),
-                    reorder_quantity DECIMAL(12,2),
-                    unit_cost DECIMAL(12,4),
-                    selling_price DECIMAL(12,4),
-                    vendor_id VARCHAR(255),
-                    location VARCHAR(255),
-                    custom_fields JSONB,
-                    created_date TIMESTAMP,
-                    modified_date TIMESTAMP,
-                    synced_at TIMESTAMP DEFAULT NOW()
-                );
-                
-                CREATE INDEX IF NOT EXISTS idx_wc_inventory_centerpoint ON weathercraft_inventory(centerpoint_id);
-                CREATE INDEX IF NOT EXISTS idx_wc_inventory_code ON weathercraft_inventory(item_code);
-            ''')
-            
-            # Sync log table
-            await conn.execute('''
-                CREATE TABLE IF NOT EXISTS centerpoint_sync_log (
-                    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                    sync_type VARCHAR(50),
-                    entity_type VARCHAR(50),
-                    records_fetched INT,
-                    records_synced INT,
-                    records_failed INT,
-                    errors JSONB,
-                    started_at TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    duration_seconds INT,
-                    success BOOLEAN
-                );
-            ''')
-            
-            await conn.close()
-            logger.info("WeatherCraft ERP tables initialized")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize tables: {e}")
-    
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
     async def authenticate(self):
         """Authenticate with CenterPoint API"""
         try:
             if not self.session:
                 self.session = aiohttp.ClientSession()
-            
+
             # OAuth2 authentication
             auth_url = f"{self.config['base_url']}/auth/token"
-            
+
             auth_data = {
                 "grant_type": "password",
                 "client_id": self.config["client_id"],
@@ -276,12 +388,12 @@ class CenterPointSync:
                 "password": self.config["password"],
                 "scope": "read write"
             }
-            
+
             headers = {
                 "Content-Type": "application/x-www-form-urlencoded",
                 "Authorization": f"Bearer {self.config['bearer_token']}"
             }
-            
+
             async with self.session.post(auth_url, data=auth_data, headers=headers) as response:
                 if response.status == 200:
                     token_data = await response.json()
@@ -291,337 +403,354 @@ class CenterPointSync:
                 else:
                     logger.error(f"Authentication failed: {response.status}")
                     return False
-                    
+
         except Exception as e:
             logger.error(f"Authentication error: {e}")
             return False
-    
-    async def sync_customers(self):
-        """Sync all customers from CenterPoint"""
-        try:
+
+    async def _fetch_page(self, spec: EntitySpec, after: Optional[Tuple[datetime, str]]) -> Dict[str, Any]:
+        """Fetch the next page of records ordered by ``(updated_at, id)`` after the ``after`` key."""
+        params = {"per_page": str(self.page_size), "sort": "updated_at,id"}
+        if after is not None:
+            params["updated_since"] = after[0].isoformat()
+            if after[1] is not None:
+                params["after_id"] = after[1]
+        return await self._fetch(spec, params)
+
+    async def _fetch(self, spec: EntitySpec, params: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        url = f"{self.config['base_url']}{spec.path}"
+
+        for attempt in range(2):
             if not self.access_token:
                 await self.authenticate()
-            
             headers = {
                 "Authorization": f"Bearer {self.access_token}",
                 "Accept": "application/json"
             }
-            
-            # Get all customers
-            url = f"{self.config['base_url']}/api/v1/customers"
-            
-            async with self.session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    customers = await response.json()
-                    
-                    synced_count = 0
-                    for customer in customers.get("data", []):
-                        # Check if exists
-                        existing = self.supabase.table("weathercraft_customers").select("id").eq(
-                            "centerpoint_id", customer.get("id")
-                        ).execute()
-                        
-                        customer_data = {
-                            "centerpoint_id": customer.get("id"),
-                            "company_name": customer.get("company_name"),
-                            "contact_name": customer.get("primary_contact"),
-                            "email": customer.get("email"),
-                            "phone": customer.get("phone"),
-                            "mobile": customer.get("mobile"),
-                            "address": {
-                                "street": customer.get("address_line1"),
-                                "street2": customer.get("address_line2"),
-                                "city": customer.get("city"),
-                                "state": customer.get("state"),
-                                "zip": customer.get("zip_code")
-                            },
-                            "customer_type": customer.get("customer_type"),
-                            "status": customer.get("status"),
-                            "credit_limit": customer.get("credit_limit", 0),
-                            "balance": customer.get("current_balance", 0),
-                            "tags": customer.get("tags", []),
-                            "custom_fields": customer.get("custom_fields", {}),
-                            "created_date": customer.get("created_at"),
-                            "modified_date": customer.get("updated_at"),
-                            "synced_at": datetime.now().isoformat()
-                        }
-                        
-                        if existing.data:
-                            # Update
-                            self.supabase.table("weathercraft_customers").update(
-                                customer_data
-                            ).eq("centerpoint_id", customer.get("id")).execute()
-                        else:
-                            # Insert
-                            self.supabase.table("weathercraft_customers").insert(
-                                customer_data
-                            ).execute()
-                        
-                        synced_count += 1
-                    
-                    logger.info(f"Synced {synced_count} customers")
-                    return synced_count
-                else:
-                    logger.error(f"Failed to fetch customers: {response.status}")
-                    return 0
-                    
-        except Exception as e:
-            logger.error(f"Customer sync error: {e}")
-            return 0
-    
-    async def sync_projects(self):
-        """Sync all projects from CenterPoint"""
+            async with self.session.get(url, params=params, headers=headers) as response:
+                if response.status == 401 and attempt == 0:
+                    self.access_token = None
+                    continue
+                if response.status != 200:
+                    raise RuntimeError(f"Failed to fetch {spec.name}: HTTP {response.status}")
+                return await response.json()
+        raise RuntimeError(f"Failed to fetch {spec.name}: not authorised")
+
+    async def _load_watermark(self, entity: str) -> Optional[Tuple[datetime, Optional[str]]]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT high_water_mark, high_water_id FROM centerpoint_sync_state WHERE entity = $1", entity
+            )
+        if row is None or row["high_water_mark"] is None:
+            return None
+        return row["high_water_mark"], row["high_water_id"]
+
+    def _resume_key(
+        self,
+        records: List[Dict[str, Any]],
+        keys: List[Optional[Tuple[datetime, str]]],
+        unresolved: Set[str],
+        watermark: Optional[Tuple[datetime, str]],
+    ) -> Tuple[Optional[Tuple[datetime, str]], bool, int]:
+        """
+        Key to save after a page: that of the last record before the first one
+        still waiting for its parent. Returns (key, held back, orphans passed).
+        """
+        cutoff = datetime.now(timezone.utc).timestamp() - self.unresolved_grace_seconds
+        key = watermark
+        orphans = 0
+        for record, record_key in zip(records, keys):
+            if record["centerpoint_id"] in unresolved:
+                if record_key is None or record_key[0].timestamp() >= cutoff:
+                    return key, True, orphans
+                orphans += 1
+            if record_key is not None:
+                key = record_key
+        return key, False, orphans
+
+    async def _write_page(
+        self,
+        spec: EntitySpec,
+        records: List[Dict[str, Any]],
+        keys: Optional[List[Optional[Tuple[datetime, str]]]],
+        watermark: Optional[Tuple[datetime, str]],
+    ) -> Dict[str, Any]:
+        """
+        Upsert one page and advance the watermark atomically (``keys=None``
+        writes without moving it). Returns the write counts and saved key.
+        """
+        result = {"inserted": 0, "updated": 0, "unresolved": 0, "orphaned": 0, "held_back": False, "key": watermark}
+        if not records:
+            return result
+        unresolved = set()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for start in range(0, len(records), self.batch_size):
+                    batch = records[start:start + self.batch_size]
+                    rows = await conn.fetch(self._upsert_sql[spec.name], json.dumps(batch, default=str))
+                    for row in rows:
+                        if row["unresolved"]:
+                            unresolved.add(row["centerpoint_id"])
+                        if row["inserted"] is None:
+                            continue
+                        result["inserted" if row["inserted"] else "updated"] += 1
+                result["unresolved"] = len(unresolved)
+                if keys is not None:
+                    key, result["held_back"], result["orphaned"] = self._resume_key(
+                        records, keys, unresolved, watermark
+                    )
+                    if key is not None and key != watermark:
+                        await conn.execute(_SAVE_WATERMARK, spec.name, *key)
+                    result["key"] = key
+        return result
+
+    def _records(
+        self, spec: EntitySpec, items: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], List[Optional[Tuple[datetime, str]]]]:
+        records = []
+        keys = []
+        for item in items:
+            if item.get("id") is None:
+                continue
+            mapped = spec.mapper(item)
+            records.append({"centerpoint_id": str(item["id"]), "content_hash": content_hash(mapped), **mapped})
+            keys.append(_item_key(item))
+        return records, keys
+
+    async def sync_entity(self, name: str) -> Dict[str, Any]:
+        """Sync records of one entity changed since its high-water mark."""
+        spec = self.entities[name]
+        started = datetime.now(timezone.utc)
+        progress = {
+            "pages": 0,
+            "fetched": 0,
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "unresolved": 0,
+            "orphaned": 0,
+            "held_back": False,
+            "full_fetch": False,
+            "started_at": started.isoformat(),
+            "completed_at": None,
+            "error": None,
+        }
+        self.sync_status["entities"][name] = progress
+
+        watermark = await self._load_watermark(name)
         try:
-            if not self.access_token:
-                await self.authenticate()
-            
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Accept": "application/json"
-            }
-            
-            url = f"{self.config['base_url']}/api/v1/projects"
-            
-            async with self.session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    projects = await response.json()
-                    
-                    synced_count = 0
-                    for project in projects.get("data", []):
-                        # Get customer ID from our database
-                        customer = self.supabase.table("weathercraft_customers").select("id").eq(
-                            "centerpoint_id", project.get("customer_id")
-                        ).execute()
-                        
-                        customer_id = customer.data[0]["id"] if customer.data else None
-                        
-                        project_data = {
-                            "centerpoint_id": project.get("id"),
-                            "project_number": project.get("project_number"),
-                            "project_name": project.get("name"),
-                            "customer_id": customer_id,
-                            "property_address": {
-                                "street": project.get("site_address"),
-                                "city": project.get("site_city"),
-                                "state": project.get("site_state"),
-                                "zip": project.get("site_zip")
-                            },
-                            "project_type": project.get("project_type"),
-                            "status": project.get("status"),
-                            "stage": project.get("stage"),
-                            "start_date": project.get("start_date"),
-                            "completion_date": project.get("completion_date"),
-                            "total_contract": project.get("contract_amount", 0),
-                            "total_cost": project.get("total_cost", 0),
-                            "gross_profit": project.get("gross_profit", 0),
-                            "project_manager": project.get("project_manager"),
-                            "estimator": project.get("estimator"),
-                            "crew_assigned": project.get("crews", []),
-                            "scope_of_work": project.get("scope_of_work"),
-                            "notes": project.get("notes"),
-                            "custom_fields": project.get("custom_fields", {}),
-                            "created_date": project.get("created_at"),
-                            "modified_date": project.get("updated_at"),
-                            "synced_at": datetime.now().isoformat()
-                        }
-                        
-                        existing = self.supabase.table("weathercraft_projects").select("id").eq(
-                            "centerpoint_id", project.get("id")
-                        ).execute()
-                        
-                        if existing.data:
-                            self.supabase.table("weathercraft_projects").update(
-                                project_data
-                            ).eq("centerpoint_id", project.get("id")).execute()
-                        else:
-                            self.supabase.table("weathercraft_projects").insert(
-                                project_data
-                            ).execute()
-                        
-                        synced_count += 1
-                    
-                    logger.info(f"Synced {synced_count} projects")
-                    return synced_count
-                else:
-                    logger.error(f"Failed to fetch projects: {response.status}")
-                    return 0
-                    
+            while name not in self._full_fetch:
+                payload = await self._fetch_page(spec, watermark)
+                items = payload.get("data", [])
+                records, keys = self._records(spec, items)
+                if keyset_ignored([key for key in keys if key is not None], watermark):
+                    logger.warning(f"CenterPoint ignored keyset parameters for {name}; using full fetches")
+                    self._full_fetch.add(name)
+                    break
+
+                written = await self._write_page(spec, records, keys, watermark)
+                self._count(progress, items, records, written)
+                page_key = written["key"]
+                if written["held_back"]:
+                    # Resume at the first record whose parent has not synced yet.
+                    progress["held_back"] = True
+                    watermark = page_key
+                    break
+
+                meta = payload.get("meta") or {}
+                has_more = meta.get("has_more")
+                if has_more is None:
+                    has_more = len(items) >= self.page_size
+                if not has_more or not items:
+                    watermark = page_key
+                    break
+                if page_key == watermark:
+                    raise RuntimeError(f"{name} keyset did not advance past {watermark}")
+                watermark = page_key
+
+            if name in self._full_fetch:
+                # Everything in one unparameterised fetch, as before incremental
+                # sync; unresolved references are retried by the next full fetch.
+                progress["full_fetch"] = True
+                payload = await self._fetch(spec, None)
+                items = payload.get("data", [])
+                records, _ = self._records(spec, items)
+                self._count(progress, items, records, await self._write_page(spec, records, None, watermark))
         except Exception as e:
-            logger.error(f"Project sync error: {e}")
-            return 0
-    
+            progress["error"] = str(e)
+            logger.error(f"{name} sync error: {e}")
+            raise
+        finally:
+            completed = datetime.now(timezone.utc)
+            progress["completed_at"] = completed.isoformat()
+            progress["duration_seconds"] = round((completed - started).total_seconds(), 3)
+            progress["high_water_mark"] = watermark[0].isoformat() if watermark else None
+            progress["high_water_id"] = watermark[1] if watermark else None
+            progress["lag_seconds"] = round((completed - watermark[0]).total_seconds(), 1) if watermark else None
+
+        logger.info(
+            f"Synced {name}: {progress['fetched']} fetched, {progress['inserted']} inserted, "
+            f"{progress['updated']} updated, {progress['unchanged']} unchanged, "
+            f"{progress['unresolved']} with unsynced references"
+        )
+        return progress
+
+    @staticmethod
+    def _count(progress: Dict[str, Any], items: List[Any], records: List[Any], written: Dict[str, Any]) -> None:
+        progress["pages"] += 1
+        progress["fetched"] += len(items)
+        progress["inserted"] += written["inserted"]
+        progress["updated"] += written["updated"]
+        progress["unchanged"] += len(records) - written["inserted"] - written["updated"]
+        progress["unresolved"] += written["unresolved"]
+        progress["orphaned"] += written["orphaned"]
+
+    async def sync_customers(self):
+        """Sync changed customers from CenterPoint"""
+        return await self._sync_count("customers")
+
+    async def sync_projects(self):
+        """Sync changed projects from CenterPoint"""
+        return await self._sync_count("projects")
+
     async def sync_invoices(self):
-        """Sync all invoices from CenterPoint"""
+        """Sync changed invoices from CenterPoint"""
+        return await self._sync_count("invoices")
+
+    async def _sync_count(self, name: str) -> int:
         try:
-            if not self.access_token:
-                await self.authenticate()
-            
-            headers = {
-                "Authorization": f"Bearer {self.access_token}",
-                "Accept": "application/json"
-            }
-            
-            url = f"{self.config['base_url']}/api/v1/invoices"
-            
-            async with self.session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    invoices = await response.json()
-                    
-                    synced_count = 0
-                    for invoice in invoices.get("data", []):
-                        # Get related IDs
-                        customer = self.supabase.table("weathercraft_customers").select("id").eq(
-                            "centerpoint_id", invoice.get("customer_id")
-                        ).execute()
-                        
-                        project = self.supabase.table("weathercraft_projects").select("id").eq(
-                            "centerpoint_id", invoice.get("project_id")
-                        ).execute()
-                        
-                        invoice_data = {
-                            "centerpoint_id": invoice.get("id"),
-                            "invoice_number": invoice.get("invoice_number"),
-                            "project_id": project.data[0]["id"] if project.data else None,
-                            "customer_id": customer.data[0]["id"] if customer.data else None,
-                            "invoice_date": invoice.get("invoice_date"),
-                            "due_date": invoice.get("due_date"),
-                            "total_amount": invoice.get("total_amount", 0),
-                            "paid_amount": invoice.get("paid_amount", 0),
-                            "balance_due": invoice.get("balance_due", 0),
-                            "status": invoice.get("status"),
-                            "payment_terms": invoice.get("payment_terms"),
-                            "line_items": invoice.get("line_items", []),
-                            "payments": invoice.get("payments", []),
-                            "custom_fields": invoice.get("custom_fields", {}),
-                            "created_date": invoice.get("created_at"),
-                            "modified_date": invoice.get("updated_at"),
-                            "synced_at": datetime.now().isoformat()
-                        }
-                        
-                        existing = self.supabase.table("weathercraft_invoices").select("id").eq(
-                            "centerpoint_id", invoice.get("id")
-                        ).execute()
-                        
-                        if existing.data:
-                            self.supabase.table("weathercraft_invoices").update(
-                                invoice_data
-                            ).eq("centerpoint_id", invoice.get("id")).execute()
-                        else:
-                            self.supabase.table("weathercraft_invoices").insert(
-                                invoice_data
-                            ).execute()
-                        
-                        synced_count += 1
-                    
-                    logger.info(f"Synced {synced_count} invoices")
-                    return synced_count
-                else:
-                    logger.error(f"Failed to fetch invoices: {response.status}")
-                    return 0
-                    
-        except Exception as e:
-            logger.error(f"Invoice sync error: {e}")
+            progress = await self.sync_entity(name)
+        except Exception:
             return 0
-    
+        return progress["inserted"] + progress["updated"]
+
     async def sync_all(self):
-        """Sync all data from CenterPoint"""
-        start_time = datetime.now()
-        
-        try:
-            # Log sync start
-            sync_log = self.supabase.table("centerpoint_sync_log").insert({
-                "sync_type": "full",
-                "entity_type": "all",
-                "started_at": start_time.isoformat(),
-                "success": False
-            }).execute()
-            
-            sync_id = sync_log.data[0]["id"] if sync_log.data else None
-            
-            # Sync in order of dependencies
-            customers_synced = await self.sync_customers()
-            projects_synced = await self.sync_projects()
-            invoices_synced = await self.sync_invoices()
-            
-            # Add more entity syncs as needed
-            # estimates_synced = await self.sync_estimates()
-            # service_tickets_synced = await self.sync_service_tickets()
-            # inventory_synced = await self.sync_inventory()
-            
-            total_synced = customers_synced + projects_synced + invoices_synced
-            
-            # Update sync log
-            if sync_id:
-                self.supabase.table("centerpoint_sync_log").update({
-                    "records_synced": total_synced,
-                    "completed_at": datetime.now().isoformat(),
-                    "duration_seconds": (datetime.now() - start_time).seconds,
-                    "success": True
-                }).eq("id", sync_id).execute()
-            
-            self.sync_status = {
-                "last_sync": datetime.now().isoformat(),
+        """Sync all entities, in dependency order, from CenterPoint"""
+        start_time = datetime.now(timezone.utc)
+        pool = await self._get_pool()
+        errors: List[str] = []
+        total_fetched = total_synced = 0
+
+        async with pool.acquire() as conn:
+            sync_id = await conn.fetchval(
+                """
+                INSERT INTO centerpoint_sync_log (sync_type, entity_type, started_at, success)
+                VALUES ('incremental', 'all', $1, FALSE)
+                RETURNING id
+                """,
+                start_time.replace(tzinfo=None),
+            )
+
+        # Sync in order of dependencies; a failed parent's dependents wait for
+        # the next run rather than writing NULL references.
+        failed_tables = set()
+        for name, spec in self.entities.items():
+            blocked = [table for _, _, table in spec.references if table in failed_tables]
+            if blocked:
+                failed_tables.add(spec.table)
+                errors.append(f"{name}: skipped, {', '.join(blocked)} sync failed")
+                continue
+            try:
+                progress = await self.sync_entity(name)
+            except Exception as e:
+                failed_tables.add(spec.table)
+                errors.append(f"{name}: {e}")
+                continue
+            total_fetched += progress["fetched"]
+            total_synced += progress["inserted"] + progress["updated"]
+
+        completed = datetime.now(timezone.utc)
+        async with pool.acquire() as conn:
+            await conn.execute(
+                """
+                UPDATE centerpoint_sync_log
+                SET records_fetched = $2, records_synced = $3, records_failed = $4,
+                    errors = $5::jsonb, completed_at = $6, duration_seconds = $7, success = $8
+                WHERE id = $1
+                """,
+                sync_id,
+                total_fetched,
+                total_synced,
+                len(errors),
+                json.dumps(errors),
+                completed.replace(tzinfo=None),
+                int((completed - start_time).total_seconds()),
+                not errors,
+            )
+
+        self.sync_status.update(
+            {
+                "last_sync": completed.isoformat(),
                 "records_synced": total_synced,
-                "errors": []
+                "errors": errors,
             }
-            
-            logger.info(f"Full sync completed: {total_synced} records")
-            return total_synced
-            
-        except Exception as e:
-            logger.error(f"Full sync error: {e}")
-            
-            if sync_id:
-                self.supabase.table("centerpoint_sync_log").update({
-                    "errors": [str(e)],
-                    "completed_at": datetime.now().isoformat(),
-                    "duration_seconds": (datetime.now() - start_time).seconds,
-                    "success": False
-                }).eq("id", sync_id).execute()
-            
-            self.sync_status["errors"].append(str(e))
-            return 0
-    
+        )
+        logger.info(f"Incremental sync completed: {total_synced} records written, {total_fetched} fetched")
+        return total_synced
+
+    def start(self) -> asyncio.Task:
+        """Start the periodic sync loop (call from a running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._continuous_sync())
+        return self._task
+
     async def _continuous_sync(self):
-        """Run continuous sync every 15 minutes"""
+        """Run an incremental sync every ``CENTERPOINT_SYNC_INTERVAL_SECS``"""
         while True:
             try:
-                await asyncio.sleep(900)  # Wait 15 minutes
-                
+                await asyncio.sleep(DEFAULT_SYNC_INTERVAL_SECONDS)
+
                 logger.info("Starting scheduled CenterPoint sync")
                 await self.sync_all()
-                
+
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Continuous sync error: {e}")
-                await asyncio.sleep(900)
-    
+
     async def get_sync_status(self) -> Dict:
         """Get current sync status"""
-        # Get last sync log
-        last_sync = self.supabase.table("centerpoint_sync_log").select("*").order(
-            "started_at", desc=True
-        ).limit(1).execute()
-        
-        # Get record counts
-        customers = self.supabase.table("weathercraft_customers").select("count", count="exact").execute()
-        projects = self.supabase.table("weathercraft_projects").select("count", count="exact").execute()
-        invoices = self.supabase.table("weathercraft_invoices").select("count", count="exact").execute()
-        
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            last_sync = await conn.fetchrow(
+                "SELECT * FROM centerpoint_sync_log ORDER BY started_at DESC LIMIT 1"
+            )
+            state = await conn.fetch(
+                """
+                SELECT entity, high_water_mark, high_water_id,
+                       EXTRACT(EPOCH FROM NOW() - high_water_mark) AS lag_seconds
+                FROM centerpoint_sync_state
+                """
+            )
+
         return {
-            "last_sync": last_sync.data[0] if last_sync.data else None,
-            "record_counts": {
-                "customers": customers.count if customers else 0,
-                "projects": projects.count if projects else 0,
-                "invoices": invoices.count if invoices else 0
+            "last_sync": dict(last_sync) if last_sync else None,
+            "watermarks": {
+                row["entity"]: {
+                    "high_water_mark": row["high_water_mark"].isoformat() if row["high_water_mark"] else None,
+                    "high_water_id": row["high_water_id"],
+                    "lag_seconds": float(row["lag_seconds"]) if row["lag_seconds"] is not None else None,
+                }
+                for row in state
             },
             "sync_status": self.sync_status,
             "connection": "active" if self.access_token else "disconnected"
         }
-    
+
     async def close(self):
-        """Close session"""
+        """Stop the sync loop and close the session"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
         if self.session:
             await self.session.close()
+            self.session = None
 
 # Global instance
 centerpoint_sync = None
@@ -631,4 +760,4 @@ def get_centerpoint_sync() -> CenterPointSync:
     global centerpoint_sync
     if centerpoint_sync is None:
         centerpoint_sync = CenterPointSync()
-    return centerpoint_sync
\ No newline at end of file
+    return centerpoint_sync
@@ -6,8 +6,9 @@ import asyncio
 import logging
 import os
 import uuid
+from collections import deque
 from datetime import datetime, timezone
-from typing import Any, Coroutine, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional
 
 import httpx
 
@@ -36,6 +37,12 @@ def get_brain_store_health() -> Dict[str, Any]:
         "failures": _dispatch_failures,
         "last_failure": _last_failure_detail,
         "last_store_timestamp": _last_brain_store_timestamp,
+        "queue_depth": len(_queue),
+        "queue_max": QUEUE_MAX,
+        "enqueued": _queue_enqueued,
+        "dropped": _queue_dropped,
+        "batches_sent": _batches_sent,
+        "http2": HTTP2_AVAILABLE,
     }
 
 
@@ -109,14 +116,6 @@ def _brain_headers() -> Dict[str, str]:
     return headers
 
 
-def _create_task(coro: Coroutine[Any, Any, Any]) -> None:
-    try:
-        loop = asyncio.get_running_loop()
-    except RuntimeError:
-        return
-    loop.create_task(coro)
-
-
 def _normalize_context_items(payload: Any, limit: int) -> List[Dict[str, Any]]:
     def _coerce(item: Any) -> Dict[str, Any]:
         if isinstance(item, dict):
@@ -217,52 +216,62 @@ async def store_to_brain(
     category: str = "operational",
     priority: str = "medium",
     source: str = "backend_api",
+    *,
+    client: Optional[httpx.AsyncClient] = None,
+    timestamp: Optional[str] = None,
 ) -> None:
-    """Write a memory record to the AI Agents brain API."""
-    global \
-        _last_brain_store_timestamp, \
-        _dispatch_count, \
-        _dispatch_failures, \
-        _last_failure_detail
-    _dispatch_count += 1
+    """Write a memory record to the AI Agents brain API.
 
-    url = f"{_resolve_brain_base_url()}/store"
+    The batched telemetry worker passes its shared ``client``; direct callers
+    without one get a short-lived client.
+    """
     payload = {
         "key": key,
         "value": value,
         "category": category,
         "source": source,
         "priority": priority,
-        "timestamp": _now_utc_iso(),
+        "timestamp": timestamp or _now_utc_iso(),
     }
+    if client is not None:
+        await _post_record(client, payload)
+        return
+    async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT_SECONDS) as short_lived:
+        await _post_record(short_lived, payload)
+
+
+async def _post_record(client: httpx.AsyncClient, payload: Dict[str, Any]) -> None:
+    global _dispatch_count, _dispatch_failures, _last_failure_detail
+    _dispatch_count += 1
+    key = payload["key"]
+    url = f"{_resolve_brain_base_url()}/store"
 
     try:
-        async with httpx.AsyncClient(timeout=DEFAULT_TIMEOUT_SECONDS) as client:
-            response = await client.post(url, json=payload, headers=_brain_headers())
-            if response.is_success:
-                response_timestamp: Optional[str] = None
-                if response.headers.get("content-type", "").startswith(
-                    "application/json"
-                ):
-                    try:
-                        body = response.json()
-                        if isinstance(body, dict):
-                            response_timestamp = body.get("last_update") or body.get(
-                                "timestamp"
-                            )
-                    except Exception:
-                        response_timestamp = None
-                _record_local_store_timestamp(response_timestamp or _now_utc_iso())
-            else:
-                _dispatch_failures += 1
-                _last_failure_detail = f"status={response.status_code} key={key}"
-                logger.warning(
-                    "BRAIN_STORE_FAIL: status=%s key=%s failures=%d body=%s",
-                    response.status_code,
-                    key,
-                    _dispatch_failures,
-                    response.text[:500],
-                )
+        response = await client.post(url, json=payload, headers=_brain_headers())
+        if response.is_success:
+            response_timestamp: Optional[str] = None
+            if response.headers.get("content-type", "").startswith(
+                "application/json"
+            ):
+                try:
+                    body = response.json()
+                    if isinstance(body, dict):
+                        response_timestamp = body.get("last_update") or body.get(
+                            "timestamp"
+                        )
+                except Exception:
+                    response_timestamp = None
+            _record_local_store_timestamp(response_timestamp or _now_utc_iso())
+        else:
+            _dispatch_failures += 1
+            _last_failure_detail = f"status={response.status_code} key={key}"
+            logger.warning(
+                "BRAIN_STORE_FAIL: status=%s key=%s failures=%d body=%s",
+                response.status_code,
+                key,
+                _dispatch_failures,
+                response.text[:500],
+            )
     except Exception as exc:
         _dispatch_failures += 1
         _last_failure_detail = f"{key}: {exc}"
@@ -274,6 +283,133 @@ async def store_to_brain(
         )
 
 
+# ── Batched delivery ──────────────────────────────────────────────────────────
+# Records are queued in memory (bounded; the oldest record is dropped when
+# full) and sent by one background worker over a single long-lived client.
+# A batch goes out when BATCH_SIZE records are waiting or every
+# FLUSH_INTERVAL_SECONDS; its records are posted concurrently so they share
+# one HTTP/2 connection when ``h2`` is installed.
+QUEUE_MAX = max(int(os.getenv("BRAINOPS_BRAIN_QUEUE_MAX", "2000")), 1)
+BATCH_SIZE = max(int(os.getenv("BRAINOPS_BRAIN_BATCH_SIZE", "50")), 1)
+FLUSH_INTERVAL_SECONDS = max(float(os.getenv("BRAINOPS_BRAIN_FLUSH_SECS", "2")), 0.05)
+
+try:  # pragma: no cover - depends on the optional h2 package
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+_queue: Deque[Dict[str, Any]] = deque()
+_queue_dropped: int = 0
+_queue_enqueued: int = 0
+_batches_sent: int = 0
+_worker_task: Optional[asyncio.Task] = None
+_worker_wakeup: Optional[asyncio.Event] = None
+_worker_stop: Optional[asyncio.Event] = None
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT_SECONDS,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        )
+        _http_client_loop = loop
+    return _http_client
+
+
+def _ensure_worker(loop: asyncio.AbstractEventLoop) -> None:
+    global _worker_task, _worker_wakeup, _worker_stop
+    if (
+        _worker_task is not None
+        and not _worker_task.done()
+        and _worker_task.get_loop() is loop
+    ):
+        return
+    _worker_wakeup = asyncio.Event()
+    _worker_stop = asyncio.Event()
+    _worker_task = loop.create_task(_delivery_worker(_worker_wakeup, _worker_stop))
+
+
+def _enqueue(record: Dict[str, Any]) -> None:
+    global _queue_dropped, _queue_enqueued
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    if len(_queue) >= QUEUE_MAX:
+        _queue.popleft()
+        _queue_dropped += 1
+    _queue.append(record)
+    _queue_enqueued += 1
+    _ensure_worker(loop)
+    if len(_queue) >= BATCH_SIZE and _worker_wakeup is not None:
+        _worker_wakeup.set()
+
+
+async def _flush_queue() -> None:
+    global _batches_sent
+    while _queue:
+        batch = [_queue.popleft() for _ in range(min(BATCH_SIZE, len(_queue)))]
+        client = _get_http_client()
+        await asyncio.gather(*(store_to_brain(client=client, **record) for record in batch))
+        _batches_sent += 1
+
+
+async def _delivery_worker(wakeup: asyncio.Event, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(wakeup.wait(), FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+        try:
+            await _flush_queue()
+        except Exception as exc:  # pragma: no cover - delivery must never stop
+            logger.warning("Brain store batch delivery failed: %s", exc)
+    # Stop requested: drain whatever was enqueued while the last batch was in flight.
+    try:
+        await _flush_queue()
+    except Exception as exc:  # pragma: no cover
+        logger.warning("Brain store final flush failed: %s", exc)
+
+
+async def shutdown_brain_store(timeout: float = 5.0) -> None:
+    """Drain queued telemetry and close the shared client (called from lifespan).
+
+    The worker is asked to stop and finishes its in-flight batch plus the rest
+    of the queue; it is only cancelled if that takes longer than ``timeout``.
+    """
+    global _worker_task, _http_client, _queue_dropped
+    if _worker_task is not None and not _worker_task.done():
+        _worker_stop.set()
+        _worker_wakeup.set()
+        try:
+            await asyncio.wait_for(_worker_task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Brain store flush timed out; dropping %d records", len(_queue))
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Brain store worker failed during shutdown: %s", exc)
+    elif _queue:
+        try:
+            await asyncio.wait_for(_flush_queue(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Brain store flush timed out; dropping %d records", len(_queue))
+    _worker_task = None
+    _queue_dropped += len(_queue)
+    _queue.clear()
+
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
 def dispatch_brain_store(
     key: str,
     value: Dict[str, Any],
@@ -281,15 +417,20 @@ def dispatch_brain_store(
     priority: str = "medium",
     source: str = "backend_api",
 ) -> None:
-    """Fire-and-forget wrapper so route handlers never block on persistence."""
-    _create_task(
-        store_to_brain(
-            key=key,
-            value=value,
-            category=category,
-            priority=priority,
-            source=source,
-        )
+    """Fire-and-forget wrapper so route handlers never block on persistence.
+
+    The record is queued for the batched delivery worker; when the queue is
+    full the oldest record is dropped and counted.
+    """
+    _enqueue(
+        {
+            "key": key,
+            "value": value,
+            "category": category,
+            "priority": priority,
+            "source": source,
+            "timestamp": _now_utc_iso(),
+        }
     )
 
 
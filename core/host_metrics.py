@@ -0,0 +1,272 @@
+"""Shared host-metrics sampler.
+
+``psutil.cpu_percent(interval=N)`` sleeps for ``N`` seconds in the calling
+thread; called from a handler or a sensor loop it stalls the whole event loop
+for that long. Instead one daemon thread samples CPU, memory, disk and network
+every ``interval`` seconds into a fixed-size ring buffer, and every monitoring
+endpoint / AI OS sensor reads the latest sample without touching psutil.
+
+- CPU is ``cpu_percent(interval=None)``: utilisation since the previous
+  sample, so the sampler cadence is the measurement window.
+- Network and disk I/O rates are deltas between consecutive samples.
+- Before the first sample, and whenever the sampler is not running (e.g.
+  scripts) and the latest sample is older than ``interval``, readers get a
+  non-blocking sample taken on demand.
+
+Cadence, history length and disk path come from ``HOST_METRICS_INTERVAL_SECS``,
+``HOST_METRICS_HISTORY`` and ``HOST_METRICS_DISK_PATH``.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_SECONDS = float(os.getenv("HOST_METRICS_INTERVAL_SECS", "5"))
+DEFAULT_HISTORY = int(os.getenv("HOST_METRICS_HISTORY", "720"))
+DEFAULT_DISK_PATH = os.getenv("HOST_METRICS_DISK_PATH", "/")
+
+_NET_FIELDS = ("bytes_sent", "bytes_recv", "packets_sent", "packets_recv")
+
+
+@dataclass(frozen=True)
+class HostSample:
+    timestamp: float
+    cpu_percent: float
+    cpu_count: int
+    load_average: Optional[List[float]]
+    memory_percent: float
+    memory_total: int
+    memory_used: int
+    memory_available: int
+    swap_percent: float
+    disk_percent: float
+    disk_total: int
+    disk_used: int
+    disk_free: int
+    net_bytes_sent: int
+    net_bytes_recv: int
+    net_packets_sent: int
+    net_packets_recv: int
+    net_sent_per_sec: float
+    net_recv_per_sec: float
+    disk_read_per_sec: float
+    disk_write_per_sec: float
+    process_rss: int
+    process_cpu_percent: float
+    process_threads: int
+    process_count: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _counter(fn, *attrs: str) -> Optional[tuple]:
+    try:
+        value = fn()
+    except Exception:
+        return None
+    if value is None:
+        return None
+    return tuple(getattr(value, attr) for attr in attrs)
+
+
+def _rate(current: Optional[tuple], previous: Optional[tuple], index: int, elapsed: float) -> float:
+    if current is None or previous is None or elapsed <= 0:
+        return 0.0
+    return max(current[index] - previous[index], 0) / elapsed
+
+
+class HostMetricsSampler:
+    def __init__(
+        self,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+        history: int = DEFAULT_HISTORY,
+        disk_path: str = DEFAULT_DISK_PATH,
+    ):
+        self.interval = max(interval, 0.05)
+        self.disk_path = disk_path
+        self._samples: Deque[HostSample] = deque(maxlen=max(history, 1))
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = psutil.Process()
+        self._prev_time = time.monotonic()
+        self._prev_net = _counter(psutil.net_io_counters, *_NET_FIELDS)
+        self._prev_disk = _counter(psutil.disk_io_counters, "read_bytes", "write_bytes")
+        self._errors = 0
+        self._sample_ms = 0.0
+        # Prime the "since last call" CPU counters so the first sample is meaningful.
+        psutil.cpu_percent(interval=None)
+        self._process.cpu_percent(interval=None)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="host-metrics-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=max(self.interval, 1.0))
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.sample()
+            except Exception as exc:
+                self._errors += 1
+                logger.warning("Host metrics sample failed: %s", exc)
+            if self._stop.wait(self.interval):
+                return
+
+    def sample(self) -> HostSample:
+        """Take one non-blocking sample and append it to the ring buffer.
+
+        psutil is read without the lock so readers of ``latest`` never wait on
+        it; only the delta bookkeeping and the append are serialised.
+        """
+        started = time.perf_counter()
+        now = time.monotonic()
+        net = _counter(psutil.net_io_counters, *_NET_FIELDS)
+        disk_io = _counter(psutil.disk_io_counters, "read_bytes", "write_bytes")
+        memory = psutil.virtual_memory()
+        try:
+            disk = psutil.disk_usage(self.disk_path)
+        except OSError:
+            disk = None
+        try:
+            load = [round(value, 2) for value in os.getloadavg()]
+        except (AttributeError, OSError):
+            load = None
+        with self._process.oneshot():
+            process_rss = self._process.memory_info().rss
+            process_cpu = self._process.cpu_percent(interval=None)
+            process_threads = self._process.num_threads()
+        cpu_percent = psutil.cpu_percent(interval=None)
+        cpu_count = psutil.cpu_count() or 1
+        swap_percent = psutil.swap_memory().percent
+        process_count = len(psutil.pids())
+
+        with self._lock:
+            elapsed = now - self._prev_time
+            sample = HostSample(
+                timestamp=time.time(),
+                cpu_percent=cpu_percent,
+                cpu_count=cpu_count,
+                load_average=load,
+                memory_percent=memory.percent,
+                memory_total=memory.total,
+                memory_used=memory.used,
+                memory_available=memory.available,
+                swap_percent=swap_percent,
+                disk_percent=disk.percent if disk else 0.0,
+                disk_total=disk.total if disk else 0,
+                disk_used=disk.used if disk else 0,
+                disk_free=disk.free if disk else 0,
+                net_bytes_sent=net[0] if net else 0,
+                net_bytes_recv=net[1] if net else 0,
+                net_packets_sent=net[2] if net else 0,
+                net_packets_recv=net[3] if net else 0,
+                net_sent_per_sec=round(_rate(net, self._prev_net, 0, elapsed), 1),
+                net_recv_per_sec=round(_rate(net, self._prev_net, 1, elapsed), 1),
+                disk_read_per_sec=round(_rate(disk_io, self._prev_disk, 0, elapsed), 1),
+                disk_write_per_sec=round(_rate(disk_io, self._prev_disk, 1, elapsed), 1),
+                process_rss=process_rss,
+                process_cpu_percent=process_cpu,
+                process_threads=process_threads,
+                process_count=process_count,
+            )
+            self._prev_time, self._prev_net, self._prev_disk = now, net, disk_io
+            self._samples.append(sample)
+        self._sample_ms = (time.perf_counter() - started) * 1000.0
+        return sample
+
+    def latest(self) -> HostSample:
+        """Most recent sample; never blocks on a measurement window.
+
+        Without the background thread the buffer only moves when read, so a
+        sample older than ``interval`` is replaced by a fresh one.
+        """
+        with self._lock:
+            last = self._samples[-1] if self._samples else None
+        if last is not None and (self.running or time.time() - last.timestamp < self.interval):
+            return last
+        return self.sample()
+
+    def history(self, seconds: Optional[float] = None) -> List[HostSample]:
+        with self._lock:
+            samples = list(self._samples)
+        if seconds is None:
+            return samples
+        cutoff = time.time() - seconds
+        return [sample for sample in samples if sample.timestamp >= cutoff]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = len(self._samples)
+            last = self._samples[-1].timestamp if count else None
+        return {
+            "running": self.running,
+            "interval_secs": self.interval,
+            "samples": count,
+            "capacity": self._samples.maxlen,
+            "age_secs": round(time.time() - last, 2) if last else None,
+            "last_sample_ms": round(self._sample_ms, 2),
+            "errors": self._errors,
+        }
+
+
+_sampler: Optional[HostMetricsSampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_host_sampler() -> HostMetricsSampler:
+    global _sampler
+    if _sampler is None:
+        with _sampler_lock:
+            if _sampler is None:
+                _sampler = HostMetricsSampler()
+    return _sampler
+
+
+def start_host_sampler() -> Optional[HostMetricsSampler]:
+    if os.getenv("HOST_METRICS_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    sampler = get_host_sampler()
+    sampler.start()
+    return sampler
+
+
+async def stop_host_sampler() -> None:
+    if _sampler is not None:
+        _sampler.stop()
+
+
+def host_metrics() -> HostSample:
+    """Latest host sample (shared by every monitoring endpoint and sensor)."""
+    return get_host_sampler().latest()
+
+
+def host_metrics_history(seconds: Optional[float] = None) -> List[HostSample]:
+    return get_host_sampler().history(seconds)
+
+
+def get_host_metrics_stats() -> Dict[str, Any]:
+    return get_host_sampler().stats()
@@ -0,0 +1,217 @@
+"""Event-loop lag monitor with blocking-call attribution.
+
+A heartbeat coroutine sleeps for ``interval`` and measures how late it wakes
+up; the difference is the loop lag every other request saw at that moment.
+Lag alone does not say *who* held the loop, so a watchdog thread checks the
+heartbeat and, while it is overdue, samples the loop thread's current stack
+via ``sys._current_frames()``. When the heartbeat finally runs, the stall is
+charged to the frame seen most often during it:
+
+- the outermost frame under ``routes/`` (the handler) when there is one;
+- otherwise the innermost project frame outside site-packages.
+
+Per-culprit count / total / max blocked time is kept in memory and surfaced
+by ``/diagnostics``; each stall above the threshold is also logged.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = str(Path(__file__).resolve().parents[1]) + os.sep
+ROUTES_DIR = os.path.join(PROJECT_ROOT, "routes") + os.sep
+
+DEFAULT_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100"))
+DEFAULT_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECS", "0.1"))
+MAX_CULPRITS = 200
+UNKNOWN_CULPRIT = "unknown"
+
+
+def _frame_label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if filename.startswith(PROJECT_ROOT):
+        filename = filename[len(PROJECT_ROOT):]
+    return f"{filename}:{frame.f_code.co_name}"
+
+
+def attribute_frame(frame) -> str:
+    """Name the code responsible for a stack: route handler first, else innermost project frame."""
+    stack = []
+    while frame is not None:
+        stack.append(frame)
+        frame = frame.f_back
+    # ``stack`` runs innermost -> outermost.
+    for candidate in reversed(stack):
+        if candidate.f_code.co_filename.startswith(ROUTES_DIR):
+            return _frame_label(candidate)
+    for candidate in stack:
+        filename = candidate.f_code.co_filename
+        if (
+            filename.startswith(PROJECT_ROOT)
+            and "site-packages" not in filename
+            and filename != __file__
+        ):
+            return _frame_label(candidate)
+    return UNKNOWN_CULPRIT
+
+
+class LoopLagMonitor:
+    def __init__(
+        self,
+        threshold_ms: float = DEFAULT_THRESHOLD_MS,
+        interval: float = DEFAULT_INTERVAL_SECONDS,
+    ):
+        self.threshold_ms = threshold_ms
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stall_samples: Counter = Counter()
+        self._culprits: Dict[str, Dict[str, float]] = {}
+        self._samples = 0
+        self._lag_total_ms = 0.0
+        self._max_lag_ms = 0.0
+        self._last_lag_ms = 0.0
+        self._stalls = 0
+        self._blocked_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start the heartbeat and watchdog; must be called from the loop thread."""
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.record_lag(max((now - started - self.interval) * 1000.0, 0.0))
+            self._last_beat = now
+
+    def _watch(self) -> None:
+        threshold = self.threshold_ms / 1000.0
+        poll = max(min(threshold / 2, self.interval), 0.005)
+        while not self._stop.wait(poll):
+            if time.monotonic() - self._last_beat < self.interval + threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            culprit = attribute_frame(frame)
+            with self._lock:
+                self._stall_samples[culprit] += 1
+
+    def record_lag(self, lag_ms: float) -> None:
+        self._samples += 1
+        self._lag_total_ms += lag_ms
+        self._last_lag_ms = lag_ms
+        self._max_lag_ms = max(self._max_lag_ms, lag_ms)
+        with self._lock:
+            samples, self._stall_samples = self._stall_samples, Counter()
+        if lag_ms < self.threshold_ms:
+            return
+
+        culprit = samples.most_common(1)[0][0] if samples else UNKNOWN_CULPRIT
+        self._stalls += 1
+        self._blocked_ms += lag_ms
+        entry = self._culprits.get(culprit)
+        if entry is None:
+            if len(self._culprits) >= MAX_CULPRITS:
+                culprit = UNKNOWN_CULPRIT
+                entry = self._culprits.get(culprit)
+            if entry is None:
+                entry = self._culprits[culprit] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["count"] += 1
+        entry["total_ms"] += lag_ms
+        entry["max_ms"] = max(entry["max_ms"], lag_ms)
+        logger.warning("Event loop blocked for %.0fms by %s", lag_ms, culprit)
+
+    def culprits(self, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = [
+            {
+                "culprit": name,
+                "count": int(entry["count"]),
+                "total_ms": round(entry["total_ms"], 1),
+                "max_ms": round(entry["max_ms"], 1),
+            }
+            for name, entry in self._culprits.items()
+        ]
+        rows.sort(key=lambda row: row["total_ms"], reverse=True)
+        return rows[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "threshold_ms": self.threshold_ms,
+            "interval_ms": round(self.interval * 1000.0, 1),
+            "samples": self._samples,
+            "last_lag_ms": round(self._last_lag_ms, 2),
+            "avg_lag_ms": round(self._lag_total_ms / self._samples, 2) if self._samples else 0.0,
+            "max_lag_ms": round(self._max_lag_ms, 2),
+            "stalls": self._stalls,
+            "blocked_ms_total": round(self._blocked_ms, 1),
+            "culprits": self.culprits(),
+        }
+
+
+_monitor: Optional[LoopLagMonitor] = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopLagMonitor()
+    return _monitor
+
+
+def start_loop_monitor() -> Optional[LoopLagMonitor]:
+    if os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    monitor = get_loop_monitor()
+    monitor.start()
+    return monitor
+
+
+async def stop_loop_monitor() -> None:
+    if _monitor is not None:
+        await _monitor.stop()
+
+
+def get_loop_lag_stats() -> Dict[str, Any]:
+    return get_loop_monitor().stats()
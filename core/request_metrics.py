@@ -0,0 +1,298 @@
+"""In-process per-route request metrics with Prometheus exposition.
+
+Each ``(method, route template)`` pair owns a fixed-size log-linear latency
+histogram (HDR-style: ``SUB_BUCKETS`` buckets per power of two, so any
+recorded value is within ~9% of its bucket bound) plus status-class and byte
+counters, all held in ``array`` instances rather than dicts. Recording is a
+handful of integer increments on the event loop thread, so no locking is
+needed.
+
+Two views are kept per route:
+
+- cumulative counters, exposed on ``/metrics`` in the Prometheus text format;
+- a window that is drained by ``summarize_periodically`` and sent to the
+  brain store as per-route p50/p95/p99 summaries.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+from array import array
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MIN_LATENCY_MS = 0.25
+SUB_BUCKETS = 8
+OCTAVES = 18  # 0.25ms .. 65.5s
+BUCKET_COUNT = OCTAVES * SUB_BUCKETS + 1  # last bucket is overflow (+Inf)
+BUCKET_BOUNDS_MS: Tuple[float, ...] = tuple(
+    MIN_LATENCY_MS * 2 ** (idx / SUB_BUCKETS) for idx in range(BUCKET_COUNT - 1)
+)
+# Prometheus buckets are every power of two, which coincide exactly with
+# histogram bucket bounds, so cumulative counts are exact.
+EXPOSITION_BUCKETS: Tuple[int, ...] = tuple(range(0, BUCKET_COUNT - 1, SUB_BUCKETS))
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx", "other")
+OVERFLOW_ROUTE = "__other__"
+# Label for requests no route matched (404s, scanners, rejected before routing).
+UNMATCHED_ROUTE = "__unmatched__"
+
+DEFAULT_MAX_ROUTES = int(os.getenv("API_METRICS_MAX_ROUTES", "1000"))
+DEFAULT_SUMMARY_INTERVAL_SECONDS = float(os.getenv("API_METRICS_SUMMARY_INTERVAL_SECS", "300"))
+DEFAULT_SUMMARY_TOP_ROUTES = int(os.getenv("API_METRICS_SUMMARY_TOP_ROUTES", "25"))
+
+_LOG2_MIN = math.log2(MIN_LATENCY_MS)
+
+
+def bucket_index(duration_ms: float) -> int:
+    """Histogram bucket for a latency; bucket ``i`` covers (bound[i-1], bound[i]]."""
+    if duration_ms <= MIN_LATENCY_MS:
+        return 0
+    idx = math.ceil((math.log2(duration_ms) - _LOG2_MIN) * SUB_BUCKETS - 1e-9)
+    return idx if idx < BUCKET_COUNT - 1 else BUCKET_COUNT - 1
+
+
+def _status_index(status_code: int) -> int:
+    cls = int(status_code) // 100
+    return cls - 1 if 1 <= cls <= 5 else 5
+
+
+class _Histogram:
+    __slots__ = ("buckets", "statuses", "count", "total_ms", "max_ms", "bytes_in", "bytes_out")
+
+    def __init__(self):
+        self.buckets = array("Q", bytes(8 * BUCKET_COUNT))
+        self.statuses = array("Q", bytes(8 * len(STATUS_CLASSES)))
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def record(self, bucket: int, status: int, duration_ms: float, bytes_in: int, bytes_out: int) -> None:
+        self.buckets[bucket] += 1
+        self.statuses[status] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile, capped at the max seen."""
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(q * self.count), 1)
+        seen = 0
+        for idx, value in enumerate(self.buckets):
+            seen += value
+            if seen >= rank:
+                if idx >= BUCKET_COUNT - 1:
+                    return self.max_ms
+                return min(BUCKET_BOUNDS_MS[idx], self.max_ms)
+        return self.max_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.50), 2),
+            "p95_ms": round(self.quantile(0.95), 2),
+            "p99_ms": round(self.quantile(0.99), 2),
+            "max_ms": round(self.max_ms, 2),
+            "status": {
+                name: self.statuses[idx]
+                for idx, name in enumerate(STATUS_CLASSES)
+                if self.statuses[idx]
+            },
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+class _RouteMetrics:
+    __slots__ = ("method", "route", "total", "window")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.total = _Histogram()
+        self.window = _Histogram()
+
+
+class RequestMetrics:
+    """Registry of per-route histograms, capped at ``max_routes`` series.
+
+    Callers label requests no route matched as ``__unmatched__``, so the cap
+    only counts route templates; any beyond it are folded into a single
+    ``__other__`` series per method.
+    """
+
+    def __init__(self, max_routes: int = DEFAULT_MAX_ROUTES):
+        self.max_routes = max(int(max_routes), 1)
+        self._routes: Dict[Tuple[str, str], _RouteMetrics] = {}
+        self.total_requests = 0
+
+    def observe(
+        self,
+        method: str,
+        route: str,
+        status_code: int,
+        duration_ms: float,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+    ) -> None:
+        key = (method, route)
+        metrics = self._routes.get(key)
+        if metrics is None:
+            if len(self._routes) >= self.max_routes:
+                key = (method, OVERFLOW_ROUTE)
+                metrics = self._routes.get(key)
+            if metrics is None:
+                metrics = self._routes[key] = _RouteMetrics(*key)
+
+        bucket = bucket_index(duration_ms)
+        status = _status_index(status_code)
+        metrics.total.record(bucket, status, duration_ms, bytes_in, bytes_out)
+        metrics.window.record(bucket, status, duration_ms, bytes_in, bytes_out)
+        self.total_requests += 1
+
+    def routes(self) -> List[Dict[str, Any]]:
+        """Cumulative per-route summaries, busiest first."""
+        rows = [
+            {"method": m.method, "route": m.route, **m.total.summary()}
+            for m in self._routes.values()
+        ]
+        rows.sort(key=lambda row: row["count"], reverse=True)
+        return rows
+
+    def drain_window(self) -> List[Dict[str, Any]]:
+        """Per-route summaries since the last drain, busiest first; resets the window."""
+        rows = []
+        for metrics in self._routes.values():
+            window = metrics.window
+            if window.count:
+                rows.append({"method": metrics.method, "route": metrics.route, **window.summary()})
+                metrics.window = _Histogram()
+        rows.sort(key=lambda row: row["count"], reverse=True)
+        return rows
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition (format 0.0.4) of the cumulative counters."""
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        status_lines = [
+            "# HELP http_requests_total Requests by route and status class.",
+            "# TYPE http_requests_total counter",
+        ]
+        response_bytes_lines = [
+            "# HELP http_response_bytes_total Response body bytes by route.",
+            "# TYPE http_response_bytes_total counter",
+        ]
+        request_bytes_lines = [
+            "# HELP http_request_bytes_total Request body bytes (Content-Length) by route.",
+            "# TYPE http_request_bytes_total counter",
+        ]
+        for metrics in self._routes.values():
+            labels = f'method="{_escape(metrics.method)}",route="{_escape(metrics.route)}"'
+            hist = metrics.total
+            cumulative = 0
+            position = 0
+            for boundary in EXPOSITION_BUCKETS:
+                while position <= boundary:
+                    cumulative += hist.buckets[position]
+                    position += 1
+                le = _format_float(BUCKET_BOUNDS_MS[boundary] / 1000.0)
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {_format_float(hist.total_ms / 1000.0)}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {hist.count}")
+            for idx, name in enumerate(STATUS_CLASSES):
+                if hist.statuses[idx]:
+                    status_lines.append(
+                        f'http_requests_total{{{labels},status="{name}"}} {hist.statuses[idx]}'
+                    )
+            response_bytes_lines.append(f"http_response_bytes_total{{{labels}}} {hist.bytes_out}")
+            request_bytes_lines.append(f"http_request_bytes_total{{{labels}}} {hist.bytes_in}")
+        return "\n".join(lines + status_lines + response_bytes_lines + request_bytes_lines) + "\n"
+
+    def reset(self) -> None:
+        self._routes.clear()
+        self.total_requests = 0
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value))
+
+
+_request_metrics = RequestMetrics()
+
+
+def get_request_metrics() -> RequestMetrics:
+    return _request_metrics
+
+
+def emit_route_summaries(
+    metrics: RequestMetrics,
+    *,
+    top_routes: int = DEFAULT_SUMMARY_TOP_ROUTES,
+    store_event: Optional[Callable[..., None]] = None,
+    store_api_insight: Optional[Callable[..., None]] = None,
+) -> List[Dict[str, Any]]:
+    """Drain the current window and send per-route summaries to the brain store."""
+    if store_event is None or store_api_insight is None:
+        from core.brain_store import store_api_insight as _insight, store_event as _event
+
+        store_event = store_event or _event
+        store_api_insight = store_api_insight or _insight
+
+    rows = metrics.drain_window()
+    if not rows:
+        return rows
+
+    for row in rows[:top_routes]:
+        # One insight per route; the status reported is the worst class seen.
+        worst = max(row["status"], key=lambda name: STATUS_CLASSES.index(name), default="2xx")
+        store_api_insight(
+            route=f"summary:{row['route']}",
+            method=row["method"],
+            status_code=int(worst[0]) * 100 if worst[0].isdigit() else 0,
+            response_time_ms=row["p95_ms"],
+        )
+    store_event(
+        event_type="api_usage_summary",
+        data={
+            "window_size": sum(row["count"] for row in rows),
+            "routes": rows[:top_routes],
+            "routes_truncated": max(len(rows) - top_routes, 0),
+            "total_requests_served": metrics.total_requests,
+        },
+        metadata={"source": "request_metrics"},
+    )
+    return rows
+
+
+async def summarize_periodically(
+    metrics: Optional[RequestMetrics] = None,
+    interval_seconds: float = DEFAULT_SUMMARY_INTERVAL_SECONDS,
+) -> None:
+    """Background loop emitting per-route summaries every ``interval_seconds``."""
+    metrics = metrics or get_request_metrics()
+    interval = max(float(interval_seconds), 1.0)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            emit_route_summaries(metrics)
+        except Exception as exc:  # pragma: no cover - telemetry must never crash the loop
+            logger.debug("Route summary emission failed: %s", exc)
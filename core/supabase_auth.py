@@ -12,11 +12,13 @@ from supabase import create_client, Client
 from fastapi import Header, HTTPException, Depends, Request
 from typing import Dict, Any, Optional
 import os
+import copy
 import logging
 import jwt
 from jwt import PyJWTError
 import time
-from collections import defaultdict
+import hashlib
+from collections import OrderedDict, defaultdict
 
 logger = logging.getLogger(__name__)
 
@@ -89,6 +91,71 @@ if not SUPABASE_AUTH_AVAILABLE:
             "with BRAINOPS_ALLOW_OFFLINE_AUTH=true for local-only testing."
         )
 
+# Verified-token cache: the same bearer token is reused across many dashboard
+# calls, so the HS256 verification and user-context build are done once per
+# token. Entries are keyed by a SHA-256 digest (the raw token is never kept)
+# and expire at the token's own ``exp`` or after the TTL cap, whichever is
+# first.
+JWT_CACHE_MAX_ENTRIES = max(int(os.getenv("SUPABASE_JWT_CACHE_SIZE", "10000")), 0)
+JWT_CACHE_TTL_SECONDS = max(float(os.getenv("SUPABASE_JWT_CACHE_TTL_SECONDS", "300")), 0.0)
+
+_jwt_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_jwt_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+
+def _jwt_cache_key(token: str, audience: str) -> bytes:
+    return hashlib.sha256(f"{audience}\x00{token}".encode("utf-8")).digest()
+
+
+def _jwt_cache_get(key: bytes) -> Optional[Dict[str, Any]]:
+    entry = _jwt_cache.get(key)
+    if entry is None:
+        _jwt_cache_stats["misses"] += 1
+        return None
+    expires_at, user = entry
+    if expires_at <= time.time():
+        del _jwt_cache[key]
+        _jwt_cache_stats["expired"] += 1
+        _jwt_cache_stats["misses"] += 1
+        return None
+    _jwt_cache.move_to_end(key)
+    _jwt_cache_stats["hits"] += 1
+    return user
+
+
+def _jwt_cache_put(key: bytes, payload: Dict[str, Any], user: Dict[str, Any]) -> None:
+    if not JWT_CACHE_MAX_ENTRIES or not JWT_CACHE_TTL_SECONDS:
+        return
+    expires_at = time.time() + JWT_CACHE_TTL_SECONDS
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        expires_at = min(expires_at, float(exp))
+    _jwt_cache[key] = (expires_at, copy.deepcopy(user))
+    _jwt_cache.move_to_end(key)
+    while len(_jwt_cache) > JWT_CACHE_MAX_ENTRIES:
+        _jwt_cache.popitem(last=False)
+        _jwt_cache_stats["evictions"] += 1
+
+
+def get_jwt_cache_stats() -> Dict[str, Any]:
+    """Verified-token cache counters for /diagnostics."""
+    lookups = _jwt_cache_stats["hits"] + _jwt_cache_stats["misses"]
+    return {
+        **_jwt_cache_stats,
+        "size": len(_jwt_cache),
+        "max_entries": JWT_CACHE_MAX_ENTRIES,
+        "ttl_seconds": JWT_CACHE_TTL_SECONDS,
+        "hit_rate": round(_jwt_cache_stats["hits"] / lookups, 4) if lookups else None,
+    }
+
+
+def clear_jwt_cache() -> None:
+    """Drop every cached token (e.g. after a JWT secret rotation) and reset counters."""
+    _jwt_cache.clear()
+    for key in _jwt_cache_stats:
+        _jwt_cache_stats[key] = 0
+
+
 DEFAULT_OFFLINE_TENANT = os.getenv(
     "OFFLINE_TENANT_ID",
     "51e728c5-94e8-4ae0-8a0a-6a08d1fb3457"
@@ -123,6 +190,9 @@ async def get_current_user(
     1. request.state.user - Set by APIKeyMiddleware for API key auth
     2. Authorization: Bearer <supabase_jwt_token> - Supabase JWT auth
 
+    Verified tokens are cached until their ``exp`` (see JWT_CACHE_*); a hit
+    returns a shallow copy of the user context built on the first request.
+
     Returns:
         dict: User info including id, email, tenant_id, metadata
 
@@ -159,12 +229,16 @@ async def get_current_user(
 
     # Extract JWT token
     token = authorization.replace("Bearer ", "").strip()
+    audience = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    cache_key = _jwt_cache_key(token, audience)
+    cached_user = _jwt_cache_get(cache_key)
+    if cached_user is not None:
+        # Deep copy: callers may mutate user_metadata / app_metadata.
+        return copy.deepcopy(cached_user)
 
     try:
         # Decode the JWT token with verification
         # Supabase JWTs are signed with HS256 using the JWT_SECRET
-        audience = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
-        
         try:
             payload = jwt.decode(
                 token,
@@ -205,7 +279,7 @@ async def get_current_user(
             logger.warning(f"User {user_id} has no tenant_id in metadata")
 
         # Return user info in standardized format
-        return {
+        user = {
             "id": user_id,
             "email": email,
             "tenant_id": tenant_id,
@@ -215,6 +289,8 @@ async def get_current_user(
             "created_at": payload.get("created_at"),
             "last_sign_in_at": payload.get("last_sign_in_at")
         }
+        _jwt_cache_put(cache_key, payload, user)
+        return user
 
     except HTTPException:
         raise
@@ -335,6 +411,8 @@ def require_role(required_role: str):
 # Export commonly used functions
 __all__ = [
     "get_current_user",
+    "get_jwt_cache_stats",
+    "clear_jwt_cache",
     "get_supabase_client",
     "verify_tenant_access",
     "require_role",
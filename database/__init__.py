@@ -3,14 +3,38 @@ Database compatibility layer for BrainOps Backend.
 
 Provides both async (asyncpg) and sync (SQLAlchemy) interfaces for routes.
 Most new code should use async get_pool(). Legacy SQLAlchemy is for compatibility.
+
+All asyncpg access goes through the process-wide pool manager
+(database/pool_manager.py); nothing in this package opens its own pool.
+
+SECURITY: tenant-isolated access sets the tenant context via PostgreSQL
+session variables, which RLS policies use to enforce data isolation.
 """
 
+import asyncio
 import os
 import logging
 from typing import Optional, Generator
 from contextlib import contextmanager, asynccontextmanager
 
 from .async_connection import get_pool
+from .tenant_context import (
+    apply_tenant_context,
+    get_tenant_context_stats,
+    record_context_reuse,
+    tenant_connection,
+)
+from .pool_manager import (
+    PURPOSE_BACKGROUND,
+    PURPOSE_REQUEST,
+    PURPOSE_WEBHOOK,
+    PoolBackpressureError,
+    PoolManager,
+    close_pool_manager,
+    get_pool_manager,
+    get_pool_stats,
+    init_pool_manager,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -58,11 +82,14 @@ def _init_sqlalchemy():
         from sqlalchemy import create_engine
         from sqlalchemy.orm import sessionmaker
 
+        # Sized small on purpose: sync routes share the same pgBouncer
+        # connection budget as the asyncpg pool manager.
         _engine = create_engine(
-            DATABASE_URL,
-            pool_size=10,
-            max_overflow=20,
-            pool_recycle=3600,
+            DATABASE_URL.replace("+asyncpg", ""),  # Remove async driver if present
+            pool_size=int(os.getenv("DB_POOL_SIZE", "2")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "3")),
+            pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "300")),
+            pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", "10")),
             pool_pre_ping=True,
             connect_args={"sslmode": "require"} if "supabase" in DATABASE_URL else {}
         )
@@ -76,15 +103,6 @@ def _init_sqlalchemy():
         # SQLAlchemy not installed - provide stubs
         pass
 
-@property
-def engine():
-    """Get SQLAlchemy engine (lazy initialization)."""
-    if _engine is None:
-        _init_sqlalchemy()
-    if _engine is None:
-        raise RuntimeError("SQLAlchemy is not available. Use async get_pool() instead.")
-    return _engine
-
 # Make engine accessible as module attribute
 class _EngineProxy:
     """Proxy to allow lazy access to engine as database.engine"""
@@ -130,10 +148,14 @@ def get_db_session() -> Generator:
 # =============================================================================
 # Async database access (preferred)
 # =============================================================================
-async def get_db_connection():
-    """Return an asyncpg connection for legacy callers."""
-    pool = await get_pool()
-    return pool
+async def get_db_connection(purpose: str = PURPOSE_REQUEST):
+    """Return the shared pool facade for legacy callers."""
+    return await get_pool(purpose)
+
+
+async def close_db_connection():
+    """Close the shared pool (normally done by main.lifespan)."""
+    await close_pool_manager()
 
 
 async def get_db():
@@ -142,44 +164,102 @@ async def get_db():
     async with pool.acquire() as conn:
         yield conn
 
-# Alias for compatibility with some route loaders
-get_db_async = get_db
+async def get_db_async(
+    tenant_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    purpose: str = PURPOSE_REQUEST,
+) -> "Database":
+    """
+    Get database instance for FastAPI dependency injection (async)
+
+    Args:
+        tenant_id: Optional tenant ID for RLS enforcement
+        user_id: Optional user ID for RLS enforcement
+        purpose: Pool sub-quota to draw from (request, background, webhook)
+
+    Returns:
+        Database instance with tenant context set
+    """
+    pool = await get_pool(purpose)
+    return Database(pool, tenant_id=tenant_id, user_id=user_id)
+
+
+@asynccontextmanager
+async def get_tenant_connection(
+    pool,
+    tenant_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    transaction: bool = False,
+):
+    """
+    Acquire a connection with tenant context set for RLS enforcement.
+
+    SECURITY: This is the preferred way to get database connections.
+    It sets PostgreSQL session variables that RLS policies use for isolation.
+    Tenant and user are set in a single statement; pass ``transaction=True``
+    for transaction-local (SET LOCAL) context behind pgBouncer.
+
+    Usage:
+        async with get_tenant_connection(pool, tenant_id="...") as conn:
+            await conn.fetch("SELECT * FROM customers")  # RLS filters to tenant
+    """
+    async with tenant_connection(pool, tenant_id, user_id, transaction=transaction) as conn:
+        yield conn
 
 
 # =============================================================================
 # Tenant-aware Database class (for RLS enforcement)
 # =============================================================================
 class Database:
-    """Database wrapper with tenant context for RLS enforcement."""
+    """Database wrapper with tenant context for RLS enforcement.
+
+    Each call acquires a connection and sets the context in one round-trip.
+    Inside ``async with db.connection():`` every call reuses the same
+    connection and context instead.
+    """
 
     def __init__(self, pool, tenant_id: Optional[str] = None, user_id: Optional[str] = None):
         self.pool = pool
         self.tenant_id = tenant_id
         self.user_id = user_id
+        self._conn = None
+        self._conn_owner = None
 
     async def _set_context(self, conn):
         """Set tenant context on connection for RLS enforcement."""
-        if self.tenant_id:
-            await conn.execute("SELECT set_config('app.current_tenant_id', $1, false)", self.tenant_id)
-        if self.user_id:
-            await conn.execute("SELECT set_config('app.current_user_id', $1, false)", self.user_id)
+        await apply_tenant_context(conn, self.tenant_id, self.user_id)
+
+    @asynccontextmanager
+    async def connection(self, transaction: bool = False):
+        """Hold one connection (and its tenant context) for several queries."""
+        # Only the task that opened the scope may reuse it: an asyncpg
+        # connection cannot run concurrent queries from gathered tasks.
+        if self._conn is not None and self._conn_owner is asyncio.current_task():
+            record_context_reuse(self.tenant_id, self.user_id)
+            yield self._conn
+            return
+        async with tenant_connection(
+            self.pool, self.tenant_id, self.user_id, transaction=transaction
+        ) as conn:
+            if self._conn is not None:
+                yield conn
+                return
+            self._conn, self._conn_owner = conn, asyncio.current_task()
+            try:
+                yield conn
+            finally:
+                self._conn = self._conn_owner = None
 
     async def fetch_one(self, query: str, *args):
-        pool = await get_pool()
-        async with pool.acquire() as conn:
-            await self._set_context(conn)
+        async with self.connection() as conn:
             return await conn.fetchrow(query, *args)
 
     async def fetch_all(self, query: str, *args):
-        pool = await get_pool()
-        async with pool.acquire() as conn:
-            await self._set_context(conn)
+        async with self.connection() as conn:
             return await conn.fetch(query, *args)
 
     async def execute(self, query: str, *args):
-        pool = await get_pool()
-        async with pool.acquire() as conn:
-            await self._set_context(conn)
+        async with self.connection() as conn:
             return await conn.execute(query, *args)
 
 
@@ -212,8 +292,21 @@ async def get_tenant_db(request):
 # =============================================================================
 __all__ = [
     "get_pool",
+    "get_pool_manager",
+    "get_pool_stats",
+    "init_pool_manager",
+    "close_pool_manager",
+    "PoolManager",
+    "PoolBackpressureError",
+    "PURPOSE_REQUEST",
+    "PURPOSE_BACKGROUND",
+    "PURPOSE_WEBHOOK",
     "get_db",
+    "get_db_async",
     "get_db_connection",
+    "close_db_connection",
+    "get_tenant_connection",
+    "get_tenant_context_stats",
     "get_db_session",
     "get_tenant_db",
     "Database",
@@ -1,29 +1,13 @@
-import asyncio
-import asyncpg
+from .pool_manager import PURPOSE_REQUEST, PurposePool, init_pool_manager
 
-from config import get_database_url
 
-# Shared pool for ad-hoc routes that aren't initialized through main.py.
-_pool: asyncpg.Pool | None = None
-_lock = asyncio.Lock()
+async def get_pool(purpose: str = PURPOSE_REQUEST) -> PurposePool:
+    """Return the shared pool facade for ``purpose``, starting the manager on first use.
 
+    Routes that aren't initialized through main.py land here; they share the
+    same underlying asyncpg pool as ``app.state.db_pool`` instead of opening
+    their own.
+    """
+    manager = await init_pool_manager()
+    return manager.for_purpose(purpose)
 
-async def get_pool() -> asyncpg.Pool:
-    """Return a singleton asyncpg pool, creating it on first use."""
-    global _pool
-    if _pool:
-        return _pool
-
-    async with _lock:
-        if _pool:
-            return _pool
-
-        database_url = get_database_url()
-        _pool = await asyncpg.create_pool(
-            database_url,
-            min_size=2,
-            max_size=10,
-            statement_cache_size=0,  # Required for pgBouncer compatibility
-            command_timeout=15,
-        )
-        return _pool
@@ -0,0 +1,607 @@
+"""
+Process-wide asyncpg pool manager.
+
+Every worker owns exactly one asyncpg pool. Request handlers, background loops
+(BrainOps AI OS, schedulers) and inbound webhooks all draw from it through
+per-purpose facades that enforce a sub-quota, so a busy background loop can no
+longer starve the request path and a webhook burst cannot open a storm of new
+server-side connections against the Supabase pgBouncer.
+
+When a purpose is saturated, callers queue for a bounded amount of time; once
+the queue is full (or the wait times out) ``PoolBackpressureError`` is raised
+so the API can shed load with a 503 instead of piling up connections.
+
+Every checkout records when and where it happened. A watchdog logs
+connections held longer than ``DB_POOL_LEAK_THRESHOLD_SECS``, and a leased
+connection that is garbage-collected without ``close()`` is returned to the
+pool and counted as abandoned.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import ssl as ssl_module
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+import asyncpg
+
+from config import get_database_url
+
+logger = logging.getLogger(__name__)
+
+PURPOSE_REQUEST = "request"
+PURPOSE_BACKGROUND = "background"
+PURPOSE_WEBHOOK = "webhook"
+
+# Fraction of the pool's max_size each purpose may hold at once. Quotas are
+# caps, not reservations: they intentionally sum to more than 1.0 so an idle
+# purpose does not waste capacity, while no single purpose can take it all.
+DEFAULT_PURPOSE_SHARES: Dict[str, float] = {
+    PURPOSE_REQUEST: 0.7,
+    PURPOSE_BACKGROUND: 0.3,
+    PURPOSE_WEBHOOK: 0.2,
+}
+
+
+# Per-statement timeout (seconds) applied by the purpose facades and leased
+# connections unless the caller passes its own. Enforced per statement by
+# asyncpg (which cancels the query server-side) rather than with
+# ``SET statement_timeout``, which would leak between clients behind
+# pgBouncer in transaction mode.
+DEFAULT_STATEMENT_TIMEOUTS: Dict[str, float] = {
+    PURPOSE_REQUEST: 15.0,
+    PURPOSE_BACKGROUND: 120.0,
+    PURPOSE_WEBHOOK: 10.0,
+}
+
+_QUERY_METHODS = frozenset({"fetch", "fetchrow", "fetchval", "execute", "executemany"})
+
+
+class PoolBackpressureError(RuntimeError):
+    """Raised when a purpose's quota is saturated and its wait queue is full."""
+
+    def __init__(self, purpose: str, reason: str):
+        super().__init__(f"Database pool saturated for '{purpose}': {reason}")
+        self.purpose = purpose
+        self.reason = reason
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+def _checkout_origin() -> str:
+    """``path:line (function)`` of the first caller outside the pool plumbing."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not (
+            filename == __file__
+            or filename.endswith(("contextlib.py", "asyncio/tasks.py", "asyncio/events.py"))
+            or "/asyncpg/" in filename
+        ):
+            short = "/".join(filename.replace(os.sep, "/").rsplit("/", 2)[-2:])
+            return f"{short}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return "unknown"
+
+
+def _ssl_for_url(database_url: str) -> Any:
+    """Return the asyncpg ``ssl`` argument for the configured database.
+
+    Supabase poolers use self-signed certs which fail default verification, so
+    production connects with TLS but without certificate checks. Local
+    databases can opt out with ``sslmode=disable`` or ``DB_SSLMODE=disable``.
+    """
+    if "sslmode=disable" in database_url or os.getenv("DB_SSLMODE") == "disable":
+        return False
+    ssl_context = ssl_module.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl_module.CERT_NONE
+    return ssl_context
+
+
+@dataclass
+class _PurposeQuota:
+    """Concurrency cap plus queue-wait metrics for one purpose."""
+
+    name: str
+    limit: int
+    max_waiters: int
+    semaphore: asyncio.Semaphore = field(init=False)
+    in_use: int = 0
+    waiting: int = 0
+    peak_waiting: int = 0
+    acquired: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    total_wait_ms: float = 0.0
+    max_wait_ms: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.limit)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "max_waiters": self.max_waiters,
+            "acquired": self.acquired,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait_ms / self.acquired, 2)
+            if self.acquired
+            else 0.0,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
+class _ManagedAcquireContext:
+    """Mirror of asyncpg's PoolAcquireContext: usable with ``async with`` or ``await``."""
+
+    __slots__ = ("_manager", "_purpose", "_timeout", "_conn")
+
+    def __init__(self, manager: "PoolManager", purpose: str, timeout: Optional[float]):
+        self._manager = manager
+        self._purpose = purpose
+        self._timeout = timeout
+        self._conn: Optional[asyncpg.Connection] = None
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self._conn = await self._manager._acquire(self._purpose, self._timeout)
+        return self._conn
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            await self._manager.release(conn)
+
+    def __await__(self):
+        return self._manager._acquire(self._purpose, self._timeout).__await__()
+
+
+class LeasedConnection:
+    """Pooled connection for legacy code written against ``asyncpg.connect``.
+
+    Callers keep their ``conn = await ...; finally: await conn.close()``
+    shape; ``close()`` hands the connection back to the pool instead of
+    tearing down the socket. Query methods default to the purpose's
+    statement timeout.
+    """
+
+    __slots__ = ("_conn", "_manager", "_released", "_statement_timeout")
+
+    def __init__(
+        self,
+        conn: asyncpg.Connection,
+        manager: "PoolManager",
+        statement_timeout: Optional[float] = None,
+    ):
+        self._conn = conn
+        self._manager = manager
+        self._released = False
+        self._statement_timeout = statement_timeout
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._conn, name)
+        if name in _QUERY_METHODS and self._statement_timeout is not None:
+            statement_timeout = self._statement_timeout
+
+            async def _with_timeout(*args: Any, timeout: Optional[float] = None, **kwargs: Any):
+                return await attr(
+                    *args,
+                    timeout=statement_timeout if timeout is None else timeout,
+                    **kwargs,
+                )
+
+            return _with_timeout
+        return attr
+
+    def __del__(self) -> None:
+        if not getattr(self, "_released", True):
+            self._released = True
+            self._manager._abandon(self._conn)
+
+    def is_closed(self) -> bool:
+        return self._released or self._conn.is_closed()
+
+    async def close(self, *, timeout: Optional[float] = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        await self._manager.release(self._conn, timeout=timeout)
+
+
+class PurposePool:
+    """Pool-shaped facade bound to one purpose.
+
+    Exposes the subset of the ``asyncpg.Pool`` API used across the codebase so
+    it can be handed to any code that previously received a raw pool.
+    """
+
+    def __init__(self, manager: "PoolManager", purpose: str):
+        self.manager = manager
+        self.purpose = purpose
+
+    def acquire(self, *, timeout: Optional[float] = None) -> _ManagedAcquireContext:
+        return _ManagedAcquireContext(self.manager, self.purpose, timeout)
+
+    async def release(self, connection: asyncpg.Connection, *, timeout: Optional[float] = None) -> None:
+        await self.manager.release(connection, timeout=timeout)
+
+    @property
+    def statement_timeout(self) -> Optional[float]:
+        return self.manager.statement_timeouts.get(self.purpose)
+
+    def _timeout(self, timeout: Optional[float]) -> Optional[float]:
+        return self.statement_timeout if timeout is None else timeout
+
+    async def lease(self, *, timeout: Optional[float] = None) -> LeasedConnection:
+        """Acquire a connection whose ``close()`` returns it to the pool."""
+        conn = await self.manager._acquire(self.purpose, timeout)
+        return LeasedConnection(conn, self.manager, self.statement_timeout)
+
+    async def fetch(self, query: str, *args: Any, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=self._timeout(timeout))
+
+    async def fetchrow(self, query: str, *args: Any, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=self._timeout(timeout))
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=self._timeout(timeout))
+
+    async def execute(self, query: str, *args: Any, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=self._timeout(timeout))
+
+    async def executemany(self, command: str, args: Any, *, timeout: Optional[float] = None):
+        async with self.acquire() as conn:
+            return await conn.executemany(command, args, timeout=self._timeout(timeout))
+
+    def get_size(self) -> int:
+        return self.manager.pool.get_size()
+
+    def get_idle_size(self) -> int:
+        return self.manager.pool.get_idle_size()
+
+    def get_min_size(self) -> int:
+        return self.manager.pool.get_min_size()
+
+    def get_max_size(self) -> int:
+        return self.manager.pool.get_max_size()
+
+    async def close(self) -> None:
+        # The manager owns the pool lifecycle; subsystems that "close their
+        # pool" on shutdown must not tear it down for everyone else.
+        logger.debug("Ignoring close() on shared '%s' pool facade", self.purpose)
+
+    def __repr__(self) -> str:
+        return f"<PurposePool purpose={self.purpose!r}>"
+
+
+class PoolManager:
+    """Owns the single asyncpg pool for this worker and meters access to it."""
+
+    def __init__(
+        self,
+        database_url: str,
+        *,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        shares: Optional[Dict[str, float]] = None,
+        max_waiters: Optional[int] = None,
+        acquire_timeout: Optional[float] = None,
+        statement_timeouts: Optional[Dict[str, float]] = None,
+        leak_threshold: Optional[float] = None,
+    ):
+        self.database_url = database_url
+        self.min_size = min_size if min_size is not None else _env_int("ASYNCPG_POOL_MIN_SIZE", 10)
+        self.max_size = max_size if max_size is not None else _env_int("ASYNCPG_POOL_MAX_SIZE", 40)
+        self.acquire_timeout = (
+            acquire_timeout
+            if acquire_timeout is not None
+            else _env_float("DB_POOL_ACQUIRE_TIMEOUT_SECS", 10.0)
+        )
+        waiters = max_waiters if max_waiters is not None else _env_int("DB_POOL_MAX_WAITERS", 200)
+
+        resolved_shares = dict(DEFAULT_PURPOSE_SHARES)
+        for purpose in resolved_shares:
+            resolved_shares[purpose] = _env_float(
+                f"DB_POOL_SHARE_{purpose.upper()}", resolved_shares[purpose]
+            )
+        resolved_shares.update(shares or {})
+
+        self._quotas: Dict[str, _PurposeQuota] = {
+            purpose: _PurposeQuota(
+                name=purpose,
+                limit=max(1, min(self.max_size, int(round(self.max_size * share)))),
+                max_waiters=waiters,
+            )
+            for purpose, share in resolved_shares.items()
+        }
+        self.statement_timeouts: Dict[str, float] = {
+            purpose: _env_float(f"DB_STATEMENT_TIMEOUT_{purpose.upper()}_SECS", seconds)
+            for purpose, seconds in DEFAULT_STATEMENT_TIMEOUTS.items()
+        }
+        self.statement_timeouts.update(statement_timeouts or {})
+        self.leak_threshold = (
+            leak_threshold
+            if leak_threshold is not None
+            else _env_float("DB_POOL_LEAK_THRESHOLD_SECS", 30.0)
+        )
+        self._facades: Dict[str, PurposePool] = {}
+        # id(conn) -> (purpose, acquired_at monotonic, origin)
+        self._checked_out: Dict[int, tuple] = {}
+        self._reported_leaks: set = set()
+        self.leaks_detected = 0
+        self.leases_abandoned = 0
+        self._leak_task: Optional[asyncio.Task] = None
+        self._pool: Optional[asyncpg.Pool] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    async def start(self, retries: int = 3) -> "PoolManager":
+        """Create the pool with retry and backoff. Raises on failure."""
+        if self._pool is not None:
+            return self
+
+        backoffs = [2, 5, 10]
+        last_err: Optional[Exception] = None
+        for attempt in range(1, retries + 1):
+            try:
+                pool = await asyncpg.create_pool(
+                    self.database_url,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    command_timeout=_env_float("ASYNCPG_COMMAND_TIMEOUT_SECS", 15),
+                    statement_cache_size=0,  # MUST be 0 for Supabase pgBouncer compatibility
+                    max_inactive_connection_lifetime=_env_float("ASYNCPG_MAX_INACTIVE_SECS", 60),
+                    timeout=_env_float("ASYNCPG_CONNECT_TIMEOUT_SECS", 10),
+                    ssl=_ssl_for_url(self.database_url),
+                )
+                # Smoke test a connection
+                async with pool.acquire() as conn:
+                    await conn.fetchval("SELECT 1")
+                self._pool = pool
+                if self.leak_threshold > 0:
+                    self._leak_task = asyncio.create_task(self._watch_leaks())
+                logger.info(
+                    "✅ Database pool created on attempt %d (min=%d max=%d quotas=%s)",
+                    attempt,
+                    self.min_size,
+                    self.max_size,
+                    {name: quota.limit for name, quota in self._quotas.items()},
+                )
+                return self
+            except Exception as e:
+                last_err = e
+                logger.exception("❌ Database pool creation failed on attempt %d: %r", attempt, e)
+                if attempt < retries:
+                    await asyncio.sleep(backoffs[min(attempt - 1, len(backoffs) - 1)])
+        assert last_err is not None
+        raise RuntimeError(f"Database initialization failed after {retries} attempts: {last_err}")
+
+    async def close(self) -> None:
+        pool, self._pool = self._pool, None
+        leak_task, self._leak_task = self._leak_task, None
+        if leak_task is not None:
+            leak_task.cancel()
+        self._checked_out.clear()
+        self._reported_leaks.clear()
+        if pool is not None:
+            await pool.close()
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    @property
+    def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            raise RuntimeError("Database pool manager has not been started")
+        return self._pool
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+    def for_purpose(self, purpose: str = PURPOSE_REQUEST) -> PurposePool:
+        if purpose not in self._quotas:
+            raise ValueError(f"Unknown database pool purpose: {purpose}")
+        facade = self._facades.get(purpose)
+        if facade is None:
+            facade = self._facades[purpose] = PurposePool(self, purpose)
+        return facade
+
+    def acquire(self, purpose: str = PURPOSE_REQUEST, *, timeout: Optional[float] = None) -> _ManagedAcquireContext:
+        return self.for_purpose(purpose).acquire(timeout=timeout)
+
+    async def _acquire(self, purpose: str, timeout: Optional[float]) -> asyncpg.Connection:
+        pool = self.pool
+        quota = self._quotas[purpose]
+        budget = self.acquire_timeout if timeout is None else timeout
+
+        if quota.semaphore.locked() and quota.waiting >= quota.max_waiters:
+            quota.rejected += 1
+            raise PoolBackpressureError(purpose, f"{quota.waiting} callers already waiting")
+
+        started = time.monotonic()
+        quota.waiting += 1
+        quota.peak_waiting = max(quota.peak_waiting, quota.waiting)
+        # One deadline covers the slot and the connection. Unlike wait_for,
+        # the timeout cancels the acquire in place, so a slot granted as the
+        # deadline fires is always seen here and given back below.
+        acquired = False
+        conn = None
+        try:
+            async with asyncio.timeout(budget):
+                try:
+                    await quota.semaphore.acquire()
+                    acquired = True
+                finally:
+                    quota.waiting -= 1
+                conn = await pool.acquire()
+        except asyncio.TimeoutError:
+            quota.timeouts += 1
+            missing = "connection" if acquired else "slot"
+            raise PoolBackpressureError(purpose, f"no {missing} within {budget:.1f}s") from None
+        finally:
+            if acquired and conn is None:
+                quota.semaphore.release()
+
+        wait_ms = (time.monotonic() - started) * 1000.0
+        quota.acquired += 1
+        quota.in_use += 1
+        quota.total_wait_ms += wait_ms
+        quota.max_wait_ms = max(quota.max_wait_ms, wait_ms)
+        self._checked_out[id(conn)] = (purpose, time.monotonic(), _checkout_origin())
+        return conn
+
+    async def release(self, connection: asyncpg.Connection, *, timeout: Optional[float] = None) -> None:
+        entry = self._checked_out.pop(id(connection), None)
+        self._reported_leaks.discard(id(connection))
+        try:
+            if self._pool is not None:
+                await self._pool.release(connection, timeout=timeout)
+        finally:
+            if entry is not None:
+                quota = self._quotas[entry[0]]
+                quota.in_use -= 1
+                quota.semaphore.release()
+
+    # ------------------------------------------------------------------
+    # Leak detection
+    # ------------------------------------------------------------------
+    def check_leaks(self) -> list:
+        """Checkouts held longer than ``leak_threshold``; each is logged once."""
+        now = time.monotonic()
+        held = []
+        for key, (purpose, acquired_at, origin) in list(self._checked_out.items()):
+            held_secs = now - acquired_at
+            if held_secs < self.leak_threshold:
+                continue
+            held.append({"purpose": purpose, "held_secs": round(held_secs, 1), "origin": origin})
+            if key not in self._reported_leaks:
+                self._reported_leaks.add(key)
+                self.leaks_detected += 1
+                logger.warning(
+                    "Possible connection leak: '%s' connection held %.0fs, acquired at %s",
+                    purpose,
+                    held_secs,
+                    origin,
+                )
+        return held
+
+    async def _watch_leaks(self) -> None:
+        interval = max(self.leak_threshold / 2, 1.0)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.check_leaks()
+            except Exception as exc:  # pragma: no cover - diagnostics must never crash the loop
+                logger.debug("Connection leak check failed: %s", exc)
+
+    def _abandon(self, connection: asyncpg.Connection) -> None:
+        """Return a lease that was garbage-collected without ``close()``."""
+        self.leases_abandoned += 1
+        entry = self._checked_out.get(id(connection))
+        logger.warning(
+            "Leased connection dropped without close(); acquired at %s",
+            entry[2] if entry else "unknown",
+        )
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.release(connection))
+
+    # ------------------------------------------------------------------
+    # Metrics
+    # ------------------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        size = idle = 0
+        if self._pool is not None:
+            try:
+                size = int(self._pool.get_size())
+                idle = int(self._pool.get_idle_size())
+            except Exception:
+                size = idle = 0
+        return {
+            "started": self._pool is not None,
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "size": size,
+            "idle": idle,
+            "active": max(size - idle, 0),
+            "purposes": {name: quota.snapshot() for name, quota in self._quotas.items()},
+            "statement_timeouts": dict(self.statement_timeouts),
+            "checked_out": len(self._checked_out),
+            "oldest_checkout_secs": round(
+                time.monotonic() - min(entry[1] for entry in self._checked_out.values()), 1
+            )
+            if self._checked_out
+            else 0.0,
+            "leak_threshold_secs": self.leak_threshold,
+            "leaks_detected": self.leaks_detected,
+            "leases_abandoned": self.leases_abandoned,
+        }
+
+
+_manager: Optional[PoolManager] = None
+_manager_lock: Optional[asyncio.Lock] = None
+
+
+def get_pool_manager() -> Optional[PoolManager]:
+    """Return the process-wide manager if one has been created."""
+    return _manager
+
+
+async def init_pool_manager(database_url: Optional[str] = None, *, retries: int = 3, **kwargs: Any) -> PoolManager:
+    """Create (once) and start the process-wide pool manager."""
+    global _manager, _manager_lock
+    if _manager is not None and _manager.started:
+        return _manager
+
+    if _manager_lock is None:
+        _manager_lock = asyncio.Lock()
+    async with _manager_lock:
+        if _manager is None:
+            if database_url is None:
+                database_url = get_database_url()
+            _manager = PoolManager(database_url, **kwargs)
+        await _manager.start(retries=retries)
+        return _manager
+
+
+async def close_pool_manager() -> None:
+    global _manager
+    manager, _manager = _manager, None
+    if manager is not None:
+        await manager.close()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Pool metrics for health/diagnostics endpoints without touching the database."""
+    if _manager is None:
+        return {"started": False}
+    return _manager.stats()
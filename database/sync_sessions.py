@@ -0,0 +1,134 @@
+"""
+Off-loop execution for route modules written against a sync SQLAlchemy Session.
+
+Those handlers call ``db.execute(...)`` / ``db.commit()`` synchronously. Run
+on the event loop, one slow query stalls every other request on the worker,
+so they are declared as plain ``def`` handlers on a router built with
+``route_class=SyncDBRoute`` and execute on a dedicated, bounded thread pool:
+
+- ``SYNC_DB_THREADS`` worker threads (default: the SQLAlchemy pool's
+  ``DB_POOL_SIZE + DB_MAX_OVERFLOW``), so a thread never waits on the
+  connection pool while holding a slot;
+- requests beyond that queue on the loop without blocking it.
+
+``get_db`` here yields a real Session (the asyncpg ``database.get_db`` yields
+a raw connection, which these modules cannot use). Async helpers can be
+called from inside a handler with ``anyio.from_thread.run``.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Generator, Optional
+
+import anyio
+from fastapi.routing import APIRoute
+
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def _default_threads() -> int:
+    try:
+        return int(os.getenv("SYNC_DB_THREADS", "")) or (
+            int(os.getenv("DB_POOL_SIZE", "2")) + int(os.getenv("DB_MAX_OVERFLOW", "3"))
+        )
+    except ValueError:
+        return 5
+
+
+SYNC_DB_THREADS = max(_default_threads(), 1)
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+_stats: Dict[str, Any] = {
+    "in_flight": 0,  # submitted and not finished, including those waiting for a thread
+    "completed": 0,
+    "failed": 0,
+    "total_ms": 0.0,
+    "max_ms": 0.0,
+    "max_queue_ms": 0.0,
+}
+
+
+def get_db() -> Generator:
+    """Yield a SQLAlchemy Session (FastAPI runs sync dependencies off the loop)."""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(SYNC_DB_THREADS)
+    return _limiter
+
+
+async def run_sync_db(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run blocking database work on the dedicated sync-DB thread pool."""
+    queued_at = time.perf_counter()
+    started: Optional[float] = None
+
+    def _run() -> Any:
+        nonlocal started
+        started = time.perf_counter()
+        return func(*args, **kwargs)
+
+    _stats["in_flight"] += 1
+    try:
+        return await anyio.to_thread.run_sync(_run, limiter=_get_limiter())
+    except BaseException:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _stats["in_flight"] -= 1
+        if started is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000.0
+            _stats["completed"] += 1
+            _stats["total_ms"] += elapsed_ms
+            _stats["max_ms"] = max(_stats["max_ms"], elapsed_ms)
+            _stats["max_queue_ms"] = max(_stats["max_queue_ms"], (started - queued_at) * 1000.0)
+
+
+def offload_sync_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a sync endpoint so FastAPI awaits it on the sync-DB pool.
+
+    ``functools.wraps`` keeps the signature FastAPI resolves dependencies from.
+    """
+    if inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def _endpoint(*args: Any, **kwargs: Any) -> Any:
+        return await run_sync_db(endpoint, *args, **kwargs)
+
+    return _endpoint
+
+
+class SyncDBRoute(APIRoute):
+    """APIRoute that runs sync endpoints on the sync-DB pool instead of the shared one."""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, offload_sync_endpoint(endpoint), **kwargs)
+
+
+def get_sync_db_stats() -> Dict[str, Any]:
+    completed = _stats["completed"]
+    busy = int(_limiter.borrowed_tokens) if _limiter is not None else 0
+    return {
+        "threads": SYNC_DB_THREADS,
+        "busy": busy,
+        "waiting": max(_stats["in_flight"] - busy, 0),
+        "completed": completed,
+        "failed": _stats["failed"],
+        "avg_ms": round(_stats["total_ms"] / completed, 2) if completed else 0.0,
+        "max_ms": round(_stats["max_ms"], 2),
+        "max_queue_ms": round(_stats["max_queue_ms"], 2),
+    }
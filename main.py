@@ -15,9 +15,10 @@ CRITICAL FIX: AI AGENTS SERVICE AUTHENTICATION
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import asyncio
+import hmac
 import os
 import logging
 import time
@@ -26,25 +27,64 @@ from datetime import datetime, timezone
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
 import asyncpg
-import uuid
 import json
 import random
 import httpx
 from config import get_database_url, settings
-from middleware.authentication import AuthenticationMiddleware
-from middleware.rate_limiter import RateLimitMiddleware
-from app.middleware.security import APIKeyMiddleware
+from middleware.pipeline import RequestPipelineMiddleware
 from core.brain_store import (
+    get_brain_store_health,
     get_effective_brain_timestamp,
-    store_api_insight,
-    store_event,
+    shutdown_brain_store,
 )
 from database import get_db  # Legacy import path used by many route modules
+from database.pool_manager import (
+    PURPOSE_BACKGROUND,
+    PURPOSE_REQUEST,
+    PURPOSE_WEBHOOK,
+    PoolBackpressureError,
+    close_pool_manager,
+    get_pool_stats,
+    init_pool_manager,
+)
+from database.tenant_context import get_tenant_context_stats
+from core.supabase_auth import get_jwt_cache_stats
+from core.request_metrics import (
+    emit_route_summaries,
+    get_request_metrics,
+    summarize_periodically,
+)
+from core.host_metrics import get_host_metrics_stats, start_host_sampler, stop_host_sampler
+from core.loop_monitor import get_loop_lag_stats, start_loop_monitor, stop_loop_monitor
+from database.sync_sessions import get_sync_db_stats
+from services.audit_writer import get_audit_writer_stats, start_audit_writer, stop_audit_writer
+from services.email_engine import email_engine
+from services.financial_rollups import (
+    get_financial_rollup_stats,
+    start_financial_rollup_rebuild,
+    stop_financial_rollup_rebuild,
+)
+from services.forecasting import get_forecast_stats, start_forecast_refresher, stop_forecast_refresher
+from services.notification_queue import (
+    get_notification_queue_stats,
+    start_notification_worker,
+    stop_notification_worker,
+)
+from services.report_export import get_report_export_stats, stop_report_exporter
+from services.stripe_webhook_inbox import (
+    get_stripe_webhook_inbox_stats,
+    start_stripe_webhook_worker,
+    stop_stripe_webhook_worker,
+)
+from services.tenant_summary import get_tenant_summary_engine
+from routes.route_loader import get_route_loading_report
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+request_metrics = get_request_metrics()
+
 OPENAPI_EXPORT = os.getenv("OPENAPI_EXPORT", "").strip() == "1"
 # Database configuration
 DATABASE_URL = None if OPENAPI_EXPORT else get_database_url()
@@ -129,57 +169,6 @@ except Exception as e:
     logger.error(f"Error checking BrainOps AI OS availability: {e}")
 
 
-async def _init_db_pool_with_retries(
-    database_url: str, retries: int = 3
-) -> asyncpg.Pool:
-    """Initialize the asyncpg pool with retry, backoff, and connection recycling. Raises on failure."""
-    import ssl as ssl_module
-
-    # Create SSL context that doesn't verify certificates (required for Supabase pooler)
-    # Supabase poolers use self-signed certs which fail default verification
-    ssl_context = ssl_module.create_default_context()
-    ssl_context.check_hostname = False
-    ssl_context.verify_mode = ssl_module.CERT_NONE
-
-    backoffs = [2, 5, 10]
-    last_err: Exception | None = None
-    for attempt in range(1, retries + 1):
-        try:
-            pool = await asyncpg.create_pool(
-                database_url,
-                min_size=int(os.getenv("ASYNCPG_POOL_MIN_SIZE", "10")),
-                max_size=int(os.getenv("ASYNCPG_POOL_MAX_SIZE", "40")),
-                command_timeout=float(os.getenv("ASYNCPG_COMMAND_TIMEOUT_SECS", "15")),
-                statement_cache_size=0,  # MUST be 0 for Supabase pgBouncer compatibility
-                max_inactive_connection_lifetime=float(
-                    os.getenv("ASYNCPG_MAX_INACTIVE_SECS", "60")
-                ),
-                timeout=float(os.getenv("ASYNCPG_CONNECT_TIMEOUT_SECS", "10")),
-                ssl=ssl_context,
-            )
-            # Smoke test a connection
-            async with pool.acquire() as conn:
-                await conn.fetchval("SELECT 1")
-            logger.info("✅ Database pool created successfully on attempt %d", attempt)
-            print("✅ Database pool created successfully")
-            return pool
-        except Exception as e:
-            last_err = e
-            # Log rich error information to help diagnose environment issues
-            logger.exception(
-                "❌ Database initialization failed on attempt %d: %r", attempt, e
-            )
-            print(
-                f"❌ Database initialization failed (attempt {attempt}/{retries}): {e}"
-            )
-            if attempt < retries:
-                await asyncio.sleep(backoffs[min(attempt - 1, len(backoffs) - 1)])
-    assert last_err is not None
-    raise RuntimeError(
-        f"Database initialization failed after {retries} attempts: {last_err}"
-    )
-
-
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown lifecycle"""
@@ -199,14 +188,7 @@ async def lifespan(app: FastAPI):
 
     app.state.offline_mode = OFFLINE_MODE
     app.state.started_at = datetime.now(timezone.utc)
-    app.state.total_requests_served = 0
-    app.state.api_insight_window = {
-        "count": 0,
-        "total_response_time_ms": 0.0,
-        "status_counts": {},
-    }
-    app.state.api_route_metrics = {}
-    app.state.last_api_summary_at = None
+    request_metrics.reset()
 
     if FAST_TEST_MODE:
         print(
@@ -216,9 +198,40 @@ async def lifespan(app: FastAPI):
         yield
         return
 
-    # Initialize database pool with retries; crash app if not available
-    db_pool = await _init_db_pool_with_retries(DATABASE_URL, retries=3)
+    # Initialize the shared pool manager with retries; crash app if not available.
+    # Every consumer gets a purpose-bound facade over the same asyncpg pool.
+    db_pool_manager = await init_pool_manager(DATABASE_URL, retries=3)
+    print("✅ Database pool created successfully")
+    db_pool = db_pool_manager.for_purpose(PURPOSE_REQUEST)
+    background_db_pool = db_pool_manager.for_purpose(PURPOSE_BACKGROUND)
+    app.state.db_pool_manager = db_pool_manager
     app.state.db_pool = db_pool
+    app.state.background_db_pool = background_db_pool
+    app.state.webhook_db_pool = db_pool_manager.for_purpose(PURPOSE_WEBHOOK)
+
+    # Per-route latency summaries for the brain store (see core.request_metrics).
+    metrics_summary_task = asyncio.create_task(summarize_periodically(request_metrics))
+    # Event-loop lag with blocking-handler attribution (see core.loop_monitor).
+    start_loop_monitor()
+    # Host CPU/memory/disk/network ring buffer read by every monitoring endpoint.
+    start_host_sampler()
+    # notification_queue delivery (SKIP LOCKED claims, woken by LISTEN/NOTIFY);
+    # only where NOTIFICATION_QUEUE_WORKER is enabled.
+    start_notification_worker()
+    # Batched, hash-chained audit_logs writes (see services.audit_writer).
+    start_audit_writer()
+    # Stripe webhook inbox: the endpoint only stores events; this applies them.
+    start_stripe_webhook_worker()
+    # Batched forecast / anomaly snapshots for the predictive analytics endpoints.
+    start_forecast_refresher()
+    # Nightly rebuild of the trigger-maintained financial report rollups.
+    start_financial_rollup_rebuild()
+    # Email tables are checked once here rather than on every send.
+    try:
+        async with db_pool.acquire() as conn:
+            await email_engine.verify_schema(conn)
+    except Exception as e:
+        logger.error(f"Email schema verification failed: {e}")
 
     # Initialize Credential Manager FIRST (loads all credentials from DB)
     if CREDENTIAL_MANAGER_AVAILABLE:
@@ -291,7 +304,7 @@ async def lifespan(app: FastAPI):
     if ORCHESTRATOR_AVAILABLE:
         try:
             print("\n🤖 Initializing Agent Orchestrator V2...")
-            agent_orchestrator = await initialize_orchestrator(db_pool)
+            agent_orchestrator = await initialize_orchestrator(background_db_pool)
             orch_status = await agent_orchestrator.get_orchestration_status()
             print(f"✅ Agent Orchestrator V2 initialized!")
             print(f"  Active agents: {orch_status['active_agents']}")
@@ -357,7 +370,7 @@ async def lifespan(app: FastAPI):
             print(
                 "\n🧠 Initializing BrainOps AI OS - The Unified AI Operating System..."
             )
-            brainops_controller = await initialize_brainops(db_pool)
+            brainops_controller = await initialize_brainops(background_db_pool)
             brainops_health = await brainops_controller.get_health()
             print(f"✅ BrainOps AI OS initialized!")
             print(f"  🧬 Metacognitive Controller: ACTIVE")
@@ -430,8 +443,18 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.error(f"Error shutting down BrainOps AI OS: {e}")
 
-    if db_pool:
-        await db_pool.close()
+    metrics_summary_task.cancel()
+    await stop_loop_monitor()
+    await stop_host_sampler()
+    await stop_notification_worker()
+    await stop_stripe_webhook_worker()
+    await stop_forecast_refresher()
+    await stop_financial_rollup_rebuild()
+    await stop_report_exporter()
+    await stop_audit_writer()
+    emit_route_summaries(request_metrics)
+    await shutdown_brain_store()
+    await close_pool_manager()
     print("✅ Shutdown complete")
 
 
@@ -488,6 +511,28 @@ async def _http_exception_handler(request: Request, exc: HTTPException) -> JSONR
     )
 
 
+@app.exception_handler(PoolBackpressureError)
+async def _pool_backpressure_handler(
+    request: Request, exc: PoolBackpressureError
+) -> JSONResponse:
+    logger.warning("Shedding %s %s: %s", request.method, request.url.path, exc)
+    detail = "Service temporarily overloaded, retry shortly"
+    return JSONResponse(
+        status_code=503,
+        content={
+            "detail": detail,
+            "error": {
+                "type": "ServiceOverloaded",
+                "message": detail,
+                "status_code": 503,
+                "path": request.url.path,
+            },
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.exception_handler(RequestValidationError)
 async def _validation_exception_handler(
     request: Request, exc: RequestValidationError
@@ -530,116 +575,28 @@ async def _unhandled_exception_handler(
     )
 
 
-# ---------------------------------------------------------------------------
-# Correlation ID Middleware — cross-service traceability
-# ---------------------------------------------------------------------------
-@app.middleware("http")
-async def correlation_id_middleware(request: Request, call_next):
-    """Attach correlation ID to every request for cross-service tracing."""
-    correlation_id = (
-        request.headers.get("x-correlation-id")
-        or request.headers.get("x-request-id")
-        or str(uuid.uuid4())
-    )
-    request.state.correlation_id = correlation_id
-    response = await call_next(request)
-    response.headers["X-Correlation-ID"] = correlation_id
-    response.headers["X-Request-ID"] = correlation_id
-    return response
-
-
-@app.middleware("http")
-async def api_performance_tracking_middleware(request: Request, call_next):
-    """Track request performance and periodically persist summarized usage insights."""
-    start = time.perf_counter()
-    status_code = 500
-    method = request.method.upper()
-    route_signature = request.url.path
-
-    try:
-        response = await call_next(request)
-        status_code = response.status_code
-        route_obj = request.scope.get("route")
-        if route_obj and getattr(route_obj, "path", None):
-            route_signature = str(route_obj.path)
-        return response
-    finally:
-        response_time_ms = max((time.perf_counter() - start) * 1000.0, 0.0)
-
-        total_requests = int(getattr(app.state, "total_requests_served", 0)) + 1
-        app.state.total_requests_served = total_requests
-
-        per_route = getattr(app.state, "api_route_metrics", {})
-        route_key = f"{method} {route_signature}"
-        route_metric = per_route.get(route_key) or {
-            "count": 0,
-            "total_response_time_ms": 0.0,
-            "last_status_code": 0,
-            "last_response_time_ms": 0.0,
-            "average_response_time_ms": 0.0,
-        }
-        route_metric["count"] += 1
-        route_metric["total_response_time_ms"] += response_time_ms
-        route_metric["last_status_code"] = status_code
-        route_metric["last_response_time_ms"] = round(response_time_ms, 2)
-        route_metric["average_response_time_ms"] = round(
-            route_metric["total_response_time_ms"] / max(route_metric["count"], 1),
-            2,
-        )
-        per_route[route_key] = route_metric
-        app.state.api_route_metrics = per_route
-
-        window = getattr(app.state, "api_insight_window", None)
-        if not isinstance(window, dict):
-            window = {"count": 0, "total_response_time_ms": 0.0, "status_counts": {}}
+def _record_api_performance(
+    scope: Dict[str, Any],
+    method: str,
+    route_signature: str,
+    status_code: int,
+    response_time_ms: float,
+    request_bytes: int,
+    response_bytes: int,
+) -> None:
+    """Record request latency, status and size in the per-route histograms.
 
-        window["count"] = int(window.get("count", 0)) + 1
-        window["total_response_time_ms"] = (
-            float(window.get("total_response_time_ms", 0.0)) + response_time_ms
-        )
-        window["last_route"] = route_signature
-        window["last_method"] = method
-        window["last_status_code"] = status_code
-        status_bucket = f"{max(int(status_code), 0) // 100}xx"
-        status_counts = window.get("status_counts")
-        if not isinstance(status_counts, dict):
-            status_counts = {}
-        status_counts[status_bucket] = int(status_counts.get(status_bucket, 0)) + 1
-        window["status_counts"] = status_counts
-
-        if window["count"] >= 100:
-            avg_response_time_ms = round(
-                window["total_response_time_ms"] / window["count"], 2
-            )
-
-            store_api_insight(
-                route=f"summary:{route_signature}",
-                method=method,
-                status_code=status_code,
-                response_time_ms=avg_response_time_ms,
-            )
-            store_event(
-                event_type="api_usage_summary",
-                data={
-                    "window_size": window["count"],
-                    "average_response_time_ms": avg_response_time_ms,
-                    "status_distribution": status_counts,
-                    "last_route": route_signature,
-                    "last_method": method,
-                    "last_status_code": status_code,
-                    "total_requests_served": total_requests,
-                },
-                metadata={"source": "api_performance_middleware"},
-            )
-
-            app.state.api_insight_window = {
-                "count": 0,
-                "total_response_time_ms": 0.0,
-                "status_counts": {},
-            }
-            app.state.last_api_summary_at = datetime.now(timezone.utc).isoformat()
-        else:
-            app.state.api_insight_window = window
+    Per-route summaries are sent to the brain store by the periodic
+    summarizer started in ``lifespan``.
+    """
+    request_metrics.observe(
+        method,
+        route_signature,
+        status_code,
+        response_time_ms,
+        request_bytes,
+        response_bytes,
+    )
 
 
 # CORS middleware
@@ -670,29 +627,25 @@ app.add_middleware(
     max_age=3600,
 )
 
-# Apply rate limiting to protect public APIs
-# Added FIRST so it runs LAST (innermost), after authentication has established identity
+# Correlation ID, authentication, API keys, rate limiting and performance
+# tracking run as one pure-ASGI layer (no per-layer body wrapping or task
+# groups). Added after CORS so it runs first, as the old stack did.
 app.add_middleware(
-    RateLimitMiddleware,
-    requests_per_minute=settings.rate_limit_per_minute,
-    requests_per_hour=settings.rate_limit_per_hour,
-    requests_per_day=settings.rate_limit_per_day,
-    public_requests_per_minute=settings.public_rate_limit_per_minute,
-    public_requests_per_hour=settings.public_rate_limit_per_hour,
-    webhook_requests_per_minute=settings.webhook_rate_limit_per_minute,
-    webhook_requests_per_hour=settings.webhook_rate_limit_per_hour,
-    use_redis=bool(settings.redis_url),
-    redis_url=settings.redis_url,
+    RequestPipelineMiddleware,
+    rate_limit={
+        "requests_per_minute": settings.rate_limit_per_minute,
+        "requests_per_hour": settings.rate_limit_per_hour,
+        "requests_per_day": settings.rate_limit_per_day,
+        "public_requests_per_minute": settings.public_rate_limit_per_minute,
+        "public_requests_per_hour": settings.public_rate_limit_per_hour,
+        "webhook_requests_per_minute": settings.webhook_rate_limit_per_minute,
+        "webhook_requests_per_hour": settings.webhook_rate_limit_per_hour,
+        "use_redis": bool(settings.redis_url),
+        "redis_url": settings.redis_url,
+    },
+    on_complete=_record_api_performance,
 )
 
-# Validate API keys for machine-to-machine traffic with caching.
-app.add_middleware(APIKeyMiddleware)
-
-# Enforce authentication on all non-exempt routes.
-# IMPORTANT: Starlette executes middleware in *reverse* order of registration.
-# We add AuthenticationMiddleware LAST so it runs FIRST.
-app.add_middleware(AuthenticationMiddleware)
-
 # Load all route modules dynamically
 dynamic_routes_loaded = False
 try:
@@ -829,19 +782,14 @@ except Exception as e:
 
 def _database_connection_snapshot() -> Dict[str, int]:
     """Return pool size/idle/active metrics without opening new DB connections."""
-    if not db_pool:
-        return {"size": 0, "idle": 0, "active": 0}
-
-    try:
-        size = int(db_pool.get_size())
-        idle = int(db_pool.get_idle_size())
-        return {
-            "size": size,
-            "idle": idle,
-            "active": max(size - idle, 0),
-        }
-    except Exception:
+    stats = get_pool_stats()
+    if not stats.get("started"):
         return {"size": 0, "idle": 0, "active": 0}
+    return {
+        "size": int(stats["size"]),
+        "idle": int(stats["idle"]),
+        "active": int(stats["active"]),
+    }
 
 
 async def _runtime_health_metadata(force_brain_refresh: bool = False) -> Dict[str, Any]:
@@ -859,7 +807,7 @@ async def _runtime_health_metadata(force_brain_refresh: bool = False) -> Dict[st
     )
     return {
         "uptime_seconds": uptime_seconds,
-        "total_requests_served": int(getattr(app.state, "total_requests_served", 0)),
+        "total_requests_served": request_metrics.total_requests,
         "active_database_connections": db_connections["active"],
         "database_connections": db_connections,
         "last_brain_store_timestamp": effective_brain_timestamp,
@@ -1246,6 +1194,23 @@ async def diagnostics(request: Request):
         "status": "ok",
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "database": db_probe,
+        "database_pool": get_pool_stats(),
+        "tenant_context": get_tenant_context_stats(),
+        "jwt_cache": get_jwt_cache_stats(),
+        "api_routes": request_metrics.routes()[:25],
+        "brain_store": get_brain_store_health(),
+        "tenant_summary": get_tenant_summary_engine().stats(),
+        "route_loading": get_route_loading_report(),
+        "event_loop": get_loop_lag_stats(),
+        "sync_db": get_sync_db_stats(),
+        "notification_queue": get_notification_queue_stats(),
+        "email_engine": email_engine.stats(),
+        "audit_writer": get_audit_writer_stats(),
+        "stripe_webhook_inbox": get_stripe_webhook_inbox_stats(),
+        "report_export": get_report_export_stats(),
+        "host_metrics": get_host_metrics_stats(),
+        "forecasting": get_forecast_stats(),
+        "financial_rollups": get_financial_rollup_stats(),
         "missing_env": missing_env,
         "offline_mode": OFFLINE_MODE,
         "fast_test_mode": FAST_TEST_MODE,
@@ -1259,6 +1224,27 @@ async def diagnostics(request: Request):
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus exposition of per-route request metrics.
+
+    The scraper must send METRICS_BEARER_TOKEN as a bearer token. Without a
+    configured token the endpoint does not exist (404), unless
+    METRICS_ALLOW_UNAUTHENTICATED is set for local development.
+    """
+    expected = os.getenv("METRICS_BEARER_TOKEN")
+    if expected:
+        provided = request.headers.get("Authorization") or ""
+        if not hmac.compare_digest(provided, f"Bearer {expected}"):
+            raise HTTPException(status_code=401, detail="Unauthorized", headers={"WWW-Authenticate": "Bearer"})
+    elif os.getenv("METRICS_ALLOW_UNAUTHENTICATED", "false").lower() not in ("1", "true", "yes"):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(
+        request_metrics.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 # Customer model
 class Customer(BaseModel):
     name: str
@@ -3,7 +3,7 @@
 import os
 import uuid
 from fastapi import HTTPException
-from typing import Iterable, Optional, Sequence, Dict
+from typing import Iterable, Optional, Dict
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
@@ -12,6 +12,13 @@ import time
 from collections import defaultdict
 
 from core.supabase_auth import get_current_user
+from middleware.path_classifier import (
+    AUTH_EXEMPT_MATCHER,
+    DEFAULT_EXEMPT_PATHS,
+    DEFAULT_EXEMPT_PREFIXES,
+    PathMatcher,
+    get_path_class,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,42 +26,6 @@ logger = logging.getLogger(__name__)
 _auth_fail_log_times: Dict[str, float] = defaultdict(float)
 _AUTH_FAIL_LOG_INTERVAL = 60  # Only log same path failure once per minute
 
-# Only health checks and explicitly reviewed webhook endpoints are exempt.
-DEFAULT_EXEMPT_PATHS: Sequence[str] = (
-    "/health",
-    "/api/v1/health",
-    "/ready",
-    "/api/v1/ready",
-    "/api/v1/auth/health",
-    "/api/v1/auth/login",
-    "/docs",
-    "/redoc",
-    "/openapi.json",
-    "/favicon.ico",
-    "/api/v1/stripe/webhook",
-    "/api/v1/webhooks/stripe",
-    "/api/v1/webhooks/render",
-    "/api/v1/revenue/webhook",
-    "/webhook/stripe",
-    "/api/v1/gumroad-revenue/webhook/gumroad",  # Gumroad sale pings - no auth header
-    "/api/v1/logs/vercel",  # Vercel log drain - no auth needed
-    "/api/v1/logs/render",  # Render log drain - no auth needed
-    "/api/v1/mcp/health",   # MCP Bridge health check - monitoring
-    "/api/v1/mcp/status",   # MCP Bridge status - monitoring
-    "/api/v1/orchestrator/status",  # Orchestrator status - monitoring
-    "/api/v1/stripe-automation/config",  # Stripe publishable key - public for frontend
-    "/api/v1/stripe-automation/health",  # Stripe health check - monitoring
-)
-
-DEFAULT_EXEMPT_PREFIXES: Sequence[str] = (
-    "/docs/",
-    "/openapi/",
-    "/static/",
-    "/public/",
-    "/api/v1/erp/public",
-    "/api/v1/products/public",
-)
-
 def _resolve_master_tenant_id() -> Optional[str]:
     for key in ("BACKEND_INTERNAL_TENANT_ID", "DEFAULT_TENANT_ID", "MRG_DEFAULT_TENANT_ID"):
         value = (os.getenv(key) or "").strip()
@@ -80,21 +51,46 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
         super().__init__(app)
         self.exempt_paths = set(exempt_paths or DEFAULT_EXEMPT_PATHS)
         self.exempt_prefixes = tuple(exempt_prefixes or DEFAULT_EXEMPT_PREFIXES)
+        # With the default lists the per-request classification stored in
+        # scope is authoritative; custom lists get their own matcher.
+        self._uses_default_paths = (
+            self.exempt_paths == set(DEFAULT_EXEMPT_PATHS)
+            and self.exempt_prefixes == tuple(DEFAULT_EXEMPT_PREFIXES)
+        )
+        self._matcher = (
+            AUTH_EXEMPT_MATCHER
+            if self._uses_default_paths
+            else PathMatcher(exact=self.exempt_paths, prefixes=self.exempt_prefixes)
+        )
 
     def _is_exempt(self, path: str) -> bool:
-        if path in self.exempt_paths:
-            return True
-        return any(path.startswith(prefix) for prefix in self.exempt_prefixes)
+        return self._matcher.matches(path)
+
+    def _is_exempt_request(self, request: Request) -> bool:
+        path = request.url.path
+        if self._uses_default_paths:
+            return get_path_class(request.scope, path).auth_exempt
+        return self._matcher.matches(path)
 
     async def dispatch(self, request: Request, call_next) -> Response:
+        rejection = await self.authenticate(request)
+        if rejection is not None:
+            return rejection
+        return await call_next(request)
+
+    async def authenticate(self, request: Request) -> Optional[Response]:
+        """Establish request identity; return a response only to reject the request.
+
+        Shared by ``dispatch`` and the pure-ASGI request pipeline.
+        """
         path = request.url.path
 
         # Allow upstream auth mechanisms (e.g., API key middleware) to satisfy auth.
         if getattr(request.state, "user", None) or getattr(request.state, "authenticated", False):
-            return await call_next(request)
+            return None
 
-        if self._is_exempt(path):
-            return await call_next(request)
+        if self._is_exempt_request(request):
+            return None
 
         # 2. Check API Key (Master Password or Database)
         api_key = request.headers.get("X-API-Key") or request.headers.get("x-api-key")
@@ -122,7 +118,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
             if tenant_id:
                 request.state.tenant_id = tenant_id
             request.state.user_id = "system"
-            return await call_next(request)
+            return None
 
         if api_key:
             # Validate against database (legacy logic)
@@ -132,7 +128,7 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
 
         # Also allow ApiKey bearer scheme to pass through to API key middleware
         if authorization and authorization.startswith("ApiKey "):
-            return await call_next(request)
+            return None
 
         try:
             user = await get_current_user(authorization=authorization)
@@ -154,4 +150,4 @@ class AuthenticationMiddleware(BaseHTTPMiddleware):
             request.state.tenant_id = tenant_id
         request.state.user_id = user.get("id")
 
-        return await call_next(request)
+        return None
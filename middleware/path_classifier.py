@@ -0,0 +1,223 @@
+"""
+Request path classification shared by the HTTP middlewares.
+
+Authentication, API-key validation, rate limiting and tenant isolation each
+need to know whether a path is public, a webhook, or tenant-exempt. Those
+rules used to live in four lists matched with ``any(path.startswith(...))``
+on every request, once per middleware. The lists now live here, each compiled
+into a single anchored regex, and a path is classified once per request; the
+result is stored in ``scope[PATH_CLASS_SCOPE_KEY]`` so later stages do a dict
+lookup instead of re-scanning.
+
+Each list keeps the matching semantics its middleware always had:
+
+- auth exempt: exact match on ``DEFAULT_EXEMPT_PATHS`` or plain prefix match
+  on ``DEFAULT_EXEMPT_PREFIXES``.
+- API-key public: plain prefix match on ``DEFAULT_PUBLIC_PATHS``.
+- rate-limit excluded / webhook: plain prefix match.
+- tenant exempt: ``/``, exact match, or prefix followed by ``/``.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional, Pattern, Sequence
+
+from starlette.types import Scope
+
+PATH_CLASS_SCOPE_KEY = "brainops.path_class"
+
+# Only health checks and explicitly reviewed webhook endpoints are exempt.
+DEFAULT_EXEMPT_PATHS: Sequence[str] = (
+    "/health",
+    "/api/v1/health",
+    "/ready",
+    "/api/v1/ready",
+    "/api/v1/auth/health",
+    "/api/v1/auth/login",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/favicon.ico",
+    "/metrics",  # Prometheus scrape - the endpoint checks METRICS_BEARER_TOKEN
+    "/api/v1/stripe/webhook",
+    "/api/v1/webhooks/stripe",
+    "/api/v1/webhooks/render",
+    "/api/v1/revenue/webhook",
+    "/webhook/stripe",
+    "/api/v1/gumroad-revenue/webhook/gumroad",  # Gumroad sale pings - no auth header
+    "/api/v1/logs/vercel",  # Vercel log drain - no auth needed
+    "/api/v1/logs/render",  # Render log drain - no auth needed
+    "/api/v1/mcp/health",   # MCP Bridge health check - monitoring
+    "/api/v1/mcp/status",   # MCP Bridge status - monitoring
+    "/api/v1/orchestrator/status",  # Orchestrator status - monitoring
+    "/api/v1/stripe-automation/config",  # Stripe publishable key - public for frontend
+    "/api/v1/stripe-automation/health",  # Stripe health check - monitoring
+)
+
+DEFAULT_EXEMPT_PREFIXES: Sequence[str] = (
+    "/docs/",
+    "/openapi/",
+    "/static/",
+    "/public/",
+    "/api/v1/erp/public",
+    "/api/v1/products/public",
+)
+
+# Paths that skip API key validation (prefix match).
+DEFAULT_PUBLIC_PATHS: Sequence[str] = (
+    "/health",
+    "/metrics",
+    "/api/v1/health",
+    "/ready",
+    "/api/v1/ready",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/api/v1/erp/public",
+    "/api/v1/products/public",
+    "/api/v1/stripe/webhook",
+    "/api/v1/webhooks/stripe",
+    "/api/v1/webhooks/render",
+    "/api/v1/revenue/webhook",
+    "/webhook/stripe",
+    "/api/v1/gumroad-revenue/webhook/gumroad",  # Gumroad sale pings - no auth header
+    "/api/v1/logs/vercel",  # Vercel log drain - no auth needed
+    "/api/v1/logs/render",  # Render log drain - no auth needed
+)
+
+# Paths excluded from rate limiting (prefix match).
+RATE_LIMIT_EXCLUDED_PATHS: Sequence[str] = (
+    "/health",
+    "/metrics",
+    "/api/v1/health",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+    "/api/v1/products/public",
+)
+
+# Webhook senders get their own rate-limit budget (prefix match).
+WEBHOOK_PREFIXES: Sequence[str] = (
+    "/api/v1/stripe/webhook",
+    "/api/v1/webhooks/stripe",
+    "/api/v1/revenue/webhook",
+    "/api/v1/gumroad-revenue/webhook",
+)
+
+# Paths that legitimately do NOT require a tenant context.
+TENANT_EXEMPT_PREFIXES: Sequence[str] = (
+    "/health",
+    "/ready",
+    "/capabilities",
+    "/diagnostics",
+    "/metrics",
+    "/docs",
+    "/openapi.json",
+    "/redoc",
+    "/api/v1/health",
+    "/api/v1/ready",
+    "/api/v1/stripe/webhook",   # Stripe webhooks resolve tenant internally
+    "/api/v1/cns",              # CNS system endpoints (API-key authed)
+)
+
+
+def _alternation(values: Iterable[str]) -> Optional[str]:
+    # Longest first so the regex engine never needs to backtrack between
+    # alternatives sharing a prefix.
+    unique = sorted(set(values), key=lambda value: (-len(value), value))
+    if not unique:
+        return None
+    return "(?:" + "|".join(re.escape(value) for value in unique) + ")"
+
+
+class PathMatcher:
+    """One compiled regex for a set of exact paths and path prefixes.
+
+    ``segment_prefixes`` only match at a path-segment boundary, i.e. the path
+    equals the prefix or continues with ``/``.
+    """
+
+    __slots__ = ("_pattern",)
+
+    def __init__(
+        self,
+        exact: Iterable[str] = (),
+        prefixes: Iterable[str] = (),
+        segment_prefixes: Iterable[str] = (),
+    ):
+        branches = []
+        exact_alt = _alternation(exact)
+        if exact_alt:
+            branches.append(exact_alt + r"\Z")
+        prefix_alt = _alternation(prefixes)
+        if prefix_alt:
+            branches.append(prefix_alt)
+        segment_alt = _alternation(segment_prefixes)
+        if segment_alt:
+            branches.append(segment_alt + r"(?:/|\Z)")
+        self._pattern: Optional[Pattern[str]] = (
+            re.compile("|".join(branches)) if branches else None
+        )
+
+    def matches(self, path: str) -> bool:
+        return self._pattern is not None and self._pattern.match(path) is not None
+
+
+AUTH_EXEMPT_MATCHER = PathMatcher(exact=DEFAULT_EXEMPT_PATHS, prefixes=DEFAULT_EXEMPT_PREFIXES)
+API_KEY_PUBLIC_MATCHER = PathMatcher(prefixes=DEFAULT_PUBLIC_PATHS)
+RATE_LIMIT_EXCLUDED_MATCHER = PathMatcher(prefixes=RATE_LIMIT_EXCLUDED_PATHS)
+WEBHOOK_MATCHER = PathMatcher(prefixes=WEBHOOK_PREFIXES)
+TENANT_EXEMPT_MATCHER = PathMatcher(exact=("/",), segment_prefixes=TENANT_EXEMPT_PREFIXES)
+
+
+@dataclass(frozen=True)
+class PathClass:
+    """Result of classifying one request path against every middleware list."""
+
+    path: str
+    auth_exempt: bool
+    api_key_public: bool
+    rate_limit_excluded: bool
+    webhook: bool
+    tenant_exempt: bool
+
+    @property
+    def kind(self) -> str:
+        """Coarse category: ``webhook``, ``public`` or ``authenticated``."""
+        if self.webhook:
+            return "webhook"
+        if self.auth_exempt:
+            return "public"
+        return "authenticated"
+
+
+@lru_cache(maxsize=4096)
+def classify_path(path: str) -> PathClass:
+    """Classify ``path`` against the default lists (memoised per path)."""
+    return PathClass(
+        path=path,
+        auth_exempt=AUTH_EXEMPT_MATCHER.matches(path),
+        api_key_public=API_KEY_PUBLIC_MATCHER.matches(path),
+        rate_limit_excluded=RATE_LIMIT_EXCLUDED_MATCHER.matches(path),
+        webhook=WEBHOOK_MATCHER.matches(path),
+        tenant_exempt=TENANT_EXEMPT_MATCHER.matches(path),
+    )
+
+
+def get_path_class(scope: Scope, path: Optional[str] = None) -> PathClass:
+    """Return the classification stored in ``scope``, computing it on first use.
+
+    ``path`` defaults to ``scope["path"]``; a stored result for a different
+    path (e.g. after a mount rewrote the scope) is recomputed.
+    """
+    if path is None:
+        path = scope.get("path", "")
+    cached = scope.get(PATH_CLASS_SCOPE_KEY)
+    if cached is not None and cached.path == path:
+        return cached
+    result = classify_path(path)
+    scope[PATH_CLASS_SCOPE_KEY] = result
+    return result
@@ -0,0 +1,134 @@
+"""
+Pure-ASGI request pipeline.
+
+Replaces the stack of ``BaseHTTPMiddleware`` layers (authentication, API key,
+rate limiting) and the ``@app.middleware("http")`` correlation-ID and
+performance-tracking functions with a single middleware that makes one pass
+over ``scope``. No body stream is wrapped and no task group is spawned per
+layer, so streaming responses flow straight through; only the
+``http.response.start`` message is touched to add headers.
+
+The stage logic itself still lives in the original middleware classes
+(``authenticate``/``check``), so exempt-path lists and semantics are shared.
+The path is classified once up front (``middleware.path_classifier``) and
+every stage reads that result from ``scope``.
+Stages run in the same order as the old stack: authentication, API key,
+rate limit.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.security import APIKeyMiddleware
+from core.request_metrics import UNMATCHED_ROUTE
+from middleware.authentication import AuthenticationMiddleware
+from middleware.path_classifier import get_path_class
+from middleware.rate_limiter import RateLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+# on_complete(scope, method, route_signature, status_code, response_time_ms,
+#             request_bytes, response_bytes)
+CompletionHook = Callable[[Scope, str, str, int, float, int, int], None]
+
+
+class RequestPipelineMiddleware:
+    """Correlation ID, auth, API key, rate limit and timing in one ASGI layer."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        rate_limit: Optional[Dict[str, Any]] = None,
+        on_complete: Optional[CompletionHook] = None,
+        enable_auth: bool = True,
+        enable_api_keys: bool = True,
+    ):
+        self.app = app
+        self.on_complete = on_complete
+        # The legacy classes are used only for their stage logic; their
+        # BaseHTTPMiddleware dispatch path is never entered.
+        self.auth = AuthenticationMiddleware(app) if enable_auth else None
+        self.api_keys = APIKeyMiddleware(app) if enable_api_keys else None
+        self.rate_limiter = (
+            RateLimitMiddleware(app, **rate_limit) if rate_limit is not None else None
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        request = Request(scope, receive)
+        headers = request.headers
+        correlation_id = (
+            headers.get("x-correlation-id")
+            or headers.get("x-request-id")
+            or str(uuid.uuid4())
+        )
+        request.state.correlation_id = correlation_id
+        get_path_class(scope, request.url.path)
+
+        status_code = 500
+        response_bytes = 0
+        extra_headers: Dict[str, str] = {}
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            elif message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = MutableHeaders(scope=message)
+                for name, value in extra_headers.items():
+                    response_headers[name] = value
+                response_headers["X-Correlation-ID"] = correlation_id
+                response_headers["X-Request-ID"] = correlation_id
+            await send(message)
+
+        try:
+            rejection = None
+            if self.auth is not None:
+                rejection = await self.auth.authenticate(request)
+            if rejection is None and self.api_keys is not None:
+                rejection = await self.api_keys.authenticate(request)
+            if rejection is None and self.rate_limiter is not None:
+                rejection, applies = await self.rate_limiter.check(request)
+                if rejection is None and applies:
+                    extra_headers.update(self.rate_limiter.response_headers(request))
+
+            if rejection is not None:
+                await rejection(scope, receive, send_wrapper)
+            else:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            if self.on_complete is not None:
+                response_time_ms = max((time.perf_counter() - start) * 1000.0, 0.0)
+                route_obj = scope.get("route")
+                # Raw paths would let scanners use up the per-route series.
+                route_signature = getattr(route_obj, "path", None) or UNMATCHED_ROUTE
+                try:
+                    request_bytes = int(headers.get("content-length") or 0)
+                except ValueError:
+                    request_bytes = 0
+                try:
+                    self.on_complete(
+                        scope,
+                        scope.get("method", "GET").upper(),
+                        str(route_signature),
+                        status_code,
+                        response_time_ms,
+                        request_bytes,
+                        response_bytes,
+                    )
+                except Exception as exc:  # pragma: no cover - telemetry must never break requests
+                    logger.debug("Request completion hook failed: %s", exc)
@@ -6,16 +6,86 @@ Prevents API abuse and ensures fair resource usage
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from collections import defaultdict
-from datetime import datetime, timedelta
+from collections import OrderedDict
+import os
 import time
 import logging
-from typing import Dict, Tuple, Optional, List
+from typing import Any, Dict, Tuple, Optional, List
+
+from middleware.path_classifier import get_path_class
 
 logger = logging.getLogger(__name__)
 
+# Sliding-window counter: for each window keep only the current and previous
+# fixed bucket counts and weight the previous one by how much of it still
+# overlaps the window. One Lua call checks every window atomically and only
+# consumes quota when all of them allow the request.
+_SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local n = #KEYS / 2
+local estimates = {}
+for i = 1, n do
+  local window = tonumber(ARGV[(i - 1) * 3 + 2])
+  local limit = tonumber(ARGV[(i - 1) * 3 + 3])
+  local bucket_start = tonumber(ARGV[(i - 1) * 3 + 4])
+  local curr = tonumber(redis.call('GET', KEYS[2 * i - 1]) or '0')
+  local prev = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+  local estimate = prev * (1 - (now - bucket_start) / window) + curr
+  if estimate + 1 > limit then
+    return {0, i}
+  end
+  estimates[i] = estimate
+end
+local result = {1, 0}
+for i = 1, n do
+  local window = tonumber(ARGV[(i - 1) * 3 + 2])
+  redis.call('INCR', KEYS[2 * i - 1])
+  redis.call('EXPIRE', KEYS[2 * i - 1], window * 2)
+  result[i + 2] = math.floor(estimates[i] + 1)
+end
+return result
+"""
+
+_BLOCK_SECONDS = 300
+_REDIS_ERROR_LOG_INTERVAL = 60
+
+
+class _WindowCounter:
+    """Current/previous bucket counts for one client and window length."""
+
+    __slots__ = ("bucket", "current", "previous")
+
+    def __init__(self, bucket: int):
+        self.bucket = bucket
+        self.current = 0
+        self.previous = 0
+
+    def estimate(self, now: float, window: int) -> float:
+        bucket = int(now // window)
+        if bucket != self.bucket:
+            self.previous = self.current if bucket == self.bucket + 1 else 0
+            self.current = 0
+            self.bucket = bucket
+        overlap = 1.0 - (now - bucket * window) / window
+        return self.previous * overlap + self.current
+
+
+class _ClientState:
+    __slots__ = ("windows", "blocked_until")
+
+    def __init__(self):
+        self.windows: Dict[int, _WindowCounter] = {}
+        self.blocked_until = 0.0
+
+
 class RateLimiter:
-    """Token bucket rate limiter"""
+    """Sliding-window-counter rate limiter.
+
+    Per client and window only two counters are kept, so each check costs the
+    same regardless of the limit. In-memory clients live in an LRU table
+    capped at ``max_clients``; with Redis, one Lua script call per check
+    covers every window.
+    """
 
     def __init__(
         self,
@@ -23,26 +93,35 @@ class RateLimiter:
         requests_per_hour: int = 60000,
         requests_per_day: int = 1000000,
         use_redis: bool = False,
-        redis_url: str = None
+        redis_url: str = None,
+        max_clients: Optional[int] = None,
     ):
         self.requests_per_minute = requests_per_minute
         self.requests_per_hour = requests_per_hour
         self.requests_per_day = requests_per_day
+        self.max_clients = max(
+            int(max_clients or os.getenv("RATE_LIMIT_MAX_CLIENTS", "50000")), 1
+        )
+        self._clock = time.time
 
-        # Try to use Redis for distributed rate limiting
+        # In-memory client table; also holds temporary blocks in Redis mode.
+        self._clients: "OrderedDict[str, _ClientState]" = OrderedDict()
+        self.evictions = 0
+
+        # Try to use Redis for distributed rate limiting. The client connects
+        # lazily; failures fall back to the in-memory counters.
         self.redis_client = None
+        self._redis_script = None
+        self._redis_error_logged_at = 0.0
         if use_redis and redis_url:
             try:
-                import redis
-                self.redis_client = redis.from_url(redis_url)
-                self.redis_client.ping()
+                import redis.asyncio as redis_asyncio
+                self.redis_client = redis_asyncio.from_url(redis_url)
+                self._redis_script = self.redis_client.register_script(_SLIDING_WINDOW_LUA)
                 logger.info("Using Redis for distributed rate limiting")
-            except:
-                logger.warning("Redis not available, using in-memory rate limiting")
-
-        # In-memory storage (fallback)
-        self.requests = defaultdict(list)
-        self.blocked_ips = {}
+            except Exception as exc:
+                logger.warning("Redis not available, using in-memory rate limiting: %s", exc)
+                self.redis_client = None
 
     def _get_client_id(self, request: Request) -> str:
         """Get unique client identifier"""
@@ -61,58 +140,83 @@ class RateLimiter:
         client_ip = request.client.host if request.client else "unknown"
         return f"ip:{client_ip}"
 
-    def _check_redis_limit(self, client_id: str, limit: int, window: int) -> bool:
-        """Check rate limit using Redis"""
-        try:
-            key = f"ratelimit:{client_id}:{window}"
-            current = self.redis_client.incr(key)
-
-            if current == 1:
-                self.redis_client.expire(key, window)
-
-            return current <= limit
-
-        except Exception as e:
-            logger.error(f"Redis rate limit check failed: {e}")
-            return True  # Allow on error
+    def _client_state(self, client_id: str) -> _ClientState:
+        state = self._clients.get(client_id)
+        if state is None:
+            state = _ClientState()
+            self._clients[client_id] = state
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._clients.move_to_end(client_id)
+        return state
 
     def _check_memory_limit(
         self,
         client_id: str,
-        limit: int,
-        window_seconds: int
-    ) -> bool:
-        """Check rate limit using in-memory storage"""
-        now = time.time()
-        window_start = now - window_seconds
-
-        # Clean old requests
-        self.requests[client_id] = [
-            req_time for req_time in self.requests[client_id]
-            if req_time > window_start
-        ]
-
-        # Check limit
-        if len(self.requests[client_id]) >= limit:
-            return False
-
-        # Add current request
-        self.requests[client_id].append(now)
-        return True
+        checks: List[Tuple[int, int, str]],
+        now: float,
+    ) -> Tuple[Optional[int], Dict[str, int]]:
+        """Check every window in memory; returns (denied index, usage)."""
+        state = self._client_state(client_id)
+        counters = []
+        for idx, (limit, window, _period) in enumerate(checks):
+            counter = state.windows.get(window)
+            if counter is None:
+                counter = state.windows[window] = _WindowCounter(int(now // window))
+            estimate = counter.estimate(now, window)
+            if estimate + 1 > limit:
+                return idx, {}
+            counters.append((counter, estimate))
+
+        usage = {}
+        for (counter, estimate), (_limit, _window, period) in zip(counters, checks):
+            counter.current += 1
+            usage[period] = int(estimate + 1)
+        return None, usage
+
+    async def _check_redis_limit(
+        self,
+        client_id: str,
+        checks: List[Tuple[int, int, str]],
+        now: float,
+    ) -> Tuple[Optional[int], Dict[str, int]]:
+        """Check every window with one Lua round-trip; returns (denied index, usage)."""
+        keys: List[str] = []
+        args: List[Any] = [repr(now)]
+        for limit, window, _period in checks:
+            bucket = int(now // window)
+            keys.append(f"ratelimit:{client_id}:{window}:{bucket}")
+            keys.append(f"ratelimit:{client_id}:{window}:{bucket - 1}")
+            args.extend((window, limit, bucket * window))
+
+        result = await self._redis_script(keys=keys, args=args)
+        if not int(result[0]):
+            return int(result[1]) - 1, {}
+        return None, {
+            period: int(count) for (_l, _w, period), count in zip(checks, result[2:])
+        }
 
-    def check_limit(
+    async def check_limit(
         self,
         request: Request,
         *,
         checks: Optional[List[Tuple[int, int, str]]] = None,
     ) -> Tuple[bool, str]:
-        """Check if request is within rate limits"""
+        """Check if request is within rate limits.
+
+        Usage per period is recorded on ``request.state.rate_limit_usage`` so
+        headers can be built without another lookup.
+        """
         client_id = self._get_client_id(request)
+        now = self._clock()
 
-        # Check if IP is blocked
-        if client_id in self.blocked_ips:
-            if self.blocked_ips[client_id] > datetime.utcnow():
-                return False, "IP temporarily blocked due to rate limit violations"
+        # Check if client is blocked
+        state = self._clients.get(client_id)
+        if state is not None and state.blocked_until > now:
+            request.state.rate_limit_usage = None
+            return False, "IP temporarily blocked due to rate limit violations"
 
         # Check different time windows
         checks = checks or [
@@ -121,59 +225,65 @@ class RateLimiter:
             (self.requests_per_day, 86400, "day"),
         ]
 
-        for limit, window, period in checks:
-            if self.redis_client:
-                allowed = self._check_redis_limit(client_id, limit, window)
-            else:
-                allowed = self._check_memory_limit(client_id, limit, window)
+        denied, usage = None, {}
+        if self.redis_client is not None:
+            try:
+                denied, usage = await self._check_redis_limit(client_id, checks, now)
+            except Exception as exc:
+                if now - self._redis_error_logged_at >= _REDIS_ERROR_LOG_INTERVAL:
+                    self._redis_error_logged_at = now
+                    logger.error("Redis rate limit check failed, using in-memory counters: %s", exc)
+                denied, usage = self._check_memory_limit(client_id, checks, now)
+        else:
+            denied, usage = self._check_memory_limit(client_id, checks, now)
 
-            if not allowed:
-                # Block repeat offenders
-                self._handle_violation(client_id)
-                return False, f"Rate limit exceeded: {limit} requests per {period}"
+        if denied is not None:
+            limit, _window, period = checks[denied]
+            request.state.rate_limit_usage = None
+            # Block repeat offenders
+            self._handle_violation(client_id, now)
+            return False, f"Rate limit exceeded: {limit} requests per {period}"
 
+        request.state.rate_limit_usage = usage
         return True, "OK"
 
-    def _handle_violation(self, client_id: str):
+    def _handle_violation(self, client_id: str, now: float):
         """Handle rate limit violation"""
         # Temporary block for repeat offenders
-        if client_id not in self.blocked_ips:
-            self.blocked_ips[client_id] = datetime.utcnow() + timedelta(minutes=5)
+        state = self._client_state(client_id)
+        if state.blocked_until <= now:
+            state.blocked_until = now + _BLOCK_SECONDS
             logger.warning(f"Temporarily blocked {client_id} for rate limit violations")
 
     def get_limits_for_client(self, request: Request) -> dict:
-        """Get current limits and usage for client"""
-        client_id = self._get_client_id(request)
-
-        if self.redis_client:
-            try:
-                usage = {
-                    "minute": int(self.redis_client.get(f"ratelimit:{client_id}:60") or 0),
-                    "hour": int(self.redis_client.get(f"ratelimit:{client_id}:3600") or 0),
-                    "day": int(self.redis_client.get(f"ratelimit:{client_id}:86400") or 0),
-                }
-            except:
-                usage = {"minute": 0, "hour": 0, "day": 0}
+        """Get current limits and usage for client as of its last check."""
+        limits = {
+            "minute": self.requests_per_minute,
+            "hour": self.requests_per_hour,
+            "day": self.requests_per_day,
+        }
+        recorded = getattr(request.state, "rate_limit_usage", {})
+        if recorded is None:
+            # The last check rejected the request: the quota is exhausted.
+            usage = dict(limits)
         else:
-            now = time.time()
-            usage = {
-                "minute": len([t for t in self.requests[client_id] if t > now - 60]),
-                "hour": len([t for t in self.requests[client_id] if t > now - 3600]),
-                "day": len([t for t in self.requests[client_id] if t > now - 86400]),
-            }
+            usage = {period: recorded.get(period, 0) for period in limits}
 
         return {
-            "limits": {
-                "minute": self.requests_per_minute,
-                "hour": self.requests_per_hour,
-                "day": self.requests_per_day,
-            },
+            "limits": limits,
             "usage": usage,
             "remaining": {
-                "minute": max(0, self.requests_per_minute - usage["minute"]),
-                "hour": max(0, self.requests_per_hour - usage["hour"]),
-                "day": max(0, self.requests_per_day - usage["day"]),
-            }
+                period: max(0, limits[period] - usage[period]) for period in limits
+            },
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Table size and eviction counters for diagnostics."""
+        return {
+            "backend": "redis" if self.redis_client is not None else "memory",
+            "clients": len(self._clients),
+            "max_clients": self.max_clients,
+            "evictions": self.evictions,
         }
 
 class RateLimitMiddleware(BaseHTTPMiddleware):
@@ -194,31 +304,37 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         self.webhook_requests_per_minute = int(kwargs.get("webhook_requests_per_minute", 300))
         self.webhook_requests_per_hour = int(kwargs.get("webhook_requests_per_hour", 4000))
 
-        # Paths to exclude from rate limiting
-        self.excluded_paths = {
-            "/health",
-            "/api/v1/health",
-            "/docs",
-            "/redoc",
-            "/openapi.json",
-            "/api/v1/products/public",
-            "/api/v1/products/public/"
-        }
-        self.webhook_prefixes = (
-            "/api/v1/stripe/webhook",
-            "/api/v1/webhooks/stripe",
-            "/api/v1/revenue/webhook",
-            "/api/v1/gumroad-revenue/webhook",
-        )
-
     async def dispatch(self, request: Request, call_next):
+        rejection, applies = await self.check(request)
+        if rejection is not None:
+            return rejection
+
+        # Process request
+        response = await call_next(request)
+
+        if applies:
+            # Add rate limit headers
+            response.headers.update(self.response_headers(request))
+
+        return response
+
+    async def check(self, request: Request) -> Tuple[Optional[JSONResponse], bool]:
+        """Apply the limits for this request.
+
+        Returns ``(rejection, applies)``: a 429 response when the client is over
+        its limit, and whether rate-limit headers belong on the response.
+        Shared by ``dispatch`` and the pure-ASGI request pipeline.
+        """
+        # Excluded and webhook paths are classified once per request
+        # (RATE_LIMIT_EXCLUDED_PATHS / WEBHOOK_PREFIXES in path_classifier).
+        path_class = get_path_class(request.scope, request.url.path)
+
         # Skip rate limiting for excluded paths
-        if any(request.url.path.startswith(path) for path in self.excluded_paths):
-            return await call_next(request)
+        if path_class.rate_limit_excluded:
+            return None, False
 
-        path = request.url.path
         is_authenticated = bool(getattr(request.state, "authenticated", False) or getattr(request.state, "user", None))
-        is_webhook = any(path.startswith(prefix) for prefix in self.webhook_prefixes)
+        is_webhook = path_class.webhook
 
         checks = None
         if is_webhook:
@@ -235,7 +351,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             ]
 
         # Check rate limit
-        allowed, message = self.limiter.check_limit(request, checks=checks)
+        allowed, message = await self.limiter.check_limit(request, checks=checks)
 
         if not allowed:
             # Get limit info for headers
@@ -249,18 +365,18 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
                     "X-RateLimit-Reset": str(int(time.time()) + 60),
                     "Retry-After": "60"
                 }
-            )
+            ), True
 
-        # Process request
-        response = await call_next(request)
+        return None, True
 
-        # Add rate limit headers
+    def response_headers(self, request: Request) -> Dict[str, str]:
+        """Rate limit headers for a request that was allowed through."""
         limits = self.limiter.get_limits_for_client(request)
-        response.headers["X-RateLimit-Limit"] = str(limits["limits"]["minute"])
-        response.headers["X-RateLimit-Remaining"] = str(limits["remaining"]["minute"])
-        response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 60)
-
-        return response
+        return {
+            "X-RateLimit-Limit": str(limits["limits"]["minute"]),
+            "X-RateLimit-Remaining": str(limits["remaining"]["minute"]),
+            "X-RateLimit-Reset": str(int(time.time()) + 60),
+        }
 
 # Per-endpoint rate limiting decorator
 def rate_limit(
@@ -277,7 +393,7 @@ def rate_limit(
     def decorator(func):
         async def wrapper(request: Request, *args, **kwargs):
             # Check rate limit
-            allowed, message = limiter.check_limit(request)
+            allowed, message = await limiter.check_limit(request)
 
             if not allowed:
                 raise HTTPException(
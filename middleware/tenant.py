@@ -11,27 +11,18 @@ from fastapi import Request, HTTPException
 from typing import Optional
 import logging
 
+from middleware.path_classifier import (
+    TENANT_EXEMPT_MATCHER,
+    get_path_class,
+)
+
 logger = logging.getLogger(__name__)
 
-# ---------------------------------------------------------------------------
-# Paths that legitimately do NOT require a tenant context.
+# Paths that legitimately do NOT require a tenant context are defined in
+# middleware.path_classifier (TENANT_EXEMPT_PREFIXES).
 # The TenantMiddleware will allow these through without a tenant_id, and the
 # get_tenant_filter* helpers will never be called for them (they use their own
 # auth/scoping logic).
-# ---------------------------------------------------------------------------
-TENANT_EXEMPT_PREFIXES = (
-    "/health",
-    "/ready",
-    "/capabilities",
-    "/diagnostics",
-    "/docs",
-    "/openapi.json",
-    "/redoc",
-    "/api/v1/health",
-    "/api/v1/ready",
-    "/api/v1/stripe/webhook",   # Stripe webhooks resolve tenant internally
-    "/api/v1/cns",              # CNS system endpoints (API-key authed)
-)
 
 
 class TenantMiddleware:
@@ -67,7 +58,7 @@ class TenantMiddleware:
         # Log tenant access
         if tenant_id:
             logger.debug(f"Request from tenant: {tenant_id}")
-        elif not _is_exempt_path(path):
+        elif not get_path_class(scope, path).tenant_exempt:
             logger.warning(
                 "Request to tenant-scoped path %s without tenant_id", path
             )
@@ -112,13 +103,7 @@ class TenantMiddleware:
 
 def _is_exempt_path(path: str) -> bool:
     """Return True if *path* does not require tenant scoping."""
-    for prefix in TENANT_EXEMPT_PREFIXES:
-        if path == prefix or path.startswith(prefix + "/"):
-            return True
-    # Root path
-    if path == "/":
-        return True
-    return False
+    return TENANT_EXEMPT_MATCHER.matches(path)
 
 
 def get_tenant_id(request: Request) -> Optional[str]:
@@ -0,0 +1,32 @@
+-- 20261016_audit_log_chain.sql
+-- Purpose:
+-- 1) Hash-chain columns on audit_logs written by services/audit_writer.py:
+--    chain_seq numbers chained rows, row_hash = sha256(prev_hash || row).
+--    Rows written before this migration leave them NULL.
+-- 2) audit_log_chain_head: the single row each batch locks (FOR UPDATE) to
+--    continue the chain, so concurrent writers on several replicas append
+--    to one chain instead of forking it.
+
+BEGIN;
+
+ALTER TABLE public.audit_logs
+    ADD COLUMN IF NOT EXISTS chain_seq bigint,
+    ADD COLUMN IF NOT EXISTS prev_hash text,
+    ADD COLUMN IF NOT EXISTS row_hash text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_audit_logs_chain_seq
+    ON public.audit_logs (chain_seq)
+    WHERE chain_seq IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS public.audit_log_chain_head (
+    id integer PRIMARY KEY CHECK (id = 1),
+    seq bigint NOT NULL,
+    row_hash text NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO public.audit_log_chain_head (id, seq, row_hash)
+VALUES (1, 0, repeat('0', 64))
+ON CONFLICT (id) DO NOTHING;
+
+COMMIT;
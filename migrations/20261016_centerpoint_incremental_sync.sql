@@ -0,0 +1,195 @@
+-- 20261016_centerpoint_incremental_sync.sql
+-- Purpose:
+-- 1) WeatherCraft / CenterPoint tables previously created at runtime by
+--    CenterPointSync._initialize_tables (moved here unchanged).
+-- 2) content_hash on the synced tables: the batch upsert only rewrites rows
+--    whose mapped content changed.
+-- 3) centerpoint_sync_state: per-entity high-water mark, the (updated_at, id)
+--    keyset position of the last record written, advanced in the same
+--    transaction as each synced page.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.weathercraft_customers (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    centerpoint_id VARCHAR(255) UNIQUE,
+    company_name VARCHAR(255),
+    contact_name VARCHAR(255),
+    email VARCHAR(255),
+    phone VARCHAR(50),
+    mobile VARCHAR(50),
+    address JSONB,
+    customer_type VARCHAR(50),
+    status VARCHAR(50),
+    credit_limit DECIMAL(12,2),
+    balance DECIMAL(12,2),
+    tags JSONB,
+    custom_fields JSONB,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wc_customers_centerpoint ON weathercraft_customers(centerpoint_id);
+CREATE INDEX IF NOT EXISTS idx_wc_customers_email ON weathercraft_customers(email);
+
+CREATE TABLE IF NOT EXISTS public.weathercraft_projects (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    centerpoint_id VARCHAR(255) UNIQUE,
+    project_number VARCHAR(100),
+    project_name VARCHAR(255),
+    customer_id UUID REFERENCES weathercraft_customers(id),
+    property_address JSONB,
+    project_type VARCHAR(100),
+    status VARCHAR(50),
+    stage VARCHAR(100),
+    start_date DATE,
+    completion_date DATE,
+    total_contract DECIMAL(12,2),
+    total_cost DECIMAL(12,2),
+    gross_profit DECIMAL(12,2),
+    project_manager VARCHAR(255),
+    estimator VARCHAR(255),
+    crew_assigned JSONB,
+    scope_of_work TEXT,
+    notes TEXT,
+    custom_fields JSONB,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wc_projects_centerpoint ON weathercraft_projects(centerpoint_id);
+CREATE INDEX IF NOT EXISTS idx_wc_projects_customer ON weathercraft_projects(customer_id);
+CREATE INDEX IF NOT EXISTS idx_wc_projects_status ON weathercraft_projects(status);
+
+CREATE TABLE IF NOT EXISTS public.weathercraft_estimates (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    centerpoint_id VARCHAR(255) UNIQUE,
+    estimate_number VARCHAR(100),
+    project_id UUID REFERENCES weathercraft_projects(id),
+    customer_id UUID REFERENCES weathercraft_customers(id),
+    estimate_date DATE,
+    expiry_date DATE,
+    total_amount DECIMAL(12,2),
+    status VARCHAR(50),
+    line_items JSONB,
+    terms TEXT,
+    notes TEXT,
+    created_by VARCHAR(255),
+    approved_by VARCHAR(255),
+    approval_date TIMESTAMP,
+    custom_fields JSONB,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wc_estimates_centerpoint ON weathercraft_estimates(centerpoint_id);
+CREATE INDEX IF NOT EXISTS idx_wc_estimates_project ON weathercraft_estimates(project_id);
+
+CREATE TABLE IF NOT EXISTS public.weathercraft_invoices (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    centerpoint_id VARCHAR(255) UNIQUE,
+    invoice_number VARCHAR(100),
+    project_id UUID REFERENCES weathercraft_projects(id),
+    customer_id UUID REFERENCES weathercraft_customers(id),
+    invoice_date DATE,
+    due_date DATE,
+    total_amount DECIMAL(12,2),
+    paid_amount DECIMAL(12,2),
+    balance_due DECIMAL(12,2),
+    status VARCHAR(50),
+    payment_terms VARCHAR(100),
+    line_items JSONB,
+    payments JSONB,
+    custom_fields JSONB,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wc_invoices_centerpoint ON weathercraft_invoices(centerpoint_id);
+CREATE INDEX IF NOT EXISTS idx_wc_invoices_project ON weathercraft_invoices(project_id);
+CREATE INDEX IF NOT EXISTS idx_wc_invoices_status ON weathercraft_invoices(status);
+
+CREATE TABLE IF NOT EXISTS public.weathercraft_service_tickets (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    centerpoint_id VARCHAR(255) UNIQUE,
+    ticket_number VARCHAR(100),
+    customer_id UUID REFERENCES weathercraft_customers(id),
+    project_id UUID REFERENCES weathercraft_projects(id),
+    service_type VARCHAR(100),
+    priority VARCHAR(50),
+    status VARCHAR(50),
+    issue_description TEXT,
+    resolution TEXT,
+    scheduled_date TIMESTAMP,
+    completed_date TIMESTAMP,
+    technician_assigned VARCHAR(255),
+    labor_hours DECIMAL(8,2),
+    materials_used JSONB,
+    total_cost DECIMAL(12,2),
+    photos JSONB,
+    custom_fields JSONB,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wc_service_centerpoint ON weathercraft_service_tickets(centerpoint_id);
+CREATE INDEX IF NOT EXISTS idx_wc_service_customer ON weathercraft_service_tickets(customer_id);
+CREATE INDEX IF NOT EXISTS idx_wc_service_status ON weathercraft_service_tickets(status);
+
+CREATE TABLE IF NOT EXISTS public.weathercraft_inventory (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    centerpoint_id VARCHAR(255) UNIQUE,
+    item_code VARCHAR(100),
+    item_name VARCHAR(255),
+    description TEXT,
+    category VARCHAR(100),
+    unit_of_measure VARCHAR(50),
+    quantity_on_hand DECIMAL(12,2),
+    quantity_allocated DECIMAL(12,2),
+    quantity_available DECIMAL(12,2),
+    reorder_point DECIMAL(12,2),
+    reorder_quantity DECIMAL(12,2),
+    unit_cost DECIMAL(12,4),
+    selling_price DECIMAL(12,4),
+    vendor_id VARCHAR(255),
+    location VARCHAR(255),
+    custom_fields JSONB,
+    created_date TIMESTAMP,
+    modified_date TIMESTAMP,
+    synced_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_wc_inventory_centerpoint ON weathercraft_inventory(centerpoint_id);
+CREATE INDEX IF NOT EXISTS idx_wc_inventory_code ON weathercraft_inventory(item_code);
+
+CREATE TABLE IF NOT EXISTS public.centerpoint_sync_log (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    sync_type VARCHAR(50),
+    entity_type VARCHAR(50),
+    records_fetched INT,
+    records_synced INT,
+    records_failed INT,
+    errors JSONB,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    duration_seconds INT,
+    success BOOLEAN
+);
+
+ALTER TABLE public.weathercraft_customers ADD COLUMN IF NOT EXISTS content_hash text;
+ALTER TABLE public.weathercraft_projects ADD COLUMN IF NOT EXISTS content_hash text;
+ALTER TABLE public.weathercraft_invoices ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE TABLE IF NOT EXISTS public.centerpoint_sync_state (
+    entity VARCHAR(50) PRIMARY KEY,
+    high_water_mark TIMESTAMPTZ,
+    high_water_id VARCHAR(255),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMIT;
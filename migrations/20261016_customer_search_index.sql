@@ -0,0 +1,90 @@
+-- 20261016_customer_search_index.sql
+-- Purpose:
+-- 1) customers.search_text / customers.search_vector, kept current by a row
+--    trigger that only fires when a searched column changes, with pg_trgm and
+--    tsvector GIN indexes. Used by services/customer_search.py in place of
+--    the LOWER(col) LIKE '%term%' chains.
+-- 2) Trigram indexes for per-field contains/starts/ends filters on the
+--    advanced search endpoint.
+-- 3) (sort column, id) btree indexes that serve the keyset cursors, plus the
+--    customer_id indexes driving the per-customer aggregate/tag subqueries.
+--
+-- The backfill UPDATE rewrites every customers row once. On large tables run
+-- it in id-range batches before applying the rest of this file.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE public.customers
+    ADD COLUMN IF NOT EXISTS search_text text,
+    ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION public.customers_search_refresh()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.search_text := lower(concat_ws(' ', NEW.name, NEW.email, NEW.company, NEW.phone));
+    NEW.search_vector := to_tsvector(
+        'simple'::regconfig,
+        concat_ws(' ', NEW.name, NEW.email, NEW.company, NEW.phone)
+    );
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS customers_search_refresh ON public.customers;
+CREATE TRIGGER customers_search_refresh
+    BEFORE INSERT OR UPDATE OF name, email, company, phone
+    ON public.customers
+    FOR EACH ROW
+    EXECUTE FUNCTION public.customers_search_refresh();
+
+UPDATE public.customers
+SET name = name
+WHERE search_text IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_customers_search_text_trgm
+    ON public.customers USING gin (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_search_vector
+    ON public.customers USING gin (search_vector);
+
+CREATE INDEX IF NOT EXISTS idx_customers_name_trgm
+    ON public.customers USING gin (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_email_trgm
+    ON public.customers USING gin (email gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_customers_company_trgm
+    ON public.customers USING gin (company gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_customers_created_at_id
+    ON public.customers (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_customers_updated_at_id
+    ON public.customers (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_customers_name_id
+    ON public.customers (name, id);
+-- email is nullable: keyset sorts use COALESCE(email, '') (services/customer_search.py).
+DROP INDEX IF EXISTS public.idx_customers_email_id;
+CREATE INDEX IF NOT EXISTS idx_customers_email_coalesced_id
+    ON public.customers ((COALESCE(email, '')), id);
+CREATE INDEX IF NOT EXISTS idx_customers_tenant_created_at_id
+    ON public.customers (tenant_id, created_at, id);
+
+DO $$
+BEGIN
+    IF to_regclass('public.customer_tags') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_customer_tags_customer_tag
+            ON public.customer_tags (customer_id, tag);
+    END IF;
+    IF to_regclass('public.jobs') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_jobs_customer_id
+            ON public.jobs (customer_id);
+    END IF;
+    IF to_regclass('public.invoices') IS NOT NULL THEN
+        CREATE INDEX IF NOT EXISTS idx_invoices_customer_id
+            ON public.invoices (customer_id);
+    END IF;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,55 @@
+-- 20261016_email_engine_tables.sql
+-- Purpose:
+-- 1) Tables used by services/email_engine.py, which previously ran
+--    CREATE TABLE IF NOT EXISTS on every send. The engine now only checks
+--    that they exist (once per process).
+-- 2) Functional index for the case-insensitive bounce-suppression lookup
+--    (lower(recipient_email) = ANY(...)) used by single and batch sends.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.email_templates (
+    id UUID PRIMARY KEY,
+    tenant_id VARCHAR(255) NOT NULL,
+    template_name VARCHAR(255) NOT NULL,
+    subject_template TEXT NOT NULL,
+    html_template TEXT NOT NULL,
+    text_template TEXT,
+    metadata JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    UNIQUE (tenant_id, template_name)
+);
+
+CREATE TABLE IF NOT EXISTS public.email_send_events (
+    id UUID PRIMARY KEY,
+    tenant_id VARCHAR(255) NOT NULL,
+    recipient_email VARCHAR(255) NOT NULL,
+    template_name VARCHAR(255),
+    provider VARCHAR(100),
+    provider_message_id VARCHAR(255),
+    status VARCHAR(50) NOT NULL,
+    metadata JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS public.email_bounces (
+    id UUID PRIMARY KEY,
+    tenant_id VARCHAR(255) NOT NULL,
+    recipient_email VARCHAR(255) NOT NULL,
+    reason TEXT,
+    provider_event_id VARCHAR(255),
+    metadata JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_send_events_tenant_created
+    ON public.email_send_events (tenant_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_email_bounces_tenant_email
+    ON public.email_bounces (tenant_id, recipient_email);
+
+CREATE INDEX IF NOT EXISTS idx_email_bounces_tenant_lower_email
+    ON public.email_bounces (tenant_id, lower(recipient_email));
+
+COMMIT;
@@ -0,0 +1,388 @@
+-- 20261016_financial_rollups.sql
+-- Purpose:
+-- 1) Daily per-tenant financial rollups read by services/financial_rollups.py
+--    (revenue by job category, expenses and collections, open AR by due date)
+-- 2) Statement-level triggers on invoices, invoice_payments and job_costs that
+--    apply each write to the rollups as a signed delta
+-- 3) rebuild_financial_rollups(): recomputes tenants' rollups from the raw
+--    tables (nightly correction pass and the initial backfill below)
+--
+-- Writers and the rebuild serialise per tenant, not per table: each trigger
+-- holds a shared advisory lock on the tenants it touches and the rebuild takes
+-- the same locks exclusively, so other tenants keep writing during a rebuild.
+--
+-- Days are UTC calendar days of created_at (payment_date for collections),
+-- the same boundaries the raw range queries use.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.financial_revenue_daily (
+    tenant_id uuid NOT NULL,
+    day date NOT NULL,
+    -- COALESCE(jobs.job_type, 'Other') of the invoice's job.
+    category text NOT NULL,
+    invoice_count bigint NOT NULL DEFAULT 0,
+    -- Invoices with a non-null total_amount (denominator of the average).
+    amount_count bigint NOT NULL DEFAULT 0,
+    total_amount numeric NOT NULL DEFAULT 0,
+    paid_amount numeric NOT NULL DEFAULT 0,
+    unpaid_amount numeric NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, day, category)
+);
+
+CREATE TABLE IF NOT EXISTS public.financial_ledger_daily (
+    tenant_id uuid NOT NULL,
+    day date NOT NULL,
+    expense_count bigint NOT NULL DEFAULT 0,
+    material_cost numeric NOT NULL DEFAULT 0,
+    labor_cost numeric NOT NULL DEFAULT 0,
+    other_costs numeric NOT NULL DEFAULT 0,
+    -- SUM(material_cost + labor_cost + other_costs): rows with a NULL part add nothing.
+    expense_total numeric NOT NULL DEFAULT 0,
+    collections numeric NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, day)
+);
+
+-- Open (not paid / cancelled) invoices. 'infinity' stands in for a NULL
+-- created_at / due_date so both can be part of the key.
+CREATE TABLE IF NOT EXISTS public.financial_ar_open (
+    tenant_id uuid NOT NULL,
+    created_day date NOT NULL,
+    due_date date NOT NULL,
+    invoice_count bigint NOT NULL DEFAULT 0,
+    balance_cents numeric NOT NULL DEFAULT 0,
+    PRIMARY KEY (tenant_id, created_day, due_date)
+);
+
+-- Transition rows of the firing statement with a +1 / -1 sign, so an UPDATE
+-- nets out to (new - old) in a single grouped upsert.
+CREATE OR REPLACE FUNCTION public.financial_rollup_changes(op text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+AS $$
+    SELECT CASE op
+        WHEN 'INSERT' THEN 'SELECT 1 AS sign, n.* FROM new_rows n'
+        WHEN 'DELETE' THEN 'SELECT -1 AS sign, o.* FROM old_rows o'
+        ELSE 'SELECT -1 AS sign, o.* FROM old_rows o UNION ALL SELECT 1 AS sign, n.* FROM new_rows n'
+    END
+$$;
+
+-- Per-tenant advisory locks, taken in tenant order. Shared by trigger deltas,
+-- exclusive for the rebuild.
+CREATE OR REPLACE FUNCTION public.lock_financial_rollup_tenants(p_tenants uuid[], p_exclusive boolean DEFAULT false)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_exclusive THEN
+        PERFORM pg_advisory_xact_lock(hashtext('financial_rollups'), hashtext(tenant::text))
+        FROM (SELECT DISTINCT tenant FROM unnest(p_tenants) AS tenant WHERE tenant IS NOT NULL) locked
+        ORDER BY tenant;
+    ELSE
+        PERFORM pg_advisory_xact_lock_shared(hashtext('financial_rollups'), hashtext(tenant::text))
+        FROM (SELECT DISTINCT tenant FROM unnest(p_tenants) AS tenant WHERE tenant IS NOT NULL) locked
+        ORDER BY tenant;
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.apply_invoice_financial_rollups()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    changes text := public.financial_rollup_changes(TG_OP);
+    tenants uuid[];
+BEGIN
+    EXECUTE format('SELECT array_agg(r.tenant_id) FROM (%s) r', changes) INTO tenants;
+    PERFORM public.lock_financial_rollup_tenants(tenants);
+
+    EXECUTE format($sql$
+        INSERT INTO public.financial_revenue_daily AS t
+            (tenant_id, day, category, invoice_count, amount_count, total_amount, paid_amount, unpaid_amount)
+        SELECT
+            r.tenant_id,
+            (r.created_at AT TIME ZONE 'UTC')::date,
+            COALESCE(j.job_type, 'Other'),
+            SUM(r.sign),
+            COALESCE(SUM(r.sign) FILTER (WHERE r.total_amount IS NOT NULL), 0),
+            COALESCE(SUM(r.sign * r.total_amount), 0),
+            COALESCE(SUM(r.sign * r.total_amount) FILTER (WHERE r.status = 'paid'), 0),
+            COALESCE(SUM(r.sign * r.total_amount) FILTER (WHERE r.status <> 'paid'), 0)
+        FROM (%s) r
+        LEFT JOIN public.jobs j ON j.id = r.job_id
+        WHERE r.tenant_id IS NOT NULL AND r.created_at IS NOT NULL AND r.status <> 'cancelled'
+        GROUP BY 1, 2, 3
+        HAVING SUM(r.sign) <> 0
+            OR COALESCE(SUM(r.sign) FILTER (WHERE r.total_amount IS NOT NULL), 0) <> 0
+            OR COALESCE(SUM(r.sign * r.total_amount), 0) <> 0
+            OR COALESCE(SUM(r.sign * r.total_amount) FILTER (WHERE r.status = 'paid'), 0) <> 0
+        ON CONFLICT (tenant_id, day, category) DO UPDATE SET
+            invoice_count = t.invoice_count + EXCLUDED.invoice_count,
+            amount_count = t.amount_count + EXCLUDED.amount_count,
+            total_amount = t.total_amount + EXCLUDED.total_amount,
+            paid_amount = t.paid_amount + EXCLUDED.paid_amount,
+            unpaid_amount = t.unpaid_amount + EXCLUDED.unpaid_amount
+    $sql$, changes);
+
+    EXECUTE format($sql$
+        INSERT INTO public.financial_ar_open AS t
+            (tenant_id, created_day, due_date, invoice_count, balance_cents)
+        SELECT
+            r.tenant_id,
+            COALESCE((r.created_at AT TIME ZONE 'UTC')::date, 'infinity'),
+            COALESCE(r.due_date, 'infinity'),
+            SUM(r.sign),
+            COALESCE(SUM(r.sign * r.balance_cents), 0)
+        FROM (%s) r
+        WHERE r.tenant_id IS NOT NULL AND r.status NOT IN ('paid', 'cancelled')
+        GROUP BY 1, 2, 3
+        HAVING SUM(r.sign) <> 0 OR COALESCE(SUM(r.sign * r.balance_cents), 0) <> 0
+        ON CONFLICT (tenant_id, created_day, due_date) DO UPDATE SET
+            invoice_count = t.invoice_count + EXCLUDED.invoice_count,
+            balance_cents = t.balance_cents + EXCLUDED.balance_cents
+    $sql$, changes);
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.apply_job_cost_financial_rollups()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    changes text := public.financial_rollup_changes(TG_OP);
+    tenants uuid[];
+BEGIN
+    EXECUTE format('SELECT array_agg(r.tenant_id) FROM (%s) r', changes) INTO tenants;
+    PERFORM public.lock_financial_rollup_tenants(tenants);
+
+    EXECUTE format($sql$
+        INSERT INTO public.financial_ledger_daily AS t
+            (tenant_id, day, expense_count, material_cost, labor_cost, other_costs, expense_total)
+        SELECT
+            r.tenant_id,
+            (r.created_at AT TIME ZONE 'UTC')::date,
+            SUM(r.sign),
+            COALESCE(SUM(r.sign * r.material_cost), 0),
+            COALESCE(SUM(r.sign * r.labor_cost), 0),
+            COALESCE(SUM(r.sign * r.other_costs), 0),
+            COALESCE(SUM(r.sign * (r.material_cost + r.labor_cost + r.other_costs)), 0)
+        FROM (%s) r
+        WHERE r.tenant_id IS NOT NULL AND r.created_at IS NOT NULL
+        GROUP BY 1, 2
+        HAVING SUM(r.sign) <> 0
+            OR COALESCE(SUM(r.sign * r.material_cost), 0) <> 0
+            OR COALESCE(SUM(r.sign * r.labor_cost), 0) <> 0
+            OR COALESCE(SUM(r.sign * r.other_costs), 0) <> 0
+            OR COALESCE(SUM(r.sign * (r.material_cost + r.labor_cost + r.other_costs)), 0) <> 0
+        ON CONFLICT (tenant_id, day) DO UPDATE SET
+            expense_count = t.expense_count + EXCLUDED.expense_count,
+            material_cost = t.material_cost + EXCLUDED.material_cost,
+            labor_cost = t.labor_cost + EXCLUDED.labor_cost,
+            other_costs = t.other_costs + EXCLUDED.other_costs,
+            expense_total = t.expense_total + EXCLUDED.expense_total
+    $sql$, changes);
+
+    RETURN NULL;
+END;
+$$;
+
+-- invoice_payments has no tenant_id; it comes from the parent invoice. Payments
+-- removed by an invoice delete cascade no longer have one and are corrected by
+-- the nightly rebuild.
+CREATE OR REPLACE FUNCTION public.apply_payment_financial_rollups()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    changes text := public.financial_rollup_changes(TG_OP);
+    tenants uuid[];
+BEGIN
+    EXECUTE format(
+        'SELECT array_agg(i.tenant_id) FROM (%s) r JOIN public.invoices i ON i.id = r.invoice_id', changes
+    ) INTO tenants;
+    PERFORM public.lock_financial_rollup_tenants(tenants);
+
+    EXECUTE format($sql$
+        INSERT INTO public.financial_ledger_daily AS t (tenant_id, day, collections)
+        SELECT i.tenant_id, r.payment_date, SUM(r.sign * r.amount)
+        FROM (%s) r
+        JOIN public.invoices i ON i.id = r.invoice_id
+        WHERE i.tenant_id IS NOT NULL AND r.payment_date IS NOT NULL
+        GROUP BY 1, 2
+        HAVING COALESCE(SUM(r.sign * r.amount), 0) <> 0
+        ON CONFLICT (tenant_id, day) DO UPDATE SET
+            collections = t.collections + EXCLUDED.collections
+    $sql$, changes);
+
+    RETURN NULL;
+END;
+$$;
+
+-- Recompute the rollups of p_tenants (NULL = every tenant) from the raw tables.
+-- The exclusive tenant locks wait for in-flight writers of those tenants and
+-- hold back new trigger deltas until the rebuild commits, so a write is either
+-- part of the rebuilt rows or applied on top of them, never both. A tenant that
+-- first appears after NULL is resolved is left to its own deltas.
+CREATE OR REPLACE FUNCTION public.rebuild_financial_rollups(p_tenants uuid[] DEFAULT NULL)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+    IF p_tenants IS NULL THEN
+        SELECT array_agg(DISTINCT tenant_id) INTO p_tenants FROM (
+            SELECT tenant_id FROM public.financial_revenue_daily
+            UNION ALL SELECT tenant_id FROM public.financial_ledger_daily
+            UNION ALL SELECT tenant_id FROM public.financial_ar_open
+        ) rolled_up;
+        IF to_regclass('public.invoices') IS NOT NULL THEN
+            SELECT array_agg(DISTINCT tenant_id) INTO p_tenants FROM (
+                SELECT unnest(p_tenants) UNION ALL SELECT tenant_id FROM public.invoices WHERE tenant_id IS NOT NULL
+            ) known(tenant_id);
+        END IF;
+        IF to_regclass('public.job_costs') IS NOT NULL THEN
+            SELECT array_agg(DISTINCT tenant_id) INTO p_tenants FROM (
+                SELECT unnest(p_tenants) UNION ALL SELECT tenant_id FROM public.job_costs WHERE tenant_id IS NOT NULL
+            ) known(tenant_id);
+        END IF;
+    END IF;
+
+    PERFORM public.lock_financial_rollup_tenants(p_tenants, true);
+
+    DELETE FROM public.financial_revenue_daily WHERE tenant_id = ANY(p_tenants);
+    DELETE FROM public.financial_ledger_daily WHERE tenant_id = ANY(p_tenants);
+    DELETE FROM public.financial_ar_open WHERE tenant_id = ANY(p_tenants);
+
+    IF to_regclass('public.invoices') IS NOT NULL AND to_regclass('public.jobs') IS NOT NULL THEN
+        INSERT INTO public.financial_revenue_daily
+            (tenant_id, day, category, invoice_count, amount_count, total_amount, paid_amount, unpaid_amount)
+        SELECT
+            i.tenant_id,
+            (i.created_at AT TIME ZONE 'UTC')::date,
+            COALESCE(j.job_type, 'Other'),
+            COUNT(*),
+            COUNT(i.total_amount),
+            COALESCE(SUM(i.total_amount), 0),
+            COALESCE(SUM(i.total_amount) FILTER (WHERE i.status = 'paid'), 0),
+            COALESCE(SUM(i.total_amount) FILTER (WHERE i.status <> 'paid'), 0)
+        FROM public.invoices i
+        LEFT JOIN public.jobs j ON j.id = i.job_id
+        WHERE i.tenant_id IS NOT NULL AND i.created_at IS NOT NULL AND i.status <> 'cancelled'
+          AND i.tenant_id = ANY(p_tenants)
+        GROUP BY 1, 2, 3;
+
+        INSERT INTO public.financial_ar_open (tenant_id, created_day, due_date, invoice_count, balance_cents)
+        SELECT
+            i.tenant_id,
+            COALESCE((i.created_at AT TIME ZONE 'UTC')::date, 'infinity'),
+            COALESCE(i.due_date, 'infinity'),
+            COUNT(*),
+            COALESCE(SUM(i.balance_cents), 0)
+        FROM public.invoices i
+        WHERE i.tenant_id IS NOT NULL AND i.status NOT IN ('paid', 'cancelled')
+          AND i.tenant_id = ANY(p_tenants)
+        GROUP BY 1, 2, 3;
+    END IF;
+
+    IF to_regclass('public.job_costs') IS NOT NULL THEN
+        INSERT INTO public.financial_ledger_daily
+            (tenant_id, day, expense_count, material_cost, labor_cost, other_costs, expense_total)
+        SELECT
+            c.tenant_id,
+            (c.created_at AT TIME ZONE 'UTC')::date,
+            COUNT(*),
+            COALESCE(SUM(c.material_cost), 0),
+            COALESCE(SUM(c.labor_cost), 0),
+            COALESCE(SUM(c.other_costs), 0),
+            COALESCE(SUM(c.material_cost + c.labor_cost + c.other_costs), 0)
+        FROM public.job_costs c
+        WHERE c.tenant_id IS NOT NULL AND c.created_at IS NOT NULL
+          AND c.tenant_id = ANY(p_tenants)
+        GROUP BY 1, 2;
+    END IF;
+
+    IF to_regclass('public.invoice_payments') IS NOT NULL AND to_regclass('public.invoices') IS NOT NULL THEN
+        INSERT INTO public.financial_ledger_daily AS t (tenant_id, day, collections)
+        SELECT i.tenant_id, p.payment_date, COALESCE(SUM(p.amount), 0)
+        FROM public.invoice_payments p
+        JOIN public.invoices i ON i.id = p.invoice_id
+        WHERE i.tenant_id IS NOT NULL AND p.payment_date IS NOT NULL
+          AND i.tenant_id = ANY(p_tenants)
+        GROUP BY 1, 2
+        ON CONFLICT (tenant_id, day) DO UPDATE SET collections = EXCLUDED.collections;
+    END IF;
+END;
+$$;
+
+DO $$
+DECLARE
+    source record;
+BEGIN
+    FOR source IN
+        SELECT * FROM (VALUES
+            ('invoices', 'apply_invoice_financial_rollups', 'jobs'),
+            ('job_costs', 'apply_job_cost_financial_rollups', 'job_costs'),
+            ('invoice_payments', 'apply_payment_financial_rollups', 'invoices')
+        ) AS v(source_table, function_name, depends_on)
+    LOOP
+        IF to_regclass('public.' || source.source_table) IS NULL
+           OR to_regclass('public.' || source.depends_on) IS NULL THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_financial_rollups_ins ON public.%I', source.source_table, source.source_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_financial_rollups_upd ON public.%I', source.source_table, source.source_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_financial_rollups_del ON public.%I', source.source_table, source.source_table);
+
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_financial_rollups_ins AFTER INSERT ON public.%I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.%I()',
+            source.source_table, source.source_table, source.function_name
+        );
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_financial_rollups_upd AFTER UPDATE ON public.%I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.%I()',
+            source.source_table, source.source_table, source.function_name
+        );
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_financial_rollups_del AFTER DELETE ON public.%I '
+            'REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.%I()',
+            source.source_table, source.source_table, source.function_name
+        );
+    END LOOP;
+END $$;
+
+-- Backfill: same statements as the nightly rebuild.
+SELECT public.rebuild_financial_rollups(NULL);
+
+-- Rollups are read and written by the backend only.
+DO $$
+DECLARE
+    rollup_table text;
+BEGIN
+    FOREACH rollup_table IN ARRAY ARRAY['financial_revenue_daily', 'financial_ledger_daily', 'financial_ar_open']
+    LOOP
+        IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+            EXECUTE format('REVOKE ALL ON public.%I FROM anon', rollup_table);
+        END IF;
+        IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+            EXECUTE format('REVOKE ALL ON public.%I FROM authenticated', rollup_table);
+        END IF;
+    END LOOP;
+END $$;
+
+COMMIT;
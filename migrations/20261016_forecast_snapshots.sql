@@ -0,0 +1,34 @@
+-- 20261016_forecast_snapshots.sql
+-- Purpose:
+-- 1) Per-tenant forecast snapshots written by services/forecasting.py: one row
+--    per (tenant, kind) where kind is revenue / demand / anomalies / churn.
+--    The batch refresher upserts every tenant in one statement; the
+--    predictive analytics endpoints read a single row.
+-- 2) Indexes behind the all-tenant series queries (paid invoices by month /
+--    day, jobs by week, overdue invoices per customer).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.forecast_snapshots (
+    tenant_id text NOT NULL,
+    kind varchar(32) NOT NULL,
+    payload jsonb NOT NULL,
+    computed_at timestamptz NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (tenant_id, kind)
+);
+
+CREATE INDEX IF NOT EXISTS idx_invoices_paid_tenant_created
+    ON public.invoices (tenant_id, created_at)
+    WHERE status = 'paid' OR payment_status = 'paid';
+
+CREATE INDEX IF NOT EXISTS idx_invoices_overdue_customer
+    ON public.invoices (customer_id, tenant_id)
+    WHERE status = 'overdue';
+
+CREATE INDEX IF NOT EXISTS idx_jobs_tenant_created
+    ON public.jobs (tenant_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_user_sessions_user_created
+    ON public.user_sessions (user_id, created_at);
+
+COMMIT;
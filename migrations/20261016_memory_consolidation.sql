@@ -0,0 +1,63 @@
+-- 20261016_memory_consolidation.sql
+-- Purpose:
+-- 1) unified_memory_lsh: per-memory SimHash band keys (bigint[], GIN indexed
+--    for `&&` bucket lookups) and packed signature, written by
+--    brainops_ai_os/memory_consolidation.py. Near-duplicate candidates come
+--    from shared buckets instead of the former all-pairs self-join.
+-- 2) unified_memory_consolidation_cursor: (created_at, id) keyset position of
+--    the last consolidated memory plus the hash family it was indexed under;
+--    a different family resets the index and cursor.
+--
+-- The (created_at, id) index over live memories for the paging query is built
+-- CONCURRENTLY by 20261016_memory_consolidation_index.sql.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.unified_memory_lsh (
+    memory_id uuid PRIMARY KEY,
+    band_keys bigint[] NOT NULL,
+    signature bytea NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_unified_memory_lsh_band_keys
+    ON public.unified_memory_lsh USING gin (band_keys);
+
+CREATE TABLE IF NOT EXISTS public.unified_memory_consolidation_cursor (
+    name text PRIMARY KEY,
+    params text NOT NULL,
+    last_created_at timestamptz,
+    last_id uuid,
+    updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+DO $$
+BEGIN
+    IF to_regclass('public.unified_ai_memory') IS NOT NULL THEN
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_constraint
+            WHERE conname = 'unified_memory_lsh_memory_id_fkey'
+              AND conrelid = 'public.unified_memory_lsh'::regclass
+        ) THEN
+            EXECUTE $sql$
+                ALTER TABLE public.unified_memory_lsh
+                    ADD CONSTRAINT unified_memory_lsh_memory_id_fkey
+                    FOREIGN KEY (memory_id) REFERENCES public.unified_ai_memory (id) ON DELETE CASCADE
+            $sql$;
+        END IF;
+    END IF;
+END $$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE ALL ON TABLE public.unified_memory_lsh FROM anon;
+        REVOKE ALL ON TABLE public.unified_memory_consolidation_cursor FROM anon;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+        REVOKE ALL ON TABLE public.unified_memory_lsh FROM authenticated;
+        REVOKE ALL ON TABLE public.unified_memory_consolidation_cursor FROM authenticated;
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,14 @@
+-- 20261016_memory_consolidation_index.sql
+-- Purpose:
+-- 1) (created_at, id) index over live unified_ai_memory rows for the
+--    consolidation paging query in brainops_ai_os/memory_consolidation.py.
+--
+-- Built CONCURRENTLY so writes to unified_ai_memory continue during the build.
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so this
+-- file has no BEGIN/COMMIT and must be applied on its own, after
+-- 20261016_memory_consolidation.sql. If a build is interrupted, drop the
+-- INVALID index left behind before re-running.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_unified_ai_memory_live_created_id
+    ON public.unified_ai_memory (created_at, id)
+    WHERE archived = false;
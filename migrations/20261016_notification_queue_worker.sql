@@ -0,0 +1,45 @@
+-- 20261016_notification_queue_worker.sql
+-- Purpose:
+-- 1) Visibility timeout for rows claimed by services/notification_queue.py
+--    (status 'sending' until locked_until; reclaimed once it passes).
+-- 2) Partial index for the claim and next-deadline queries.
+-- 3) NOTIFY notification_queue after inserts, so workers blocked on LISTEN
+--    pick up new rows immediately instead of on their next poll.
+-- 4) NotificationScheduler was never started, so rows queued before this
+--    migration were never sent. 'pending' rows due more than a day ago are
+--    marked 'cancelled' (one of the table's documented statuses) rather than
+--    delivered late when the worker is enabled.
+
+BEGIN;
+
+ALTER TABLE public.notification_queue
+    ADD COLUMN IF NOT EXISTS locked_until timestamptz;
+
+CREATE INDEX IF NOT EXISTS idx_notification_queue_claim
+    ON public.notification_queue (scheduled_for)
+    WHERE status IN ('pending', 'sending');
+
+CREATE OR REPLACE FUNCTION public.notify_notification_queue()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- One notification per statement; payload-free, workers claim what is due.
+    PERFORM pg_notify('notification_queue', '');
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_notification_queue_notify ON public.notification_queue;
+CREATE TRIGGER trg_notification_queue_notify
+    AFTER INSERT ON public.notification_queue
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION public.notify_notification_queue();
+
+UPDATE public.notification_queue
+SET status = 'cancelled',
+    error_message = 'Expired before the queue worker was enabled'
+WHERE status = 'pending'
+  AND scheduled_for < NOW() - interval '1 day';
+
+COMMIT;
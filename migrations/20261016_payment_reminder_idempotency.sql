@@ -0,0 +1,26 @@
+-- 20261016_payment_reminder_idempotency.sql
+-- Purpose:
+-- 1) Idempotency keys for reminders written by services/reminder_engine.py
+--    (<type>:<run date>:<invoice id>), unique per tenant, so repeating a bulk
+--    send on the same day does not remind the same invoice twice.
+-- 2) claimed_at and claim_token for the delivery claim (status 'sending'), so
+--    the scheduled sweep can reclaim reminders whose run died before recording
+--    a status, and a run only renews or finalises rows it still holds.
+
+BEGIN;
+
+ALTER TABLE public.payment_reminders
+    ADD COLUMN IF NOT EXISTS idempotency_key text,
+    ADD COLUMN IF NOT EXISTS claimed_at timestamptz,
+    ADD COLUMN IF NOT EXISTS claim_token uuid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_payment_reminders_idempotency_key
+    ON public.payment_reminders (tenant_id, idempotency_key)
+    WHERE idempotency_key IS NOT NULL;
+
+-- Due / stale-claim lookups for the sweep.
+CREATE INDEX IF NOT EXISTS idx_payment_reminders_due
+    ON public.payment_reminders (scheduled_time)
+    WHERE status IN ('scheduled', 'sending');
+
+COMMIT;
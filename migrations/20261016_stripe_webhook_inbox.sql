@@ -0,0 +1,71 @@
+-- 20261016_stripe_webhook_inbox.sql
+-- Purpose:
+-- 1) Turn webhook_events into the Stripe webhook inbox read by
+--    services/stripe_webhook_inbox.py: status / attempts / next_attempt_at /
+--    locked_until / last_error, plus ordering_key (Stripe customer) and the
+--    Stripe event timestamp for per-customer ordering.
+-- 2) webhook_event_attempts, previously created at request time by
+--    _ensure_webhook_attempts_table, and a status backfill for rows written
+--    before this migration (processed, or failed so a Stripe retry re-queues
+--    them).
+-- 3) Unique index on stripe_event_id (dedup for ON CONFLICT) if the table
+--    predates the UNIQUE constraint, and the claim / ordering indexes.
+
+BEGIN;
+
+ALTER TABLE public.webhook_events
+    ADD COLUMN IF NOT EXISTS status varchar(20),
+    ADD COLUMN IF NOT EXISTS attempts integer NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS next_attempt_at timestamptz,
+    ADD COLUMN IF NOT EXISTS locked_until timestamptz,
+    ADD COLUMN IF NOT EXISTS last_error text,
+    ADD COLUMN IF NOT EXISTS ordering_key varchar(255),
+    ADD COLUMN IF NOT EXISTS event_created_at timestamp;
+
+CREATE TABLE IF NOT EXISTS public.webhook_event_attempts (
+    id UUID PRIMARY KEY,
+    stripe_event_id VARCHAR(255) NOT NULL,
+    event_type VARCHAR(255) NOT NULL,
+    attempt_no INTEGER NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    error_message TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_webhook_event_attempts_lookup
+    ON public.webhook_event_attempts (stripe_event_id, created_at DESC);
+
+-- Backfill rows written by the inline handler: processed when processed_at is
+-- set or the last recorded attempt succeeded, otherwise failed so Stripe's
+-- next retry re-queues them through the inbox.
+UPDATE public.webhook_events w
+SET status = CASE
+        WHEN w.processed_at IS NOT NULL OR last_attempt.status = 'processed' THEN 'processed'
+        ELSE 'failed'
+    END,
+    processed_at = COALESCE(w.processed_at, CASE WHEN last_attempt.status = 'processed' THEN last_attempt.created_at END),
+    last_error = last_attempt.error_message
+FROM public.webhook_events e
+LEFT JOIN LATERAL (
+    SELECT a.status, a.error_message, a.created_at
+    FROM public.webhook_event_attempts a
+    WHERE a.stripe_event_id = e.stripe_event_id AND a.status <> 'duplicate'
+    ORDER BY a.created_at DESC
+    LIMIT 1
+) last_attempt ON TRUE
+WHERE w.id = e.id AND w.status IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_webhook_events_stripe_event_id
+    ON public.webhook_events (stripe_event_id);
+
+-- Claim scan: due / stale rows in Stripe event order.
+CREATE INDEX IF NOT EXISTS idx_webhook_events_inbox_due
+    ON public.webhook_events (event_created_at, created_at)
+    WHERE status IN ('pending', 'processing');
+
+-- Per-customer ordering check (earlier in-flight or backing-off events).
+CREATE INDEX IF NOT EXISTS idx_webhook_events_inbox_ordering
+    ON public.webhook_events (ordering_key, event_created_at)
+    WHERE status IN ('pending', 'processing');
+
+COMMIT;
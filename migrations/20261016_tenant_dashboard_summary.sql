@@ -0,0 +1,122 @@
+-- 20261016_tenant_dashboard_summary.sql
+-- Purpose:
+-- 1) Per-tenant dashboard summary rows read by services/tenant_summary.py
+-- 2) Statement-level triggers on the dashboard source tables that bump the
+--    tenant's summary version, so a stored summary is only reused while
+--    nothing it was computed from has changed.
+--
+-- Writers only touch the summary row on the first write after a reader armed
+-- it (version = armed_version); later writes see the row already stale and
+-- skip the UPDATE, so concurrent writes within a tenant do not queue on the
+-- summary row lock. Each writer holds a shared per-tenant advisory lock for
+-- the rest of its transaction; the reader arms the row, then takes that lock
+-- exclusively once (waiting out writers that checked the row before it was
+-- armed) and only then computes, so no write can be missed.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.tenant_dashboard_summary (
+    tenant_id text PRIMARY KEY,
+    summary jsonb,
+    computed_at timestamptz,
+    -- Bumped by the source-table triggers on the first write after arming.
+    version bigint NOT NULL DEFAULT 1,
+    -- Value of version when a reader last started a recompute.
+    armed_version bigint NOT NULL DEFAULT 0,
+    -- Value of version the stored summary was computed against.
+    source_version bigint NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION public.bump_tenant_dashboard_summary()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+    tenants text[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT tenant_id::text) INTO tenants
+        FROM new_rows WHERE tenant_id IS NOT NULL;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT tenant_id::text) INTO tenants
+        FROM old_rows WHERE tenant_id IS NOT NULL;
+    ELSE
+        SELECT array_agg(DISTINCT changed.tenant_id) INTO tenants
+        FROM (
+            SELECT tenant_id::text AS tenant_id FROM new_rows
+            UNION ALL
+            SELECT tenant_id::text FROM old_rows
+        ) changed
+        WHERE changed.tenant_id IS NOT NULL;
+    END IF;
+
+    IF tenants IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Shared with other writers; blocks only a reader's arming barrier.
+    PERFORM pg_advisory_xact_lock_shared(hashtext('tenant_dashboard_summary'), hashtext(tenant))
+    FROM unnest(tenants) AS tenant
+    ORDER BY tenant;
+
+    UPDATE public.tenant_dashboard_summary
+    SET version = version + 1
+    WHERE tenant_id = ANY(tenants)
+      AND version = armed_version;
+
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    source_table text;
+BEGIN
+    FOREACH source_table IN ARRAY ARRAY[
+        'customers', 'jobs', 'invoices', 'estimates', 'employees',
+        'equipment', 'inventory_items', 'leads', 'service_tickets'
+    ]
+    LOOP
+        IF to_regclass('public.' || source_table) IS NULL THEN
+            CONTINUE;
+        END IF;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_dashboard_summary_ins ON public.%I', source_table, source_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_dashboard_summary_upd ON public.%I', source_table, source_table);
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_%s_dashboard_summary_del ON public.%I', source_table, source_table);
+
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_dashboard_summary_ins AFTER INSERT ON public.%I '
+            'REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.bump_tenant_dashboard_summary()',
+            source_table, source_table
+        );
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_dashboard_summary_upd AFTER UPDATE ON public.%I '
+            'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.bump_tenant_dashboard_summary()',
+            source_table, source_table
+        );
+        EXECUTE format(
+            'CREATE TRIGGER trg_%s_dashboard_summary_del AFTER DELETE ON public.%I '
+            'REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION public.bump_tenant_dashboard_summary()',
+            source_table, source_table
+        );
+    END LOOP;
+END $$;
+
+-- Summaries are read and written by the backend only.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE ALL ON public.tenant_dashboard_summary FROM anon;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+        REVOKE ALL ON public.tenant_dashboard_summary FROM authenticated;
+    END IF;
+END $$;
+
+COMMIT;
@@ -0,0 +1,35 @@
+-- 20261016_unified_memory_ann.sql
+-- Purpose:
+-- 1) pgvector extension for the recall index, which is built CONCURRENTLY
+--    by 20261016_unified_memory_ann_index.sql (apply it after this file).
+-- 2) unified_memory_embedding_cache: API embeddings keyed by
+--    sha256(model || '\0' || text), shared across workers and restarts.
+--    Rows unused for UNIFIED_MEMORY_EMBEDDING_CACHE_TTL_DAYS are pruned by
+--    the hourly consolidation pass.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS public.unified_memory_embedding_cache (
+    content_hash text PRIMARY KEY,
+    model text NOT NULL,
+    embedding vector NOT NULL,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    last_used_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_unified_memory_embedding_cache_last_used
+    ON public.unified_memory_embedding_cache (last_used_at);
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+        REVOKE ALL ON TABLE public.unified_memory_embedding_cache FROM anon;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'authenticated') THEN
+        REVOKE ALL ON TABLE public.unified_memory_embedding_cache FROM authenticated;
+    END IF;
+END $$;
+
+COMMIT;
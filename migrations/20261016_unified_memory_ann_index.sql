@@ -0,0 +1,20 @@
+-- 20261016_unified_memory_ann_index.sql
+-- Purpose:
+-- 1) Partial HNSW index (cosine) over unified_ai_memory.embedding for live
+--    memories. UnifiedMemorySubstrate.recall and the batched automatic
+--    associations order by the bare `embedding <=> $1` distance under
+--    `archived = false`, which this index serves; hnsw.ef_search and
+--    hnsw.iterative_scan are set per transaction by the substrate.
+--
+-- Built CONCURRENTLY so writes to unified_ai_memory continue during the build
+-- (give the session a generous maintenance_work_mem on large tables).
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so this
+-- file has no BEGIN/COMMIT and must be applied on its own, after
+-- 20261016_unified_memory_ann.sql. If a build is interrupted, drop the
+-- INVALID index left behind before re-running.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_unified_ai_memory_embedding_hnsw
+    ON public.unified_ai_memory
+    USING hnsw (embedding vector_cosine_ops)
+    WITH (m = 16, ef_construction = 64)
+    WHERE archived = false;
@@ -16,7 +16,7 @@ from sentry_sdk.integrations.fastapi import FastApiIntegration
 from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
 import prometheus_client
 from prometheus_client import Counter, Histogram, Gauge, generate_latest
-import psutil
+from core.host_metrics import host_metrics
 import aiohttp
 from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
@@ -178,25 +178,19 @@ class MonitoringSystem:
         """Collect system resource metrics"""
         while True:
             try:
-                # CPU usage
-                cpu_percent = psutil.cpu_percent(interval=1)
-                SYSTEM_CPU.set(cpu_percent)
-                
-                # Memory usage
-                memory = psutil.virtual_memory()
-                SYSTEM_MEMORY.set(memory.percent)
-                
-                # Disk usage
-                disk = psutil.disk_usage('/')
-                SYSTEM_DISK.set(disk.percent)
+                # Latest sample from the shared host sampler (no blocking CPU window)
+                host = host_metrics()
+                SYSTEM_CPU.set(host.cpu_percent)
+                SYSTEM_MEMORY.set(host.memory_percent)
+                SYSTEM_DISK.set(host.disk_percent)
                 
                 # Log if resources are high
-                if cpu_percent > 80:
-                    logger.warning(f"High CPU usage: {cpu_percent}%")
-                if memory.percent > 90:
-                    logger.warning(f"High memory usage: {memory.percent}%")
-                if disk.percent > 85:
-                    logger.warning(f"High disk usage: {disk.percent}%")
+                if host.cpu_percent > 80:
+                    logger.warning(f"High CPU usage: {host.cpu_percent}%")
+                if host.memory_percent > 90:
+                    logger.warning(f"High memory usage: {host.memory_percent}%")
+                if host.disk_percent > 85:
+                    logger.warning(f"High disk usage: {host.disk_percent}%")
                     
             except Exception as e:
                 logger.error(f"Error collecting system metrics: {e}")
@@ -357,12 +351,13 @@ class MonitoringSystem:
             
     async def get_metrics_dashboard(self) -> Dict[str, Any]:
         """Get metrics for dashboard display"""
+        host = host_metrics()
         return {
             "health": asdict(await self.get_health_status()),
             "system": {
-                "cpu_percent": psutil.cpu_percent(),
-                "memory_percent": psutil.virtual_memory().percent,
-                "disk_percent": psutil.disk_usage('/').percent
+                "cpu_percent": host.cpu_percent,
+                "memory_percent": host.memory_percent,
+                "disk_percent": host.disk_percent
             },
             "business": {
                 "conversion_rate": CONVERSION_RATE._value.get() if CONVERSION_RATE._value else 0,
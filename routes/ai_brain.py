@@ -11,6 +11,7 @@ import asyncio
 import json
 
 from core.brain_store import build_brain_key, dispatch_brain_store, recall_context
+from core.host_metrics import host_metrics
 
 # Import the AI Brain Core
 try:
@@ -420,9 +421,9 @@ async def get_brain_metrics():
         cpu_usage = None
         memory_usage_mb = None
         try:
-            import psutil
-            cpu_usage = psutil.cpu_percent(interval=0.1)
-            memory_usage_mb = psutil.virtual_memory().used / (1024 * 1024)
+            host = host_metrics()
+            cpu_usage = host.cpu_percent
+            memory_usage_mb = host.memory_used / (1024 * 1024)
         except Exception:
             pass
 
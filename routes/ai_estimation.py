@@ -26,11 +26,12 @@ except ImportError:
     genai = None
     GEMINI_AVAILABLE = False
 
-from database import get_db, engine
+from database import engine
+from database.sync_sessions import SyncDBRoute, get_db, run_sync_db
 from core.supabase_auth import get_current_user
 from ai_services.real_ai_integration import ai_service, AIServiceNotConfiguredError, AIProviderCallError
 
-router = APIRouter(tags=["AI Estimation"])
+router = APIRouter(tags=["AI Estimation"], route_class=SyncDBRoute)
 
 # Configure Gemini for photo analysis
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
@@ -215,15 +216,15 @@ async def analyze_roof_photo(
             tenant_id=uuid.UUID(tenant_id) if tenant_id else None
         )
         db.add(new_analysis)
-        db.commit()
-        db.refresh(new_analysis)
+        await run_sync_db(db.commit)
+        await run_sync_db(db.refresh, new_analysis)
         
         analysis["analysis_id"] = str(new_analysis.id)
         
         return analysis
         
     except Exception as e:
-        db.rollback()
+        await run_sync_db(db.rollback)
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 @router.post("/generate-estimate", response_model=EstimateResponse)
@@ -333,7 +334,7 @@ async def generate_ai_estimate(
             tenant_id=uuid.UUID(str(tenant_id)) if tenant_id else None
         )
         db.add(new_estimate)
-        db.commit()
+        await run_sync_db(db.commit)
         
         return EstimateResponse(
             estimate_id=estimate_id,
@@ -354,7 +355,7 @@ async def generate_ai_estimate(
         )
         
     except Exception as e:
-        db.rollback()
+        await run_sync_db(db.rollback)
         if isinstance(e, HTTPException):
             raise
         if isinstance(e, AIServiceNotConfiguredError):
@@ -362,7 +363,7 @@ async def generate_ai_estimate(
         raise HTTPException(status_code=500, detail=f"Estimate generation failed: {str(e)}")
 
 @router.get("/estimate/{estimate_id}")
-async def get_estimate(
+def get_estimate(
     estimate_id: str,
     db: Session = Depends(get_db),
     current_user: Optional[dict] = Depends(get_current_user)
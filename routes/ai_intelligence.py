@@ -23,7 +23,7 @@ logger = logging.getLogger(__name__)
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db, run_sync_db
 from core.supabase_auth import get_authenticated_user
 
 # Import REAL AI service with fallback
@@ -43,7 +43,7 @@ except ImportError as e:
     AIServiceNotConfiguredError = Exception  # type: ignore
     AIProviderCallError = Exception  # type: ignore
 
-router = APIRouter(prefix="/api/v1/ai", tags=["AI Intelligence"])
+router = APIRouter(prefix="/api/v1/ai", tags=["AI Intelligence"], route_class=SyncDBRoute)
 APP_START_TIME = datetime.utcnow()
 
 # AI Models
@@ -238,7 +238,9 @@ async def predict_churn(
             """
         )
 
-        result = db.execute(query, {"tenant_id": tenant_id, "customer_id": customer_id}).first()
+        result = (
+            await run_sync_db(db.execute, query, {"tenant_id": tenant_id, "customer_id": customer_id})
+        ).first()
         if not result:
             raise HTTPException(status_code=404, detail="Customer not found")
 
@@ -300,7 +302,7 @@ async def generate_marketing_content(topic: str = "roofing", style: str = "profe
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/system-health")
-async def get_system_health(
+def get_system_health(
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user),
 ):
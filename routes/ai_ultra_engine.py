@@ -23,7 +23,7 @@ from sqlalchemy.orm import Session
 
 from core.supabase_auth import get_current_user
 from database import engine as db_engine
-from database import get_db as _get_db
+from database.sync_sessions import SyncDBRoute, get_db as _get_db, run_sync_db
 
 
 def get_db():
@@ -43,7 +43,7 @@ class JSONEncoder(json.JSONEncoder):
             return obj.isoformat()
         return super().default(obj)
 
-router = APIRouter(prefix="/api/v1/ai/ultra", tags=["Ultra AI Engine"])
+router = APIRouter(prefix="/api/v1/ai/ultra", tags=["Ultra AI Engine"], route_class=SyncDBRoute)
 logger = logging.getLogger(__name__)
 
 @router.post("/leads/analyze")
@@ -56,7 +56,7 @@ async def ultra_lead_analysis(
         # Get enhanced lead data from database if lead_id provided
         if 'lead_id' in lead_data:
             lead_id = lead_data['lead_id']
-            result = db.execute(text("""
+            result = await run_sync_db(db.execute, text("""
                 SELECT l.*, c.name as customer_name, c.email as customer_email
                 FROM leads l
                 LEFT JOIN customers c ON l.customer_id = c.id
@@ -81,7 +81,7 @@ async def ultra_lead_analysis(
             lead_score_num = None
 
         if 'lead_id' in lead_data and ai_result.confidence > 0.7 and lead_score_num is not None:
-            db.execute(text("""
+            await run_sync_db(db.execute, text("""
                 UPDATE leads 
                 SET lead_score = :score,
                     lead_grade = :grade,
@@ -97,7 +97,7 @@ async def ultra_lead_analysis(
                 "analysis": ai_result.analysis,
                 "lead_id": lead_data['lead_id']
             })
-            db.commit()
+            await run_sync_db(db.commit)
         
         return {
             "success": True,
@@ -134,7 +134,7 @@ async def ultra_revenue_optimization(
         business_metrics = {}
         
         # Get revenue data
-        revenue_result = db.execute(text("""
+        revenue_result = await run_sync_db(db.execute, text("""
             SELECT 
                 COUNT(DISTINCT c.id) as total_customers,
                 COALESCE(SUM(i.total_cents), 0) / 100.0 as total_revenue,
@@ -150,7 +150,7 @@ async def ultra_revenue_optimization(
             business_metrics.update(dict(revenue_data._mapping))
         
         # Get lead conversion data
-        lead_result = db.execute(text("""
+        lead_result = await run_sync_db(db.execute, text("""
             SELECT 
                 COUNT(*) as total_leads,
                 COUNT(CASE WHEN status = 'converted' THEN 1 END) as converted_leads,
@@ -265,7 +265,7 @@ async def ultra_predictive_analytics(
         historical_data = {}
         
         # Revenue trends (12 months)
-        revenue_trend = db.execute(text("""
+        revenue_trend = await run_sync_db(db.execute, text("""
             SELECT 
                 DATE_TRUNC('month', created_at) as month,
                 COUNT(DISTINCT customer_id) as customers,
@@ -291,7 +291,7 @@ async def ultra_predictive_analytics(
         historical_data['revenue_trends'] = revenue_trends
         
         # Lead conversion trends
-        lead_trend = db.execute(text("""
+        lead_trend = await run_sync_db(db.execute, text("""
             SELECT 
                 DATE_TRUNC('month', created_at) as month,
                 COUNT(*) as total_leads,
@@ -317,7 +317,7 @@ async def ultra_predictive_analytics(
         historical_data['lead_trends'] = lead_trends
         
         # Customer behavior patterns
-        customer_patterns = db.execute(text("""
+        customer_patterns = await run_sync_db(db.execute, text("""
             SELECT 
                 c.id,
                 c.created_at as customer_since,
@@ -431,7 +431,7 @@ async def ultra_workflow_automation(
             lead_id = workflow_data.get("lead_id")
             if lead_id:
                 # 1. Analyze lead with AI
-                lead_result = db.execute(text("SELECT * FROM leads WHERE id = :id"), {"id": lead_id})
+                lead_result = await run_sync_db(db.execute, text("SELECT * FROM leads WHERE id = :id"), {"id": lead_id})
                 lead = lead_result.fetchone()
                 
                 if lead:
@@ -441,7 +441,7 @@ async def ultra_workflow_automation(
                     # 2. Auto-convert high-scoring leads
                     if ai_analysis.metadata.get("lead_score", 0) >= 80:
                         # Create customer record
-                        customer_result = db.execute(text("""
+                        customer_result = await run_sync_db(db.execute, text("""
                             INSERT INTO customers (name, email, phone, created_at)
                             VALUES (:name, :email, :phone, NOW())
                             RETURNING id
@@ -454,13 +454,13 @@ async def ultra_workflow_automation(
                         customer_id = customer_result.fetchone()[0]
                         
                         # Update lead status
-                        db.execute(text("""
+                        await run_sync_db(db.execute, text("""
                             UPDATE leads 
                             SET status = 'converted', customer_id = :customer_id, updated_at = NOW()
                             WHERE id = :lead_id
                         """), {"customer_id": customer_id, "lead_id": lead_id})
                         
-                        db.commit()
+                        await run_sync_db(db.commit)
                         
                         automation_results.append({
                             "action": "auto_conversion",
@@ -474,7 +474,7 @@ async def ultra_workflow_automation(
             # Automated revenue optimization workflow
             
             # 1. Identify underperforming customers
-            underperformers = db.execute(text("""
+            underperformers = await run_sync_db(db.execute, text("""
                 SELECT c.id, c.name, c.email,
                        COUNT(i.id) as invoice_count,
                        COALESCE(SUM(i.total_cents), 0) / 100.0 as total_spent,
@@ -9,12 +9,12 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_authenticated_user
 import uuid
 import json
 
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 
 # Models
 class AssetBase(BaseModel):
@@ -15,7 +15,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from core.supabase_auth import get_authenticated_user
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db, run_sync_db
 from ai_services.real_ai_integration import (
     ai_service,
     AIServiceNotConfiguredError,
@@ -24,7 +24,7 @@ from ai_services.real_ai_integration import (
 from routes.ai_brain import get_ai_brain
 
 
-router = APIRouter(prefix="/api/v1/aurea", tags=["AUREA"])
+router = APIRouter(prefix="/api/v1/aurea", tags=["AUREA"], route_class=SyncDBRoute)
 
 
 class AureaChatRequest(BaseModel):
@@ -203,7 +203,7 @@ async def aurea_executive_status(db: Session = Depends(get_db)):
 
     memory_total = None
     try:
-        row = db.execute(text("SELECT COUNT(*) FROM memory_entries")).first()
+        row = (await run_sync_db(db.execute, text("SELECT COUNT(*) FROM memory_entries"))).first()
         if row:
             memory_total = int(row[0])
     except Exception:
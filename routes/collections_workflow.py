@@ -13,11 +13,10 @@ from pydantic import BaseModel, Field, EmailStr
 from enum import Enum
 import json
 import uuid
-import asyncpg
 import os
 import logging
 from decimal import Decimal
-from database import DATABASE_URL as RESOLVED_DATABASE_URL
+from database import DATABASE_URL as RESOLVED_DATABASE_URL, get_pool
 from core.supabase_auth import get_authenticated_user
 
 logger = logging.getLogger(__name__)
@@ -146,10 +145,11 @@ class DisputeResolution(BaseModel):
 # ==================== Database Functions ====================
 
 async def get_db_connection():
-    """Get database connection"""
+    """Borrow a connection from the shared pool; ``conn.close()`` returns it."""
     if not DATABASE_URL:
         raise HTTPException(status_code=503, detail="Database connection not available")
-    return await asyncpg.connect(DATABASE_URL)
+    pool = await get_pool()
+    return await pool.lease()
 
 # ==================== Collection Cases ====================
 
@@ -18,7 +18,7 @@ import asyncio
 import os
 import logging
 from decimal import Decimal
-from database import DATABASE_URL as RESOLVED_DATABASE_URL
+from database import DATABASE_URL as RESOLVED_DATABASE_URL, get_pool
 from core.supabase_auth import get_authenticated_user
 from services.notifications import send_email_message
 
@@ -128,10 +128,11 @@ class CreditAdjustment(BaseModel):
 # ==================== Database Functions ====================
 
 async def get_db_connection():
-    """Get database connection"""
+    """Borrow a connection from the shared pool; ``conn.close()`` returns it."""
     if not DATABASE_URL:
         raise HTTPException(status_code=503, detail="Database connection not available")
-    return await asyncpg.connect(DATABASE_URL)
+    pool = await get_pool()
+    return await pool.lease()
 
 # ==================== Credit Limits ====================
 
@@ -10,19 +10,19 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, date, timedelta
 import logging
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from services.audit_service import log_data_access
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/customers/{customer_id}", tags=["Customer Details"])
+router = APIRouter(prefix="/api/v1/customers/{customer_id}", tags=["Customer Details"], route_class=SyncDBRoute)
 
 # ============================================================================
 # CUSTOMER DETAILS
 # ============================================================================
 
 @router.get("/summary")
-async def get_customer_summary(
+def get_customer_summary(
     customer_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -91,7 +91,7 @@ async def get_customer_summary(
         raise HTTPException(status_code=500, detail="Failed to fetch customer summary")
 
 @router.get("/jobs")
-async def get_customer_jobs(
+def get_customer_jobs(
     customer_id: str,
     status: Optional[str] = None,
     limit: int = Query(50, ge=1, le=500),
@@ -152,7 +152,7 @@ async def get_customer_jobs(
         raise HTTPException(status_code=500, detail="Failed to fetch customer jobs")
 
 @router.get("/invoices")
-async def get_customer_invoices(
+def get_customer_invoices(
     customer_id: str,
     status: Optional[str] = None,
     limit: int = Query(50, ge=1, le=500),
@@ -212,7 +212,7 @@ async def get_customer_invoices(
         raise HTTPException(status_code=500, detail="Failed to fetch customer invoices")
 
 @router.get("/timeline")
-async def get_customer_timeline(
+def get_customer_timeline(
     customer_id: str,
     days: int = Query(90, ge=1, le=365),
     current_user: dict = Depends(get_current_user),
@@ -283,7 +283,7 @@ async def get_customer_timeline(
         raise HTTPException(status_code=500, detail="Failed to fetch customer timeline")
 
 @router.get("/analytics")
-async def get_customer_analytics(
+def get_customer_analytics(
     customer_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -359,7 +359,7 @@ async def get_customer_analytics(
         raise HTTPException(status_code=500, detail="Failed to fetch customer analytics")
 
 @router.get("/communications")
-async def get_customer_communications(
+def get_customer_communications(
     customer_id: str,
     limit: int = Query(50, ge=1, le=500),
     current_user: dict = Depends(get_current_user),
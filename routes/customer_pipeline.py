@@ -18,11 +18,12 @@ from sqlalchemy import Column, String, Integer, Boolean, JSON, DateTime, Foreign
 from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 
-from database import get_db, engine
+from database import engine
+from database.sync_sessions import SyncDBRoute, get_db, run_sync_db
 from core.supabase_auth import get_current_user
 from services.notifications import send_email_message
 
-router = APIRouter(tags=["Customer Pipeline"])
+router = APIRouter(tags=["Customer Pipeline"], route_class=SyncDBRoute)
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
 SENDGRID_FROM_EMAIL = os.getenv("SENDGRID_FROM_EMAIL", "")
@@ -392,12 +393,12 @@ async def get_lead_analytics(
         cutoff = datetime.utcnow() - timedelta(days=30)
         
         # Lead funnel
-        total_leads = db.query(Lead).filter(Lead.created_at >= cutoff, Lead.tenant_id == tenant_uuid).count()
-        hot_leads = db.query(Lead).filter(Lead.created_at >= cutoff, Lead.segment == 'hot', Lead.tenant_id == tenant_uuid).count()
-        warm_leads = db.query(Lead).filter(Lead.created_at >= cutoff, Lead.segment == 'warm', Lead.tenant_id == tenant_uuid).count()
-        cold_leads = db.query(Lead).filter(Lead.created_at >= cutoff, Lead.segment == 'cold', Lead.tenant_id == tenant_uuid).count()
-        converted = db.query(Lead).filter(Lead.created_at >= cutoff, Lead.converted == True, Lead.tenant_id == tenant_uuid).count()
-        avg_score_val = db.query(text("AVG(score)")).filter(Lead.created_at >= cutoff, Lead.tenant_id == tenant_uuid).scalar()
+        total_leads = await run_sync_db(db.query(Lead).filter(Lead.created_at >= cutoff, Lead.tenant_id == tenant_uuid).count)
+        hot_leads = await run_sync_db(db.query(Lead).filter(Lead.created_at >= cutoff, Lead.segment == 'hot', Lead.tenant_id == tenant_uuid).count)
+        warm_leads = await run_sync_db(db.query(Lead).filter(Lead.created_at >= cutoff, Lead.segment == 'warm', Lead.tenant_id == tenant_uuid).count)
+        cold_leads = await run_sync_db(db.query(Lead).filter(Lead.created_at >= cutoff, Lead.segment == 'cold', Lead.tenant_id == tenant_uuid).count)
+        converted = await run_sync_db(db.query(Lead).filter(Lead.created_at >= cutoff, Lead.converted == True, Lead.tenant_id == tenant_uuid).count)
+        avg_score_val = await run_sync_db(db.query(text("AVG(score)")).filter(Lead.created_at >= cutoff, Lead.tenant_id == tenant_uuid).scalar)
 
         funnel = {
             "total_leads": total_leads,
@@ -409,7 +410,7 @@ async def get_lead_analytics(
         }
 
         # Source performance (Simplified)
-        sources_res = db.execute(text("""
+        sources_res = (await run_sync_db(db.execute, text("""
             SELECT 
                 source,
                 COUNT(*) as leads,
@@ -419,12 +420,12 @@ async def get_lead_analytics(
             WHERE created_at >= :cutoff AND tenant_id = :tenant_id
             GROUP BY source
             ORDER BY conversions DESC
-        """), {"cutoff": cutoff, "tenant_id": tenant_uuid}).fetchall()
+        """), {"cutoff": cutoff, "tenant_id": tenant_uuid})).fetchall()
         
         sources = [dict(s._mapping) for s in sources_res]
         
         # Conversion rate by urgency
-        urgency_res = db.execute(text("""
+        urgency_res = (await run_sync_db(db.execute, text("""
             SELECT 
                 urgency,
                 COUNT(*) as total,
@@ -432,7 +433,7 @@ async def get_lead_analytics(
             FROM leads
             WHERE created_at >= :cutoff AND tenant_id = :tenant_id
             GROUP BY urgency
-        """), {"cutoff": cutoff, "tenant_id": tenant_uuid}).fetchall()
+        """), {"cutoff": cutoff, "tenant_id": tenant_uuid})).fetchall()
         
         urgency_conversion = []
         for u in urgency_res:
@@ -479,21 +480,21 @@ async def identify_upsell_opportunity(
         tenant_id = current_user.get("tenant_id")
         
         # Get customer data
-        customer = db.execute(text("""
+        customer = (await run_sync_db(db.execute, text("""
             SELECT * FROM customers
             WHERE id = :customer_id AND tenant_id = :tenant_id
-        """), {"customer_id": customer_id, "tenant_id": tenant_id}).fetchone()
+        """), {"customer_id": customer_id, "tenant_id": tenant_id})).fetchone()
         
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         
         # Analyze purchase history (Mocking table 'orders' if not exists, assuming generic)
         try:
-             purchases = db.execute(text("""
+             purchases = (await run_sync_db(db.execute, text("""
                 SELECT * FROM orders
                 WHERE customer_id = :customer_id
                 ORDER BY created_at DESC
-            """), {"customer_id": customer_id}).fetchall()
+            """), {"customer_id": customer_id})).fetchall()
         except Exception as e:
             logger.warning(f"Could not fetch purchases for customer {customer_id}: {e}")
             purchases = []
@@ -11,12 +11,13 @@ from datetime import datetime, date, timedelta
 import logging
 from enum import Enum
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
+from services import customer_search
 from services.audit_service import log_data_access
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/customers/search", tags=["Customer Search"])
+router = APIRouter(prefix="/api/v1/customers/search", tags=["Customer Search"], route_class=SyncDBRoute)
 
 # ============================================================================
 # ENUMS AND MODELS
@@ -64,12 +65,14 @@ class SortOrder(str, Enum):
 # ============================================================================
 
 @router.post("/advanced")
-async def advanced_search(
+def advanced_search(
     filters: List[Dict[str, Any]],
     sort_by: str = Query("created_at"),
     sort_order: SortOrder = Query(SortOrder.DESC),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    exact_count: bool = Query(False),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -82,21 +85,11 @@ async def advanced_search(
         {"field": "total_revenue", "operator": "gt", "value": 10000},
         {"field": "state", "operator": "in", "value": ["CA", "NY"]}
     ]
+
+    Pass the returned next_cursor as cursor to continue with keyset
+    pagination; total is a planner estimate unless exact_count is set.
     """
     try:
-        # Build base query with aggregates
-        base_query = """
-            SELECT 
-                c.*,
-                COUNT(DISTINCT j.id) as job_count,
-                COALESCE(SUM(j.total_amount), 0) as total_revenue,
-                COUNT(DISTINCT i.id) as invoice_count,
-                MAX(j.created_at) as last_job_date
-            FROM customers c
-            LEFT JOIN jobs j ON c.id = j.customer_id
-            LEFT JOIN invoices i ON c.id = i.customer_id
-        """
-
         # Build WHERE conditions
         conditions = []
         params = {}
@@ -112,59 +105,88 @@ async def advanced_search(
             condition = _build_condition(field, operator, value, param_name)
             if condition:
                 conditions.append(condition)
-                if value is not None and operator not in ["is_null", "is_not_null"]:
+                if isinstance(value, list) and operator in ["in", "not_in", "between"]:
+                    params.update({f"{param_name}_{i}": item for i, item in enumerate(value)})
+                elif value is not None and operator not in ["is_null", "is_not_null"]:
                     params[param_name] = value
 
+        descending = sort_order == SortOrder.DESC
+        sort_key, sort_expr = customer_search.sort_expression(sort_by)
+        uses_aggregates = sort_key in customer_search.AGGREGATE_SORTS or any(
+            item.get("field") in _AGGREGATE_FIELDS for item in filters
+        )
         where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
-
-        # Add GROUP BY and ORDER BY
-        query = base_query + where_clause + " GROUP BY c.id "
-
-        # Whitelist allowed sort columns to prevent SQL injection
-        allowed_sort_columns = {"name": "c.name", "email": "c.email", "created_at": "c.created_at", "updated_at": "c.updated_at", "total_revenue": "total_revenue", "job_count": "job_count"}
-        safe_sort_by = allowed_sort_columns.get(sort_by, "c.created_at")
-        safe_sort_order = "DESC" if sort_order.value.upper() == "DESC" else "ASC"
-        query += f" ORDER BY {safe_sort_by} {safe_sort_order} "
-        query += " LIMIT :limit OFFSET :offset"
-
-        params["limit"] = per_page
-        params["offset"] = (page - 1) * per_page
+        filter_from = "FROM customers c " + (customer_search.AGGREGATES_LATERAL if uses_aggregates else "") + where_clause
+        filter_params = dict(params)
+
+        keyset = customer_search.Params(customer_search.STYLE_NAMED)
+        page_conditions = list(conditions)
+        offset = None
+        if cursor:
+            cursor_value, cursor_id = customer_search.decode_cursor(cursor, sort_key, descending)
+            page_conditions.append(
+                customer_search.keyset_condition(sort_expr, descending, cursor_value, cursor_id, keyset)
+            )
+            limit_clause = f"LIMIT {keyset.add(per_page + 1)}"
+        else:
+            offset = (page - 1) * per_page
+            limit_clause = f"LIMIT {keyset.add(per_page + 1)} OFFSET {keyset.add(offset)}"
+
+        # Aggregates come from a LATERAL row per customer, so aggregate
+        # filters work in WHERE and there is no jobs x invoices fan-out.
+        query = f"""
+            SELECT
+                c.*,
+                agg.job_count,
+                agg.total_revenue,
+                agg.invoice_count,
+                agg.last_job_date
+            FROM customers c
+            {customer_search.AGGREGATES_LATERAL}
+            {" WHERE " + " AND ".join(page_conditions) if page_conditions else ""}
+            {customer_search.order_clause(sort_expr, descending)}
+            {limit_clause}
+        """
 
         # Execute main query
-        result = db.execute(text(query), params)
+        result = db.execute(text(query), {**params, **keyset.values})
+        rows = [dict(row._mapping) for row in result]
+        page_rows, next_cursor = customer_search.split_page(rows, per_page, sort_key, descending)
         customers = []
-        for row in result:
-            customer = dict(row._mapping)
+        for customer in page_rows:
             customer["id"] = str(customer["id"])
             customers.append(customer)
 
         # Get total count
-        count_query = f"""
-            SELECT COUNT(DISTINCT c.id)
-            FROM customers c
-            LEFT JOIN jobs j ON c.id = j.customer_id
-            {where_clause}
-        """
-        count_params = {k: v for k, v in params.items() if k not in ["limit", "offset"]}
-        total = db.execute(text(count_query), count_params).scalar()
+        estimate = exact = None
+        if exact_count:
+            exact = db.execute(text(customer_search.count_sql(filter_from)), filter_params).scalar()
+        elif cursor or len(rows) > per_page:
+            plan = db.execute(text(customer_search.estimate_sql(filter_from)), filter_params).scalar()
+            estimate = customer_search.parse_plan_rows(plan)
+        total, total_is_estimate = customer_search.resolve_total(estimate, exact, offset, len(rows), per_page)
 
         log_data_access(db, current_user["id"], "customers", "advanced_search", len(customers))
 
         return {
             "customers": customers,
             "total": total,
+            "total_is_estimate": total_is_estimate,
             "page": page,
             "per_page": per_page,
             "pages": (total + per_page - 1) // per_page if per_page > 0 else 0,
+            "next_cursor": next_cursor,
             "filters_applied": len(filters)
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Advanced search failed: {e}")
         raise HTTPException(status_code=500, detail="Search failed")
 
 @router.get("/quick")
-async def quick_search(
+def quick_search(
     q: str = Query(..., min_length=2),
     fields: Optional[List[SearchField]] = Query(None),
     limit: int = Query(20, ge=1, le=100),
@@ -238,7 +260,7 @@ async def quick_search(
         raise HTTPException(status_code=500, detail="Search failed")
 
 @router.get("/facets")
-async def get_search_facets(
+def get_search_facets(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -375,7 +397,7 @@ async def get_search_facets(
         raise HTTPException(status_code=500, detail="Failed to generate facets")
 
 @router.get("/saved")
-async def get_saved_searches(
+def get_saved_searches(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -407,7 +429,7 @@ async def get_saved_searches(
         raise HTTPException(status_code=500, detail="Failed to fetch saved searches")
 
 @router.post("/save")
-async def save_search(
+def save_search(
     name: str,
     filters: List[Dict[str, Any]],
     current_user: dict = Depends(get_current_user),
@@ -445,7 +467,7 @@ async def save_search(
         raise HTTPException(status_code=500, detail="Failed to save search")
 
 @router.get("/suggestions")
-async def get_search_suggestions(
+def get_search_suggestions(
     q: str = Query(..., min_length=1),
     field: SearchField = Query(SearchField.NAME),
     limit: int = Query(10, ge=1, le=50),
@@ -499,6 +521,9 @@ async def get_search_suggestions(
 # HELPER FUNCTIONS
 # ============================================================================
 
+# Filter fields that read from the per-customer aggregates LATERAL row
+_AGGREGATE_FIELDS = {"total_revenue", "job_count"}
+
 def _build_condition(field: str, operator: str, value: Any, param_name: str) -> str:
     """
     Build SQL condition based on field, operator, and value
@@ -516,8 +541,8 @@ def _build_condition(field: str, operator: str, value: Any, param_name: str) ->
         "status": "c.status",
         "created_at": "c.created_at",
         "updated_at": "c.updated_at",
-        "total_revenue": "COALESCE(SUM(j.total_amount), 0)",
-        "job_count": "COUNT(DISTINCT j.id)"
+        "total_revenue": "agg.total_revenue",
+        "job_count": "agg.job_count"
     }
 
     column = field_map.get(field, f"c.{field}")
@@ -559,6 +584,6 @@ def _build_condition(field: str, operator: str, value: Any, param_name: str) ->
     elif operator == "is_null":
         return f"{column} IS NULL"
     elif operator == "is_not_null":
-        return f"{column} IS NOT NULL RETURNING *"
+        return f"{column} IS NOT NULL"
 
     return None
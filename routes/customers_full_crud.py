@@ -21,6 +21,7 @@ from psycopg2 import sql
 
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from database import get_db
+from services import customer_search
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1/customers", tags=["Customers - Complete"])
@@ -140,6 +141,8 @@ class CustomerListResponse(BaseModel):
     page: int
     per_page: int
     total_pages: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
 
 class CustomerMergeRequest(BaseModel):
     primary_customer_id: UUID
@@ -411,6 +414,8 @@ async def delete_customer(
 async def list_customers(
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page; overrides page"),
+    exact_count: bool = Query(False, description="Count matches exactly instead of using the planner estimate"),
     search: Optional[str] = None,
     status: Optional[CustomerStatus] = None,
     city: Optional[str] = None,
@@ -424,130 +429,96 @@ async def list_customers(
     current_user=Depends(get_current_user)
 ):
     """
-    List customers with advanced filtering and pagination
+    List customers with advanced filtering and keyset pagination.
+    Pass next_cursor back as cursor for the following page; page/OFFSET is
+    still accepted for existing clients.
     """
     try:
-        cursor = db.cursor()
+        descending = sort_order.lower() == "desc"
+        sort_key, sort_expr = customer_search.sort_expression(sort_by)
+        params = customer_search.Params(customer_search.STYLE_PYFORMAT)
 
         # Build WHERE clause
-        where_conditions = [sql.SQL("1=1")]
-        params = []
-
-        if search:
-            where_conditions.append(sql.SQL("""
-                (LOWER(c.name) LIKE LOWER(%s) OR
-                 LOWER(c.email) LIKE LOWER(%s) OR
-                 LOWER(c.company) LIKE LOWER(%s) OR
-                 c.phone LIKE %s)
-            """))
-            search_pattern = f"%{search}%"
-            params.extend([search_pattern] * 4)
+        where_conditions = ["TRUE"]
+        if search and search.strip():
+            where_conditions.append(customer_search.search_condition(search, params))
 
         if status:
-            where_conditions.append(sql.SQL("c.status = %s"))
-            params.append(status.value)
+            where_conditions.append(f"c.status = {params.add(status.value)}")
 
         if city:
-            where_conditions.append(sql.SQL("LOWER(c.city) = LOWER(%s)"))
-            params.append(city)
+            where_conditions.append(f"LOWER(c.city) = LOWER({params.add(city)})")
 
         if state:
-            where_conditions.append(sql.SQL("UPPER(c.state) = UPPER(%s)"))
-            params.append(state)
+            where_conditions.append(f"UPPER(c.state) = UPPER({params.add(state)})")
 
-        where_clause = sql.SQL(" AND ").join(where_conditions)
+        if tags:
+            where_conditions.append(customer_search.tags_condition(tags, params))
 
-        # Build HAVING clause for aggregates
-        having_conditions = []
         if min_spent is not None:
-            having_conditions.append(sql.SQL("COALESCE(SUM(i.amount), 0) >= %s"))
-            params.append(min_spent)
+            where_conditions.append(f"agg.total_spent >= {params.add(min_spent)}")
         if max_spent is not None:
-            having_conditions.append(sql.SQL("COALESCE(SUM(i.amount), 0) <= %s"))
-            params.append(max_spent)
-
-        having_clause = sql.SQL(" AND ").join(having_conditions) if having_conditions else sql.SQL("1=1")
+            where_conditions.append(f"agg.total_spent <= {params.add(max_spent)}")
 
-        # Get total count
-        count_query = sql.SQL("""
-            SELECT COUNT(DISTINCT c.id) as total
-            FROM customers c
-            LEFT JOIN invoices i ON i.customer_id = c.id AND i.status = 'paid'
-            WHERE {where_clause}
-            GROUP BY c.id
-            HAVING {having_clause}
-        """).format(
-            where_clause=where_clause,
-            having_clause=having_clause,
+        needs_aggregates = min_spent is not None or max_spent is not None or sort_key in customer_search.AGGREGATE_SORTS
+        filter_from = "FROM customers c {aggregates} WHERE {where}".format(
+            aggregates=customer_search.AGGREGATES_LATERAL if needs_aggregates else "",
+            where=" AND ".join(where_conditions),
         )
-        cursor.execute(count_query, params)
-        total = len(cursor.fetchall())
-
-        # Get paginated results
-        offset = (page - 1) * per_page
-
-        # Sort mapping
-        sort_mapping = {
-            "name": "c.name",
-            "email": "c.email",
-            "created_at": "c.created_at",
-            "updated_at": "c.updated_at",
-            "total_spent": "total_spent",
-            "job_count": "job_count"
-        }
-
-        # Ensure safe sort column and order to prevent SQL injection
-        safe_sort_column = sort_mapping.get(sort_by, 'c.created_at')
-        safe_sort_order = "DESC" if sort_order.upper() == "DESC" else "ASC"
-
-        if "." in safe_sort_column:
-            alias, column = safe_sort_column.split(".", 1)
-            sort_sql = sql.SQL("{}.{}").format(sql.Identifier(alias), sql.Identifier(column))
+        filter_params = params.values
+
+        offset = None
+        page_conditions = list(where_conditions)
+        if cursor:
+            cursor_value, cursor_id = customer_search.decode_cursor(cursor, sort_key, descending)
+            page_conditions.append(
+                customer_search.keyset_condition(sort_expr, descending, cursor_value, cursor_id, params)
+            )
+            limit_clause = f"LIMIT {params.add(per_page + 1)}"
         else:
-            sort_sql = sql.Identifier(safe_sort_column)
+            offset = (page - 1) * per_page
+            limit_clause = f"LIMIT {params.add(per_page + 1)} OFFSET {params.add(offset)}"
 
-        list_query = sql.SQL("""
+        list_query = f"""
             SELECT c.*,
-                   COALESCE(SUM(i.amount), 0) as total_spent,
-                   COUNT(DISTINCT j.id) as job_count,
-                   MAX(GREATEST(j.updated_at, i.updated_at)) as last_interaction,
-                   COUNT(DISTINCT ch.version) as history_count
+                   agg.total_spent,
+                   agg.job_count,
+                   agg.last_interaction,
+                   hist.history_count,
+                   tg.tags AS tag_list
             FROM customers c
-            LEFT JOIN jobs j ON j.customer_id = c.id
-            LEFT JOIN invoices i ON i.customer_id = c.id AND i.status = 'paid'
-            LEFT JOIN customer_history ch ON ch.customer_id = c.id
-            WHERE {where_clause}
-            GROUP BY c.id
-            HAVING {having_clause}
-            ORDER BY {sort_column} {sort_order}
-            LIMIT %s OFFSET %s
-        """).format(
-            where_clause=where_clause,
-            having_clause=having_clause,
-            sort_column=sort_sql,
-            sort_order=sql.SQL(safe_sort_order),
-        )
-        params.extend([per_page, offset])
-
-        cursor.execute(list_query, params)
-        customers = cursor.fetchall()
+            {customer_search.AGGREGATES_LATERAL}
+            {customer_search.TAGS_LATERAL}
+            CROSS JOIN LATERAL (
+                SELECT COUNT(DISTINCT ch.version) AS history_count
+                FROM customer_history ch
+                WHERE ch.customer_id = c.id
+            ) hist
+            WHERE {" AND ".join(page_conditions)}
+            {customer_search.order_clause(sort_expr, descending)}
+            {limit_clause}
+        """
+
+        db_cursor = db.cursor()
+        db_cursor.execute(list_query, params.values)
+        rows = db_cursor.fetchall()
+        customers, next_cursor = customer_search.split_page(rows, per_page, sort_key, descending)
+
+        estimate = exact = None
+        if exact_count:
+            db_cursor.execute(customer_search.count_sql(filter_from), filter_params)
+            exact = db_cursor.fetchone()["count"]
+        elif cursor or len(rows) > per_page:
+            db_cursor.execute(customer_search.estimate_sql(filter_from), filter_params)
+            estimate = customer_search.parse_plan_rows(db_cursor.fetchone()["QUERY PLAN"])
+        total, total_is_estimate = customer_search.resolve_total(estimate, exact, offset, len(rows), per_page)
 
-        # Enrich with tags for each customer
         customer_responses = []
         for customer in customers:
-            cursor.execute("SELECT tag FROM customer_tags WHERE customer_id = %s", (customer['id'],))
-            customer_tags = [row['tag'] for row in cursor.fetchall()]
-
-            # Filter by tags if specified
-            if tags and not any(tag in customer_tags for tag in tags):
-                continue
-
-            customer_responses.append(CustomerResponse(
-                **customer,
-                contacts=[],
-                tags=customer_tags,
-                custom_fields={}
-            ))
+            record = dict(customer)
+            customer_tags = list(record.pop("tag_list") or [])
+            record.update(contacts=[], tags=customer_tags, custom_fields={})
+            customer_responses.append(CustomerResponse(**record))
 
         total_pages = (total + per_page - 1) // per_page
 
@@ -556,9 +527,13 @@ async def list_customers(
             total=total,
             page=page,
             per_page=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+            total_is_estimate=total_is_estimate,
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing customers: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
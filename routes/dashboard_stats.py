@@ -13,6 +13,7 @@ import asyncpg
 
 from core.brain_store import build_brain_key, dispatch_brain_store, recall_context
 from core.supabase_auth import get_authenticated_user
+from services.tenant_summary import get_tenant_summary
 
 logger = logging.getLogger(__name__)
 
@@ -92,181 +93,49 @@ async def get_dashboard_stats(
         raise HTTPException(status_code=503, detail="Database connection not available")
 
     try:
-        async with pool.acquire() as conn:
-            customers = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (
-                        WHERE created_at >= date_trunc('month', NOW())
-                    ) AS new_this_month
-                FROM customers
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
+        # One combined aggregate query, shared by concurrent requests and
+        # reused from tenant_dashboard_summary while the source tables are unchanged.
+        summary = await get_tenant_summary(pool, str(resolved_tenant))
 
-            jobs = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (
-                        WHERE status IN ('in_progress', 'scheduled')
-                    ) AS active,
-                    COUNT(*) FILTER (
-                        WHERE status = 'completed'
-                    ) AS completed
-                FROM jobs
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            invoices = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (
-                        WHERE COALESCE(LOWER(payment_status), '') <> 'paid'
-                    ) AS pending,
-                    COUNT(*) FILTER (
-                        WHERE COALESCE(LOWER(payment_status), '') <> 'paid'
-                          AND due_date IS NOT NULL
-                          AND due_date < NOW()
-                    ) AS overdue,
-                    COALESCE(SUM(
-                        CASE
-                            WHEN LOWER(payment_status) = 'paid'
-                                THEN COALESCE(total_amount, amount, 0)
-                            ELSE 0
-                        END
-                    ), 0) AS total_revenue,
-                    COALESCE(SUM(
-                        CASE
-                            WHEN COALESCE(LOWER(payment_status), '') <> 'paid'
-                                THEN COALESCE(total_amount, amount, 0)
-                            ELSE 0
-                        END
-                    ), 0) AS pending_amount
-                FROM invoices
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            estimates = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (WHERE status = 'pending') AS pending
-                FROM estimates
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            employees = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (
-                        WHERE employment_status = 'active'
-                    ) AS active
-                FROM employees
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            equipment = await conn.fetchrow(
-                """
-                SELECT COUNT(*) AS total
-                FROM equipment
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            inventory = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total_items,
-                    COALESCE(SUM(
-                        COALESCE(cost, unit_price, 0)::numeric
-                        * COALESCE(quantity, 0)::numeric
-                    ), 0) AS total_value
-                FROM inventory_items
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            leads = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) AS total,
-                    COUNT(*) FILTER (
-                        WHERE COALESCE(status, 'active') <> 'lost'
-                    ) AS active,
-                    COUNT(*) FILTER (WHERE source = 'estimate') AS estimates,
-                    COUNT(*) FILTER (WHERE source = 'service_ticket') AS service_tickets
-                FROM leads
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-            service_tickets = await conn.fetchrow(
-                """
-                SELECT
-                    COUNT(*) FILTER (
-                        WHERE COALESCE(stage, '') NOT IN ('completed', 'cancelled', 'void')
-                    ) AS open_requests
-                FROM service_tickets
-                WHERE tenant_id = $1
-                """,
-                resolved_tenant,
-            )
-
-        total_equipment = equipment["total"] or 0
-        active_employees = employees["active"] or 0
+        total_equipment = summary["equipment_total"]
+        active_employees = summary["employees_active"]
         utilization = (
             round(min(active_employees, total_equipment) / total_equipment * 100)
             if total_equipment
             else 0
         )
 
-        total_revenue = _to_float(invoices["total_revenue"])
+        total_revenue = _to_float(summary["revenue_total"])
         formatted_revenue = f"${total_revenue:,.0f}"
 
         stats = {
             "revenue": {
                 "total": total_revenue,
-                "pending": _to_float(invoices["pending_amount"]),
-                "overdue": invoices["overdue"] or 0,
+                "pending": _to_float(summary["revenue_pending"]),
+                "overdue": summary["invoices_overdue"],
                 "formatted": formatted_revenue,
             },
             "customers": {
-                "total": customers["total"] or 0,
-                "new_this_month": customers["new_this_month"] or 0,
+                "total": summary["customers_total"],
+                "new_this_month": summary["customers_new_this_month"],
             },
             "jobs": {
-                "total": jobs["total"] or 0,
-                "active": jobs["active"] or 0,
-                "completed": jobs["completed"] or 0,
+                "total": summary["jobs_total"],
+                "active": summary["jobs_active"],
+                "completed": summary["jobs_completed"],
             },
             "invoices": {
-                "total": invoices["total"] or 0,
-                "pending": invoices["pending"] or 0,
-                "overdue": invoices["overdue"] or 0,
-                "pending_amount": _to_float(invoices["pending_amount"]),
+                "total": summary["invoices_total"],
+                "pending": summary["invoices_unpaid"],
+                "overdue": summary["invoices_overdue"],
+                "pending_amount": _to_float(summary["revenue_pending"]),
             },
             "estimates": {
-                "total": estimates["total"] or 0,
-                "pending": estimates["pending"] or 0,
+                "total": summary["estimates_total"],
+                "pending": summary["estimates_pending"],
             },
             "employees": {
-                "total": employees["total"] or 0,
+                "total": summary["employees_total"],
                 "active": active_employees,
             },
             "equipment": {
@@ -274,15 +143,15 @@ async def get_dashboard_stats(
                 "utilization": utilization,
             },
             "inventory": {
-                "total_items": inventory["total_items"] or 0,
-                "total_value": _to_float(inventory["total_value"]),
+                "total_items": summary["inventory_total_items"],
+                "total_value": _to_float(summary["inventory_total_value"]),
             },
             "leads": {
-                "total": leads["total"] or 0,
-                "active": leads["active"] or 0,
-                "estimates": leads["estimates"] or 0,
-                "service_tickets": leads["service_tickets"] or 0,
-                "open_service_requests": service_tickets["open_requests"] or 0,
+                "total": summary["leads_total"],
+                "active": summary["leads_active"],
+                "estimates": summary["leads_estimates"],
+                "service_tickets": summary["leads_service_tickets"],
+                "open_service_requests": summary["service_tickets_open"],
             },
         }
 
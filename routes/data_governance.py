@@ -12,10 +12,11 @@ from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
-from database import get_db, engine
+from database import engine
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user
 
-router = APIRouter() # Prefix is likely handled by route loader, but can be explicit if needed. Loader usually uses file name or internal prefix. The file had router = APIRouter().
+router = APIRouter(route_class=SyncDBRoute) # Prefix is likely handled by route loader, but can be explicit if needed. Loader usually uses file name or internal prefix. The file had router = APIRouter().
 
 # Local Base for internal models
 Base = declarative_base()
@@ -110,7 +111,7 @@ class DataQualityRuleResponse(DataQualityRuleBase):
 # ============================================================================
 
 @router.post("/policies", response_model=DataPolicyResponse, status_code=status.HTTP_201_CREATED)
-async def create_data_policy(
+def create_data_policy(
     policy: DataPolicyCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -133,7 +134,7 @@ async def create_data_policy(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/policies", response_model=List[DataPolicyResponse])
-async def list_data_policies(
+def list_data_policies(
     skip: int = 0,
     limit: int = 100,
     policy_type: Optional[str] = None,
@@ -155,7 +156,7 @@ async def list_data_policies(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/policies/{policy_id}", response_model=DataPolicyResponse)
-async def get_data_policy(
+def get_data_policy(
     policy_id: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -168,7 +169,7 @@ async def get_data_policy(
     return policy
 
 @router.put("/policies/{policy_id}", response_model=DataPolicyResponse)
-async def update_data_policy(
+def update_data_policy(
     policy_id: uuid.UUID,
     policy_update: DataPolicyUpdate,
     db: Session = Depends(get_db),
@@ -192,7 +193,7 @@ async def update_data_policy(
     return policy
 
 @router.delete("/policies/{policy_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_data_policy(
+def delete_data_policy(
     policy_id: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -211,7 +212,7 @@ async def delete_data_policy(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/quality/rules", response_model=DataQualityRuleResponse, status_code=status.HTTP_201_CREATED)
-async def define_quality_rule(
+def define_quality_rule(
     rule: DataQualityRuleCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -232,7 +233,7 @@ async def define_quality_rule(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/quality/rules", response_model=List[DataQualityRuleResponse])
-async def list_quality_rules(
+def list_quality_rules(
     skip: int = 0,
     limit: int = 100,
     table: Optional[str] = None,
@@ -11,7 +11,7 @@ from pydantic import BaseModel, EmailStr, Field
 
 from core.request_safety import parse_uuid, require_tenant_id, sanitize_payload, sanitize_text
 from core.supabase_auth import get_authenticated_user
-from services.email_engine import email_engine
+from services.email_engine import MAX_BATCH_RECIPIENTS, email_engine
 import re
 
 router = APIRouter()
@@ -65,6 +65,16 @@ class TemplateSendRequest(BaseModel):
     context: Optional[Dict[str, Any]] = None
 
 
+class BatchRecipient(BaseModel):
+    recipient_email: EmailStr
+    context: Optional[Dict[str, Any]] = None
+
+
+class TemplateBatchSendRequest(BaseModel):
+    template_name: str = Field(..., min_length=1, max_length=255)
+    recipients: List[BatchRecipient] = Field(..., min_length=1, max_length=MAX_BATCH_RECIPIENTS)
+
+
 class BounceEventRequest(BaseModel):
     recipient_email: EmailStr
     reason: Optional[str] = Field(default=None, max_length=1000)
@@ -282,6 +292,25 @@ async def queue_templated_email(
     )
 
 
+@router.post("/send-batch")
+async def queue_templated_email_batch(
+    payload: TemplateBatchSendRequest,
+    conn: asyncpg.Connection = Depends(get_db),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user),
+):
+    tenant_id = require_tenant_id(current_user)
+    return await email_engine.queue_send_many(
+        conn,
+        tenant_id=tenant_id,
+        template_name=payload.template_name,
+        recipients=[
+            {"recipient_email": str(item.recipient_email), "context": item.context}
+            for item in payload.recipients
+        ],
+        provider="resend",
+    )
+
+
 @router.post("/events/bounce")
 async def record_bounce(
     payload: BounceEventRequest,
@@ -16,6 +16,8 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from core.supabase_auth import get_authenticated_user
+from services import customer_search
+from services.tenant_summary import get_tenant_summary
 
 # NOTE: STORE import removed 2025-12-18 - fake data fallback is dangerous
 # System should fail with 503 error, not return fake/mock data that misleads users
@@ -41,9 +43,11 @@ async def get_erp_customers(
     limit: int = Query(100, ge=1, le=1000),
     status: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    exact_count: bool = Query(False),
     current_user: Dict[str, Any] = Depends(get_authenticated_user),
 ):
-    """Get ERP customers (tenant-scoped)."""
+    """Get ERP customers (tenant-scoped, keyset-paginated via ``cursor``)."""
     tenant_id = current_user.get("tenant_id")
     if not tenant_id:
         raise HTTPException(status_code=403, detail="Tenant assignment required")
@@ -52,41 +56,57 @@ async def get_erp_customers(
     if not db_pool:
         raise HTTPException(status_code=503, detail="Database connection not available")
 
-    try:
-        query_parts = ["SELECT id, name, email, phone, company, status, created_at, updated_at FROM customers WHERE tenant_id = $1"]
-        count_parts = ["SELECT COUNT(*) FROM customers WHERE tenant_id = $1"]
-        params: list = [tenant_id]
-        count_params: list = [tenant_id]
-        idx = 2
-
-        if status:
-            query_parts.append(f"AND status = ${idx}")
-            count_parts.append(f"AND status = ${idx}")
-            params.append(status)
-            count_params.append(status)
-            idx += 1
-
-        if search:
-            query_parts.append(f"AND (LOWER(name) LIKE LOWER(${idx}) OR LOWER(email) LIKE LOWER(${idx}) OR LOWER(company) LIKE LOWER(${idx}))")
-            count_parts.append(f"AND (LOWER(name) LIKE LOWER(${idx}) OR LOWER(email) LIKE LOWER(${idx}) OR LOWER(company) LIKE LOWER(${idx}))")
-            params.append(f"%{search}%")
-            count_params.append(f"%{search}%")
-            idx += 1
-
-        query_parts.append(f"ORDER BY created_at DESC LIMIT ${idx} OFFSET ${idx + 1}")
-        params.extend([limit, skip])
+    params = customer_search.Params(customer_search.STYLE_NUMERIC)
+    conditions = [f"c.tenant_id = {params.add(tenant_id)}"]
+    if status:
+        conditions.append(f"c.status = {params.add(status)}")
+    if search and search.strip():
+        conditions.append(customer_search.search_condition(search, params))
+    filter_from = "FROM customers c WHERE " + " AND ".join(conditions)
+    filter_params = params.values
+
+    _, sort_expr = customer_search.sort_expression("created_at")
+    offset: Optional[int] = None
+    if cursor:
+        cursor_value, cursor_id = customer_search.decode_cursor(cursor, "created_at", True)
+        conditions.append(customer_search.keyset_condition(sort_expr, True, cursor_value, cursor_id, params))
+        limit_clause = f"LIMIT {params.add(limit + 1)}"
+    else:
+        offset = skip
+        limit_clause = f"LIMIT {params.add(limit + 1)} OFFSET {params.add(skip)}"
+
+    query = (
+        "SELECT c.id, c.name, c.email, c.phone, c.company, c.status, c.created_at, c.updated_at "
+        f"FROM customers c WHERE {' AND '.join(conditions)} "
+        f"{customer_search.order_clause(sort_expr, True)} {limit_clause}"
+    )
 
+    try:
         async with db_pool.acquire() as conn:
-            rows = await conn.fetch(" ".join(query_parts), *params)
-            total = await conn.fetchval(" ".join(count_parts), *count_params)
-
-        customers = [dict(row) for row in rows]
+            rows = [dict(row) for row in await conn.fetch(query, *params.values)]
+            estimate = exact = None
+            if exact_count:
+                exact = await conn.fetchval(customer_search.count_sql(filter_from), *filter_params)
+            elif cursor or len(rows) > limit:
+                plan = await conn.fetchval(customer_search.estimate_sql(filter_from), *filter_params)
+                estimate = customer_search.parse_plan_rows(plan)
+
+        customers, next_cursor = customer_search.split_page(rows, limit, "created_at", True)
+        total, total_is_estimate = customer_search.resolve_total(estimate, exact, offset, len(rows), limit)
         for c in customers:
             c["id"] = str(c["id"])
             for k in ("created_at", "updated_at"):
                 c[k] = _iso(c.get(k))
 
-        return {"customers": customers, "total": total or 0, "skip": skip, "limit": limit, "status": "operational"}
+        return {
+            "customers": customers,
+            "total": total,
+            "total_is_estimate": total_is_estimate,
+            "skip": skip,
+            "limit": limit,
+            "next_cursor": next_cursor,
+            "status": "operational",
+        }
     except Exception as exc:
         logger.error("ERP customers query failed: %s", exc)
         raise HTTPException(status_code=503, detail="Database temporarily unavailable") from exc
@@ -261,27 +281,18 @@ async def get_erp_dashboard(
         logger.error("ERP dashboard: db_pool not available - returning 503")
         raise HTTPException(status_code=503, detail="Database connection not available")
 
-    query = """
-        SELECT
-            (SELECT COUNT(*) FROM jobs WHERE tenant_id = $1) AS total_jobs,
-            (SELECT COUNT(*) FROM estimates WHERE tenant_id = $1) AS total_estimates,
-            (SELECT COUNT(*) FROM invoices WHERE tenant_id = $1) AS total_invoices,
-            (SELECT COUNT(*) FROM customers WHERE tenant_id = $1) AS total_customers,
-            (SELECT COUNT(*) FROM jobs WHERE tenant_id = $1 AND status IN ('in_progress', 'scheduled')) AS active_jobs,
-            (SELECT COUNT(*) FROM invoices WHERE tenant_id = $1 AND status IN ('pending', 'overdue')) AS pending_invoices,
-            (SELECT COALESCE(SUM(CASE WHEN created_at >= date_trunc('month', CURRENT_DATE) THEN total_amount ELSE 0 END), 0)
-             FROM invoices WHERE tenant_id = $1 AND status = 'paid') AS revenue_mtd,
-            (SELECT COALESCE(SUM(CASE WHEN created_at >= date_trunc('year', CURRENT_DATE) THEN total_amount ELSE 0 END), 0)
-             FROM invoices WHERE tenant_id = $1 AND status = 'paid') AS revenue_ytd
-    """
-
     try:
-        async with db_pool.acquire() as conn:
-            row = await conn.fetchrow(query, tenant_id)
-        metrics = dict(row) if row else {}
-        for key in ("revenue_mtd", "revenue_ytd"):
-            if metrics.get(key) is not None:
-                metrics[key] = float(metrics[key])
+        summary = await get_tenant_summary(db_pool, str(tenant_id))
+        metrics = {
+            "total_jobs": summary["jobs_total"],
+            "total_estimates": summary["estimates_total"],
+            "total_invoices": summary["invoices_total"],
+            "total_customers": summary["customers_total"],
+            "active_jobs": summary["jobs_active"],
+            "pending_invoices": summary["invoices_pending_status"],
+            "revenue_mtd": summary["revenue_mtd"],
+            "revenue_ytd": summary["revenue_ytd"],
+        }
         return {"metrics": metrics, "status": "operational"}
     except Exception as exc:
         logger.error("ERP dashboard query failed: %s", exc)
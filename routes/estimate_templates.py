@@ -10,11 +10,11 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from uuid import uuid4
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from pydantic import BaseModel, Field
 
-router = APIRouter(prefix="/templates")
+router = APIRouter(prefix="/templates", route_class=SyncDBRoute)
 
 # ============================================================================
 # TEMPLATE MODELS
@@ -69,7 +69,7 @@ class TemplateResponse(BaseModel):
 # ============================================================================
 
 @router.post("/", response_model=TemplateResponse)
-async def create_template(
+def create_template(
     template: TemplateCreate,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -199,7 +199,7 @@ async def create_template(
         )
 
 @router.get("/", response_model=Dict[str, Any])
-async def list_templates(
+def list_templates(
     category: Optional[str] = None,
     is_active: Optional[bool] = True,
     search: Optional[str] = None,
@@ -305,7 +305,7 @@ async def list_templates(
         )
 
 @router.get("/{template_id}", response_model=Dict[str, Any])
-async def get_template_details(
+def get_template_details(
     template_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -426,7 +426,7 @@ async def get_template_details(
         )
 
 @router.put("/{template_id}", response_model=dict)
-async def update_template(
+def update_template(
     template_id: str,
     update: TemplateUpdate,
     current_user: dict = Depends(get_current_user),
@@ -492,7 +492,7 @@ async def update_template(
         )
 
 @router.post("/{template_id}/items", response_model=dict)
-async def add_template_item(
+def add_template_item(
     template_id: str,
     item: TemplateItem,
     current_user: dict = Depends(get_current_user),
@@ -561,7 +561,7 @@ async def add_template_item(
         )
 
 @router.put("/{template_id}/items/{item_id}", response_model=dict)
-async def update_template_item(
+def update_template_item(
     template_id: str,
     item_id: str,
     update: TemplateItemUpdate,
@@ -647,7 +647,7 @@ async def update_template_item(
         )
 
 @router.delete("/{template_id}/items/{item_id}", response_model=dict)
-async def delete_template_item(
+def delete_template_item(
     template_id: str,
     item_id: str,
     current_user: dict = Depends(get_current_user),
@@ -690,7 +690,7 @@ async def delete_template_item(
         )
 
 @router.post("/{template_id}/create-estimate", response_model=dict)
-async def create_estimate_from_template(
+def create_estimate_from_template(
     template_id: str,
     customer_id: str,
     title: Optional[str] = None,
@@ -818,7 +818,7 @@ async def create_estimate_from_template(
         )
 
 @router.get("/categories/list", response_model=List[Dict[str, Any]])
-async def list_template_categories(
+def list_template_categories(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> List[dict]:
@@ -3,12 +3,12 @@ Financial Reporting System
 Task 39: Comprehensive financial reporting and analytics
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from typing import Optional, List, Dict, Any
 from datetime import datetime, date, timedelta
 from pydantic import BaseModel, Field, ConfigDict
 from enum import Enum
-import uuid
 import asyncpg
 import logging
 from decimal import Decimal
@@ -19,6 +19,8 @@ from dateutil.relativedelta import relativedelta
 
 from database import get_db_connection
 from core.supabase_auth import get_authenticated_user
+from services import report_export
+from services.financial_rollups import get_financial_rollups
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +54,10 @@ class ReportFormat(str, Enum):
     EXCEL = "excel"
     HTML = "html"
 
+class ExportFileFormat(str, Enum):
+    CSV = "csv"
+    XLSX = "xlsx"
+
 class ComparisonType(str, Enum):
     PERIOD_OVER_PERIOD = "period_over_period"
     YEAR_OVER_YEAR = "year_over_year"
@@ -196,131 +202,25 @@ async def calculate_period_dates(period: ReportPeriod, base_date: date) -> tuple
     else:
         return base_date, base_date
 
-async def get_revenue_data(conn, start_date: date, end_date: date, tenant_id: str = None) -> Dict[str, Any]:
+async def get_revenue_data(conn, start_date: date, end_date: date, tenant_id: str) -> Dict[str, Any]:
     """Get revenue data for period"""
-    if tenant_id:
-        result = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as transaction_count,
-                SUM(total_amount) as total_revenue,
-                SUM(CASE WHEN status = 'paid' THEN total_amount ELSE 0 END) as collected_revenue,
-                SUM(CASE WHEN status != 'paid' THEN total_amount ELSE 0 END) as pending_revenue,
-                AVG(total_amount) as avg_transaction_value
-            FROM invoices
-            WHERE created_at >= $1 AND created_at <= $2
-                AND status != 'cancelled'
-                AND tenant_id = $3
-        """, datetime.combine(start_date, datetime.min.time()),
-            datetime.combine(end_date, datetime.max.time()),
-            uuid.UUID(tenant_id))
-
-        # Get revenue by category
-        categories = await conn.fetch("""
-            SELECT
-                COALESCE(j.job_type, 'Other') as category,
-                COUNT(i.id) as count,
-                SUM(i.total_amount) as amount
-            FROM invoices i
-            LEFT JOIN jobs j ON i.job_id = j.id
-            WHERE i.created_at >= $1 AND i.created_at <= $2
-                AND i.status != 'cancelled'
-                AND i.tenant_id = $3
-            GROUP BY j.job_type
-        """, datetime.combine(start_date, datetime.min.time()),
-            datetime.combine(end_date, datetime.max.time()),
-            uuid.UUID(tenant_id))
-    else:
-        result = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as transaction_count,
-                SUM(total_amount) as total_revenue,
-                SUM(CASE WHEN status = 'paid' THEN total_amount ELSE 0 END) as collected_revenue,
-                SUM(CASE WHEN status != 'paid' THEN total_amount ELSE 0 END) as pending_revenue,
-                AVG(total_amount) as avg_transaction_value
-            FROM invoices
-            WHERE created_at >= $1 AND created_at <= $2
-                AND status != 'cancelled'
-        """, datetime.combine(start_date, datetime.min.time()),
-            datetime.combine(end_date, datetime.max.time()))
-
-        # Get revenue by category
-        categories = await conn.fetch("""
-            SELECT
-                COALESCE(j.job_type, 'Other') as category,
-                COUNT(i.id) as count,
-                SUM(i.total_amount) as amount
-            FROM invoices i
-            LEFT JOIN jobs j ON i.job_id = j.id
-            WHERE i.created_at >= $1 AND i.created_at <= $2
-                AND i.status != 'cancelled'
-            GROUP BY j.job_type
-        """, datetime.combine(start_date, datetime.min.time()),
-            datetime.combine(end_date, datetime.max.time()))
-
-    return {
-        "total": float(result["total_revenue"]) if result["total_revenue"] else 0,
-        "collected": float(result["collected_revenue"]) if result["collected_revenue"] else 0,
-        "pending": float(result["pending_revenue"]) if result["pending_revenue"] else 0,
-        "transaction_count": result["transaction_count"] or 0,
-        "avg_value": float(result["avg_transaction_value"]) if result["avg_transaction_value"] else 0,
-        "by_category": [
-            {
-                "category": cat["category"],
-                "count": cat["count"],
-                "amount": float(cat["amount"]) if cat["amount"] else 0
-            }
-            for cat in categories
-        ]
-    }
-
-async def get_expense_data(conn, start_date: date, end_date: date, tenant_id: str = None) -> Dict[str, Any]:
-    """Get expense data for period"""
-    # Get job costs as expenses
-    if tenant_id:
-        result = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as expense_count,
-                SUM(material_cost + labor_cost + other_costs) as total_expenses,
-                SUM(material_cost) as material_expenses,
-                SUM(labor_cost) as labor_expenses,
-                SUM(other_costs) as other_expenses
-            FROM job_costs
-            WHERE created_at >= $1 AND created_at <= $2 AND tenant_id = $3
-        """, datetime.combine(start_date, datetime.min.time()),
-            datetime.combine(end_date, datetime.max.time()),
-            uuid.UUID(tenant_id))
-    else:
-        result = await conn.fetchrow("""
-            SELECT
-                COUNT(*) as expense_count,
-                SUM(material_cost + labor_cost + other_costs) as total_expenses,
-                SUM(material_cost) as material_expenses,
-                SUM(labor_cost) as labor_expenses,
-                SUM(other_costs) as other_expenses
-            FROM job_costs
-            WHERE created_at >= $1 AND created_at <= $2
-        """, datetime.combine(start_date, datetime.min.time()),
-            datetime.combine(end_date, datetime.max.time()))
+    return await get_financial_rollups().revenue(conn, tenant_id, start_date, end_date)
 
-    return {
-        "total": float(result["total_expenses"]) if result["total_expenses"] else 0,
-        "materials": float(result["material_expenses"]) if result["material_expenses"] else 0,
-        "labor": float(result["labor_expenses"]) if result["labor_expenses"] else 0,
-        "other": float(result["other_expenses"]) if result["other_expenses"] else 0,
-        "count": result["expense_count"] or 0
-    }
+async def get_expense_data(conn, start_date: date, end_date: date, tenant_id: str) -> Dict[str, Any]:
+    """Get expense data for period (job costs)"""
+    return await get_financial_rollups().expenses(conn, tenant_id, start_date, end_date)
 
-async def calculate_kpis(conn, start_date: date, end_date: date) -> KPIMetrics:
+async def calculate_kpis(conn, start_date: date, end_date: date, *, tenant_id: str) -> KPIMetrics:
     """Calculate key performance indicators"""
     # Get current period data
-    current_revenue = await get_revenue_data(conn, start_date, end_date)
-    current_expenses = await get_expense_data(conn, start_date, end_date)
+    current_revenue = await get_revenue_data(conn, start_date, end_date, tenant_id)
+    current_expenses = await get_expense_data(conn, start_date, end_date, tenant_id)
 
     # Get previous period for comparison
     period_days = (end_date - start_date).days
     prev_end = start_date - timedelta(days=1)
     prev_start = prev_end - timedelta(days=period_days)
-    prev_revenue = await get_revenue_data(conn, prev_start, prev_end)
+    prev_revenue = await get_revenue_data(conn, prev_start, prev_end, tenant_id)
 
     # Calculate metrics
     revenue_growth = ((current_revenue["total"] - prev_revenue["total"]) / prev_revenue["total"] * 100) if prev_revenue["total"] > 0 else 0
@@ -331,13 +231,7 @@ async def calculate_kpis(conn, start_date: date, end_date: date) -> KPIMetrics:
     net_margin = operating_margin  # Simplified, would include taxes
 
     # Get AR/AP data
-    ar_data = await conn.fetchrow("""
-        SELECT
-            SUM(balance_cents) / 100.0 as total_ar,
-            AVG(CURRENT_DATE - due_date) as avg_days_outstanding
-        FROM invoices
-        WHERE status NOT IN ('paid', 'cancelled')
-    """)
+    ar_data = await get_financial_rollups().ar_outstanding(conn, tenant_id)
 
     return KPIMetrics(
         revenue_growth_rate=round(revenue_growth, 2),
@@ -351,7 +245,7 @@ async def calculate_kpis(conn, start_date: date, end_date: date) -> KPIMetrics:
         current_ratio=0,  # Would need current assets/liabilities
         quick_ratio=0,  # Would need liquid assets
         debt_to_equity=0,  # Would need debt/equity data
-        days_sales_outstanding=float(ar_data["avg_days_outstanding"]) if ar_data["avg_days_outstanding"] else 0,
+        days_sales_outstanding=ar_data["avg_days_outstanding"],
         inventory_turnover=0,  # Would need inventory data
         employee_productivity=0  # Would need employee data
     )
@@ -390,10 +284,11 @@ async def generate_report(
 
         # Format output
         if request.format == ReportFormat.CSV:
-            csv_content = convert_to_csv(report_data)
-            response.headers["Content-Type"] = "text/csv"
-            response.headers["Content-Disposition"] = f"attachment; filename={request.report_type}_{request.start_date}.csv"
-            return Response(content=csv_content, media_type="text/csv")
+            return StreamingResponse(
+                iter_report_csv(report_data),
+                media_type="text/csv",
+                headers={"Content-Disposition": f"attachment; filename={request.report_type}_{request.start_date}.csv"},
+            )
         else:
             return report_data
 
@@ -433,11 +328,7 @@ async def get_financial_summary(
         ebitda = net_profit  # Simplified
 
         # Get AR/AP
-        ar_result = await conn.fetchrow("""
-            SELECT SUM(balance_cents) / 100.0 as total_ar
-            FROM invoices
-            WHERE status NOT IN ('paid', 'cancelled') AND tenant_id = $1
-        """, uuid.UUID(tenant_id))
+        ar_result = await get_financial_rollups().ar_outstanding(conn, tenant_id)
 
         return FinancialSummary(
             period=f"{start_date} to {end_date}",
@@ -449,7 +340,7 @@ async def get_financial_summary(
             net_margin=round(net_margin, 2),
             ebitda=ebitda,
             cash_flow=revenue_data["collected"] - expenses,
-            accounts_receivable=float(ar_result["total_ar"]) if ar_result["total_ar"] else 0,
+            accounts_receivable=ar_result["total_ar"],
             accounts_payable=0  # Would need AP data
         )
 
@@ -644,9 +535,9 @@ async def get_financial_trends(
         raise HTTPException(status_code=403, detail="Tenant assignment required")
 
     try:
-        trends = []
         current_date = datetime.now().date()
 
+        bounds = []
         for i in range(periods):
             if period_type == ReportPeriod.MONTHLY:
                 period_date = current_date - relativedelta(months=i)
@@ -657,18 +548,19 @@ async def get_financial_trends(
             else:
                 period_date = current_date - timedelta(days=i*7)
 
-            start_date, end_date = await calculate_period_dates(period_type, period_date)
-
-            revenue_data = await get_revenue_data(conn, start_date, end_date, tenant_id)
-            expense_data = await get_expense_data(conn, start_date, end_date, tenant_id)
+            bounds.append(await calculate_period_dates(period_type, period_date))
 
-            trends.append({
+        totals = await get_financial_rollups().trends(conn, tenant_id, bounds)
+        trends = [
+            {
                 "period": f"{start_date}",
-                "revenue": revenue_data["total"],
-                "expenses": expense_data["total"],
-                "profit": revenue_data["total"] - expense_data["total"],
-                "transactions": revenue_data["transaction_count"]
-            })
+                "revenue": total["revenue"],
+                "expenses": total["expenses"],
+                "profit": total["revenue"] - total["expenses"],
+                "transactions": total["transactions"]
+            }
+            for (start_date, _), total in zip(bounds, totals)
+        ]
 
         return {
             "period_type": period_type,
@@ -732,11 +624,86 @@ async def get_scheduled_reports(
         logger.error(f"Error fetching scheduled reports: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/reports/export/{dataset}")
+async def export_report_rows(
+    dataset: str,
+    request: Request,
+    start_date: date,
+    end_date: Optional[date] = None,
+    format: ExportFileFormat = Query(ExportFileFormat.CSV),
+    background: Optional[bool] = Query(None, description="Force (true) or forbid (false) a background export job; default decides by size"),
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
+    """Export raw financial rows (invoices, payments, job_costs, transactions) as CSV or XLSX.
+
+    Small exports stream straight from a server-side cursor. Large ones (or
+    background=true, or any export while every streaming slot is busy) return
+    202 with a job whose file supports Range resume, or 429 while the job queue
+    or the export storage is full.
+    """
+    tenant_id = current_user.get("tenant_id")
+    if not tenant_id:
+        raise HTTPException(status_code=403, detail="Tenant assignment required")
+
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+
+    spec = report_export.get_dataset(dataset)
+    exporter = report_export.get_report_exporter()
+    args = report_export.query_args(tenant_id, start_date, end_date)
+    fmt = format.value
+
+    if background is None:
+        # All streaming slots busy: queue a job rather than wait for a slot.
+        background = exporter.streams_saturated or await exporter.should_run_in_background(spec, args)
+    if background:
+        job = exporter.submit(tenant_id, spec, fmt, start_date, end_date)
+        body = job.to_dict()
+        body["status_url"] = str(request.url_for("get_report_export_job", job_id=job.id))
+        body["download_url"] = str(request.url_for("download_report_export", job_id=job.id))
+        return JSONResponse(status_code=202, content=body)
+
+    filename = report_export.export_filename(spec.name, start_date, end_date, fmt)
+    return StreamingResponse(
+        exporter.stream(spec, args, fmt),
+        media_type=report_export.CONTENT_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+@router.get("/reports/exports/{job_id}")
+async def get_report_export_job(
+    job_id: str,
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
+    """Status of a background export job"""
+    job = report_export.get_report_exporter().get_job(job_id, current_user.get("tenant_id"))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job.to_dict()
+
+@router.get("/reports/exports/{job_id}/download")
+async def download_report_export(
+    job_id: str,
+    current_user: Dict[str, Any] = Depends(get_authenticated_user)
+):
+    """Download a finished export; honours Range/If-Range so clients can resume"""
+    job = report_export.get_report_exporter().get_job(job_id, current_user.get("tenant_id"))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status != report_export.JOB_COMPLETED or not job.path:
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    return FileResponse(
+        job.path,
+        media_type=report_export.CONTENT_TYPES[job.format],
+        filename=job.filename,
+    )
+
 # Report generation functions
-async def generate_profit_loss(conn, start_date: date, end_date: date, comparison: Optional[ComparisonType] = None) -> Dict:
+async def generate_profit_loss(conn, start_date: date, end_date: date, comparison: Optional[ComparisonType] = None, *, tenant_id: str) -> Dict:
     """Generate P&L statement"""
-    revenue_data = await get_revenue_data(conn, start_date, end_date)
-    expense_data = await get_expense_data(conn, start_date, end_date)
+    revenue_data = await get_revenue_data(conn, start_date, end_date, tenant_id)
+    expense_data = await get_expense_data(conn, start_date, end_date, tenant_id)
 
     # Build revenue breakdown
     revenue_breakdown = {}
@@ -776,15 +743,15 @@ async def generate_profit_loss(conn, start_date: date, end_date: date, compariso
             period_days = (end_date - start_date).days
             prev_end = start_date - timedelta(days=1)
             prev_start = prev_end - timedelta(days=period_days)
-            prev_pl = await generate_profit_loss(conn, prev_start, prev_end)
+            prev_pl = await generate_profit_loss(conn, prev_start, prev_end, tenant_id=tenant_id)
             result["previous_period"] = prev_pl["current_period"]
             result["variance"] = calculate_variance(pl_statement.dict(), prev_pl["current_period"])
 
     return result
 
-async def generate_revenue_report(conn, start_date: date, end_date: date, group_by: str = "category") -> Dict:
+async def generate_revenue_report(conn, start_date: date, end_date: date, group_by: str = "category", *, tenant_id: str) -> Dict:
     """Generate revenue report"""
-    revenue_data = await get_revenue_data(conn, start_date, end_date)
+    revenue_data = await get_revenue_data(conn, start_date, end_date, tenant_id)
 
     breakdown = []
     total = revenue_data["total"]
@@ -808,9 +775,9 @@ async def generate_revenue_report(conn, start_date: date, end_date: date, group_
         "breakdown": breakdown
     }
 
-async def generate_expense_report(conn, start_date: date, end_date: date, group_by: str = "category") -> Dict:
+async def generate_expense_report(conn, start_date: date, end_date: date, group_by: str = "category", *, tenant_id: str) -> Dict:
     """Generate expense report"""
-    expense_data = await get_expense_data(conn, start_date, end_date)
+    expense_data = await get_expense_data(conn, start_date, end_date, tenant_id)
 
     total = expense_data["total"]
     breakdown = [
@@ -841,30 +808,18 @@ async def generate_expense_report(conn, start_date: date, end_date: date, group_
         "breakdown": breakdown
     }
 
-async def generate_ar_report(conn, as_of_date: date) -> Dict:
+async def generate_ar_report(conn, as_of_date: date, *, tenant_id: str) -> Dict:
     """Generate accounts receivable aging report"""
-    result = await conn.fetchrow("""
-        SELECT
-            SUM(CASE WHEN CURRENT_DATE - due_date <= 0 THEN balance_cents ELSE 0 END) / 100.0 as current,
-            SUM(CASE WHEN CURRENT_DATE - due_date BETWEEN 1 AND 30 THEN balance_cents ELSE 0 END) / 100.0 as days_1_30,
-            SUM(CASE WHEN CURRENT_DATE - due_date BETWEEN 31 AND 60 THEN balance_cents ELSE 0 END) / 100.0 as days_31_60,
-            SUM(CASE WHEN CURRENT_DATE - due_date BETWEEN 61 AND 90 THEN balance_cents ELSE 0 END) / 100.0 as days_61_90,
-            SUM(CASE WHEN CURRENT_DATE - due_date > 90 THEN balance_cents ELSE 0 END) / 100.0 as days_over_90,
-            SUM(balance_cents) / 100.0 as total,
-            AVG(CURRENT_DATE - due_date) as avg_days
-        FROM invoices
-        WHERE status NOT IN ('paid', 'cancelled')
-            AND created_at <= $1
-    """, datetime.combine(as_of_date, datetime.max.time()))
+    result = await get_financial_rollups().ar_aging(conn, tenant_id, as_of_date)
 
     aging = AccountsReceivableAging(
-        current=float(result["current"]) if result["current"] else 0,
-        days_1_30=float(result["days_1_30"]) if result["days_1_30"] else 0,
-        days_31_60=float(result["days_31_60"]) if result["days_31_60"] else 0,
-        days_61_90=float(result["days_61_90"]) if result["days_61_90"] else 0,
-        days_over_90=float(result["days_over_90"]) if result["days_over_90"] else 0,
-        total=float(result["total"]) if result["total"] else 0,
-        average_days_outstanding=float(result["avg_days"]) if result["avg_days"] else 0
+        current=result["current"],
+        days_1_30=result["days_1_30"],
+        days_31_60=result["days_31_60"],
+        days_61_90=result["days_61_90"],
+        days_over_90=result["days_over_90"],
+        total=result["total"],
+        average_days_outstanding=result["avg_days"]
     )
 
     return {
@@ -874,24 +829,12 @@ async def generate_ar_report(conn, as_of_date: date) -> Dict:
         "percentage_overdue": ((aging.total - aging.current) / aging.total * 100) if aging.total > 0 else 0
     }
 
-async def generate_cash_flow(conn, start_date: date, end_date: date) -> Dict:
+async def generate_cash_flow(conn, start_date: date, end_date: date, *, tenant_id: str) -> Dict:
     """Generate cash flow statement"""
-    # Get cash collections
-    collections = await conn.fetchrow("""
-        SELECT SUM(amount) as total
-        FROM invoice_payments
-        WHERE payment_date >= $1 AND payment_date <= $2
-    """, start_date, end_date)
-
-    # Get cash payments (simplified)
-    payments = await conn.fetchrow("""
-        SELECT SUM(material_cost + labor_cost + other_costs) as total
-        FROM job_costs
-        WHERE DATE(created_at) >= $1 AND DATE(created_at) <= $2
-    """, start_date, end_date)
-
-    operating_cash = float(collections["total"]) if collections["total"] else 0
-    operating_payments = float(payments["total"]) if payments["total"] else 0
+    # Cash collections (invoice payments) and cash payments (job costs, simplified)
+    flows = await get_financial_rollups().cash_flow(conn, tenant_id, start_date, end_date)
+    operating_cash = flows["collections"]
+    operating_payments = flows["payments"]
 
     cash_flow = CashFlowStatement(
         period=f"{start_date} to {end_date}",
@@ -917,35 +860,41 @@ def calculate_variance(current: Dict, previous: Dict) -> Dict:
                 }
     return variance
 
-def convert_to_csv(data: Dict) -> str:
-    """Convert report data to CSV format"""
-    output = io.StringIO()
-
-    # Flatten nested dictionaries
-    flat_data = []
-
-    def flatten_dict(d, parent_key=''):
-        items = []
-        for k, v in d.items():
-            new_key = f"{parent_key}.{k}" if parent_key else k
-            if isinstance(v, dict):
-                items.extend(flatten_dict(v, new_key))
-            elif isinstance(v, list):
-                for i, item in enumerate(v):
-                    if isinstance(item, dict):
-                        items.extend(flatten_dict(item, f"{new_key}[{i}]"))
-                    else:
-                        items.append((f"{new_key}[{i}]", v))
-            else:
-                items.append((new_key, v))
-        return items
-
-    flat_items = flatten_dict(data)
+def iter_flat_items(d: Dict, parent_key: str = ''):
+    """Yield (dotted key, value) pairs of a nested report without building a list"""
+    for k, v in d.items():
+        new_key = f"{parent_key}.{k}" if parent_key else k
+        if isinstance(v, dict):
+            yield from iter_flat_items(v, new_key)
+        elif isinstance(v, list):
+            for i, item in enumerate(v):
+                if isinstance(item, dict):
+                    yield from iter_flat_items(item, f"{new_key}[{i}]")
+                else:
+                    yield (f"{new_key}[{i}]", v)
+        else:
+            yield (new_key, v)
 
-    if flat_items:
-        writer = csv.writer(output)
-        writer.writerow(["Field", "Value"])
-        for key, value in flat_items:
-            writer.writerow([key, value])
+def iter_report_csv(data: Dict, flush_rows: int = 500):
+    """Encode report data as Field,Value CSV in chunks of ``flush_rows`` rows"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    header_written = False
+    pending = 0
+    for key, value in iter_flat_items(data):
+        if not header_written:
+            writer.writerow(["Field", "Value"])
+            header_written = True
+        writer.writerow([key, value])
+        pending += 1
+        if pending >= flush_rows:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+            pending = 0
+    if pending:
+        yield output.getvalue()
 
-    return output.getvalue()
\ No newline at end of file
+def convert_to_csv(data: Dict) -> str:
+    """Convert report data to CSV format"""
+    return "".join(iter_report_csv(data))
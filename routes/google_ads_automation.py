@@ -15,10 +15,11 @@ from sqlalchemy import Column, String, Integer, Float, Boolean, JSON, DateTime,
 from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 
-from database import get_db, engine
+from database import engine
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user
 
-router = APIRouter(tags=["Google Ads"])
+router = APIRouter(tags=["Google Ads"], route_class=SyncDBRoute)
 logger = logging.getLogger(__name__)
 
 # Google Ads configuration
@@ -104,7 +105,7 @@ class CampaignResponse(BaseModel):
 # ============================================================================
 
 @router.post("/campaigns/create", response_model=CampaignResponse)
-async def create_campaign(
+def create_campaign(
     campaign: CampaignCreate,
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -149,7 +150,7 @@ async def create_campaign(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/campaigns/emergency-weather")
-async def create_weather_triggered_campaign(
+def create_weather_triggered_campaign(
     location: str,
     weather_event: str,
     db: Session = Depends(get_db),
@@ -254,7 +255,7 @@ async def create_weather_triggered_campaign(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/campaigns/performance")
-async def get_campaign_performance(
+def get_campaign_performance(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
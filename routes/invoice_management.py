@@ -14,12 +14,12 @@ from uuid import uuid4
 from enum import Enum
 import logging
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from pydantic import BaseModel, Field
 from services.notifications import send_email_message
 
-router = APIRouter(prefix="/invoices")
+router = APIRouter(prefix="/invoices", route_class=SyncDBRoute)
 logger = logging.getLogger(__name__)
 
 # ============================================================================
@@ -99,7 +99,7 @@ class InvoiceResponse(BaseModel):
 # ============================================================================
 
 @router.post("/", response_model=InvoiceResponse)
-async def create_invoice(
+def create_invoice(
     invoice: InvoiceCreate,
     background_tasks: BackgroundTasks,
     current_user: dict = Depends(get_current_user),
@@ -297,7 +297,7 @@ async def create_invoice(
         )
 
 @router.get("/", response_model=Dict[str, Any])
-async def list_invoices(
+def list_invoices(
     customer_id: Optional[str] = None,
     status: Optional[InvoiceStatus] = None,
     is_overdue: Optional[bool] = None,
@@ -401,7 +401,7 @@ async def list_invoices(
         )
 
 @router.get("/{invoice_id}", response_model=Dict[str, Any])
-async def get_invoice_details(
+def get_invoice_details(
     invoice_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -544,7 +544,7 @@ async def get_invoice_details(
         )
 
 @router.post("/{invoice_id}/payment", response_model=dict)
-async def record_payment(
+def record_payment(
     invoice_id: str,
     payment: PaymentRecord,
     current_user: dict = Depends(get_current_user),
@@ -659,7 +659,7 @@ async def record_payment(
         )
 
 @router.post("/{invoice_id}/send", response_model=dict)
-async def send_invoice(
+def send_invoice(
     invoice_id: str,
     background_tasks: BackgroundTasks,
     email_to: Optional[str] = None,
@@ -744,7 +744,7 @@ async def send_invoice(
         )
 
 @router.get("/overdue/list", response_model=Dict[str, Any])
-async def get_overdue_invoices(
+def get_overdue_invoices(
     days_overdue: Optional[int] = Query(None, ge=1),
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -813,7 +813,7 @@ async def get_overdue_invoices(
         )
 
 @router.get("/summary/stats", response_model=Dict[str, Any])
-async def get_invoice_summary(
+def get_invoice_summary(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     current_user: dict = Depends(get_current_user),
@@ -12,10 +12,9 @@ from pydantic import BaseModel, Field
 from enum import Enum
 import json
 import uuid
-import asyncpg
 import os
 import logging
-from database import DATABASE_URL as RESOLVED_DATABASE_URL
+from database import DATABASE_URL as RESOLVED_DATABASE_URL, get_pool
 from core.supabase_auth import get_authenticated_user
 
 logger = logging.getLogger(__name__)
@@ -92,10 +91,11 @@ class TemplateUsageStats(BaseModel):
 # ==================== Database Functions ====================
 
 async def get_db_connection():
-    """Get database connection"""
+    """Borrow a connection from the shared pool; ``conn.close()`` returns it."""
     if not DATABASE_URL:
         raise HTTPException(status_code=503, detail="Database connection not available")
-    return await asyncpg.connect(DATABASE_URL)
+    pool = await get_pool()
+    return await pool.lease()
 
 # ==================== Template Management ====================
 
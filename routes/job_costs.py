@@ -15,12 +15,12 @@ import json
 from decimal import Decimal
 from uuid import uuid4
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from services.audit_service import log_data_modification, log_data_access
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/jobs", tags=["Job Costs"])
+router = APIRouter(prefix="/api/v1/jobs", tags=["Job Costs"], route_class=SyncDBRoute)
 
 # ============================================================================
 # ENUMS AND MODELS
@@ -103,7 +103,7 @@ class CostSummary(BaseModel):
 # ============================================================================
 
 @router.post("/{job_id}/expenses", status_code=status.HTTP_201_CREATED)
-async def add_job_expense(
+def add_job_expense(
     job_id: str,
     expense: ExpenseCreate,
     current_user: dict = Depends(get_current_user),
@@ -213,7 +213,7 @@ async def add_job_expense(
         raise HTTPException(status_code=500, detail="Failed to add expense")
 
 @router.get("/{job_id}/expenses")
-async def get_job_expenses(
+def get_job_expenses(
     job_id: str,
     category: Optional[CostCategory] = None,
     status: Optional[ExpenseStatus] = None,
@@ -283,7 +283,7 @@ async def get_job_expenses(
         raise HTTPException(status_code=500, detail="Failed to fetch expenses")
 
 @router.post("/{job_id}/materials")
-async def record_material_usage(
+def record_material_usage(
     job_id: str,
     material: MaterialUsage,
     current_user: dict = Depends(get_current_user),
@@ -391,7 +391,7 @@ async def record_material_usage(
         raise HTTPException(status_code=500, detail="Failed to record material usage")
 
 @router.post("/{job_id}/labor")
-async def record_labor_entry(
+def record_labor_entry(
     job_id: str,
     labor: LaborEntry,
     current_user: dict = Depends(get_current_user),
@@ -501,7 +501,7 @@ async def record_labor_entry(
         raise HTTPException(status_code=500, detail="Failed to record labor")
 
 @router.get("/{job_id}/cost-summary")
-async def get_job_cost_summary(
+def get_job_cost_summary(
     job_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -598,7 +598,7 @@ async def get_job_cost_summary(
         raise HTTPException(status_code=500, detail="Failed to fetch cost summary")
 
 @router.put("/expenses/{expense_id}/approve")
-async def approve_expense(
+def approve_expense(
     expense_id: str,
     notes: Optional[str] = None,
     current_user: dict = Depends(get_current_user),
@@ -13,11 +13,11 @@ import os
 import shutil
 from pathlib import Path
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from pydantic import BaseModel, Field
 
-router = APIRouter(prefix="/documents")
+router = APIRouter(prefix="/documents", route_class=SyncDBRoute)
 
 # Document upload directory
 UPLOAD_DIR = Path("uploads/job_documents")
@@ -54,7 +54,7 @@ class DocumentResponse(BaseModel):
 # ============================================================================
 
 @router.post("/{job_id}/documents", response_model=DocumentResponse)
-async def upload_job_document(
+def upload_job_document(
     job_id: str,
     file: UploadFile = File(...),
     metadata: DocumentMetadata = Depends(),
@@ -152,7 +152,7 @@ async def upload_job_document(
         )
 
 @router.get("/{job_id}/documents", response_model=Dict[str, Any])
-async def list_job_documents(
+def list_job_documents(
     job_id: str,
     category: Optional[str] = None,
     search: Optional[str] = None,
@@ -224,7 +224,7 @@ async def list_job_documents(
         )
 
 @router.get("/{job_id}/documents/{document_id}")
-async def get_document_info(
+def get_document_info(
     job_id: str,
     document_id: str,
     current_user: dict = Depends(get_current_user),
@@ -278,7 +278,7 @@ async def get_document_info(
         )
 
 @router.delete("/{job_id}/documents/{document_id}")
-async def delete_job_document(
+def delete_job_document(
     job_id: str,
     document_id: str,
     current_user: dict = Depends(get_current_user),
@@ -323,7 +323,7 @@ async def delete_job_document(
         )
 
 @router.post("/{job_id}/documents/bulk-upload")
-async def bulk_upload_documents(
+def bulk_upload_documents(
     job_id: str,
     files: List[UploadFile] = File(...),
     category: Optional[str] = Query(None, pattern="^(contract|estimate|invoice|photo|permit|inspection|warranty|other)$"),
@@ -420,7 +420,7 @@ async def bulk_upload_documents(
         )
 
 @router.get("/{job_id}/document-summary")
-async def get_document_summary(
+def get_document_summary(
     job_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -14,12 +14,12 @@ import logging
 import json
 from uuid import uuid4
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from services.audit_service import log_data_modification, log_data_access
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/jobs", tags=["Job Lifecycle"])
+router = APIRouter(prefix="/api/v1/jobs", tags=["Job Lifecycle"], route_class=SyncDBRoute)
 
 # ============================================================================
 # ENUMS AND MODELS
@@ -112,7 +112,7 @@ class JobNote(BaseModel):
 # ============================================================================
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=dict)
-async def create_job(
+def create_job(
     job: JobCreate,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -235,7 +235,7 @@ async def create_job(
         raise HTTPException(status_code=500, detail="Failed to create job")
 
 @router.put("/{job_id}/status", response_model=dict)
-async def transition_job_status(
+def transition_job_status(
     job_id: str,
     transition: JobStatusTransition,
     current_user: dict = Depends(get_current_user),
@@ -369,7 +369,7 @@ async def transition_job_status(
         raise HTTPException(status_code=500, detail="Failed to update job status")
 
 @router.get("/{job_id}/lifecycle", response_model=dict)
-async def get_job_lifecycle(
+def get_job_lifecycle(
     job_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -495,7 +495,7 @@ async def get_job_lifecycle(
         raise HTTPException(status_code=500, detail="Failed to fetch job lifecycle")
 
 @router.post("/{job_id}/notes", response_model=dict)
-async def add_job_note(
+def add_job_note(
     job_id: str,
     note: JobNote,
     current_user: dict = Depends(get_current_user),
@@ -550,7 +550,7 @@ async def add_job_note(
         raise HTTPException(status_code=500, detail="Failed to add note")
 
 @router.get("/{job_id}/notes", response_model=dict)
-async def get_job_notes(
+def get_job_notes(
     job_id: str,
     include_internal: bool = Query(False),
     current_user: dict = Depends(get_current_user),
@@ -12,11 +12,11 @@ from uuid import uuid4
 import json
 from enum import Enum
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from pydantic import BaseModel, Field
 
-router = APIRouter(prefix="/notifications")
+router = APIRouter(prefix="/notifications", route_class=SyncDBRoute)
 
 # ============================================================================
 # NOTIFICATION TYPES AND MODELS
@@ -87,7 +87,7 @@ class NotificationResponse(BaseModel):
 # ============================================================================
 
 @router.post("/{job_id}/send", response_model=dict)
-async def send_job_notification(
+def send_job_notification(
     job_id: str,
     notification: CreateNotification,
     background_tasks: BackgroundTasks,
@@ -173,7 +173,7 @@ async def send_job_notification(
         )
 
 @router.get("/{job_id}/notifications", response_model=Dict[str, Any])
-async def get_job_notifications(
+def get_job_notifications(
     job_id: str,
     type: Optional[NotificationType] = None,
     priority: Optional[NotificationPriority] = None,
@@ -257,7 +257,7 @@ async def get_job_notifications(
         )
 
 @router.put("/{job_id}/notifications/{notification_id}/read", response_model=dict)
-async def mark_notification_read(
+def mark_notification_read(
     job_id: str,
     notification_id: str,
     current_user: dict = Depends(get_current_user),
@@ -300,7 +300,7 @@ async def mark_notification_read(
         )
 
 @router.post("/bulk-read", response_model=dict)
-async def mark_multiple_notifications_read(
+def mark_multiple_notifications_read(
     notification_ids: List[str],
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -335,7 +335,7 @@ async def mark_multiple_notifications_read(
         )
 
 @router.get("/preferences", response_model=NotificationPreferences)
-async def get_notification_preferences(
+def get_notification_preferences(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> NotificationPreferences:
@@ -370,7 +370,7 @@ async def get_notification_preferences(
         )
 
 @router.put("/preferences", response_model=dict)
-async def update_notification_preferences(
+def update_notification_preferences(
     preferences: NotificationPreferences,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -423,7 +423,7 @@ async def update_notification_preferences(
         )
 
 @router.get("/summary", response_model=Dict[str, Any])
-async def get_notification_summary(
+def get_notification_summary(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> dict:
@@ -544,7 +544,7 @@ def process_notification(
         print(f"Error processing notification {notification_id}: {str(e)}")
 
 @router.post("/setup-automated-notifications", response_model=dict)
-async def setup_automated_notifications(
+def setup_automated_notifications(
     job_id: str,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -12,11 +12,11 @@ import json
 import csv
 import io
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from pydantic import BaseModel, Field
 
-router = APIRouter(prefix="/reports")
+router = APIRouter(prefix="/reports", route_class=SyncDBRoute)
 
 # ============================================================================
 # PYDANTIC MODELS
@@ -35,7 +35,7 @@ class ReportFilters(BaseModel):
 # ============================================================================
 
 @router.get("/summary")
-async def get_jobs_summary_report(
+def get_jobs_summary_report(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     group_by: str = Query("month", pattern="^(day|week|month|quarter|year)$"),
@@ -139,7 +139,7 @@ async def get_jobs_summary_report(
         )
 
 @router.get("/performance")
-async def get_performance_report(
+def get_performance_report(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     current_user: dict = Depends(get_current_user),
@@ -273,7 +273,7 @@ async def get_performance_report(
         )
 
 @router.get("/financial")
-async def get_financial_report(
+def get_financial_report(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     current_user: dict = Depends(get_current_user),
@@ -421,7 +421,7 @@ async def get_financial_report(
         )
 
 @router.get("/export/csv")
-async def export_jobs_report_csv(
+def export_jobs_report_csv(
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
     status: Optional[str] = Query(None),
@@ -526,7 +526,7 @@ async def export_jobs_report_csv(
         )
 
 @router.get("/dashboard")
-async def get_dashboard_metrics(
+def get_dashboard_metrics(
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
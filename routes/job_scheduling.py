@@ -13,12 +13,12 @@ import logging
 import json
 from uuid import uuid4
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from services.audit_service import log_data_access, log_data_modification
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/jobs/schedule", tags=["Job Scheduling"])
+router = APIRouter(prefix="/api/v1/jobs/schedule", tags=["Job Scheduling"], route_class=SyncDBRoute)
 
 # ============================================================================
 # MODELS
@@ -58,7 +58,7 @@ class ScheduleOptimizationRequest(BaseModel):
 # ============================================================================
 
 @router.get("/calendar")
-async def get_schedule_calendar(
+def get_schedule_calendar(
     start_date: date = Query(...),
     end_date: date = Query(...),
     crew_id: Optional[str] = None,
@@ -161,7 +161,7 @@ async def get_schedule_calendar(
         raise HTTPException(status_code=500, detail="Failed to fetch schedule")
 
 @router.post("/{job_id}/schedule")
-async def schedule_job(
+def schedule_job(
     job_id: str,
     schedule: ScheduleSlot,
     current_user: dict = Depends(get_current_user),
@@ -182,7 +182,7 @@ async def schedule_job(
             )
         
         # Check for conflicts
-        conflicts = await check_schedule_conflicts(
+        conflicts = check_schedule_conflicts(
             job_id, schedule.start_time, schedule.end_time,
             schedule.crew_id, schedule.employee_ids, db
         )
@@ -285,7 +285,7 @@ async def schedule_job(
         raise HTTPException(status_code=500, detail="Failed to schedule job")
 
 @router.get("/{job_id}/availability")
-async def check_resource_availability(
+def check_resource_availability(
     job_id: str,
     proposed_start: datetime = Query(...),
     proposed_end: datetime = Query(...),
@@ -323,7 +323,7 @@ async def check_resource_availability(
         ).fetchall()
         
         for crew in crews:
-            crew_conflicts = await check_crew_conflicts(
+            crew_conflicts = check_crew_conflicts(
                 str(crew.id), proposed_start, proposed_end, db
             )
             
@@ -345,7 +345,7 @@ async def check_resource_availability(
         ).fetchall()
         
         for employee in employees:
-            emp_conflicts = await check_employee_conflicts(
+            emp_conflicts = check_employee_conflicts(
                 str(employee.id), proposed_start, proposed_end, db
             )
             
@@ -373,7 +373,7 @@ async def check_resource_availability(
         raise HTTPException(status_code=500, detail="Failed to check availability")
 
 @router.post("/optimize")
-async def optimize_schedule(
+def optimize_schedule(
     request: ScheduleOptimizationRequest,
     current_user: dict = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -466,7 +466,7 @@ async def optimize_schedule(
 # HELPER FUNCTIONS
 # ============================================================================
 
-async def check_schedule_conflicts(
+def check_schedule_conflicts(
     job_id: str,
     start_time: datetime,
     end_time: datetime,
@@ -479,17 +479,17 @@ async def check_schedule_conflicts(
     
     # Check crew conflicts
     if crew_id:
-        crew_conflicts = await check_crew_conflicts(crew_id, start_time, end_time, db, job_id)
+        crew_conflicts = check_crew_conflicts(crew_id, start_time, end_time, db, job_id)
         conflicts.extend(crew_conflicts)
     
     # Check employee conflicts
     for employee_id in employee_ids:
-        emp_conflicts = await check_employee_conflicts(employee_id, start_time, end_time, db, job_id)
+        emp_conflicts = check_employee_conflicts(employee_id, start_time, end_time, db, job_id)
         conflicts.extend(emp_conflicts)
     
     return conflicts
 
-async def check_crew_conflicts(
+def check_crew_conflicts(
     crew_id: str,
     start_time: datetime,
     end_time: datetime,
@@ -531,7 +531,7 @@ async def check_crew_conflicts(
     
     return conflicts
 
-async def check_employee_conflicts(
+def check_employee_conflicts(
     employee_id: str,
     start_time: datetime,
     end_time: datetime,
@@ -14,12 +14,12 @@ import logging
 import json
 from uuid import uuid4
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user  # SUPABASE AUTH
 from services.audit_service import log_data_modification, log_data_access
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/jobs", tags=["Job Tasks"])
+router = APIRouter(prefix="/api/v1/jobs", tags=["Job Tasks"], route_class=SyncDBRoute)
 
 # ============================================================================
 # ENUMS AND MODELS
@@ -99,7 +99,7 @@ class TaskTemplate(BaseModel):
 # ============================================================================
 
 @router.post("/{job_id}/tasks", status_code=status.HTTP_201_CREATED)
-async def create_job_task(
+def create_job_task(
     job_id: str,
     task: TaskCreate,
     current_user: dict = Depends(get_current_user),
@@ -224,7 +224,7 @@ async def create_job_task(
         raise HTTPException(status_code=500, detail="Failed to create task")
 
 @router.get("/{job_id}/tasks")
-async def get_job_tasks(
+def get_job_tasks(
     job_id: str,
     status: Optional[TaskStatus] = None,
     category: Optional[TaskCategory] = None,
@@ -317,7 +317,7 @@ async def get_job_tasks(
         raise HTTPException(status_code=500, detail="Failed to fetch tasks")
 
 @router.put("/{job_id}/tasks/{task_id}/status")
-async def update_task_status(
+def update_task_status(
     job_id: str,
     task_id: str,
     status_update: TaskStatusUpdate,
@@ -435,7 +435,7 @@ async def update_task_status(
         raise HTTPException(status_code=500, detail="Failed to update task status")
 
 @router.put("/{job_id}/tasks/{task_id}/checklist")
-async def update_checklist_item(
+def update_checklist_item(
     job_id: str,
     task_id: str,
     item_update: ChecklistItemUpdate,
@@ -523,7 +523,7 @@ async def update_checklist_item(
         raise HTTPException(status_code=500, detail="Failed to update checklist")
 
 @router.get("/templates")
-async def get_task_templates(
+def get_task_templates(
     job_type: Optional[str] = None,
     is_active: bool = Query(True),
     current_user: dict = Depends(get_current_user),
@@ -559,7 +559,7 @@ async def get_task_templates(
         raise HTTPException(status_code=500, detail="Failed to fetch templates")
 
 @router.post("/{job_id}/tasks/from-template")
-async def create_tasks_from_template(
+def create_tasks_from_template(
     job_id: str,
     template_id: str,
     current_user: dict = Depends(get_current_user),
@@ -19,10 +19,10 @@ from pydantic import BaseModel
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db, run_sync_db
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/langgraph", tags=["LangGraph Workflows"])
+router = APIRouter(prefix="/api/v1/langgraph", tags=["LangGraph Workflows"], route_class=SyncDBRoute)
 
 try:
     from langgraph.graph import StateGraph  # noqa: F401
@@ -144,7 +144,7 @@ async def execute_workflow(
 
     execution_id = str(uuid.uuid4())
 
-    workflow = db.execute(
+    workflow = (await run_sync_db(db.execute,
         text(
             """
             SELECT id, execution_count, success_rate
@@ -153,12 +153,12 @@ async def execute_workflow(
             """
         ),
         {"name": workflow_name},
-    ).first()
+    )).first()
 
     if not workflow:
         raise HTTPException(status_code=404, detail=f"Workflow {workflow_name} not found")
 
-    db.execute(
+    await run_sync_db(db.execute,
         text(
             """
             INSERT INTO langgraph_executions
@@ -177,7 +177,7 @@ async def execute_workflow(
             },
         },
     )
-    db.commit()
+    await run_sync_db(db.commit)
 
     payload = {
         "prompt": (
@@ -201,7 +201,7 @@ async def execute_workflow(
                 json=payload,
             )
     except Exception as exc:
-        db.execute(
+        await run_sync_db(db.execute,
             text(
                 """
                 UPDATE langgraph_executions
@@ -211,11 +211,11 @@ async def execute_workflow(
             ),
             {"id": execution_id, "error": str(exc)},
         )
-        db.commit()
+        await run_sync_db(db.commit)
         raise HTTPException(status_code=502, detail="LangGraph execution failed") from exc
 
     if response.status_code != 200:
-        db.execute(
+        await run_sync_db(db.execute,
             text(
                 """
                 UPDATE langgraph_executions
@@ -225,13 +225,13 @@ async def execute_workflow(
             ),
             {"id": execution_id, "error": response.text[:500]},
         )
-        db.commit()
+        await run_sync_db(db.commit)
         raise HTTPException(status_code=502, detail="LangGraph execution failed")
 
     result = response.json()
     success = result.get("status") not in {"failed", "error"}
 
-    db.execute(
+    await run_sync_db(db.execute,
         text(
             """
             UPDATE langgraph_executions
@@ -251,7 +251,7 @@ async def execute_workflow(
     current_rate = workflow[2] or 0
     new_total = current_count + 1
     new_rate = ((current_rate * current_count) + (100 if success else 0)) / new_total
-    db.execute(
+    await run_sync_db(db.execute,
         text(
             """
             UPDATE langgraph_workflows
@@ -261,7 +261,7 @@ async def execute_workflow(
         ),
         {"id": workflow[0], "count": new_total, "rate": new_rate},
     )
-    db.commit()
+    await run_sync_db(db.commit)
 
     return {
         "execution_id": execution_id,
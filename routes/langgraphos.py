@@ -5,11 +5,11 @@ LangGraphOS compatibility endpoints (alias for LangGraph status).
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from routes.langgraph_execution import get_langgraph_status
 
 
-router = APIRouter(prefix="/api/v1/langgraphos", tags=["LangGraphOS"])
+router = APIRouter(prefix="/api/v1/langgraphos", tags=["LangGraphOS"], route_class=SyncDBRoute)
 
 
 @router.get("/status")
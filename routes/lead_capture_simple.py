@@ -13,10 +13,11 @@ import uuid
 import os
 import logging
 
+from database.sync_sessions import SyncDBRoute, get_db
+
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 
-from database import get_db
 
 class LeadCaptureRequest(BaseModel):
     name: str
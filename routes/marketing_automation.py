@@ -15,6 +15,7 @@ import uuid
 import json
 
 from core.supabase_auth import get_authenticated_user
+from database import PURPOSE_BACKGROUND, get_pool
 from services.notifications import send_email_message, send_sms_message
 
 router = APIRouter()
@@ -235,7 +236,9 @@ async def execute_automation(automation_id: str, trigger_data: dict):
     if not db_url:
         raise RuntimeError("DATABASE_URL environment variable is required for automation execution")
 
-    conn = await asyncpg.connect(db_url)
+    # Runs as a background task: borrow from the shared pool's background quota.
+    pool = await get_pool(PURPOSE_BACKGROUND)
+    conn = await pool.lease()
     execution_id = str(uuid.uuid4())
 
     try:
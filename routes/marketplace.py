@@ -6,10 +6,10 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 
 
-router = APIRouter(prefix="/api/v1/marketplace", tags=["Marketplace"])
+router = APIRouter(prefix="/api/v1/marketplace", tags=["Marketplace"], route_class=SyncDBRoute)
 
 
 @router.get("")
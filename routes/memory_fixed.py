@@ -10,10 +10,10 @@ from datetime import datetime
 import json
 import re
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/memory", tags=["Memory"])
+router = APIRouter(prefix="/api/v1/memory", tags=["Memory"], route_class=SyncDBRoute)
 
 def _relevance_score(query: str, content: str) -> float:
     """Deterministic relevance score based on token overlap (0..1)."""
@@ -25,7 +25,7 @@ def _relevance_score(query: str, content: str) -> float:
     return round(min(1.0, overlap / len(query_terms)), 3)
 
 @router.get("/search")
-async def search_memory(
+def search_memory(
     query: str = Query(..., description="Search query"),
     limit: int = Query(10, description="Maximum results"),
     db: Session = Depends(get_db)
@@ -74,7 +74,7 @@ async def search_memory(
         }
 
 @router.post("/store")
-async def store_memory(
+def store_memory(
     content: str,
     metadata: Optional[Dict[str, Any]] = None,
     db: Session = Depends(get_db)
@@ -110,7 +110,7 @@ async def store_memory(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/status")
-async def memory_status(db: Session = Depends(get_db)):
+def memory_status(db: Session = Depends(get_db)):
     """Get memory system status"""
     try:
         count_query = "SELECT COUNT(*) FROM memory_entries"
@@ -132,7 +132,7 @@ async def memory_status(db: Session = Depends(get_db)):
 
 
 @router.get("/dashboard/overview")
-async def memory_dashboard_overview(db: Session = Depends(get_db)):
+def memory_dashboard_overview(db: Session = Depends(get_db)):
     """Return memory dashboard aggregates."""
     try:
         total = db.execute(text("SELECT COUNT(*) FROM memory_entries")).scalar() or 0
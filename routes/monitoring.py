@@ -9,25 +9,24 @@ from sqlalchemy import text
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import logging
-import psutil
 import os
 
+from core.host_metrics import host_metrics
+from database.sync_sessions import SyncDBRoute, get_db
+
 logger = logging.getLogger(__name__)
-router = APIRouter(tags=["Monitoring"])
+router = APIRouter(tags=["Monitoring"], route_class=SyncDBRoute)
 
-from database import get_db
 from version import __version__
 
 @router.get("/monitoring")
-async def get_system_monitoring(db: Session = Depends(get_db)):
+def get_system_monitoring(db: Session = Depends(get_db)):
     """
     Get comprehensive system monitoring data
     """
     try:
-        # Get system metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        # Get system metrics (latest background sample, no blocking CPU window)
+        host = host_metrics()
 
         # Get database stats
         db_stats = {}
@@ -75,16 +74,16 @@ async def get_system_monitoring(db: Session = Depends(get_db)):
             'status': 'operational',
             'timestamp': datetime.now().isoformat(),
             'system': {
-                'cpu_percent': round(cpu_percent, 2),
+                'cpu_percent': round(host.cpu_percent, 2),
                 'memory': {
-                    'percent': round(memory.percent, 2),
-                    'used_gb': round(memory.used / (1024**3), 2),
-                    'total_gb': round(memory.total / (1024**3), 2)
+                    'percent': round(host.memory_percent, 2),
+                    'used_gb': round(host.memory_used / (1024**3), 2),
+                    'total_gb': round(host.memory_total / (1024**3), 2)
                 },
                 'disk': {
-                    'percent': round(disk.percent, 2),
-                    'used_gb': round(disk.used / (1024**3), 2),
-                    'total_gb': round(disk.total / (1024**3), 2)
+                    'percent': round(host.disk_percent, 2),
+                    'used_gb': round(host.disk_used / (1024**3), 2),
+                    'total_gb': round(host.disk_total / (1024**3), 2)
                 }
             },
             'database': db_stats,
@@ -110,7 +109,7 @@ async def get_health_status():
     }
 
 @router.get("/monitoring/metrics")
-async def get_metrics(
+def get_metrics(
     period: str = "1h",  # 1h, 6h, 24h, 7d
     db: Session = Depends(get_db)
 ):
@@ -230,7 +229,7 @@ async def get_metrics(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/monitoring/alerts")
-async def get_system_alerts(
+def get_system_alerts(
     severity: Optional[str] = None,  # critical, warning, info
     db: Session = Depends(get_db)
 ):
@@ -241,32 +240,31 @@ async def get_system_alerts(
         alerts = []
 
         # Check system resources
-        memory = psutil.virtual_memory()
-        if memory.percent > 90:
+        host = host_metrics()
+        if host.memory_percent > 90:
             alerts.append({
                 'id': 'mem-001',
                 'severity': 'critical',
                 'type': 'system',
-                'message': f'Memory usage critical: {memory.percent}%',
+                'message': f'Memory usage critical: {host.memory_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
-        elif memory.percent > 80:
+        elif host.memory_percent > 80:
             alerts.append({
                 'id': 'mem-002',
                 'severity': 'warning',
                 'type': 'system',
-                'message': f'Memory usage high: {memory.percent}%',
+                'message': f'Memory usage high: {host.memory_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
 
         # Check disk space
-        disk = psutil.disk_usage('/')
-        if disk.percent > 90:
+        if host.disk_percent > 90:
             alerts.append({
                 'id': 'disk-001',
                 'severity': 'critical',
                 'type': 'system',
-                'message': f'Disk usage critical: {disk.percent}%',
+                'message': f'Disk usage critical: {host.disk_percent}%',
                 'timestamp': datetime.now().isoformat()
             })
 
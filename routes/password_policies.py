@@ -12,10 +12,11 @@ from sqlalchemy.orm import Session, declarative_base
 from sqlalchemy.dialects.postgresql import UUID
 import uuid
 
-from database import get_db, engine
+from database import engine
+from database.sync_sessions import SyncDBRoute, get_db
 from core.supabase_auth import get_current_user
 
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 
 # Local Base for internal models
 Base = declarative_base()
@@ -80,7 +81,7 @@ class StatsResponse(BaseModel):
 # ============================================================================
 
 @router.post("/", response_model=PasswordPolicyResponse, status_code=status.HTTP_201_CREATED)
-async def create_password_policy(
+def create_password_policy(
     policy: PasswordPolicyCreate,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -101,7 +102,7 @@ async def create_password_policy(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=List[PasswordPolicyResponse])
-async def list_password_policies(
+def list_password_policies(
     status: Optional[str] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
@@ -123,7 +124,7 @@ async def list_password_policies(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{policy_id}", response_model=PasswordPolicyResponse)
-async def get_password_policy(
+def get_password_policy(
     policy_id: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -136,7 +137,7 @@ async def get_password_policy(
     return policy
 
 @router.put("/{policy_id}", response_model=PasswordPolicyResponse)
-async def update_password_policy(
+def update_password_policy(
     policy_id: uuid.UUID,
     policy_update: PasswordPolicyUpdate,
     db: Session = Depends(get_db),
@@ -160,7 +161,7 @@ async def update_password_policy(
     return policy
 
 @router.delete("/{policy_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_password_policy(
+def delete_password_policy(
     policy_id: uuid.UUID,
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
@@ -179,7 +180,7 @@ async def delete_password_policy(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats/summary", response_model=StatsResponse)
-async def get_password_policies_stats(
+def get_password_policies_stats(
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
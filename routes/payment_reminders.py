@@ -14,14 +14,13 @@ from enum import Enum
 import asyncio
 import json
 import uuid
-import asyncpg
 import os
 import logging
 from collections import defaultdict
-from database import DATABASE_URL as RESOLVED_DATABASE_URL
-from config import settings
+from database import DATABASE_URL as RESOLVED_DATABASE_URL, get_pool
 from core.supabase_auth import get_authenticated_user
 from services.notifications import send_email_message, send_sms_message
+from services.reminder_engine import generate_reminder_message, get_reminder_engine
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +49,7 @@ class ReminderChannel(str, Enum):
 
 class ReminderStatus(str, Enum):
     SCHEDULED = "scheduled"
+    SENDING = "sending"
     SENT = "sent"
     DELIVERED = "delivered"
     FAILED = "failed"
@@ -126,10 +126,11 @@ class ReminderCampaign(BaseModel):
 # ==================== Database Functions ====================
 
 async def get_db_connection():
-    """Get database connection"""
+    """Borrow a connection from the shared pool; ``conn.close()`` returns it."""
     if not DATABASE_URL:
         raise HTTPException(status_code=503, detail="Database connection not available")
-    return await asyncpg.connect(DATABASE_URL)
+    pool = await get_pool()
+    return await pool.lease()
 
 # ==================== Reminder Templates ====================
 
@@ -293,52 +294,17 @@ async def send_bulk_reminders(
     if not tenant_id:
         raise HTTPException(status_code=403, detail="Tenant assignment required")
 
+    engine = get_reminder_engine()
     try:
         conn = await get_db_connection()
         try:
-            # Build query for target invoices
-            query = """
-                SELECT i.*, c.email, c.phone, c.customer_name
-                FROM invoices i
-                JOIN customers c ON i.customer_id = c.id
-                WHERE i.balance_cents > 0 AND i.tenant_id = $1
-            """
-            params = [uuid.UUID(tenant_id)]
-            param_count = 1
-            
-            if request.filter_status:
-                param_count += 1
-                query += f" AND i.status = ${param_count}"
-                params.append(request.filter_status)
-            
-            if request.days_overdue_min is not None:
-                param_count += 1
-                query += f" AND i.due_date <= CURRENT_DATE - INTERVAL '${param_count} days'"
-                params.append(request.days_overdue_min)
-            
-            if request.min_amount:
-                param_count += 1
-                query += f" AND i.balance_cents >= ${param_count}"
-                params.append(int(request.min_amount * 100))
-            
-            if request.customer_ids:
-                param_count += 1
-                query += f" AND i.customer_id = ANY(${param_count}::uuid[])"
-                params.append([uuid.UUID(cid) for cid in request.customer_ids])
-            
-            if request.exclude_customer_ids:
-                param_count += 1
-                query += f" AND i.customer_id != ALL(${param_count}::uuid[])"
-                params.append([uuid.UUID(cid) for cid in request.exclude_customer_ids])
-            
-            invoices = await conn.fetch(query, *params)
-            
             if request.test_mode:
                 # Return preview without sending
+                preview = await engine.preview(conn, tenant_id, request)
                 return {
                     "test_mode": True,
-                    "total_invoices": len(invoices),
-                    "total_amount": sum(i['balance_cents'] for i in invoices) / 100,
+                    "total_invoices": preview["total_invoices"],
+                    "total_amount": preview["total_cents"] / 100,
                     "invoices": [
                         {
                             "invoice_number": inv['invoice_number'],
@@ -346,49 +312,34 @@ async def send_bulk_reminders(
                             "balance": inv['balance_cents'] / 100,
                             "days_overdue": (date.today() - inv['due_date']).days if inv['due_date'] < date.today() else 0
                         }
-                        for inv in invoices[:10]  # Limit preview
+                        for inv in preview["invoices"]
                     ]
                 }
-            
-            # Send reminders
-            sent_count = 0
-            failed_count = 0
-            
-            for invoice in invoices:
-                try:
-                    reminder_id = str(uuid.uuid4())
-                    await conn.execute("""
-                        INSERT INTO payment_reminders (
-                            id, invoice_id, reminder_type, scheduled_time,
-                            channels, status, sent_at, tenant_id
-                        ) VALUES ($1, $2, $3, NOW(), $4, $5, NOW(), $6)
-                    """, uuid.UUID(reminder_id), invoice['id'],
-                        request.reminder_type.value,
-                        json.dumps([c.value for c in request.channels]),
-                        ReminderStatus.SENT.value, uuid.UUID(tenant_id))
-                    
-                    # Queue background task
-                    background_tasks.add_task(
-                        send_reminder,
-                        reminder_id,
-                        invoice['email'],
-                        invoice['phone']
-                    )
-                    
-                    sent_count += 1
-                except Exception as e:
-                    logger.error(f"Failed to send reminder for invoice {invoice['id']}: {e}")
-                    failed_count += 1
-            
-            return {
-                "success": True,
-                "sent_count": sent_count,
-                "failed_count": failed_count,
-                "total_amount_reminded": sum(i['balance_cents'] for i in invoices[:sent_count]) / 100,
-                "message": f"Sent {sent_count} reminders successfully"
-            }
+
+            # One set-based insert; invoices already reminded today are skipped.
+            batch = await engine.enqueue(
+                conn,
+                tenant_id,
+                request,
+                request.reminder_type.value,
+                [c.value for c in request.channels],
+            )
         finally:
             await conn.close()
+
+        queued = batch["queued"]
+        if queued:
+            # Delivery runs after the response, off the request connection.
+            background_tasks.add_task(engine.deliver, queued)
+
+        return {
+            "success": True,
+            "sent_count": len(queued),
+            "failed_count": 0,
+            "duplicate_count": batch["duplicates"],
+            "total_amount_reminded": sum(r['balance_cents'] for r in queued) / 100,
+            "message": f"Queued {len(queued)} reminders for delivery"
+        }
     except Exception as e:
         logger.error(f"Error sending bulk reminders: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -872,64 +823,6 @@ async def send_reminder(reminder_id: str, email: str, phone: str):
 async def process_scheduled_reminders():
     """Process scheduled reminders (to be called by cron/scheduler)"""
     try:
-        conn = await get_db_connection()
-        try:
-            # Get due reminders
-            reminders = await conn.fetch("""
-                SELECT r.*, i.*, c.email, c.phone
-                FROM payment_reminders r
-                JOIN invoices i ON r.invoice_id = i.id
-                JOIN customers c ON i.customer_id = c.id
-                WHERE r.status = 'scheduled'
-                    AND r.scheduled_time <= NOW()
-            """)
-            
-            for reminder in reminders:
-                try:
-                    # Send reminder
-                    success = await send_reminder(
-                        str(reminder['id']),
-                        reminder['email'],
-                        reminder['phone']
-                    )
-                    
-                    # Update status
-                    if success:
-                        await conn.execute("""
-                            UPDATE payment_reminders
-                            SET status = 'sent',
-                                sent_at = NOW()
-                            WHERE id = $1
-                        """, reminder['id'])
-                    else:
-                        await conn.execute("""
-                            UPDATE payment_reminders
-                            SET status = 'failed'
-                            WHERE id = $1
-                        """, reminder['id'])
-                except Exception as e:
-                    logger.error(f"Failed to send reminder {reminder['id']}: {e}")
-        finally:
-            await conn.close()
+        return await get_reminder_engine().process_due()
     except Exception as e:
         logger.error(f"Error processing scheduled reminders: {str(e)}")
-
-def generate_reminder_message(template: str, invoice_data: Dict[str, Any]) -> str:
-    """Generate reminder message from template"""
-    # Replace placeholders in template
-    message = template
-    frontend_base = (settings.frontend_url or "").rstrip("/")
-    invoice_id = invoice_data.get("id", "")
-    replacements = {
-        "{customer_name}": invoice_data.get('customer_name', 'Customer'),
-        "{invoice_number}": invoice_data.get('invoice_number', ''),
-        "{amount_due}": f"${invoice_data.get('balance_cents', 0) / 100:.2f}",
-        "{due_date}": invoice_data.get('due_date', '').isoformat() if invoice_data.get('due_date') else '',
-        "{days_overdue}": str((date.today() - invoice_data.get('due_date')).days) if invoice_data.get('due_date') and invoice_data.get('due_date') < date.today() else '0',
-        "{payment_link}": f"{frontend_base}/invoices/{invoice_id}" if frontend_base and invoice_id else ""
-    }
-    
-    for key, value in replacements.items():
-        message = message.replace(key, value)
-    
-    return message
@@ -9,10 +9,10 @@ from sqlalchemy import text
 from typing import List, Dict, Any
 import logging
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 
 @router.get("/list")
 def get_products_list(db: Session = Depends(get_db)):
@@ -7,10 +7,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from core.supabase_auth import get_authenticated_user
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 
 
-router = APIRouter(prefix="/api/v1/projects", tags=["Projects"])
+router = APIRouter(prefix="/api/v1/projects", tags=["Projects"], route_class=SyncDBRoute)
 
 
 @router.get("")
@@ -11,10 +11,10 @@ import uuid
 from datetime import datetime
 import logging
 
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 
 logger = logging.getLogger(__name__)
-router = APIRouter(prefix="/api/v1/erp/public", tags=["Public"])
+router = APIRouter(prefix="/api/v1/erp/public", tags=["Public"], route_class=SyncDBRoute)
 
 class EstimateRequest(BaseModel):
     tenant_id: str = Field(..., description="The ID of the roofing company (Tenant)")
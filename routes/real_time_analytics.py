@@ -10,8 +10,8 @@ from datetime import datetime, timedelta
 import asyncpg
 import json
 import asyncio
-import psutil
 
+from core.host_metrics import host_metrics
 from core.supabase_auth import get_authenticated_user
 
 router = APIRouter()
@@ -91,8 +91,7 @@ async def get_live_metrics(
         except Exception:
             revenue_today = None
 
-    cpu_percent = psutil.cpu_percent(interval=0.1)
-    memory = psutil.virtual_memory()
+    host = host_metrics()
 
     metrics = {
         "timestamp": now.isoformat(),
@@ -103,8 +102,8 @@ async def get_live_metrics(
         "avg_response_time_ms": None,
         "error_rate": None,
         "system": {
-            "cpu_percent": round(cpu_percent, 2),
-            "memory_percent": round(memory.percent, 2),
+            "cpu_percent": round(host.cpu_percent, 2),
+            "memory_percent": round(host.memory_percent, 2),
         },
         "throughput": None,
     }
@@ -118,15 +117,14 @@ async def websocket_metrics(websocket: WebSocket):
 
     try:
         while True:
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            memory = psutil.virtual_memory()
+            host = host_metrics()
 
             metrics = {
                 "timestamp": datetime.now().isoformat(),
                 "type": "metrics_update",
                 "data": {
-                    "cpu_usage": round(cpu_percent, 2),
-                    "memory_usage": round(memory.percent, 2),
+                    "cpu_usage": round(host.cpu_percent, 2),
+                    "memory_usage": round(host.memory_percent, 2),
                 }
             }
 
@@ -18,7 +18,7 @@ import os
 import logging
 from dateutil.relativedelta import relativedelta
 from dateutil.rrule import rrule, DAILY, WEEKLY, MONTHLY, YEARLY
-from database import DATABASE_URL as RESOLVED_DATABASE_URL
+from database import DATABASE_URL as RESOLVED_DATABASE_URL, get_pool
 from core.supabase_auth import get_authenticated_user
 
 logger = logging.getLogger(__name__)
@@ -112,10 +112,11 @@ class RecurrencePreview(BaseModel):
 # ==================== Database Functions ====================
 
 async def get_db_connection():
-    """Get database connection"""
+    """Borrow a connection from the shared pool; ``conn.close()`` returns it."""
     if not DATABASE_URL:
         raise HTTPException(status_code=503, detail="Database connection not available")
-    return await asyncpg.connect(DATABASE_URL)
+    pool = await get_pool()
+    return await pool.lease()
 
 # ==================== Recurring Invoice Management ====================
 
@@ -1,12 +1,25 @@
 """
 Dynamic route loader for all route modules
 Automatically registers all routes from the routes directory
+
+Every import is profiled (wall time, RSS delta, modules pulled in) and the
+slowest are logged at startup; see get_route_loading_report().
 """
 
 import os
+import sys
+import json
+import time
+import hashlib
 import importlib
 import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
 from fastapi import FastAPI
+from starlette._utils import get_route_path
+from starlette.routing import BaseRoute, Match, Mount, NoMatchFound, compile_path
+from starlette.types import Receive, Scope, Send
 
 logger = logging.getLogger(__name__)
 
@@ -111,22 +124,94 @@ EXCLUDED_MODULES = {
 }
 
 
-def load_all_routes(app: FastAPI):
-    """
-    Dynamically load all route files from the routes directory
-    """
-    if os.getenv("SKIP_ROUTE_LOADING") == "1":
+ROUTES_PACKAGE = "routes"
+DEFAULT_MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "route_manifest.json")
+MANIFEST_VERSION = 1
+PROFILE_LOG_TOP = 15
+
+# Import profile of every route module loaded by this process, in load order.
+_import_profile: List[Dict[str, Any]] = []
+# Manifest entries collected while loading eagerly (see write_route_manifest).
+_manifest_entries: List[Dict[str, Any]] = []
+_lazy_state: Dict[str, Any] = {"mode": "eager", "pending": {}, "loaded": [], "failed": []}
+
+
+def _current_rss_bytes() -> int:
+    """Resident set size of this process, or 0 when it cannot be read."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return 0
+
+
+def _profile_import(module_name: str, package: str = ROUTES_PACKAGE, lazy: bool = False):
+    """Import ``package.module_name``, recording wall time, RSS and module deltas."""
+    modules_before = len(sys.modules)
+    rss_before = _current_rss_bytes()
+    started = time.perf_counter()
+    record: Dict[str, Any] = {"module": module_name, "lazy": lazy, "ok": False}
+    try:
+        module = importlib.import_module(f"{package}.{module_name}")
+        record["ok"] = True
+        return module
+    finally:
+        record["import_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        record["rss_delta_kb"] = max(_current_rss_bytes() - rss_before, 0) // 1024
+        # Includes transitive imports, so the first module to pull in a heavy
+        # dependency (SQLAlchemy, openai, numpy...) carries its cost.
+        record["new_modules"] = max(len(sys.modules) - modules_before, 0)
+        _import_profile.append(record)
+
+
+def get_import_profile() -> List[Dict[str, Any]]:
+    """Per-module import records, slowest first."""
+    return sorted(_import_profile, key=lambda row: row["import_ms"], reverse=True)
+
+
+def log_import_profile(top: int = PROFILE_LOG_TOP) -> None:
+    if not _import_profile:
+        return
+    total_ms = sum(row["import_ms"] for row in _import_profile)
+    total_kb = sum(row["rss_delta_kb"] for row in _import_profile)
+    logger.info(
+        "Route imports: %d modules in %.0fms, +%.1f MB RSS",
+        len(_import_profile),
+        total_ms,
+        total_kb / 1024,
+    )
+    for row in get_import_profile()[:top]:
         logger.info(
-            "SKIP_ROUTE_LOADING set; skipping dynamic route loading for this process"
+            "  %-40s %8.1fms  +%7.1f MB  %4d new modules",
+            row["module"],
+            row["import_ms"],
+            row["rss_delta_kb"] / 1024,
+            row["new_modules"],
         )
-        return 0, 0
-    routes_dir = os.path.dirname(__file__)
-    loaded_count = 0
-    failed_count = 0
-    skipped_files = ["__init__.py", "route_loader.py", "__pycache__"]
-    skipped_dirs = ["archive", "__pycache__", "tests"]
 
-    # Get all Python files in routes directory
+
+def get_route_loading_report(top: int = PROFILE_LOG_TOP) -> Dict[str, Any]:
+    """Loader mode, lazy-loading progress and the slowest route imports."""
+    return {
+        "mode": _lazy_state["mode"],
+        "modules_imported": len(_import_profile),
+        "import_ms_total": round(sum(row["import_ms"] for row in _import_profile), 1),
+        "rss_delta_mb_total": round(sum(row["rss_delta_kb"] for row in _import_profile) / 1024, 1),
+        "lazy_pending": len(_lazy_state["pending"]),
+        "lazy_loaded": list(_lazy_state["loaded"]),
+        "lazy_failed": list(_lazy_state["failed"]),
+        "slowest_imports": get_import_profile()[:top],
+    }
+
+
+def _discover_route_modules(routes_dir: str) -> List[str]:
+    skipped_files = ["__init__.py", "route_loader.py", "__pycache__"]
     route_files = []
     for filename in os.listdir(routes_dir):
         file_path = os.path.join(routes_dir, filename)
@@ -138,65 +223,322 @@ def load_all_routes(app: FastAPI):
         if filename.endswith(".py") and filename not in skipped_files:
             module_name = filename[:-3]  # Remove .py extension
             route_files.append(module_name)
+    return sorted(route_files)
+
+
+def _module_tag(module_name: str) -> str:
+    return " ".join(word.capitalize() for word in module_name.split("_"))
+
+
+def _mount_prefix(module_name: str, router: Any) -> Optional[str]:
+    """Prefix to mount ``router`` under, or None when it carries its own."""
+    # FIX v148: Check if router already has a prefix
+    # If it does, use it directly (don't add another prefix)
+    if hasattr(router, "prefix") and router.prefix:
+        return None
+    if module_name in ROUTE_MAPPINGS:
+        return ROUTE_MAPPINGS[module_name]
+    if module_name.startswith("task_"):
+        # Handle task_XXX_name files
+        parts = module_name.split("_")
+        if len(parts) >= 2 and parts[1].isdigit():
+            return f"/api/v1/task{parts[1]}"
+    # Default: convert underscores to hyphens
+    return f"/api/v1/{module_name.replace('_', '-')}"
+
+
+def _include_module(app: FastAPI, module_name: str, module: Any) -> Optional[List[BaseRoute]]:
+    """Mount ``module.router`` on ``app``; returns the routes it added, or None."""
+    if not hasattr(module, "router"):
+        logger.warning(f"Module {module_name} has no router attribute")
+        return None
+
+    router = module.router
+    tag = _module_tag(module_name)
+    prefix = _mount_prefix(module_name, router)
+    before = len(app.router.routes)
+    if prefix is None:
+        # Router already has its own prefix, use it as-is
+        app.include_router(router, tags=[tag])
+        logger.debug(f"Loaded route: {module_name} (using router prefix: {router.prefix})")
+    else:
+        # Register the router WITH our prefix
+        app.include_router(router, prefix=prefix, tags=[tag])
+        logger.debug(f"Loaded route: {module_name} -> {prefix}")
+    return list(app.router.routes[before:])
+
+
+def _route_signatures(routes: List[BaseRoute], prefix: str = "") -> List[Dict[str, Any]]:
+    """Full paths and methods of ``routes``, descending into included routers."""
+    signatures = []
+    for route in routes:
+        # Newer FastAPI keeps included routers nested instead of copying routes.
+        inner = getattr(route, "original_router", None)
+        if inner is not None:
+            context_prefix = getattr(getattr(route, "include_context", None), "prefix", "") or ""
+            signatures.extend(_route_signatures(inner.routes, prefix + context_prefix))
+            continue
+        path = getattr(route, "path", None)
+        if not path:
+            continue
+        if isinstance(route, Mount):
+            path = path.rstrip("/") + "/{path:path}"
+        signatures.append(
+            {"path": prefix + path, "methods": sorted(getattr(route, "methods", None) or [])}
+        )
+    return signatures
+
+
+def _manifest_entry(module_name: str, routes: List[BaseRoute]) -> Dict[str, Any]:
+    return {"module": module_name, "routes": _route_signatures(routes)}
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.sha1(fh.read()).hexdigest()
+
+
+def write_route_manifest(path: str = DEFAULT_MANIFEST_PATH, routes_dir: Optional[str] = None) -> int:
+    """Write the manifest collected by the last eager load; returns the module count.
+
+    Each module's source digest is stored so a lazy start loads any module
+    whose file changed after the manifest was built eagerly instead.
+    """
+    routes_dir = routes_dir or os.path.dirname(__file__)
+    modules = []
+    for entry in _manifest_entries:
+        source = os.path.join(routes_dir, f"{entry['module']}.py")
+        modules.append({**entry, "sha1": _file_digest(source)})
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "modules": modules,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+    return len(modules)
 
+
+def _read_manifest(path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            manifest = json.load(fh)
+    except FileNotFoundError:
+        logger.warning("Route manifest %s not found; loading routes eagerly", path)
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Route manifest %s unreadable (%s); loading routes eagerly", path, exc)
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning("Route manifest %s has an unsupported version; loading routes eagerly", path)
+        return None
+    return {entry["module"]: entry for entry in manifest.get("modules", [])}
+
+
+class LazyModuleRoute(BaseRoute):
+    """Placeholder for a route module that is imported on its first request.
+
+    Matches any path the manifest lists for the module (whatever the method,
+    so 405s still come from the real routes). On first match the module is
+    imported, its routes replace this placeholder at the same position in the
+    route table, and the request is dispatched again.
+    """
+
+    def __init__(self, app: FastAPI, module_name: str, paths: List[str], package: str):
+        self.app_ref = app
+        self.module_name = module_name
+        self.package = package
+        self.path_regexes = [compile_path(path)[0] for path in paths]
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if scope["type"] not in ("http", "websocket"):
+            return Match.NONE, {}
+        route_path = get_route_path(scope)
+        for regex in self.path_regexes:
+            if regex.match(route_path):
+                return Match.FULL, {}
+        return Match.NONE, {}
+
+    def url_path_for(self, name: str, /, **path_params: Any):
+        raise NoMatchFound(name, path_params)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        _load_lazy_module(self.app_ref, self)
+        await self.app_ref.router(scope, receive, send)
+
+
+def _load_lazy_module(app: FastAPI, placeholder: LazyModuleRoute) -> None:
+    routes = app.router.routes
+    if placeholder not in routes:
+        return  # already swapped in by an earlier request
+    module_name = placeholder.module_name
+    _lazy_state["pending"].pop(module_name, None)
+    added: Optional[List[BaseRoute]] = None
+    try:
+        module = _profile_import(module_name, placeholder.package, lazy=True)
+        added = _include_module(app, module_name, module)
+    except Exception as e:
+        logger.error(f"Failed to load route {module_name}: {e}")
+    if added is None:
+        _lazy_state["failed"].append(module_name)
+        routes.remove(placeholder)
+        return
+
+    # include_router appended the new routes; move them to where the
+    # placeholder sat so route precedence matches an eager start.
+    del routes[len(routes) - len(added):]
+    index = routes.index(placeholder)
+    routes[index:index + 1] = added
+    app.openapi_schema = None
+    _lazy_state["loaded"].append(module_name)
+    record = _import_profile[-1]
+    logger.info(
+        "Lazily loaded route module %s in %.1fms (+%.1f MB RSS)",
+        module_name,
+        record["import_ms"],
+        record["rss_delta_kb"] / 1024,
+    )
+
+
+def load_pending_routes(app: FastAPI) -> int:
+    """Import every module still behind a lazy placeholder; returns the count."""
+    placeholders = [route for route in app.router.routes if isinstance(route, LazyModuleRoute)]
+    for placeholder in placeholders:
+        _load_lazy_module(app, placeholder)
+    return len(placeholders)
+
+
+def _install_openapi_hook(app: FastAPI) -> None:
+    build_openapi = app.openapi
+
+    def openapi() -> Dict[str, Any]:
+        # The schema must describe every route, so /openapi.json and /docs
+        # load whatever is still pending.
+        if _lazy_state["pending"]:
+            load_pending_routes(app)
+        return build_openapi()
+
+    app.openapi = openapi
+
+
+def _load_module_eagerly(app: FastAPI, module_name: str, package: str) -> bool:
+    try:
+        module = _profile_import(module_name, package)
+        added = _include_module(app, module_name, module)
+    except Exception as e:
+        logger.error(f"Failed to load route {module_name}: {e}")
+        return False
+    if added is None:
+        return False
+    _manifest_entries.append(_manifest_entry(module_name, added))
+    return True
+
+
+def load_all_routes(
+    app: FastAPI,
+    *,
+    routes_dir: Optional[str] = None,
+    package: str = ROUTES_PACKAGE,
+):
+    """
+    Dynamically load all route files from the routes directory
+
+    ``ROUTE_LOADING_MODE=lazy`` builds the route table from the manifest
+    (``ROUTE_MANIFEST_PATH``, written by ``python -m routes.route_loader
+    --write-manifest``) and imports each module on the first request to one
+    of its paths. Modules missing from the manifest, or whose source changed
+    since it was written, are still loaded eagerly.
+    """
+    if os.getenv("SKIP_ROUTE_LOADING") == "1":
+        logger.info(
+            "SKIP_ROUTE_LOADING set; skipping dynamic route loading for this process"
+        )
+        return 0, 0
+    routes_dir = routes_dir or os.path.dirname(__file__)
+    loaded_count = 0
+    failed_count = 0
+
+    # Get all Python files in routes directory
+    route_files = _discover_route_modules(routes_dir)
     logger.info(f"Found {len(route_files)} route files to load")
 
+    manifest = None
+    if os.getenv("ROUTE_LOADING_MODE", "eager").lower() == "lazy":
+        manifest = _read_manifest(os.getenv("ROUTE_MANIFEST_PATH", DEFAULT_MANIFEST_PATH))
+    _lazy_state["mode"] = "lazy" if manifest is not None else "eager"
+    _manifest_entries.clear()
+
     # Load each route file
-    for module_name in sorted(route_files):
+    for module_name in route_files:
         if module_name in EXCLUDED_MODULES:
             logger.info(f"Skipping route module {module_name} (handled elsewhere)")
             continue
-        try:
-            # Import the module
-            module = importlib.import_module(f"routes.{module_name}")
-
-            # Check if module has a router
-            if hasattr(module, "router"):
-                router = module.router
-
-                # Create tag from module name
-                tag = " ".join(word.capitalize() for word in module_name.split("_"))
-
-                # FIX v148: Check if router already has a prefix
-                # If it does, use it directly (don't add another prefix)
-                if hasattr(router, "prefix") and router.prefix:
-                    # Router already has its own prefix, use it as-is
-                    app.include_router(router, tags=[tag])
-                    loaded_count += 1
-                    if loaded_count <= 10 or loaded_count % 50 == 0:
-                        logger.debug(
-                            f"Loaded route: {module_name} (using router prefix: {router.prefix})"
-                        )
-                else:
-                    # Router has no prefix, we need to provide one
-                    if module_name in ROUTE_MAPPINGS:
-                        prefix = ROUTE_MAPPINGS[module_name]
-                    elif module_name.startswith("task_"):
-                        # Handle task_XXX_name files
-                        parts = module_name.split("_")
-                        if len(parts) >= 2 and parts[1].isdigit():
-                            task_num = parts[1]
-                            prefix = f"/api/v1/task{task_num}"
-                        else:
-                            prefix = f"/api/v1/{module_name.replace('_', '-')}"
-                    else:
-                        # Default: convert underscores to hyphens
-                        prefix = f"/api/v1/{module_name.replace('_', '-')}"
-
-                    # Register the router WITH our prefix
-                    app.include_router(router, prefix=prefix, tags=[tag])
-                    loaded_count += 1
-
-                    if loaded_count <= 10 or loaded_count % 50 == 0:
-                        logger.debug(f"Loaded route: {module_name} -> {prefix}")
-
-            else:
-                logger.warning(f"Module {module_name} has no router attribute")
-                failed_count += 1
-
-        except Exception as e:
-            logger.error(f"Failed to load route {module_name}: {e}")
+
+        entry = manifest.get(module_name) if manifest is not None else None
+        if entry is not None:
+            try:
+                current = _file_digest(os.path.join(routes_dir, f"{module_name}.py"))
+            except OSError:
+                current = None
+            if current == entry.get("sha1"):
+                paths = [route["path"] for route in entry["routes"]]
+                app.router.routes.append(LazyModuleRoute(app, module_name, paths, package))
+                _lazy_state["pending"][module_name] = len(paths)
+                loaded_count += 1
+                continue
+            logger.info(f"Route module {module_name} changed since the manifest; loading eagerly")
+
+        if _load_module_eagerly(app, module_name, package):
+            loaded_count += 1
+        else:
             failed_count += 1
 
+    if _lazy_state["mode"] == "lazy":
+        _install_openapi_hook(app)
+        logger.info(
+            "Lazy route loading: %d modules deferred, %d imported at startup",
+            len(_lazy_state["pending"]),
+            len(_import_profile),
+        )
+    log_import_profile()
     logger.info(f"Route loading complete: {loaded_count} loaded, {failed_count} failed")
     return loaded_count, failed_count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Route loader utilities")
+    parser.add_argument(
+        "--write-manifest",
+        nargs="?",
+        const=DEFAULT_MANIFEST_PATH,
+        metavar="PATH",
+        help="Import every route module and write the lazy-loading manifest",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Import every route module and print per-module import cost",
+    )
+    args = parser.parse_args(argv)
+    if not args.write_manifest and not args.profile:
+        parser.print_help()
+        return 2
+
+    logging.basicConfig(level=logging.INFO)
+    os.environ["ROUTE_LOADING_MODE"] = "eager"
+    os.environ.pop("SKIP_ROUTE_LOADING", None)
+    loaded, failed = load_all_routes(FastAPI())
+    if args.profile:
+        print(json.dumps(get_import_profile(), indent=1))
+    if args.write_manifest:
+        count = write_route_manifest(args.write_manifest)
+        print(f"Wrote {count} modules to {args.write_manifest} ({failed} failed to import)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,13 +9,13 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 import uuid
 import json
 
 from core.supabase_auth import get_authenticated_user
 
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 
 # Models
 class ContractBase(BaseModel):
@@ -5,12 +5,20 @@ import stripe
 import os
 import json
 import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
 import uuid
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
 from database import SessionLocal as _SessionLocal
+from services.stripe_webhook_inbox import (
+    INGEST_DUPLICATE,
+    INGEST_REQUEUED,
+    get_stripe_webhook_inbox,
+)
 from services.subscription_lifecycle import subscription_lifecycle_service
 
 if _SessionLocal is None:  # pragma: no cover
@@ -46,6 +54,35 @@ def _extract_subscription_plan_and_amount(payload: Dict[str, Any]) -> tuple[Opti
     return plan_id, amount
 
 
+TENANT_CACHE_TTL_SECONDS = float(os.getenv("STRIPE_TENANT_CACHE_TTL_SECS", "300"))
+TENANT_CACHE_SIZE = 10000
+
+# (lookup kind, value) -> (expires_at, tenant_id). Only hits are cached; the
+# webhook worker threads share it, hence the lock.
+_tenant_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_tenant_cache_lock = threading.Lock()
+
+
+def _cached_tenant(key: tuple) -> Optional[str]:
+    with _tenant_cache_lock:
+        entry = _tenant_cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _tenant_cache[key]
+            return None
+        _tenant_cache.move_to_end(key)
+        return entry[1]
+
+
+def _cache_tenant(key: tuple, tenant_id: str) -> None:
+    with _tenant_cache_lock:
+        _tenant_cache[key] = (time.monotonic() + TENANT_CACHE_TTL_SECONDS, tenant_id)
+        _tenant_cache.move_to_end(key)
+        while len(_tenant_cache) > TENANT_CACHE_SIZE:
+            _tenant_cache.popitem(last=False)
+
+
 def _resolve_tenant_id(
     db: "Session",
     *,
@@ -61,42 +98,63 @@ def _resolve_tenant_id(
       2. subscriptions.tenant_id by stripe_subscription_id
       3. customers.tenant_id by stripe_customer_id
       4. customers.tenant_id by email
+
+    Steps 2-4 are answered from a short-lived cache when possible, otherwise by
+    one prioritised query instead of up to three round trips.
     """
     # 1) Metadata
     tid = (metadata or {}).get("tenant_id")
     if tid:
         return str(tid)
 
-    # 2) Subscription lookup
-    if subscription_id:
-        row = db.execute(
-            text(
-                "SELECT tenant_id FROM subscriptions WHERE stripe_subscription_id = :sid"
-            ),
-            {"sid": subscription_id},
-        ).first()
-        if row and row.tenant_id:
-            return str(row.tenant_id)
-
-    # 3) Customer lookup by stripe_customer_id
-    if customer_id:
-        row = db.execute(
-            text("SELECT tenant_id FROM customers WHERE stripe_customer_id = :cid"),
-            {"cid": customer_id},
-        ).first()
-        if row and row.tenant_id:
-            return str(row.tenant_id)
-
-    # 4) Customer lookup by email
-    if customer_email:
-        row = db.execute(
-            text("SELECT tenant_id FROM customers WHERE email = :email"),
-            {"email": customer_email},
-        ).first()
-        if row and row.tenant_id:
-            return str(row.tenant_id)
-
-    return None
+    keys = [
+        (priority, kind, value)
+        for priority, kind, value in (
+            (2, "subscription", subscription_id),
+            (3, "customer", customer_id),
+            (4, "email", customer_email),
+        )
+        if value
+    ]
+    if not keys:
+        return None
+
+    for _, kind, value in keys:
+        cached = _cached_tenant((kind, value))
+        if cached:
+            return cached
+
+    # 2-4) Single lookup; the lowest priority with a tenant wins.
+    row = db.execute(
+        text(
+            """
+            SELECT tenant_id, priority FROM (
+                SELECT tenant_id, 2 AS priority FROM subscriptions
+                WHERE CAST(:sid AS text) IS NOT NULL AND stripe_subscription_id = :sid
+                UNION ALL
+                SELECT tenant_id, 3 FROM customers
+                WHERE CAST(:cid AS text) IS NOT NULL AND stripe_customer_id = :cid
+                UNION ALL
+                SELECT tenant_id, 4 FROM customers
+                WHERE CAST(:email AS text) IS NOT NULL AND email = :email
+            ) lookups
+            WHERE tenant_id IS NOT NULL
+            ORDER BY priority
+            LIMIT 1
+            """
+        ),
+        {"sid": subscription_id, "cid": customer_id, "email": customer_email},
+    ).first()
+    if not row or not row.tenant_id:
+        return None
+
+    tenant_id = str(row.tenant_id)
+    priority = getattr(row, "priority", None)
+    for key_priority, kind, value in keys:
+        if priority is None or key_priority == priority:
+            _cache_tenant((kind, value), tenant_id)
+            break
+    return tenant_id
 
 
 def _quarantine_webhook_event(
@@ -134,66 +192,16 @@ def _quarantine_webhook_event(
     db.commit()
 
 
-_webhook_attempt_tables_ready = False
-
-
-def _ensure_webhook_attempts_table(db: "Session") -> None:
-    """Create retry/audit table for webhook attempts if needed."""
-    global _webhook_attempt_tables_ready
-    if _webhook_attempt_tables_ready:
-        return
-
-    db.execute(
-        text(
-            """
-            CREATE TABLE IF NOT EXISTS webhook_event_attempts (
-                id UUID PRIMARY KEY,
-                stripe_event_id VARCHAR(255) NOT NULL,
-                event_type VARCHAR(255) NOT NULL,
-                attempt_no INTEGER NOT NULL,
-                status VARCHAR(50) NOT NULL,
-                error_message TEXT,
-                created_at TIMESTAMP NOT NULL DEFAULT NOW()
-            )
-            """
-        )
-    )
-    db.execute(
-        text(
-            """
-            CREATE INDEX IF NOT EXISTS idx_webhook_event_attempts_lookup
-            ON webhook_event_attempts (stripe_event_id, created_at DESC)
-            """
-        )
-    )
-    db.commit()
-    _webhook_attempt_tables_ready = True
-
-
-def _next_attempt_number(db: "Session", stripe_event_id: str) -> int:
-    row = db.execute(
-        text(
-            """
-            SELECT COALESCE(MAX(attempt_no), 0) AS last_attempt
-            FROM webhook_event_attempts
-            WHERE stripe_event_id = :stripe_event_id
-            """
-        ),
-        {"stripe_event_id": stripe_event_id},
-    ).first()
-    return int((row.last_attempt if row and row.last_attempt is not None else 0) + 1)
-
-
 def _record_webhook_attempt(
     db: "Session",
     *,
     stripe_event_id: str,
     event_type: str,
     status: str,
+    attempt_no: int,
     error_message: Optional[str] = None,
 ) -> int:
-    _ensure_webhook_attempts_table(db)
-    attempt_no = _next_attempt_number(db, stripe_event_id)
+    """Append to the webhook_event_attempts audit trail (attempt_no comes from the inbox row)."""
     db.execute(
         text(
             """
@@ -231,7 +239,11 @@ router = APIRouter(prefix="/api/v1/stripe", tags=["stripe-webhooks"])
 async def handle_stripe_webhook(
     request: Request, stripe_signature: Optional[str] = Header(None)
 ):
-    """Handle Stripe webhook events"""
+    """Verify a Stripe webhook, store it in the inbox and acknowledge.
+
+    Processing happens in the inbox worker (services.stripe_webhook_inbox),
+    which calls ``process_stripe_event``.
+    """
     try:
         # Get the raw body
         payload = await request.body()
@@ -258,132 +270,25 @@ async def handle_stripe_webhook(
             logger.error("Invalid signature")
             raise HTTPException(status_code=400, detail="Invalid signature")
 
-        # Handle the event
         event_type = event.get("type", "")
-        data = event.get("data", {}).get("object", {})
         stripe_event_id = event.get("id", "")
         if not stripe_event_id:
             raise HTTPException(status_code=400, detail="Invalid event ID")
 
-        logger.info("Processing webhook event: %s (%s)", event_type, stripe_event_id)
-
-        with SessionLocal() as db:
-            # Insert canonical webhook event row. We intentionally keep a single row
-            # per Stripe event ID and track retries in webhook_event_attempts.
-            inserted = db.execute(
-                text(
-                    """
-                INSERT INTO webhook_events (id, event_type, stripe_event_id, data, created_at)
-                VALUES (:id, :event_type, :stripe_event_id, :data, NOW())
-                ON CONFLICT (stripe_event_id) DO NOTHING
-                RETURNING stripe_event_id
-            """
-                ),
-                {
-                    "id": str(uuid.uuid4()),
-                    "event_type": event_type,
-                    "stripe_event_id": stripe_event_id,
-                    "data": json.dumps(event),
-                },
-            ).first()
-            db.commit()
-
-            is_retry = False
-            if not inserted:
-                _ensure_webhook_attempts_table(db)
-                # Event already seen. Only short-circuit when last attempt succeeded.
-                last_attempt = db.execute(
-                    text(
-                        """
-                        SELECT status
-                        FROM webhook_event_attempts
-                        WHERE stripe_event_id = :stripe_event_id
-                        ORDER BY created_at DESC
-                        LIMIT 1
-                        """
-                    ),
-                    {"stripe_event_id": stripe_event_id},
-                ).first()
-                if last_attempt and last_attempt.status == "processed":
-                    _record_webhook_attempt(
-                        db,
-                        stripe_event_id=stripe_event_id,
-                        event_type=event_type,
-                        status="duplicate",
-                    )
-                    return {
-                        "received": True,
-                        "type": event_type,
-                        "duplicate": True,
-                    }
-                is_retry = True
-
-            attempt_no = _record_webhook_attempt(
-                db,
-                stripe_event_id=stripe_event_id,
-                event_type=event_type,
-                status="processing",
-            )
-
-            try:
-                # Process specific events
-                if event_type == "checkout.session.completed":
-                    await handle_checkout_completed(db, data, stripe_event_id)
-
-                elif event_type == "customer.subscription.created":
-                    await handle_subscription_created(db, data, stripe_event_id)
-
-                elif event_type == "customer.subscription.updated":
-                    await handle_subscription_updated(db, data, stripe_event_id)
-
-                elif event_type == "customer.subscription.deleted":
-                    await handle_subscription_deleted(db, data, stripe_event_id)
-
-                elif event_type == "invoice.payment_succeeded":
-                    await handle_payment_succeeded(db, data, stripe_event_id)
-
-                elif event_type == "invoice.payment_failed":
-                    await handle_payment_failed(db, data, stripe_event_id)
-
-                elif event_type == "customer.created":
-                    await handle_customer_created(db, data, stripe_event_id)
-
-                elif event_type == "payment_intent.succeeded":
-                    await handle_payment_intent_succeeded(db, data, stripe_event_id)
-
-                elif event_type == "payment_method.attached":
-                    await handle_payment_method_attached(db, data, stripe_event_id)
-
-                else:
-                    logger.info("Unhandled event type: %s", event_type)
-
-                _record_webhook_attempt(
-                    db,
-                    stripe_event_id=stripe_event_id,
-                    event_type=event_type,
-                    status="processed",
-                )
-            except Exception as event_exc:
-                _record_webhook_attempt(
-                    db,
-                    stripe_event_id=stripe_event_id,
-                    event_type=event_type,
-                    status="failed",
-                    error_message=str(event_exc),
-                )
-                logger.exception(
-                    "Webhook processing failed for event %s (attempt %s)",
-                    stripe_event_id,
-                    attempt_no,
-                    exc_info=event_exc,
-                )
-                # Return non-2xx to let Stripe retry this event.
-                raise HTTPException(status_code=500, detail="Webhook processing failed")
+        # One INSERT ... ON CONFLICT; a failure here returns 500 so Stripe redelivers.
+        outcome = await get_stripe_webhook_inbox().ingest(event)
+        logger.info("Queued webhook event: %s (%s, %s)", event_type, stripe_event_id, outcome)
 
+        if outcome == INGEST_DUPLICATE:
+            return {
+                "received": True,
+                "type": event_type,
+                "duplicate": True,
+            }
         return {
             "received": True,
             "type": event_type,
-            "retry": is_retry,
+            "retry": outcome == INGEST_REQUEUED,
         }
 
     except HTTPException:
@@ -393,7 +298,50 @@ async def handle_stripe_webhook(
         raise HTTPException(status_code=500, detail="Webhook processing failed")
 
 
-async def handle_checkout_completed(db: Session, data: dict, stripe_event_id: str = ""):
+def process_stripe_event(event: Dict[str, Any], attempt_no: int = 1) -> None:
+    """Apply one stored Stripe event (runs on the sync-DB thread pool).
+
+    Raises on failure so the inbox schedules a retry.
+    """
+    event_type = event.get("type", "")
+    data = event.get("data", {}).get("object", {})
+    stripe_event_id = event.get("id", "")
+    handler = EVENT_HANDLERS.get(event_type)
+
+    with SessionLocal() as db:
+        try:
+            if handler is not None:
+                handler(db, data, stripe_event_id)
+            else:
+                logger.info("Unhandled event type: %s", event_type)
+
+            _record_webhook_attempt(
+                db,
+                stripe_event_id=stripe_event_id,
+                event_type=event_type,
+                status="processed",
+                attempt_no=attempt_no,
+            )
+        except Exception as event_exc:
+            db.rollback()
+            _record_webhook_attempt(
+                db,
+                stripe_event_id=stripe_event_id,
+                event_type=event_type,
+                status="failed",
+                attempt_no=attempt_no,
+                error_message=str(event_exc),
+            )
+            logger.exception(
+                "Webhook processing failed for event %s (attempt %s)",
+                stripe_event_id,
+                attempt_no,
+                exc_info=event_exc,
+            )
+            raise
+
+
+def handle_checkout_completed(db: Session, data: dict, stripe_event_id: str = ""):
     """Handle completed checkout session"""
     try:
         customer_email = data.get("customer_email")
@@ -495,7 +443,7 @@ async def handle_checkout_completed(db: Session, data: dict, stripe_event_id: st
         db.rollback()
 
 
-async def handle_subscription_created(
+def handle_subscription_created(
     db: Session, data: dict, stripe_event_id: str = ""
 ):
     """Handle new subscription creation"""
@@ -554,7 +502,7 @@ async def handle_subscription_created(
         db.rollback()
 
 
-async def handle_subscription_updated(db: Session, data: dict, stripe_event_id: str = ""):
+def handle_subscription_updated(db: Session, data: dict, stripe_event_id: str = ""):
     """Handle subscription updates.
 
     SECURITY FIX (F-009): Previously updated by stripe_subscription_id only,
@@ -610,7 +558,7 @@ async def handle_subscription_updated(db: Session, data: dict, stripe_event_id:
         db.rollback()
 
 
-async def handle_subscription_deleted(db: Session, data: dict, stripe_event_id: str = ""):
+def handle_subscription_deleted(db: Session, data: dict, stripe_event_id: str = ""):
     """Handle subscription cancellation.
 
     SECURITY FIX (F-009): Previously updated by stripe_subscription_id only,
@@ -662,7 +610,7 @@ async def handle_subscription_deleted(db: Session, data: dict, stripe_event_id:
         db.rollback()
 
 
-async def handle_payment_succeeded(db: Session, data: dict, stripe_event_id: str = ""):
+def handle_payment_succeeded(db: Session, data: dict, stripe_event_id: str = ""):
     """Handle successful payment"""
     try:
         invoice_id = data.get("id")
@@ -771,7 +719,7 @@ async def handle_payment_succeeded(db: Session, data: dict, stripe_event_id: str
         db.rollback()
 
 
-async def handle_payment_failed(db: Session, data: dict, stripe_event_id: str = ""):
+def handle_payment_failed(db: Session, data: dict, stripe_event_id: str = ""):
     """Handle failed payment"""
     try:
         invoice_id = data.get("id")
@@ -850,7 +798,7 @@ async def handle_payment_failed(db: Session, data: dict, stripe_event_id: str =
         db.rollback()
 
 
-async def handle_customer_created(db: Session, data: dict, stripe_event_id: str = ""):
+def handle_customer_created(db: Session, data: dict, stripe_event_id: str = ""):
     """Handle new customer creation"""
     try:
         customer_id = data.get("id")
@@ -898,7 +846,7 @@ async def handle_customer_created(db: Session, data: dict, stripe_event_id: str
         db.rollback()
 
 
-async def handle_payment_intent_succeeded(
+def handle_payment_intent_succeeded(
     db: Session, data: dict, stripe_event_id: str = ""
 ):
     """Handle successful payment intent"""
@@ -975,7 +923,7 @@ async def handle_payment_intent_succeeded(
         db.rollback()
 
 
-async def handle_payment_method_attached(db: Session, data: dict, stripe_event_id: str):
+def handle_payment_method_attached(db: Session, data: dict, stripe_event_id: str):
     """Handle payment method attachment"""
     try:
         payment_method_id = data.get("id")
@@ -1023,6 +971,19 @@ async def handle_payment_method_attached(db: Session, data: dict, stripe_event_i
         db.rollback()
 
 
+EVENT_HANDLERS = {
+    "checkout.session.completed": handle_checkout_completed,
+    "customer.subscription.created": handle_subscription_created,
+    "customer.subscription.updated": handle_subscription_updated,
+    "customer.subscription.deleted": handle_subscription_deleted,
+    "invoice.payment_succeeded": handle_payment_succeeded,
+    "invoice.payment_failed": handle_payment_failed,
+    "customer.created": handle_customer_created,
+    "payment_intent.succeeded": handle_payment_intent_succeeded,
+    "payment_method.attached": handle_payment_method_attached,
+}
+
+
 @router.get("/webhook/test")
 async def test_webhook():
     """Test endpoint to verify webhook is accessible"""
@@ -16,12 +16,12 @@ from sqlalchemy.orm import Session
 
 from core.request_safety import require_tenant_id, sanitize_text
 from core.supabase_auth import get_authenticated_user
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 from services.subscription_lifecycle import subscription_lifecycle_service
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/v1/subscriptions", tags=["subscriptions"])
+router = APIRouter(prefix="/api/v1/subscriptions", tags=["subscriptions"], route_class=SyncDBRoute)
 
 
 class SubscriptionTier(str, Enum):
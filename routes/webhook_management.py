@@ -15,9 +15,9 @@ from sqlalchemy.orm import Session
 
 from core.request_safety import parse_uuid, require_tenant_id, sanitize_payload, sanitize_text
 from core.supabase_auth import get_authenticated_user
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db
 
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 logger = logging.getLogger(__name__)
 
 
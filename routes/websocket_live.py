@@ -16,6 +16,7 @@ router = APIRouter(prefix="/api/v1/live", tags=["Real-Time"])
 logger = logging.getLogger(__name__)
 
 from database import get_db_connection
+from services.tenant_summary import get_tenant_summary
 
 # Redis for pub/sub (optional)
 try:
@@ -167,36 +168,13 @@ async def send_live_update(update_type: str, user_id: str, tenant_id: str, webso
 async def get_live_dashboard_data(tenant_id: str) -> Dict[str, Any]:
     """Fetch real-time dashboard metrics"""
     pool = await get_db_connection()
-    async with pool.acquire() as conn:
-        active_jobs = await conn.fetchval(
-            """
-            SELECT COUNT(*)
-            FROM jobs
-            WHERE tenant_id = $1
-              AND status IN ('in_progress', 'scheduled')
-            """,
-            tenant_id,
-        )
-        pending_estimates = await conn.fetchval(
-            "SELECT COUNT(*) FROM estimates WHERE tenant_id = $1 AND status = 'pending'",
-            tenant_id,
-        )
-        today_revenue = await conn.fetchval(
-            """
-            SELECT COALESCE(SUM(total_amount), 0)
-            FROM invoices
-            WHERE tenant_id = $1
-              AND status = 'paid'
-              AND created_at >= CURRENT_DATE
-            """,
-            tenant_id,
-        )
+    summary = await get_tenant_summary(pool, str(tenant_id))
 
     return {
-        "active_jobs": int(active_jobs or 0),
-        "today_revenue": float(today_revenue or 0),
+        "active_jobs": summary["jobs_active"],
+        "today_revenue": summary["revenue_today"],
         "crew_locations": [],
-        "pending_estimates": int(pending_estimates or 0),
+        "pending_estimates": summary["estimates_pending"],
         "weather_alerts": [],
     }
 
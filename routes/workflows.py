@@ -9,7 +9,7 @@ import json
 import logging
 from datetime import datetime
 from uuid import uuid4
-from database import get_db
+from database.sync_sessions import SyncDBRoute, get_db, run_sync_db
 from core.supabase_auth import get_authenticated_user
 
 # These services might not be available yet
@@ -29,14 +29,14 @@ logger = logging.getLogger(__name__)
 # Use the SQLAlchemy get_db defined above, not asyncpg
 # Remove duplicate async get_db function
 
-router = APIRouter()
+router = APIRouter(route_class=SyncDBRoute)
 
 # ============================================================================
 # WORKFLOW MANAGEMENT
 # ============================================================================
 
 @router.post("/workflows")
-async def create_workflow(
+def create_workflow(
     workflow: Dict[str, Any],
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user)
@@ -93,7 +93,7 @@ async def create_workflow(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/workflows")
-async def get_workflows(
+def get_workflows(
     category: Optional[str] = None,
     is_active: Optional[bool] = None,
     skip: int = 0,
@@ -180,7 +180,7 @@ async def execute_workflow(
 
     # Verify workflow belongs to tenant
     verify_query = "SELECT id FROM workflows WHERE id = :workflow_id AND tenant_id = :tenant_id"
-    workflow = db.execute(text(verify_query), {'workflow_id': workflow_id, 'tenant_id': tenant_id}).fetchone()
+    workflow = (await run_sync_db(db.execute, text(verify_query), {'workflow_id': workflow_id, 'tenant_id': tenant_id})).fetchone()
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
 
@@ -209,7 +209,7 @@ async def execute_workflow(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/workflows/{workflow_id}/executions")
-async def get_workflow_executions(
+def get_workflow_executions(
     workflow_id: str,
     status: Optional[str] = None,
     skip: int = 0,
@@ -271,7 +271,7 @@ async def get_workflow_executions(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/executions/{execution_id}/steps")
-async def get_execution_steps(
+def get_execution_steps(
     execution_id: str,
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user)
@@ -314,7 +314,7 @@ async def get_execution_steps(
 # ============================================================================
 
 @router.post("/automation-rules")
-async def create_automation_rule(
+def create_automation_rule(
     rule: Dict[str, Any],
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user)
@@ -368,7 +368,7 @@ async def create_automation_rule(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/automation-rules")
-async def get_automation_rules(
+def get_automation_rules(
     entity_type: Optional[str] = None,
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db),
@@ -413,7 +413,7 @@ async def get_automation_rules(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/automation-rules/process")
-async def process_entity_rules(
+def process_entity_rules(
     entity_data: Dict[str, Any],
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -450,7 +450,7 @@ async def process_entity_rules(
 # ============================================================================
 
 @router.post("/notifications/send")
-async def send_notification(
+def send_notification(
     notification: Dict[str, Any],
     background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
@@ -506,7 +506,7 @@ async def send_notification(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/notifications/queue")
-async def get_notification_queue(
+def get_notification_queue(
     status: Optional[str] = None,
     limit: int = 100,
     db: Session = Depends(get_db),
@@ -562,7 +562,7 @@ async def get_notification_queue(
 # ============================================================================
 
 @router.post("/campaigns")
-async def create_campaign(
+def create_campaign(
     campaign: Dict[str, Any],
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user)
@@ -613,7 +613,7 @@ async def create_campaign(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/campaigns/{campaign_id}/enroll")
-async def enroll_in_campaign(
+def enroll_in_campaign(
     campaign_id: str,
     enrollment: Dict[str, Any],
     db: Session = Depends(get_db),
@@ -697,7 +697,7 @@ async def enroll_in_campaign(
 # ============================================================================
 
 @router.post("/templates/email")
-async def create_email_template(
+def create_email_template(
     template: Dict[str, Any],
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user)
@@ -751,7 +751,7 @@ async def create_email_template(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/templates/email")
-async def get_email_templates(
+def get_email_templates(
     is_active: Optional[bool] = None,
     db: Session = Depends(get_db),
     current_user: Dict[str, Any] = Depends(get_authenticated_user)
@@ -3,7 +3,6 @@ Audit Logging Service
 Tracks all critical operations for compliance and security
 """
 
-import json
 import logging
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -13,6 +12,8 @@ from fastapi import Request
 import hashlib
 import uuid
 
+from services.audit_writer import build_audit_record, get_audit_writer, write_chained
+
 logger = logging.getLogger(__name__)
 
 class AuditService:
@@ -51,7 +52,13 @@ class AuditService:
         severity: str = "INFO",
         request: Optional[Request] = None
     ) -> bool:
-        """Log an audit event to database"""
+        """Log an audit event.
+
+        Rows go through the batched audit writer (services.audit_writer); the
+        synchronous chained insert on ``db`` is only used when the writer is
+        not running, its buffer is full, or a wait-mode event is logged from
+        the event loop thread.
+        """
         try:
             # Extract request information if available
             ip_address = None
@@ -67,56 +74,43 @@ class AuditService:
 
             # Generate event ID
             event_id = str(uuid.uuid4())
+            created_at = datetime.utcnow()
 
             # Prepare details JSON
             event_details = {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": created_at.isoformat(),
                 "event_id": event_id,
                 "severity": severity,
                 **(details or {})
             }
 
-            # Insert audit log
-            db.execute(
-                text("""
-                    INSERT INTO audit_logs (
-                        id, event_type, action, user_id,
-                        resource_type, resource_id,
-                        details, severity,
-                        ip_address, user_agent,
-                        request_method, request_path,
-                        created_at
-                    ) VALUES (
-                        :id, :event_type, :action, :user_id,
-                        :resource_type, :resource_id,
-                        :details::jsonb, :severity,
-                        :ip_address, :user_agent,
-                        :request_method, :request_path,
-                        NOW()
-                    )
-                """),
-                {
-                    "id": event_id,
-                    "event_type": event_type,
-                    "action": action,
-                    "user_id": user_id,
-                    "resource_type": resource_type,
-                    "resource_id": resource_id,
-                    "details": json.dumps(event_details),
-                    "severity": severity,
-                    "ip_address": ip_address,
-                    "user_agent": user_agent,
-                    "request_method": request_method,
-                    "request_path": request_path
-                }
+            record = build_audit_record(
+                event_id=event_id,
+                event_type=event_type,
+                action=action,
+                user_id=user_id,
+                resource_type=resource_type,
+                resource_id=resource_id,
+                details=event_details,
+                severity=severity,
+                ip_address=ip_address,
+                user_agent=user_agent,
+                request_method=request_method,
+                request_path=request_path,
+                created_at=created_at,
             )
-            db.commit()
+
+            accepted = get_audit_writer().submit(record)
+            if accepted is None:
+                # Insert audit log, chained like the writer's batches
+                write_chained(db, record)
+                accepted = True
 
             # Log critical events to application logger
             if severity in ["ERROR", "CRITICAL"]:
                 logger.error(f"Audit Event: {event_type} - {action} - {event_details}")
 
-            return True
+            return accepted
 
         except Exception as e:
             logger.error(f"Failed to log audit event: {e}")
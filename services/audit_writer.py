@@ -0,0 +1,550 @@
+"""
+Batched Audit Log Writer
+Moves ``audit_logs`` inserts off the request path.
+
+- ``AuditService.log_event`` hands the row to an in-memory bounded buffer and
+  returns; a flusher task on the event loop writes the buffer with one
+  multi-row ``INSERT ... SELECT FROM unnest(...)`` when ``batch_size`` rows
+  are waiting or every ``flush_interval`` seconds.
+- Durability is chosen per event type: types listed in ``wait_event_types``
+  (AUTH / SECURITY / DELETE by default) block the calling worker thread until
+  their batch is committed; everything else is fire-and-forget. The flusher
+  runs on the event loop, so a wait-mode row submitted from the loop thread
+  is handed back for a synchronous write; async callers can ``await
+  submit_async`` instead.
+- Rows are hash-chained for tamper evidence. Each flush locks the single
+  ``audit_log_chain_head`` row, numbers its rows from the head's ``seq`` and
+  sets ``row_hash = sha256(prev_hash || canonical row)``, so replicas share
+  one chain and ``verify_chain`` can re-check it from the table.
+- A batch rejected for a row-level data error (an unknown ``user_id``
+  violating ``fk_audit_user``, a bad value) is bisected down to the offending
+  rows: an unknown user is moved into ``details`` and the row retried, any
+  other bad row is dropped alone while the rest of the batch is written.
+- When the writer is not running or the buffer is full, callers fall back to
+  ``write_chained``: a synchronous insert that locks the same chain head, so
+  those rows are part of the chain too.
+- ``stop()`` drains the buffer; it is awaited from the app lifespan before the
+  pool closes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, FrozenSet, Iterable, List, Optional
+
+import asyncpg
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database import get_pool
+from database.pool_manager import PURPOSE_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+GENESIS_HASH = "0" * 64
+
+DEFAULT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+DEFAULT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "20000"))
+DEFAULT_FLUSH_INTERVAL_SECONDS = float(os.getenv("AUDIT_FLUSH_INTERVAL_SECS", "1.0"))
+DEFAULT_WAIT_TIMEOUT_SECONDS = float(os.getenv("AUDIT_WAIT_TIMEOUT_SECS", "5"))
+DEFAULT_WAIT_EVENT_TYPES = os.getenv("AUDIT_WAIT_EVENT_TYPES", "AUTH,SECURITY,DELETE")
+MAX_FLUSH_ATTEMPTS = 3
+
+USER_FOREIGN_KEY = "fk_audit_user"
+
+# Errors caused by the rows themselves: retrying the same batch cannot help.
+_ROW_ERRORS = (asyncpg.exceptions.IntegrityConstraintViolationError, asyncpg.exceptions.DataError)
+
+DURABILITY_ASYNC = "async"
+DURABILITY_WAIT = "wait"
+
+_COLUMNS = (
+    "id",
+    "event_type",
+    "action",
+    "user_id",
+    "resource_type",
+    "resource_id",
+    "details",
+    "severity",
+    "ip_address",
+    "user_agent",
+    "request_method",
+    "request_path",
+    "created_at",
+)
+
+_INSERT = """
+    INSERT INTO audit_logs (
+        id, event_type, action, user_id, resource_type, resource_id,
+        details, severity, ip_address, user_agent, request_method,
+        request_path, created_at, chain_seq, prev_hash, row_hash
+    )
+    SELECT * FROM unnest(
+        $1::uuid[], $2::text[], $3::text[], $4::uuid[], $5::text[], $6::uuid[],
+        $7::jsonb[], $8::text[], $9::inet[], $10::text[], $11::text[],
+        $12::text[], $13::timestamp[], $14::bigint[], $15::text[], $16::text[]
+    )
+"""
+
+_LOCK_HEAD = "SELECT seq, row_hash FROM audit_log_chain_head WHERE id = 1 FOR UPDATE"
+
+_ADVANCE_HEAD = """
+    INSERT INTO audit_log_chain_head (id, seq, row_hash) VALUES (1, {seq}, {row_hash})
+    ON CONFLICT (id) DO UPDATE
+    SET seq = EXCLUDED.seq, row_hash = EXCLUDED.row_hash, updated_at = NOW()
+"""
+
+_INSERT_ONE = """
+    INSERT INTO audit_logs (
+        id, event_type, action, user_id, resource_type, resource_id,
+        details, severity, ip_address, user_agent, request_method,
+        request_path, created_at, chain_seq, prev_hash, row_hash
+    ) VALUES (
+        :id, :event_type, :action, :user_id, :resource_type, :resource_id,
+        CAST(:details AS jsonb), :severity, CAST(:ip_address AS inet), :user_agent, :request_method,
+        :request_path, :created_at, :chain_seq, :prev_hash, :row_hash
+    )
+"""
+
+
+def _parse_list(value: str) -> FrozenSet[str]:
+    return frozenset(item.strip().upper() for item in value.split(",") if item.strip())
+
+
+def _as_uuid(value: Any) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    try:
+        return str(uuid.UUID(str(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_inet(value: Any) -> Optional[str]:
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(str(value)))
+    except ValueError:
+        return None
+
+
+def build_audit_record(
+    *,
+    event_type: str,
+    action: str,
+    details: Dict[str, Any],
+    severity: str,
+    user_id: Any = None,
+    resource_type: Optional[str] = None,
+    resource_id: Any = None,
+    ip_address: Any = None,
+    user_agent: Optional[str] = None,
+    request_method: Optional[str] = None,
+    request_path: Optional[str] = None,
+    event_id: Optional[str] = None,
+    created_at: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Normalise one audit row to the ``audit_logs`` column types.
+
+    ``user_id`` / ``resource_id`` that are not UUIDs are kept in ``details``
+    (``user_ref`` / ``resource_ref``) instead of the UUID columns. A
+    well-formed ``user_id`` with no matching user still violates
+    ``fk_audit_user``; ``AuditWriter`` isolates such rows when flushing.
+    """
+    details = dict(details)
+    user_uuid = _as_uuid(user_id)
+    if user_id not in (None, "") and user_uuid is None:
+        details.setdefault("user_ref", str(user_id))
+    resource_uuid = _as_uuid(resource_id)
+    if resource_id not in (None, "") and resource_uuid is None:
+        details.setdefault("resource_ref", str(resource_id))
+    return {
+        "id": event_id or str(uuid.uuid4()),
+        "event_type": event_type,
+        "action": action,
+        "user_id": user_uuid,
+        "resource_type": resource_type,
+        "resource_id": resource_uuid,
+        "details": json.dumps(details, default=str),
+        "severity": severity,
+        "ip_address": _as_inet(ip_address),
+        "user_agent": user_agent,
+        "request_method": request_method,
+        "request_path": request_path,
+        "created_at": created_at or datetime.utcnow(),
+    }
+
+
+def _canonical(record: Dict[str, Any]) -> str:
+    details = record.get("details")
+    if isinstance(details, str):
+        details = json.loads(details)
+    created_at = record.get("created_at")
+    values = [
+        None if record.get(column) is None else str(record[column])
+        for column in _COLUMNS
+        if column not in ("details", "created_at")
+    ]
+    values.append(created_at.isoformat() if isinstance(created_at, datetime) else created_at)
+    values.append(details)
+    return json.dumps(values, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def chain_hash(prev_hash: str, record: Dict[str, Any]) -> str:
+    return hashlib.sha256((prev_hash + _canonical(record)).encode("utf-8")).hexdigest()
+
+
+def verify_chain(rows: Iterable[Dict[str, Any]], prev_hash: Optional[str] = None) -> Optional[int]:
+    """Re-hash rows ordered by ``chain_seq``; return the first broken ``chain_seq`` or None."""
+    for row in rows:
+        expected_prev = row["prev_hash"] if prev_hash is None else prev_hash
+        if row["prev_hash"] != expected_prev or chain_hash(expected_prev, row) != row["row_hash"]:
+            return row["chain_seq"]
+        prev_hash = row["row_hash"]
+    return None
+
+
+def write_chained(db: Session, record: Dict[str, Any]) -> None:
+    """Insert one row on a SQLAlchemy session, linked into the chain, and commit.
+
+    The fallback when ``AuditWriter`` cannot take the row; it locks the same
+    chain head as the batched writer, so the two never fork the chain.
+    """
+    head = db.execute(text(_LOCK_HEAD)).mappings().first()
+    seq = (head["seq"] if head else 0) + 1
+    prev_hash = head["row_hash"] if head else GENESIS_HASH
+    row_hash = chain_hash(prev_hash, record)
+    db.execute(text(_INSERT_ONE), {**record, "chain_seq": seq, "prev_hash": prev_hash, "row_hash": row_hash})
+    db.execute(text(_ADVANCE_HEAD.format(seq=":seq", row_hash=":row_hash")), {"seq": seq, "row_hash": row_hash})
+    db.commit()
+
+
+@dataclass
+class _Pending:
+    record: Dict[str, Any]
+    future: Optional[concurrent.futures.Future] = None
+    attempts: int = field(default=0)
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        pool: Any = None,
+        *,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_buffer: int = DEFAULT_MAX_BUFFER,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        wait_timeout: float = DEFAULT_WAIT_TIMEOUT_SECONDS,
+        wait_event_types: Iterable[str] = _parse_list(DEFAULT_WAIT_EVENT_TYPES),
+    ):
+        self._pool = pool
+        self.batch_size = max(1, batch_size)
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self.flush_interval = flush_interval
+        self.wait_timeout = wait_timeout
+        self.wait_event_types = frozenset(item.upper() for item in wait_event_types)
+        self._buffer: Deque[_Pending] = deque()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "batches": 0,
+            "flush_failures": 0,
+            "rows_rejected": 0,
+            "users_detached": 0,
+            "dropped": 0,
+            "rejected_full": 0,
+            "wait_timeouts": 0,
+            "handed_back": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done() and not self._stopping
+
+    def durability_for(self, event_type: str) -> str:
+        return DURABILITY_WAIT if (event_type or "").upper() in self.wait_event_types else DURABILITY_ASYNC
+
+    # ------------------------------------------------------------------
+    # Producer side (any thread)
+    # ------------------------------------------------------------------
+
+    def submit(self, record: Dict[str, Any], *, durability: Optional[str] = None) -> Optional[bool]:
+        """Buffer ``record`` for the next flush.
+
+        Returns None when the writer cannot take the row (not running or the
+        buffer is full) so the caller can write it synchronously. Otherwise
+        returns True, or for wait-mode events whether the batch was committed
+        within ``wait_timeout``. A wait-mode row submitted on the event loop
+        thread cannot block on the flusher running there, so it also returns
+        None for the caller's synchronous write.
+        """
+        if not self.running:
+            return None
+        wait = self._waits(record, durability)
+        on_loop = threading.get_ident() == self._loop_thread_id
+        if wait and on_loop:
+            self._stats["handed_back"] += 1
+            return None
+        pending = self._enqueue(record, wait, on_loop)
+        if pending is None:
+            return None
+        if pending.future is None:
+            return True
+        try:
+            return pending.future.result(timeout=self.wait_timeout)
+        except concurrent.futures.TimeoutError:
+            self._stats["wait_timeouts"] += 1
+            return False
+
+    async def submit_async(self, record: Dict[str, Any], *, durability: Optional[str] = None) -> Optional[bool]:
+        """``submit`` for coroutines on the writer's loop: wait-mode rows are awaited, not handed back."""
+        if not self.running:
+            return None
+        pending = self._enqueue(record, self._waits(record, durability), True)
+        if pending is None:
+            return None
+        if pending.future is None:
+            return True
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(pending.future), self.wait_timeout)
+        except asyncio.TimeoutError:
+            self._stats["wait_timeouts"] += 1
+            return False
+
+    def _waits(self, record: Dict[str, Any], durability: Optional[str]) -> bool:
+        return (durability or self.durability_for(record.get("event_type", ""))) == DURABILITY_WAIT
+
+    def _enqueue(self, record: Dict[str, Any], wait: bool, on_loop: bool) -> Optional[_Pending]:
+        pending = _Pending(record, concurrent.futures.Future() if wait else None)
+        with self._lock:
+            if len(self._buffer) >= self.max_buffer:
+                self._stats["rejected_full"] += 1
+                return None
+            self._buffer.append(pending)
+            self._stats["submitted"] += 1
+            full = len(self._buffer) >= self.batch_size
+
+        if full or wait:
+            if on_loop:
+                self._wake.set()
+            else:
+                self._loop.call_soon_threadsafe(self._wake.set)
+        return pending
+
+    # ------------------------------------------------------------------
+    # Flusher (event loop)
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the flusher; must be called from the event loop thread."""
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop accepting rows and drain what is buffered."""
+        task = self._task
+        if task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            await asyncio.wait_for(task, timeout)
+        except asyncio.TimeoutError:
+            task.cancel()
+        self._task = None
+        with self._lock:
+            leftover, self._buffer = list(self._buffer), deque()
+        if leftover:
+            logger.error("Audit writer stopped with %s unwritten events", len(leftover))
+            self._fail(leftover)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if self._stopping:
+                with self._lock:
+                    if not self._buffer:
+                        return
+
+    async def flush(self) -> int:
+        """Write everything currently buffered; returns the number of rows written."""
+        written = 0
+        while True:
+            with self._lock:
+                batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return written
+            written_rows: List[_Pending] = []
+            try:
+                rejected = await self._write_isolating(batch, written_rows)
+            except Exception as exc:
+                self._stats["flush_failures"] += 1
+                logger.error("Failed to write %s audit events: %s", len(batch), exc)
+                self._commit(written_rows)
+                written += len(written_rows)
+                committed = {id(pending) for pending in written_rows}
+                batch = [pending for pending in batch if id(pending) not in committed]
+                for pending in batch:
+                    pending.attempts += 1
+                retry = [pending for pending in batch if pending.attempts < MAX_FLUSH_ATTEMPTS]
+                self._fail([pending for pending in batch if pending.attempts >= MAX_FLUSH_ATTEMPTS])
+                # Requeue in front so the chain keeps submission order.
+                with self._lock:
+                    self._buffer.extendleft(reversed(retry))
+                if not self._stopping:
+                    return written
+                continue
+            self._commit(written_rows)
+            written += len(written_rows)
+            if rejected:
+                self._stats["rows_rejected"] += len(rejected)
+                self._fail(rejected)
+
+    async def _write_isolating(self, batch: List[_Pending], written: List[_Pending]) -> List[_Pending]:
+        """Write ``batch``, bisecting around rows the database rejects.
+
+        Committed rows are appended to ``written``; returns the rejected rows.
+        Errors that are not about the rows (connection loss) propagate.
+        """
+        try:
+            await self._write(batch)
+        except _ROW_ERRORS as exc:
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                rejected = await self._write_isolating(batch[:middle], written)
+                return rejected + await self._write_isolating(batch[middle:], written)
+            if self._detach_unknown_user(batch[0], exc):
+                return await self._write_isolating(batch, written)
+            logger.error("Rejected audit event %s: %s", batch[0].record.get("id"), exc)
+            return batch
+        written.extend(batch)
+        return []
+
+    def _detach_unknown_user(self, pending: _Pending, exc: Exception) -> bool:
+        """Move a ``user_id`` with no users row into ``details`` so the event is kept."""
+        record = pending.record
+        if (
+            not isinstance(exc, asyncpg.exceptions.ForeignKeyViolationError)
+            or getattr(exc, "constraint_name", None) != USER_FOREIGN_KEY
+            or record.get("user_id") is None
+        ):
+            return False
+        details = record.get("details")
+        details = json.loads(details) if isinstance(details, str) else dict(details or {})
+        details.setdefault("user_ref", str(record["user_id"]))
+        record["details"] = json.dumps(details, default=str)
+        record["user_id"] = None
+        self._stats["users_detached"] += 1
+        return True
+
+    def _commit(self, batch: List[_Pending]) -> None:
+        if not batch:
+            return
+        self._stats["written"] += len(batch)
+        self._stats["batches"] += 1
+        for pending in batch:
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_result(True)
+
+    def _fail(self, batch: List[_Pending]) -> None:
+        self._stats["dropped"] += len(batch)
+        for pending in batch:
+            if pending.future is not None and not pending.future.done():
+                pending.future.set_result(False)
+
+    async def _write(self, batch: List[_Pending]) -> None:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                head = await conn.fetchrow(_LOCK_HEAD)
+                seq = head["seq"] if head else 0
+                prev_hash = head["row_hash"] if head else GENESIS_HASH
+                columns: Dict[str, List[Any]] = {column: [] for column in _COLUMNS}
+                seqs: List[int] = []
+                prev_hashes: List[str] = []
+                row_hashes: List[str] = []
+                for pending in batch:
+                    record = pending.record
+                    seq += 1
+                    row_hash = chain_hash(prev_hash, record)
+                    for column in _COLUMNS:
+                        columns[column].append(record.get(column))
+                    seqs.append(seq)
+                    prev_hashes.append(prev_hash)
+                    row_hashes.append(row_hash)
+                    prev_hash = row_hash
+                await conn.execute(_INSERT, *columns.values(), seqs, prev_hashes, row_hashes)
+                await conn.execute(_ADVANCE_HEAD.format(seq="$1", row_hash="$2"), seq, prev_hash)
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            **self._stats,
+            "running": self.running,
+            "buffered": buffered,
+            "batch_size": self.batch_size,
+            "max_buffer": self.max_buffer,
+            "wait_event_types": sorted(self.wait_event_types),
+        }
+
+
+_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter()
+    return _writer
+
+
+def start_audit_writer() -> Optional[AuditWriter]:
+    if os.getenv("AUDIT_WRITER_ENABLED", "true").lower() in ("0", "false", "no"):
+        return None
+    writer = get_audit_writer()
+    writer.start()
+    return writer
+
+
+async def stop_audit_writer() -> None:
+    if _writer is not None:
+        await _writer.stop()
+
+
+def get_audit_writer_stats() -> Dict[str, Any]:
+    return get_audit_writer().stats()
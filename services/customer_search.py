@@ -0,0 +1,284 @@
+"""
+Customer Search Engine
+Shared query building for the customer listing/search endpoints
+(/api/v1/customers, /api/v1/customers/search/advanced and /api/v1/erp/customers).
+
+- Keyset pagination: pages continue from an opaque cursor holding the last
+  row's sort value and id, so page 2,000 costs the same as page 1 instead of
+  scanning and discarding ``OFFSET`` rows.
+- Free-text search goes through ``customers.search_text`` (pg_trgm GIN) and
+  ``customers.search_vector`` (tsvector GIN). Both columns are maintained by a
+  row trigger (migrations/20261016_customer_search_index.sql), so only the
+  changed row is re-indexed on write.
+- Per-customer aggregates (jobs, paid invoices) and tags are computed in
+  LATERAL subqueries, one query per page, instead of GROUP BY over a
+  jobs x invoices fan-out plus one tag query per customer.
+- Totals are planner estimates unless an exact count is requested; a short
+  page still yields an exact total for free.
+
+The three endpoints use different drivers (psycopg2, SQLAlchemy ``text`` and
+asyncpg), so fragments are rendered against a ``Params`` collector that emits
+the matching placeholder style.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+STYLE_PYFORMAT = "pyformat"  # psycopg2: %(p0)s
+STYLE_NAMED = "named"  # SQLAlchemy text(): :p0
+STYLE_NUMERIC = "numeric"  # asyncpg: $1
+
+# Sort keys usable with keyset cursors. Sort expressions must be NOT NULL so
+# the row comparison in ``keyset_condition`` is total: nullable columns are
+# COALESCEd here (with the same default in ``NULLABLE_SORT_DEFAULTS`` for the
+# cursor, and the same expression in the index); aggregate sorts are
+# COALESCEd in ``AGGREGATES_LATERAL``.
+SORT_EXPRESSIONS: Dict[str, str] = {
+    "name": "c.name",
+    "email": "COALESCE(c.email, '')",
+    "created_at": "c.created_at",
+    "updated_at": "c.updated_at",
+    "total_spent": "agg.total_spent",
+    "total_revenue": "agg.total_revenue",
+    "job_count": "agg.job_count",
+}
+AGGREGATE_SORTS = frozenset({"total_spent", "total_revenue", "job_count"})
+NULLABLE_SORT_DEFAULTS: Dict[str, Any] = {"email": ""}
+
+# One row of per-customer aggregates. Each subquery is driven by the
+# customer_id index of its table and only runs for rows that reach it.
+AGGREGATES_LATERAL = """
+    CROSS JOIN LATERAL (
+        SELECT
+            COALESCE(jb.job_count, 0) AS job_count,
+            COALESCE(jb.total_revenue, 0) AS total_revenue,
+            jb.last_job_date,
+            COALESCE(inv.invoice_count, 0) AS invoice_count,
+            COALESCE(inv.total_spent, 0) AS total_spent,
+            GREATEST(jb.last_updated, inv.last_updated) AS last_interaction
+        FROM (
+            SELECT COUNT(*) AS job_count,
+                   SUM(j.total_amount) AS total_revenue,
+                   MAX(j.created_at) AS last_job_date,
+                   MAX(j.updated_at) AS last_updated
+            FROM jobs j
+            WHERE j.customer_id = c.id
+        ) jb,
+        (
+            SELECT COUNT(*) AS invoice_count,
+                   SUM(i.amount) FILTER (WHERE i.status = 'paid') AS total_spent,
+                   MAX(i.updated_at) FILTER (WHERE i.status = 'paid') AS last_updated
+            FROM invoices i
+            WHERE i.customer_id = c.id
+        ) inv
+    ) agg
+"""
+
+TAGS_LATERAL = """
+    LEFT JOIN LATERAL (
+        SELECT COALESCE(array_agg(t.tag ORDER BY t.tag), ARRAY[]::text[]) AS tags
+        FROM customer_tags t
+        WHERE t.customer_id = c.id
+    ) tg ON TRUE
+"""
+
+
+class Params:
+    """Collects bind values and returns the placeholder for each one."""
+
+    def __init__(self, style: str = STYLE_NUMERIC, start: int = 1, prefix: str = "cs"):
+        if style not in (STYLE_PYFORMAT, STYLE_NAMED, STYLE_NUMERIC):
+            raise ValueError(f"Unknown placeholder style: {style}")
+        self.style = style
+        self.prefix = prefix
+        self._start = start
+        self._values: List[Any] = []
+
+    def add(self, value: Any) -> str:
+        self._values.append(value)
+        index = len(self._values) - 1
+        if self.style == STYLE_NUMERIC:
+            return f"${self._start + index}"
+        name = f"{self.prefix}{index}"
+        return f"%({name})s" if self.style == STYLE_PYFORMAT else f":{name}"
+
+    @property
+    def values(self):
+        """Positional list for asyncpg, name -> value mapping otherwise."""
+        if self.style == STYLE_NUMERIC:
+            return list(self._values)
+        return {f"{self.prefix}{index}": value for index, value in enumerate(self._values)}
+
+
+def escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def normalize_term(term: Optional[str]) -> str:
+    return " ".join((term or "").lower().split())
+
+
+def search_condition(term: str, params: Params, alias: str = "c") -> str:
+    """Indexed free-text match over name, email, company and phone.
+
+    The substring match uses the trigram index on ``search_text`` (same
+    results as the old ``LOWER(col) LIKE '%term%'`` chain); the tsquery lets
+    multi-word terms match words in any order via ``search_vector``.
+    """
+    normalized = normalize_term(term)
+    pattern = params.add(f"%{escape_like(normalized)}%")
+    words = params.add(normalized)
+    return (
+        f"({alias}.search_text LIKE {pattern} "
+        f"OR {alias}.search_vector @@ plainto_tsquery('simple', {words}))"
+    )
+
+
+def tags_condition(tags: Sequence[str], params: Params, alias: str = "c") -> str:
+    """Customer has any of ``tags`` (the old in-Python filter, now in SQL)."""
+    placeholder = params.add(list(tags))
+    return (
+        f"EXISTS (SELECT 1 FROM customer_tags ft "
+        f"WHERE ft.customer_id = {alias}.id AND ft.tag = ANY({placeholder}))"
+    )
+
+
+def sort_expression(sort_by: str, default: str = "created_at") -> Tuple[str, str]:
+    key = sort_by if sort_by in SORT_EXPRESSIONS else default
+    return key, SORT_EXPRESSIONS[key]
+
+
+def order_clause(sort_expr: str, descending: bool, alias: str = "c") -> str:
+    direction = "DESC" if descending else "ASC"
+    return f"ORDER BY {sort_expr} {direction}, {alias}.id {direction}"
+
+
+def keyset_condition(
+    sort_expr: str,
+    descending: bool,
+    value: Any,
+    row_id: str,
+    params: Params,
+    alias: str = "c",
+) -> str:
+    """Rows strictly after ``(value, row_id)`` in ``order_clause`` order."""
+    operator = "<" if descending else ">"
+    return f"({sort_expr}, {alias}.id) {operator} ({params.add(value)}, {params.add(row_id)})"
+
+
+# ---------------------------------------------------------------------------
+# Cursors
+# ---------------------------------------------------------------------------
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "n" in value:
+            return Decimal(value["n"])
+        raise ValueError("unknown cursor value")
+    return value
+
+
+def encode_cursor(sort_by: str, descending: bool, value: Any, row_id: Any) -> str:
+    payload = {"s": sort_by, "o": "desc" if descending else "asc", "v": _encode_value(value), "id": str(row_id)}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str, descending: bool) -> Tuple[Any, str]:
+    """Return ``(sort_value, id)``; 400 if the cursor is malformed or was
+    issued for a different sort."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["s"] != sort_by or payload["o"] != ("desc" if descending else "asc"):
+            raise ValueError("cursor sort mismatch")
+        return _decode_value(payload["v"]), str(payload["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid or expired cursor") from exc
+
+
+def split_page(
+    rows: Sequence[Any],
+    limit: int,
+    sort_by: str,
+    descending: bool,
+    sort_field: Optional[str] = None,
+) -> Tuple[List[Any], Optional[str]]:
+    """Trim a ``limit + 1`` fetch to one page and build the next cursor."""
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+    last = page[-1]
+    value = last[sort_field or sort_by]
+    if value is None:
+        # Same value the COALESCEd sort expression compared on.
+        value = NULLABLE_SORT_DEFAULTS.get(sort_by)
+    return page, encode_cursor(sort_by, descending, value, last["id"])
+
+
+# ---------------------------------------------------------------------------
+# Counts
+# ---------------------------------------------------------------------------
+
+def count_sql(from_where: str) -> str:
+    return f"SELECT COUNT(*) {from_where}"
+
+
+def estimate_sql(from_where: str) -> str:
+    return f"EXPLAIN (FORMAT JSON) SELECT 1 {from_where}"
+
+
+def parse_plan_rows(plan: Any) -> int:
+    """Top-level row estimate from ``EXPLAIN (FORMAT JSON)`` output.
+
+    asyncpg returns the JSON as text; psycopg2 has already decoded it.
+    """
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    if isinstance(plan, (list, tuple)) and plan and not isinstance(plan[0], dict):
+        plan = plan[0]
+        if isinstance(plan, (str, bytes)):
+            plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def resolve_total(
+    estimate: Optional[int],
+    exact: Optional[int],
+    offset: Optional[int],
+    fetched: int,
+    limit: int,
+) -> Tuple[int, bool]:
+    """Pick the total to report and whether it is an estimate.
+
+    ``offset`` is None on cursor pages, where the position is unknown.
+    """
+    if exact is not None:
+        return exact, False
+    if offset is not None and fetched <= limit and (offset == 0 or fetched > 0):
+        # The last page tells us the exact size without a count query.
+        return offset + fetched, False
+    floor = (offset or 0) + fetched
+    return max(int(estimate or 0), floor), True
@@ -1,26 +1,83 @@
-"""Email templating, rate limiting, and bounce tracking service."""
+"""Email templating, rate limiting, and bounce tracking service.
+
+The send path does no per-message schema or rate-limit queries:
+
+- tables are verified once (at startup, or on first use) instead of running
+  ``CREATE TABLE IF NOT EXISTS`` on every call; creating them is left to the
+  migration and only falls back to runtime DDL where that is allowed;
+- each tenant's send rate is an in-process token bucket, reconciled with the
+  ``email_send_events`` count at most every ``reconcile_interval`` seconds so
+  other replicas' sends still count;
+- templates are parsed once and cached per tenant for ``template_cache_ttl``;
+- ``queue_send_many`` checks bounces for all recipients in one query and
+  inserts every send event in one ``unnest`` round trip.
+"""
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
+import string
+import time
 import uuid
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 import asyncpg
 from fastapi import HTTPException
 
 from core.request_safety import sanitize_payload, sanitize_text
+from services.notifications import TokenBucket
 
 logger = logging.getLogger(__name__)
 
+EMAIL_TABLES = ("email_templates", "email_send_events", "email_bounces")
+DEFAULT_RECONCILE_INTERVAL_SECONDS = float(os.getenv("EMAIL_RATE_RECONCILE_SECS", "30"))
+DEFAULT_TEMPLATE_CACHE_TTL_SECONDS = float(os.getenv("EMAIL_TEMPLATE_CACHE_TTL_SECS", "300"))
+TEMPLATE_CACHE_SIZE = 1024
+MAX_BATCH_RECIPIENTS = 5000
+
+_FORMATTER = string.Formatter()
+
 
 class _SafeTemplateMap(dict):
     def __missing__(self, key: str) -> str:
         return ""
 
 
+class _CompiledTemplate:
+    """A ``str.format_map`` template parsed once into literal/field segments."""
+
+    __slots__ = ("segments",)
+
+    def __init__(self, source: str):
+        self.segments = list(_FORMATTER.parse(source))
+
+    def render(self, mapping: Dict[str, Any]) -> str:
+        parts: List[str] = []
+        for literal, field, spec, conversion in self.segments:
+            parts.append(literal)
+            if field is None:
+                continue
+            value, _ = _FORMATTER.get_field(field, (), mapping)
+            if conversion:
+                value = _FORMATTER.convert_field(value, conversion)
+            if spec and "{" in spec:
+                spec = _FORMATTER.vformat(spec, (), mapping)
+            parts.append(_FORMATTER.format_field(value, spec or ""))
+        return "".join(parts)
+
+
+@dataclass
+class _TemplateSet:
+    subject: _CompiledTemplate
+    html: _CompiledTemplate
+    text: Optional[_CompiledTemplate]
+
+
 @dataclass
 class RenderedEmail:
     subject: str
@@ -31,10 +88,56 @@ class RenderedEmail:
 class EmailEngine:
     """Provides template management and safe send orchestration."""
 
-    def __init__(self, max_emails_per_minute: int = 60):
+    def __init__(
+        self,
+        max_emails_per_minute: int = 60,
+        reconcile_interval: float = DEFAULT_RECONCILE_INTERVAL_SECONDS,
+        template_cache_ttl: float = DEFAULT_TEMPLATE_CACHE_TTL_SECONDS,
+    ):
         self.max_emails_per_minute = max(1, max_emails_per_minute)
+        self.reconcile_interval = reconcile_interval
+        self.template_cache_ttl = template_cache_ttl
+        self._schema_ready = False
+        self._schema_lock = asyncio.Lock()
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._reconciled_at: Dict[str, float] = {}
+        self._templates: "OrderedDict[Tuple[str, str], Tuple[float, _TemplateSet]]" = OrderedDict()
+        self._stats = {
+            "rate_reconciliations": 0,
+            "rate_limited": 0,
+            "template_cache_hits": 0,
+            "template_cache_misses": 0,
+        }
+
+    async def verify_schema(self, conn: asyncpg.Connection) -> None:
+        """Check once per process that the email tables exist.
+
+        Missing tables are created only where runtime DDL is allowed; otherwise
+        the migration has to be applied and sends fail with 503.
+        """
+        if self._schema_ready:
+            return
+        async with self._schema_lock:
+            if self._schema_ready:
+                return
+            row = await conn.fetchrow(
+                "SELECT "
+                + ", ".join(f"to_regclass('{table}') IS NOT NULL AS {table}" for table in EMAIL_TABLES)
+            )
+            missing = [table for table in EMAIL_TABLES if not row[table]]
+            if missing:
+                try:
+                    await self.ensure_tables(conn)
+                except RuntimeError as exc:
+                    logger.error("Email tables missing (%s): %s", ", ".join(missing), exc)
+                    raise HTTPException(status_code=503, detail="Email tables are not provisioned") from exc
+            self._schema_ready = True
 
     async def ensure_tables(self, conn: asyncpg.Connection) -> None:
+        """Create the email tables (guarded by the runtime DDL kill-switch)."""
+        from brainops_ai_os._resilience import assert_no_runtime_ddl
+
+        assert_no_runtime_ddl("CREATE TABLE IF NOT EXISTS email_templates")
         await conn.execute(
             """
             CREATE TABLE IF NOT EXISTS email_templates (
@@ -91,6 +194,12 @@ class EmailEngine:
                 ON email_bounces(tenant_id, recipient_email)
             """
         )
+        await conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_email_bounces_tenant_lower_email
+                ON email_bounces(tenant_id, lower(recipient_email))
+            """
+        )
 
     async def upsert_template(
         self,
@@ -103,7 +212,7 @@ class EmailEngine:
         text_template: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        await self.ensure_tables(conn)
+        await self.verify_schema(conn)
 
         clean_metadata = sanitize_payload(metadata or {})
         clean_template_name = sanitize_text(template_name, max_length=255)
@@ -133,13 +242,38 @@ class EmailEngine:
             json.dumps(clean_metadata),
         )
 
+        self.invalidate_template(tenant_id, clean_template_name)
         return {
             "id": str(row["id"]),
             "template_name": row["template_name"],
             "updated_at": row["updated_at"],
         }
 
-    async def _assert_rate_limit(self, conn: asyncpg.Connection, tenant_id: str) -> None:
+    # ------------------------------------------------------------------
+    # Rate limiting
+    # ------------------------------------------------------------------
+
+    def _bucket(self, tenant_id: str) -> TokenBucket:
+        bucket = self._buckets.get(tenant_id)
+        if bucket is None:
+            bucket = self._buckets[tenant_id] = TokenBucket(
+                rate=self.max_emails_per_minute / 60.0,
+                capacity=self.max_emails_per_minute,
+            )
+        return bucket
+
+    async def _reconcile_rate(self, conn: asyncpg.Connection, tenant_id: str, bucket: TokenBucket) -> None:
+        """Lower the tenant's bucket to what the DB says is left this minute.
+
+        Runs on the first send for a tenant and then at most every
+        ``reconcile_interval`` seconds, so sends from other replicas (or from
+        before a restart) still count against the limit.
+        """
+        now = time.monotonic()
+        last = self._reconciled_at.get(tenant_id)
+        if last is not None and now - last < self.reconcile_interval:
+            return
+        self._reconciled_at[tenant_id] = now
         sent_last_minute = await conn.fetchval(
             """
             SELECT COUNT(*)
@@ -150,12 +284,20 @@ class EmailEngine:
             """,
             tenant_id,
         )
+        bucket.set_available(self.max_emails_per_minute - (sent_last_minute or 0))
+        self._stats["rate_reconciliations"] += 1
 
-        if (sent_last_minute or 0) >= self.max_emails_per_minute:
-            raise HTTPException(
-                status_code=429,
-                detail="Email send rate limit exceeded",
-            )
+    async def _take_send_tokens(self, conn: asyncpg.Connection, tenant_id: str, count: int) -> int:
+        """Grant up to ``count`` sends for ``tenant_id`` without a per-send query."""
+        bucket = self._bucket(tenant_id)
+        await self._reconcile_rate(conn, tenant_id, bucket)
+        granted = bucket.take(count)
+        self._stats["rate_limited"] += count - granted
+        return granted
+
+    # ------------------------------------------------------------------
+    # Bounces
+    # ------------------------------------------------------------------
 
     async def is_bounce_suppressed(
         self,
@@ -165,29 +307,59 @@ class EmailEngine:
         recipient_email: str,
         bounce_threshold: int = 3,
     ) -> bool:
-        await self.ensure_tables(conn)
-        bounce_count = await conn.fetchval(
+        await self.verify_schema(conn)
+        suppressed = await self._suppressed_recipients(
+            conn,
+            tenant_id=tenant_id,
+            recipient_emails=[recipient_email],
+            bounce_threshold=bounce_threshold,
+        )
+        return recipient_email.lower() in suppressed
+
+    async def _suppressed_recipients(
+        self,
+        conn: asyncpg.Connection,
+        *,
+        tenant_id: str,
+        recipient_emails: Sequence[str],
+        bounce_threshold: int = 3,
+    ) -> Set[str]:
+        """Return the lower-cased addresses with at least ``bounce_threshold`` bounces."""
+        if not recipient_emails:
+            return set()
+        rows = await conn.fetch(
             """
-            SELECT COUNT(*)
+            SELECT lower(recipient_email) AS recipient_email
             FROM email_bounces
             WHERE tenant_id = $1
-              AND lower(recipient_email) = lower($2)
+              AND lower(recipient_email) = ANY($2::text[])
+            GROUP BY lower(recipient_email)
+            HAVING COUNT(*) >= $3
             """,
             tenant_id,
-            recipient_email,
+            sorted({email.lower() for email in recipient_emails}),
+            bounce_threshold,
         )
-        return (bounce_count or 0) >= bounce_threshold
+        return {row["recipient_email"] for row in rows}
 
-    async def render_template(
+    # ------------------------------------------------------------------
+    # Templates
+    # ------------------------------------------------------------------
+
+    async def _compiled_template(
         self,
         conn: asyncpg.Connection,
-        *,
         tenant_id: str,
         template_name: str,
-        context: Optional[Dict[str, Any]] = None,
-    ) -> RenderedEmail:
-        await self.ensure_tables(conn)
-
+    ) -> _TemplateSet:
+        key = (tenant_id, template_name)
+        cached = self._templates.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._templates.move_to_end(key)
+            self._stats["template_cache_hits"] += 1
+            return cached[1]
+
+        self._stats["template_cache_misses"] += 1
         template = await conn.fetchrow(
             """
             SELECT subject_template, html_template, text_template
@@ -200,15 +372,45 @@ class EmailEngine:
         if not template:
             raise HTTPException(status_code=404, detail="Email template not found")
 
-        clean_context = sanitize_payload(context or {})
-        mapper = _SafeTemplateMap(clean_context)
-
+        compiled = _TemplateSet(
+            subject=_CompiledTemplate(template["subject_template"]),
+            html=_CompiledTemplate(template["html_template"]),
+            text=_CompiledTemplate(template["text_template"]) if template["text_template"] else None,
+        )
+        self._templates[key] = (time.monotonic() + self.template_cache_ttl, compiled)
+        self._templates.move_to_end(key)
+        while len(self._templates) > TEMPLATE_CACHE_SIZE:
+            self._templates.popitem(last=False)
+        return compiled
+
+    def invalidate_template(self, tenant_id: str, template_name: str) -> None:
+        self._templates.pop((tenant_id, template_name), None)
+
+    @staticmethod
+    def _render(template: _TemplateSet, context: Dict[str, Any]) -> RenderedEmail:
+        mapper = _SafeTemplateMap(context)
         return RenderedEmail(
-            subject=template["subject_template"].format_map(mapper),
-            html_body=template["html_template"].format_map(mapper),
-            text_body=(template["text_template"].format_map(mapper) if template["text_template"] else None),
+            subject=template.subject.render(mapper),
+            html_body=template.html.render(mapper),
+            text_body=template.text.render(mapper) if template.text else None,
         )
 
+    async def render_template(
+        self,
+        conn: asyncpg.Connection,
+        *,
+        tenant_id: str,
+        template_name: str,
+        context: Optional[Dict[str, Any]] = None,
+    ) -> RenderedEmail:
+        await self.verify_schema(conn)
+        template = await self._compiled_template(conn, tenant_id, template_name)
+        return self._render(template, sanitize_payload(context or {}))
+
+    # ------------------------------------------------------------------
+    # Sending
+    # ------------------------------------------------------------------
+
     async def queue_send(
         self,
         conn: asyncpg.Connection,
@@ -220,8 +422,7 @@ class EmailEngine:
         provider: str = "resend",
     ) -> Dict[str, Any]:
         """Queue a send event with template rendering and tenant rate limiting."""
-        await self.ensure_tables(conn)
-        await self._assert_rate_limit(conn, tenant_id)
+        await self.verify_schema(conn)
 
         email = sanitize_text(recipient_email, max_length=255)
         if not email:
@@ -230,12 +431,14 @@ class EmailEngine:
         if await self.is_bounce_suppressed(conn, tenant_id=tenant_id, recipient_email=email):
             raise HTTPException(status_code=409, detail="Recipient is suppressed due to repeated bounces")
 
-        rendered = await self.render_template(
-            conn,
-            tenant_id=tenant_id,
-            template_name=template_name,
-            context=context,
-        )
+        clean_context = sanitize_payload(context or {})
+        rendered = self._render(await self._compiled_template(conn, tenant_id, template_name), clean_context)
+
+        if not await self._take_send_tokens(conn, tenant_id, 1):
+            raise HTTPException(
+                status_code=429,
+                detail="Email send rate limit exceeded",
+            )
 
         event_id = str(uuid.uuid4())
         await conn.execute(
@@ -256,7 +459,7 @@ class EmailEngine:
                 {
                     "subject": rendered.subject,
                     "text_body": rendered.text_body,
-                    "context": sanitize_payload(context or {}),
+                    "context": clean_context,
                 }
             ),
         )
@@ -271,6 +474,111 @@ class EmailEngine:
             "text_body": rendered.text_body,
         }
 
+    async def queue_send_many(
+        self,
+        conn: asyncpg.Connection,
+        *,
+        tenant_id: str,
+        template_name: str,
+        recipients: Sequence[Dict[str, Any]],
+        provider: str = "resend",
+        bounce_threshold: int = 3,
+    ) -> Dict[str, Any]:
+        """Queue one template to many recipients in a single insert.
+
+        ``recipients`` is a list of ``{"recipient_email": ..., "context": {...}}``.
+        Duplicate addresses are sent once; suppressed, invalid and over-limit
+        recipients are reported under ``skipped`` rather than failing the batch.
+        """
+        await self.verify_schema(conn)
+        if len(recipients) > MAX_BATCH_RECIPIENTS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {MAX_BATCH_RECIPIENTS} recipients per batch",
+            )
+
+        template = await self._compiled_template(conn, tenant_id, template_name)
+
+        skipped: List[Dict[str, str]] = []
+        pending: List[Tuple[str, Dict[str, Any]]] = []
+        seen: Set[str] = set()
+        for recipient in recipients:
+            raw_email = recipient.get("recipient_email")
+            email = sanitize_text(raw_email, max_length=255)
+            if not email:
+                skipped.append({"recipient_email": str(raw_email or ""), "reason": "invalid"})
+                continue
+            if email.lower() in seen:
+                skipped.append({"recipient_email": email, "reason": "duplicate"})
+                continue
+            seen.add(email.lower())
+            pending.append((email, sanitize_payload(recipient.get("context") or {})))
+
+        suppressed = await self._suppressed_recipients(
+            conn,
+            tenant_id=tenant_id,
+            recipient_emails=[email for email, _ in pending],
+            bounce_threshold=bounce_threshold,
+        )
+        if suppressed:
+            skipped.extend(
+                {"recipient_email": email, "reason": "suppressed"}
+                for email, _ in pending
+                if email.lower() in suppressed
+            )
+            pending = [item for item in pending if item[0].lower() not in suppressed]
+
+        granted = await self._take_send_tokens(conn, tenant_id, len(pending)) if pending else 0
+        skipped.extend({"recipient_email": email, "reason": "rate_limited"} for email, _ in pending[granted:])
+        pending = pending[:granted]
+
+        event_ids: List[str] = []
+        emails: List[str] = []
+        metadata: List[str] = []
+        queued: List[Dict[str, Any]] = []
+        for email, context in pending:
+            rendered = self._render(template, context)
+            event_id = str(uuid.uuid4())
+            event_ids.append(event_id)
+            emails.append(email)
+            metadata.append(
+                json.dumps(
+                    {
+                        "subject": rendered.subject,
+                        "text_body": rendered.text_body,
+                        "context": context,
+                    }
+                )
+            )
+            queued.append({"event_id": event_id, "recipient_email": email, "subject": rendered.subject})
+
+        if event_ids:
+            await conn.execute(
+                """
+                INSERT INTO email_send_events (
+                    id, tenant_id, recipient_email, template_name,
+                    provider, status, metadata, created_at
+                )
+                SELECT e.id, $1, e.recipient_email, $2, $3, 'queued', e.metadata, NOW()
+                FROM unnest($4::uuid[], $5::text[], $6::jsonb[]) AS e(id, recipient_email, metadata)
+                """,
+                tenant_id,
+                template_name,
+                provider,
+                event_ids,
+                emails,
+                metadata,
+            )
+
+        return {
+            "status": "queued",
+            "provider": provider,
+            "queued_count": len(queued),
+            "skipped_count": len(skipped),
+            "queued": queued,
+            "skipped": skipped,
+        }
+
     async def record_bounce(
         self,
         conn: asyncpg.Connection,
@@ -281,7 +589,7 @@ class EmailEngine:
         provider_event_id: Optional[str],
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
-        await self.ensure_tables(conn)
+        await self.verify_schema(conn)
 
         bounce_id = str(uuid.uuid4())
         await conn.execute(
@@ -307,5 +615,14 @@ class EmailEngine:
             "recipient_email": recipient_email,
         }
 
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "schema_verified": self._schema_ready,
+            "max_emails_per_minute": self.max_emails_per_minute,
+            "tenants_tracked": len(self._buckets),
+            "templates_cached": len(self._templates),
+            **self._stats,
+        }
+
 
 email_engine = EmailEngine()
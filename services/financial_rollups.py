@@ -0,0 +1,557 @@
+"""
+Financial Rollups
+Daily per-tenant ledger aggregates behind the financial reporting endpoints
+(/reports/summary, profit-loss, revenue, expenses, accounts-receivable,
+cash-flow, kpi, tax, trends).
+
+Three tables, maintained by ``migrations/20261016_financial_rollups.sql``:
+
+- ``financial_revenue_daily``: invoice count / totals / paid / unpaid per
+  (tenant, day, job category).
+- ``financial_ledger_daily``: job cost parts and collections per (tenant, day).
+- ``financial_ar_open``: open invoice count and balance per
+  (tenant, created day, due date), so AR aging for any as-of date and the
+  current date is a small grouped read.
+
+Statement-level triggers on invoices, invoice_payments and job_costs apply every
+write as a signed delta, and ``rebuild_financial_rollups()`` recomputes tenants
+from the raw tables. Both take per-tenant advisory locks (shared for deltas,
+exclusive for the rebuild), so a rebuild only holds back writers of the tenants
+in its current batch. ``FinancialRollups.run`` calls it nightly (at
+``FINANCIAL_ROLLUP_REBUILD_HOUR`` UTC) to correct what deltas cannot see: a
+job's category changing after it was invoiced, or payments removed by an invoice
+delete cascade. The full pass runs under a session advisory lock, so only one
+instance rebuilds per night.
+
+Each report figure has a ``raw_*`` and a ``rollup_*`` function returning the
+same shape and the same numbers (checked by the parity suite in
+``tests/integration/test_financial_rollup_parity.py``). Reads use the rollups
+and fall back to the raw queries while the tables are not migrated.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+
+from database import get_pool
+from database.pool_manager import PURPOSE_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REBUILD_HOUR = int(os.getenv("FINANCIAL_ROLLUP_REBUILD_HOUR", "3"))
+DEFAULT_REBUILD_BATCH = int(os.getenv("FINANCIAL_ROLLUP_REBUILD_BATCH", "100"))
+# Session advisory lock held by the instance running the full rebuild.
+REBUILD_LOCK_KEY = 7_240_161_023
+
+Period = Tuple[date, date]
+
+
+def _tenant(tenant_id: str) -> uuid.UUID:
+    return uuid.UUID(str(tenant_id))
+
+
+def _day_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(start_date, datetime.min.time()), datetime.combine(end_date, datetime.max.time())
+
+
+def _float(value: Any) -> float:
+    return float(value) if value else 0
+
+
+# ---------------------------------------------------------------------------
+# Revenue
+# ---------------------------------------------------------------------------
+
+_RAW_REVENUE = """
+    SELECT
+        COUNT(*) AS transaction_count,
+        SUM(total_amount) AS total_revenue,
+        SUM(CASE WHEN status = 'paid' THEN total_amount ELSE 0 END) AS collected_revenue,
+        SUM(CASE WHEN status != 'paid' THEN total_amount ELSE 0 END) AS pending_revenue,
+        AVG(total_amount) AS avg_transaction_value
+    FROM invoices
+    WHERE created_at >= $2 AND created_at <= $3
+        AND status != 'cancelled'
+        AND tenant_id = $1
+"""
+
+_RAW_REVENUE_CATEGORIES = """
+    SELECT
+        COALESCE(j.job_type, 'Other') AS category,
+        COUNT(i.id) AS count,
+        SUM(i.total_amount) AS amount
+    FROM invoices i
+    LEFT JOIN jobs j ON i.job_id = j.id
+    WHERE i.created_at >= $2 AND i.created_at <= $3
+        AND i.status != 'cancelled'
+        AND i.tenant_id = $1
+    GROUP BY 1
+    ORDER BY 1
+"""
+
+_ROLLUP_REVENUE = """
+    SELECT
+        COALESCE(SUM(invoice_count), 0)::bigint AS transaction_count,
+        SUM(total_amount) AS total_revenue,
+        SUM(paid_amount) AS collected_revenue,
+        SUM(unpaid_amount) AS pending_revenue,
+        SUM(total_amount) / NULLIF(SUM(amount_count), 0) AS avg_transaction_value
+    FROM financial_revenue_daily
+    WHERE tenant_id = $1 AND day >= $2 AND day <= $3
+"""
+
+# Deltas can leave a (day, category) row at zero; the raw query has no such group.
+_ROLLUP_REVENUE_CATEGORIES = """
+    SELECT category, SUM(invoice_count)::bigint AS count, SUM(total_amount) AS amount
+    FROM financial_revenue_daily
+    WHERE tenant_id = $1 AND day >= $2 AND day <= $3
+    GROUP BY category
+    HAVING SUM(invoice_count) > 0
+    ORDER BY category
+"""
+
+
+def _revenue(result: Any, categories: Sequence[Any]) -> Dict[str, Any]:
+    return {
+        "total": _float(result["total_revenue"]),
+        "collected": _float(result["collected_revenue"]),
+        "pending": _float(result["pending_revenue"]),
+        "transaction_count": result["transaction_count"] or 0,
+        "avg_value": _float(result["avg_transaction_value"]),
+        "by_category": [
+            {"category": cat["category"], "count": cat["count"], "amount": _float(cat["amount"])}
+            for cat in categories
+        ],
+    }
+
+
+async def raw_revenue(conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+    args = (_tenant(tenant_id), *_day_range(start_date, end_date))
+    return _revenue(await conn.fetchrow(_RAW_REVENUE, *args), await conn.fetch(_RAW_REVENUE_CATEGORIES, *args))
+
+
+async def rollup_revenue(conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+    args = (_tenant(tenant_id), start_date, end_date)
+    return _revenue(
+        await conn.fetchrow(_ROLLUP_REVENUE, *args), await conn.fetch(_ROLLUP_REVENUE_CATEGORIES, *args)
+    )
+
+
+# ---------------------------------------------------------------------------
+# Expenses and cash flow
+# ---------------------------------------------------------------------------
+
+_RAW_EXPENSES = """
+    SELECT
+        COUNT(*) AS expense_count,
+        SUM(material_cost + labor_cost + other_costs) AS total_expenses,
+        SUM(material_cost) AS material_expenses,
+        SUM(labor_cost) AS labor_expenses,
+        SUM(other_costs) AS other_expenses
+    FROM job_costs
+    WHERE created_at >= $2 AND created_at <= $3 AND tenant_id = $1
+"""
+
+_ROLLUP_EXPENSES = """
+    SELECT
+        COALESCE(SUM(expense_count), 0)::bigint AS expense_count,
+        SUM(expense_total) AS total_expenses,
+        SUM(material_cost) AS material_expenses,
+        SUM(labor_cost) AS labor_expenses,
+        SUM(other_costs) AS other_expenses
+    FROM financial_ledger_daily
+    WHERE tenant_id = $1 AND day >= $2 AND day <= $3
+"""
+
+_RAW_COLLECTIONS = """
+    SELECT SUM(p.amount) AS total
+    FROM invoice_payments p
+    JOIN invoices i ON i.id = p.invoice_id
+    WHERE i.tenant_id = $1 AND p.payment_date >= $2 AND p.payment_date <= $3
+"""
+
+_RAW_COST_OUTFLOW = """
+    SELECT SUM(material_cost + labor_cost + other_costs) AS total
+    FROM job_costs
+    WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+"""
+
+_ROLLUP_CASH_FLOW = """
+    SELECT SUM(collections) AS collections, SUM(expense_total) AS payments
+    FROM financial_ledger_daily
+    WHERE tenant_id = $1 AND day >= $2 AND day <= $3
+"""
+
+
+def _expenses(result: Any) -> Dict[str, Any]:
+    return {
+        "total": _float(result["total_expenses"]),
+        "materials": _float(result["material_expenses"]),
+        "labor": _float(result["labor_expenses"]),
+        "other": _float(result["other_expenses"]),
+        "count": result["expense_count"] or 0,
+    }
+
+
+async def raw_expenses(conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+    return _expenses(await conn.fetchrow(_RAW_EXPENSES, _tenant(tenant_id), *_day_range(start_date, end_date)))
+
+
+async def rollup_expenses(conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+    return _expenses(await conn.fetchrow(_ROLLUP_EXPENSES, _tenant(tenant_id), start_date, end_date))
+
+
+async def raw_cash_flow(conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, float]:
+    collections = await conn.fetchrow(_RAW_COLLECTIONS, _tenant(tenant_id), start_date, end_date)
+    payments = await conn.fetchrow(_RAW_COST_OUTFLOW, _tenant(tenant_id), *_day_range(start_date, end_date))
+    return {"collections": _float(collections["total"]), "payments": _float(payments["total"])}
+
+
+async def rollup_cash_flow(conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, float]:
+    row = await conn.fetchrow(_ROLLUP_CASH_FLOW, _tenant(tenant_id), start_date, end_date)
+    return {"collections": _float(row["collections"]), "payments": _float(row["payments"])}
+
+
+# ---------------------------------------------------------------------------
+# Accounts receivable
+# ---------------------------------------------------------------------------
+
+_AGING_COLUMNS = """
+    SUM(CASE WHEN days <= 0 THEN balance_cents ELSE 0 END) / 100.0 AS current,
+    SUM(CASE WHEN days BETWEEN 1 AND 30 THEN balance_cents ELSE 0 END) / 100.0 AS days_1_30,
+    SUM(CASE WHEN days BETWEEN 31 AND 60 THEN balance_cents ELSE 0 END) / 100.0 AS days_31_60,
+    SUM(CASE WHEN days BETWEEN 61 AND 90 THEN balance_cents ELSE 0 END) / 100.0 AS days_61_90,
+    SUM(CASE WHEN days > 90 THEN balance_cents ELSE 0 END) / 100.0 AS days_over_90,
+    SUM(balance_cents) / 100.0 AS total
+"""
+
+_RAW_AR_AGING = f"""
+    SELECT {_AGING_COLUMNS}, AVG(days) AS avg_days
+    FROM (
+        SELECT CURRENT_DATE - due_date AS days, balance_cents
+        FROM invoices
+        WHERE status NOT IN ('paid', 'cancelled')
+            AND tenant_id = $1
+            AND created_at <= $2
+    ) open_invoices
+"""
+
+# One row per (created day, due date): weight the average by invoice count.
+_ROLLUP_AR_AGING = f"""
+    SELECT
+        {_AGING_COLUMNS},
+        SUM(days * invoice_count)::numeric
+            / NULLIF(SUM(invoice_count) FILTER (WHERE days IS NOT NULL), 0) AS avg_days
+    FROM (
+        SELECT CURRENT_DATE - NULLIF(due_date, 'infinity'::date) AS days, invoice_count, balance_cents
+        FROM financial_ar_open
+        WHERE tenant_id = $1 AND created_day <= $2
+    ) open_invoices
+"""
+
+_RAW_AR_OUTSTANDING = """
+    SELECT
+        SUM(balance_cents) / 100.0 AS total_ar,
+        AVG(CURRENT_DATE - due_date) AS avg_days_outstanding
+    FROM invoices
+    WHERE status NOT IN ('paid', 'cancelled') AND tenant_id = $1
+"""
+
+_ROLLUP_AR_OUTSTANDING = """
+    SELECT
+        SUM(balance_cents) / 100.0 AS total_ar,
+        SUM(days * invoice_count)::numeric
+            / NULLIF(SUM(invoice_count) FILTER (WHERE days IS NOT NULL), 0) AS avg_days_outstanding
+    FROM (
+        SELECT CURRENT_DATE - NULLIF(due_date, 'infinity'::date) AS days, invoice_count, balance_cents
+        FROM financial_ar_open
+        WHERE tenant_id = $1
+    ) open_invoices
+"""
+
+AGING_BUCKETS = ("current", "days_1_30", "days_31_60", "days_61_90", "days_over_90", "total", "avg_days")
+
+
+def _aging(row: Any) -> Dict[str, float]:
+    return {bucket: _float(row[bucket]) for bucket in AGING_BUCKETS}
+
+
+def _outstanding(row: Any) -> Dict[str, float]:
+    return {"total_ar": _float(row["total_ar"]), "avg_days_outstanding": _float(row["avg_days_outstanding"])}
+
+
+async def raw_ar_aging(conn: Any, tenant_id: str, as_of_date: date) -> Dict[str, float]:
+    as_of = datetime.combine(as_of_date, datetime.max.time())
+    return _aging(await conn.fetchrow(_RAW_AR_AGING, _tenant(tenant_id), as_of))
+
+
+async def rollup_ar_aging(conn: Any, tenant_id: str, as_of_date: date) -> Dict[str, float]:
+    return _aging(await conn.fetchrow(_ROLLUP_AR_AGING, _tenant(tenant_id), as_of_date))
+
+
+async def raw_ar_outstanding(conn: Any, tenant_id: str) -> Dict[str, float]:
+    return _outstanding(await conn.fetchrow(_RAW_AR_OUTSTANDING, _tenant(tenant_id)))
+
+
+async def rollup_ar_outstanding(conn: Any, tenant_id: str) -> Dict[str, float]:
+    return _outstanding(await conn.fetchrow(_ROLLUP_AR_OUTSTANDING, _tenant(tenant_id)))
+
+
+# ---------------------------------------------------------------------------
+# Trends
+# ---------------------------------------------------------------------------
+
+# Every period in one round-trip instead of two queries per period.
+_ROLLUP_TRENDS = """
+    SELECT p.idx, rev.revenue, rev.transactions, led.expenses
+    FROM unnest($2::date[], $3::date[]) WITH ORDINALITY AS p(start_day, end_day, idx)
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(SUM(r.total_amount), 0) AS revenue, COALESCE(SUM(r.invoice_count), 0)::bigint AS transactions
+        FROM financial_revenue_daily r
+        WHERE r.tenant_id = $1 AND r.day >= p.start_day AND r.day <= p.end_day
+    ) rev
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(SUM(l.expense_total), 0) AS expenses
+        FROM financial_ledger_daily l
+        WHERE l.tenant_id = $1 AND l.day >= p.start_day AND l.day <= p.end_day
+    ) led
+    ORDER BY p.idx
+"""
+
+
+async def raw_trends(conn: Any, tenant_id: str, periods: Sequence[Period]) -> List[Dict[str, Any]]:
+    trends = []
+    for start_date, end_date in periods:
+        revenue = await raw_revenue(conn, tenant_id, start_date, end_date)
+        expenses = await raw_expenses(conn, tenant_id, start_date, end_date)
+        trends.append({
+            "revenue": revenue["total"],
+            "expenses": expenses["total"],
+            "transactions": revenue["transaction_count"],
+        })
+    return trends
+
+
+async def rollup_trends(conn: Any, tenant_id: str, periods: Sequence[Period]) -> List[Dict[str, Any]]:
+    if not periods:
+        return []
+    rows = await conn.fetch(
+        _ROLLUP_TRENDS,
+        _tenant(tenant_id),
+        [start for start, _ in periods],
+        [end for _, end in periods],
+    )
+    return [
+        {"revenue": _float(row["revenue"]), "expenses": _float(row["expenses"]), "transactions": row["transactions"]}
+        for row in rows
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+_REBUILD_TENANTS = """
+    SELECT tenant_id FROM financial_revenue_daily
+    UNION SELECT tenant_id FROM financial_ledger_daily
+    UNION SELECT tenant_id FROM financial_ar_open
+    UNION SELECT tenant_id FROM invoices WHERE tenant_id IS NOT NULL
+    UNION SELECT tenant_id FROM job_costs WHERE tenant_id IS NOT NULL
+"""
+
+
+def seconds_until_rebuild(now: datetime, hour: int) -> float:
+    """Seconds from ``now`` (UTC) to the next ``hour``:00 UTC."""
+    target = now.replace(hour=hour % 24, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class FinancialRollups:
+    """Rollup-backed report reads (raw fallback) plus the nightly rebuild."""
+
+    def __init__(
+        self,
+        pool: Any = None,
+        *,
+        rebuild_hour: int = DEFAULT_REBUILD_HOUR,
+        batch_size: int = DEFAULT_REBUILD_BATCH,
+    ):
+        self._pool = pool
+        self.rebuild_hour = rebuild_hour
+        self.batch_size = max(batch_size, 1)
+        self._running = False
+        self._wake = asyncio.Event()
+        self._table_available = True
+        self._stats: Dict[str, Any] = {
+            "rollup_reads": 0,
+            "raw_reads": 0,
+            "rebuilds": 0,
+            "rebuilds_skipped_locked": 0,
+            "rebuilt_tenants": 0,
+            "deadlock_retries": 0,
+            "errors": 0,
+            "last_rebuild_ms": 0.0,
+            "last_rebuild_at": None,
+        }
+
+    async def _read(self, rollup: Callable[..., Awaitable[Any]], raw: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        if self._table_available:
+            try:
+                result = await rollup(*args)
+                self._stats["rollup_reads"] += 1
+                return result
+            except asyncpg.exceptions.UndefinedTableError:
+                logger.warning("Financial rollup tables missing; reports are computed from raw rows")
+                self._table_available = False
+        self._stats["raw_reads"] += 1
+        return await raw(*args)
+
+    async def revenue(self, conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+        return await self._read(rollup_revenue, raw_revenue, conn, tenant_id, start_date, end_date)
+
+    async def expenses(self, conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, Any]:
+        return await self._read(rollup_expenses, raw_expenses, conn, tenant_id, start_date, end_date)
+
+    async def cash_flow(self, conn: Any, tenant_id: str, start_date: date, end_date: date) -> Dict[str, float]:
+        return await self._read(rollup_cash_flow, raw_cash_flow, conn, tenant_id, start_date, end_date)
+
+    async def ar_aging(self, conn: Any, tenant_id: str, as_of_date: date) -> Dict[str, float]:
+        return await self._read(rollup_ar_aging, raw_ar_aging, conn, tenant_id, as_of_date)
+
+    async def ar_outstanding(self, conn: Any, tenant_id: str) -> Dict[str, float]:
+        return await self._read(rollup_ar_outstanding, raw_ar_outstanding, conn, tenant_id)
+
+    async def trends(self, conn: Any, tenant_id: str, periods: Sequence[Period]) -> List[Dict[str, Any]]:
+        return await self._read(rollup_trends, raw_trends, conn, tenant_id, periods)
+
+    async def rebuild(self, tenant_ids: Optional[Sequence[str]] = None) -> int:
+        """Recompute rollups from the raw tables, ``batch_size`` tenants per transaction.
+
+        ``tenant_ids=None`` rebuilds every tenant with raw rows or rollup rows,
+        unless another instance is already doing so. Returns the number of
+        tenants rebuilt.
+        """
+        started = time.perf_counter()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            if tenant_ids is not None:
+                tenants = [_tenant(tenant_id) for tenant_id in tenant_ids]
+                await self._rebuild_tenants(conn, tenants)
+            else:
+                # One full rebuild at a time across instances.
+                if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", REBUILD_LOCK_KEY):
+                    self._stats["rebuilds_skipped_locked"] += 1
+                    return 0
+                try:
+                    tenants = [row["tenant_id"] for row in await conn.fetch(_REBUILD_TENANTS)]
+                    await self._rebuild_tenants(conn, tenants)
+                finally:
+                    await conn.execute("SELECT pg_advisory_unlock($1)", REBUILD_LOCK_KEY)
+        self._stats["rebuilds"] += 1
+        self._stats["rebuilt_tenants"] = len(tenants)
+        self._stats["last_rebuild_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        self._stats["last_rebuild_at"] = datetime.now(timezone.utc).isoformat()
+        return len(tenants)
+
+    async def _rebuild_tenants(self, conn: Any, tenants: List[uuid.UUID]) -> None:
+        for offset in range(0, len(tenants), self.batch_size):
+            await self._rebuild_batch(conn, tenants[offset:offset + self.batch_size])
+
+    async def _rebuild_batch(self, conn: Any, tenants: List[uuid.UUID]) -> None:
+        # The rebuild locks the batch's tenants in order; a writer transaction that
+        # touches several tenants across statements can still deadlock with it,
+        # so retry once.
+        for attempt in range(2):
+            try:
+                async with conn.transaction():
+                    await conn.execute("SELECT rebuild_financial_rollups($1::uuid[])", tenants)
+                return
+            except asyncpg.exceptions.DeadlockDetectedError:
+                if attempt:
+                    raise
+                self._stats["deadlock_retries"] += 1
+
+    async def run(self) -> None:
+        """Rebuild every night at ``rebuild_hour`` UTC until ``stop()``."""
+        self._running = True
+        logger.info("Financial rollup rebuild scheduled daily at %02d:00 UTC", self.rebuild_hour)
+        try:
+            while self._running:
+                self._wake.clear()
+                delay = seconds_until_rebuild(datetime.now(timezone.utc), self.rebuild_hour)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                if not self._running:
+                    break
+                try:
+                    await self.rebuild()
+                except Exception as exc:
+                    self._stats["errors"] += 1
+                    logger.error("Financial rollup rebuild failed: %s", exc)
+        finally:
+            logger.info("Financial rollup rebuild stopped")
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._running,
+            "rebuild_hour_utc": self.rebuild_hour,
+            "rollup_tables": self._table_available,
+        }
+
+
+_rollups: Optional[FinancialRollups] = None
+_rollups_task: Optional[asyncio.Task] = None
+
+
+def get_financial_rollups() -> FinancialRollups:
+    global _rollups
+    if _rollups is None:
+        _rollups = FinancialRollups()
+    return _rollups
+
+
+def start_financial_rollup_rebuild() -> Optional[asyncio.Task]:
+    global _rollups_task
+    if os.getenv("FINANCIAL_ROLLUP_REBUILD", "true").lower() in ("0", "false", "no"):
+        return None
+    if _rollups_task is None or _rollups_task.done():
+        _rollups_task = asyncio.create_task(get_financial_rollups().run())
+    return _rollups_task
+
+
+async def stop_financial_rollup_rebuild() -> None:
+    global _rollups_task
+    task, _rollups_task = _rollups_task, None
+    if task is None:
+        return
+    get_financial_rollups().stop()
+    try:
+        await asyncio.wait_for(task, timeout=30)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        task.cancel()
+
+
+def get_financial_rollup_stats() -> Dict[str, Any]:
+    return get_financial_rollups().stats()
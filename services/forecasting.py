@@ -0,0 +1,853 @@
+"""
+Forecasting Engine
+Batched time-series forecasts and anomaly scores for the predictive analytics
+endpoints (/forecast/revenue, /predict/demand, /predict/churn, /anomalies).
+
+Every tenant's series is a row of one dense ``(tenants, periods)`` matrix and
+all of the maths below runs on whole matrices with numpy:
+
+- ``seasonal_decompose``: outlier-cleaned classical decomposition (centred
+  moving-average trend, per-phase seasonal indices, residuals).
+- ``holt_winters``: additive, damped-trend exponential smoothing. Seasonal
+  indices start from the decomposition; series shorter than two seasons fall
+  back to Holt (no seasonality). Intervals come from the one-step-ahead error.
+- ``robust_scores``: modified z-scores ``0.6745 * (x - median) / MAD`` of the
+  decomposition residuals, so one spike cannot inflate the spread the way it
+  does a mean/stdev z-score.
+- ``churn_scores``: the customer churn rules applied to whole columns.
+
+``ForecastEngine.refresh`` runs one query per kind across all tenants, scores
+everything in a single pass and upserts one ``forecast_snapshots`` row per
+(tenant, kind); a session advisory lock keeps it to one instance at a time.
+Endpoints serve those snapshots; a tenant with no snapshot, or
+one older than ``max_age_seconds``, is computed on its own and persisted.
+
+Only complete periods are modelled: the current month / week / day is still
+filling up and would read as a drop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+import warnings
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from itertools import compress
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import asyncpg
+import numpy as np
+
+from database import get_pool
+from database.pool_manager import PURPOSE_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_TABLE = "forecast_snapshots"
+
+KIND_REVENUE = "revenue"
+KIND_DEMAND = "demand"
+KIND_ANOMALIES = "anomalies"
+KIND_CHURN = "churn"
+KINDS = (KIND_REVENUE, KIND_DEMAND, KIND_ANOMALIES, KIND_CHURN)
+
+DEFAULT_REFRESH_SECONDS = float(os.getenv("FORECAST_REFRESH_SECS", "3600"))
+DEFAULT_MAX_AGE_SECONDS = float(os.getenv("FORECAST_SNAPSHOT_MAX_AGE_SECS", "21600"))
+# Session advisory lock held by the instance running the all-tenant refresh.
+REFRESH_LOCK_KEY = 7_240_161_022
+
+REVENUE_HISTORY_MONTHS = 36
+REVENUE_HORIZON_MONTHS = 36
+DEMAND_HISTORY_WEEKS = 26
+DEMAND_HORIZON_WEEKS = 53
+ANOMALY_HISTORY_DAYS = 90
+ANOMALY_REPORT_DAYS = 30
+
+# Smoothing constants (level, trend, season, damping). Fixed rather than fitted
+# per tenant so a refresh stays one pass over the matrix.
+DEFAULT_ALPHA = 0.4
+DEFAULT_BETA = 0.1
+DEFAULT_GAMMA = 0.3
+DEFAULT_PHI = 0.9
+
+_MAD_SCALE = 0.6745
+# Mean absolute deviation fallback when more than half the residuals are equal.
+_MEAN_AD_SCALE = 1.253314
+# Modified z-score above which a point is replaced before the final decomposition.
+_CLEAN_THRESHOLD = 3.5
+
+# Series queries return the period as an integer index (see the calendar
+# helpers below) so rows go straight into numpy without date parsing.
+_TENANT_FILTER = "($1::text[] IS NULL OR tenant_id::text = ANY($1::text[]))"
+
+_REVENUE_QUERY = f"""
+    SELECT tenant_id::text AS tenant_id,
+           EXTRACT(YEAR FROM created_at)::int * 12 + EXTRACT(MONTH FROM created_at)::int - 1 AS period,
+           SUM(COALESCE(total_amount, 0))::float8 AS value
+    FROM invoices
+    WHERE {_TENANT_FILTER}
+      AND (status = 'paid' OR payment_status = 'paid')
+      AND created_at >= $2
+      AND created_at < $3
+    GROUP BY 1, 2
+"""
+
+_DAILY_REVENUE_QUERY = f"""
+    SELECT tenant_id::text AS tenant_id,
+           created_at::date - DATE '0001-01-01' + 1 AS period,
+           SUM(COALESCE(total_amount, 0))::float8 AS value
+    FROM invoices
+    WHERE {_TENANT_FILTER}
+      AND (status = 'paid' OR payment_status = 'paid')
+      AND created_at >= $2
+      AND created_at < $3
+    GROUP BY 1, 2
+"""
+
+_DEMAND_QUERY = f"""
+    SELECT tenant_id::text AS tenant_id,
+           (created_at::date - DATE '0001-01-01') / 7 AS period,
+           COUNT(*)::float8 AS value
+    FROM jobs
+    WHERE {_TENANT_FILTER}
+      AND created_at >= $2
+      AND created_at < $3
+    GROUP BY 1, 2
+"""
+
+# Sessions and invoices are aggregated separately: joining both to customers
+# multiplies session counts by the customer's invoice count.
+_CHURN_QUERY = """
+    SELECT c.tenant_id::text AS tenant_id,
+           EXTRACT(DAY FROM NOW() - s.last_session)::int AS days_since_login,
+           COALESCE(i.overdue_invoices, 0)::int AS overdue_invoices,
+           COALESCE(s.session_count, 0)::int AS session_count
+    FROM customers c
+    LEFT JOIN (
+        SELECT user_id, MAX(created_at) AS last_session, COUNT(*) AS session_count
+        FROM user_sessions
+        GROUP BY user_id
+    ) s ON s.user_id = c.id
+    LEFT JOIN (
+        SELECT customer_id, tenant_id, COUNT(*) AS overdue_invoices
+        FROM invoices
+        WHERE status = 'overdue'
+        GROUP BY customer_id, tenant_id
+    ) i ON i.customer_id = c.id AND i.tenant_id = c.tenant_id
+    WHERE ($1::text[] IS NULL OR c.tenant_id::text = ANY($1::text[]))
+"""
+
+_UPSERT = f"""
+    INSERT INTO {SNAPSHOT_TABLE} (tenant_id, kind, payload, computed_at)
+    SELECT r.tenant_id, r.kind, r.payload, NOW()
+    FROM jsonb_to_recordset($1::jsonb) AS r(tenant_id text, kind text, payload jsonb)
+    ON CONFLICT (tenant_id, kind) DO UPDATE
+    SET payload = EXCLUDED.payload,
+        computed_at = EXCLUDED.computed_at
+"""
+
+
+# ----------------------------------------------------------------------
+# Calendar helpers
+# ----------------------------------------------------------------------
+def month_index(value: date) -> int:
+    return value.year * 12 + value.month - 1
+
+
+def month_start(index: int) -> date:
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def day_index(value: date) -> int:
+    return value.toordinal()
+
+
+def week_index(value: date) -> int:
+    # date(1, 1, 1) is a Monday, so weeks start on Mondays like DATE_TRUNC('week', ...).
+    return (value.toordinal() - 1) // 7
+
+
+def week_start(index: int) -> date:
+    return date.fromordinal(index * 7 + 1)
+
+
+@dataclass(frozen=True)
+class SeriesSpec:
+    """One kind of series: its query, calendar and model settings."""
+
+    kind: str
+    query: str
+    index: Callable[[date], int]
+    to_date: Callable[[int], date]
+    history: int
+    period: Optional[int]
+
+    def window(self, today: date) -> Tuple[int, datetime, datetime]:
+        """Last complete period index and the ``[start, end)`` query bounds."""
+        end = self.index(today) - 1
+        start_date = self.to_date(end - self.history + 1)
+        end_date = self.to_date(end + 1)
+        return (
+            end,
+            datetime.combine(start_date, datetime.min.time()),
+            datetime.combine(end_date, datetime.min.time()),
+        )
+
+
+REVENUE_SERIES = SeriesSpec(
+    KIND_REVENUE, _REVENUE_QUERY, month_index, month_start, REVENUE_HISTORY_MONTHS, 12
+)
+DAILY_REVENUE_SERIES = SeriesSpec(
+    KIND_ANOMALIES, _DAILY_REVENUE_QUERY, day_index, date.fromordinal, ANOMALY_HISTORY_DAYS, 7
+)
+DEMAND_SERIES = SeriesSpec(
+    KIND_DEMAND, _DEMAND_QUERY, week_index, week_start, DEMAND_HISTORY_WEEKS, None
+)
+
+
+# ----------------------------------------------------------------------
+# Vectorised maths
+# ----------------------------------------------------------------------
+def build_series_matrix(rows: Sequence[Any], end: int, length: int) -> Tuple[List[str], np.ndarray]:
+    """Long ``(tenant_id, period, value)`` rows -> tenants and a ``(n, length)`` matrix.
+
+    Column ``length - 1`` is period ``end``. Periods before a tenant's first
+    observation are NaN (the series has not started); gaps after it are zero
+    (nothing was invoiced / booked).
+    """
+    count = len(rows)
+    columns = np.fromiter((row["period"] for row in rows), dtype=np.int64, count=count) - (end - length + 1)
+    values = np.fromiter((row["value"] or 0.0 for row in rows), dtype=float, count=count)
+    keep = (columns >= 0) & (columns < length)
+    tenant_ids = np.asarray([str(row["tenant_id"]) for row in rows], dtype=object)[keep]
+    if not len(tenant_ids):
+        return [], np.zeros((0, length))
+    tenants, positions = np.unique(tenant_ids.astype(str), return_inverse=True)
+    columns = columns[keep]
+
+    matrix = np.zeros((len(tenants), length))
+    np.add.at(matrix, (positions, columns), values[keep])
+    first = np.full(len(tenants), length)
+    np.minimum.at(first, positions, columns)
+    matrix[np.arange(length)[None, :] < first[:, None]] = np.nan
+    return tenants.tolist(), matrix
+
+
+def observed_counts(matrix: np.ndarray) -> np.ndarray:
+    return np.sum(~np.isnan(matrix), axis=1)
+
+
+def _fill_edges(matrix: np.ndarray) -> np.ndarray:
+    """Carry the nearest non-NaN value of each row outwards (forward, then backward)."""
+    n, t = matrix.shape
+    columns = np.arange(t)
+    valid = ~np.isnan(matrix)
+    forward = np.where(valid, columns, 0)
+    np.maximum.accumulate(forward, axis=1, out=forward)
+    filled = matrix[np.arange(n)[:, None], forward]
+    backward = np.where(~np.isnan(filled), columns, t - 1)
+    backward = np.minimum.accumulate(backward[:, ::-1], axis=1)[:, ::-1]
+    return filled[np.arange(n)[:, None], backward]
+
+
+def _by_phase(matrix: np.ndarray, period: int) -> np.ndarray:
+    """``(n, t)`` -> ``(n, cycles, period)``, NaN-padded at the end; column ``c`` has phase ``c % period``."""
+    n, t = matrix.shape
+    cycles = -(-t // period)
+    padded = np.full((n, cycles * period), np.nan)
+    padded[:, :t] = matrix
+    return padded.reshape(n, cycles, period)
+
+
+def _decompose_once(
+    matrix: np.ndarray, period: Optional[int], robust: bool
+) -> Tuple[np.ndarray, np.ndarray]:
+    n, t = matrix.shape
+    observed = ~np.isnan(matrix)
+    seasonal_period = period if period and period >= 2 and t > period else None
+    if seasonal_period and seasonal_period % 2 == 0:
+        width = seasonal_period + 1
+        weights = np.r_[0.5, np.ones(seasonal_period - 1), 0.5] / seasonal_period
+    else:
+        width = seasonal_period or max(min(t // 4, 3), 1) * 2 + 1
+        weights = np.ones(width) / width
+
+    trend = np.full((n, t), np.nan)
+    with warnings.catch_warnings():
+        # Rows too short for any window are all-NaN slices.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        if n and t >= width:
+            windows = np.lib.stride_tricks.sliding_window_view(matrix, width, axis=1)
+            half = width // 2
+            centre = np.median(windows, axis=2) if robust else windows @ weights
+            trend[:, half:half + windows.shape[1]] = centre
+            trend = _fill_edges(trend)
+        # Series too short for one full window are centred on their median instead.
+        flat = np.isnan(trend).all(axis=1) & observed.any(axis=1)
+        if flat.any():
+            trend[flat] = np.nanmedian(matrix[flat], axis=1)[:, None]
+        trend = np.where(observed, trend, np.nan)
+
+        seasonal = np.zeros((n, t))
+        if seasonal_period:
+            detrended = _by_phase(matrix - trend, seasonal_period)
+            counts = np.sum(~np.isnan(detrended), axis=1)
+            reducer = np.nanmedian if robust else np.nanmean
+            indices = np.nan_to_num(reducer(detrended, axis=1))
+            # Every phase needs at least two cycles of evidence to count as seasonal.
+            has_cycles = (counts >= 2).all(axis=1, keepdims=True)
+            if not robust:
+                indices = indices - indices.mean(axis=1, keepdims=True)
+            seasonal = np.where(has_cycles, indices, 0.0)[:, np.arange(t) % seasonal_period]
+    return trend, np.where(observed, seasonal, np.nan)
+
+
+def seasonal_decompose(matrix: np.ndarray, period: Optional[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Additive decomposition of every row: ``(trend, seasonal, residual)``.
+
+    Two passes. A moving-median trend with per-phase median indices finds
+    gross outliers (modified z-score above ``_CLEAN_THRESHOLD``), which are
+    replaced by their expected value. The classical decomposition then runs on
+    the cleaned series: centred moving-average trend (``2 x period`` for even
+    periods, extended flat to the edges) and mean detrended value per phase,
+    centred to sum to zero. A spike therefore neither drags its neighbours'
+    trend nor its phase's index, and stays in the residual where it is scored.
+    Phases are aligned to the matrix columns, which share one calendar.
+    """
+    trend, seasonal = _decompose_once(matrix, period, robust=True)
+    expected = trend + seasonal
+    outliers = np.abs(np.nan_to_num(robust_scores(matrix - expected))) > _CLEAN_THRESHOLD
+    cleaned = np.where(outliers, expected, matrix)
+    trend, seasonal = _decompose_once(cleaned, period, robust=False)
+    return trend, seasonal, matrix - trend - seasonal
+
+
+def robust_scores(residual: np.ndarray) -> np.ndarray:
+    """Modified z-scores per row (median / MAD); NaN stays NaN."""
+    if residual.size == 0:
+        return residual.copy()
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        # Rows without any residual (series too short) are all-NaN slices.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(residual, axis=1, keepdims=True)
+        deviation = np.abs(residual - median)
+        mad = np.nanmedian(deviation, axis=1, keepdims=True)
+        mean_ad = np.nanmean(deviation, axis=1, keepdims=True)
+        scores = np.where(
+            mad > 0,
+            _MAD_SCALE * (residual - median) / mad,
+            (residual - median) / (_MEAN_AD_SCALE * mean_ad),
+        )
+    return np.where(np.isfinite(scores), scores, np.where(np.isnan(residual), np.nan, 0.0))
+
+
+def holt_winters(
+    matrix: np.ndarray,
+    period: Optional[int],
+    horizon: int,
+    *,
+    alpha: float = DEFAULT_ALPHA,
+    beta: float = DEFAULT_BETA,
+    gamma: float = DEFAULT_GAMMA,
+    phi: float = DEFAULT_PHI,
+    seasonal: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Damped additive Holt-Winters over every row at once.
+
+    Returns ``(forecast, sigma, seasonal_used)``: ``forecast`` is
+    ``(n, horizon)``, ``sigma`` the RMS one-step-ahead error per row and
+    ``seasonal_used`` whether a row was modelled with seasonality. Each row
+    starts at its first observation; ``seasonal`` (from
+    ``seasonal_decompose``) seeds the seasonal indices.
+    """
+    n, t = matrix.shape
+    period = period if period and period >= 2 else 1
+    observed = ~np.isnan(matrix)
+    start = np.where(observed.any(axis=1), observed.argmax(axis=1), t)
+    use_season = (observed_counts(matrix) >= 2 * period) & (period > 1)
+
+    season = np.zeros((n, period))
+    if seasonal is not None and period > 1 and t:
+        last_cycle = seasonal[:, max(t - period, 0):]
+        phases = np.arange(max(t - period, 0), t) % period
+        season[:, phases] = np.nan_to_num(last_cycle)
+    season[~use_season] = 0.0
+
+    level = np.zeros(n)
+    trend = np.zeros(n)
+    sq_error = np.zeros(n)
+    errors = np.zeros(n)
+    g = np.where(use_season, gamma, 0.0)
+    for step in range(t):
+        y = matrix[:, step]
+        phase = step % period
+        s = season[:, phase]
+        first = start == step
+        active = (start < step) & observed[:, step]
+
+        level = np.where(first, y - s, level)
+        predicted = level + phi * trend + s
+        error = y - predicted
+        new_level = alpha * (y - s) + (1 - alpha) * (level + phi * trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+        new_season = g * (y - new_level) + (1 - g) * s
+
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+        season[:, phase] = np.where(active, new_season, s)
+        sq_error += np.where(active, error * error, 0.0)
+        errors += active
+
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(phi ** steps)
+    forecast = level[:, None] + trend[:, None] * damping[None, :]
+    forecast += season[:, (t - 1 + steps) % period]
+    with np.errstate(invalid="ignore"):
+        sigma = np.sqrt(np.where(errors > 0, sq_error / np.maximum(errors, 1), 0.0))
+    forecast[start >= t] = np.nan
+    return forecast, sigma, use_season
+
+
+def interval(forecast: np.ndarray, sigma: np.ndarray, z: float = 1.96) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """``(lower, upper, confidence)`` with the spread growing as ``sqrt(h)``."""
+    horizon = forecast.shape[1]
+    half_width = z * sigma[:, None] * np.sqrt(np.arange(1, horizon + 1))[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        confidence = np.clip(1.0 - half_width / (np.abs(forecast) + half_width), 0.0, 1.0)
+    confidence = np.where(half_width == 0, 1.0, confidence)
+    return forecast - half_width, forecast + half_width, confidence
+
+
+def growth_rates(matrix: np.ndarray) -> np.ndarray:
+    """Mean month-over-month growth per row, over periods with prior revenue."""
+    if matrix.shape[1] < 2:
+        return np.zeros(matrix.shape[0])
+    previous, current = matrix[:, :-1], matrix[:, 1:]
+    valid = (previous > 0) & ~np.isnan(current)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = np.where(valid, (current - previous) / previous, 0.0)
+    count = valid.sum(axis=1)
+    return np.where(count > 0, rates.sum(axis=1) / np.maximum(count, 1), 0.0)
+
+
+def churn_scores(days_since_login: np.ndarray, overdue_invoices: np.ndarray, session_count: np.ndarray) -> np.ndarray:
+    """Churn probability per customer (NaN ``days_since_login`` = never logged in)."""
+    days = np.nan_to_num(np.asarray(days_since_login, dtype=float), nan=999.0)
+    overdue = np.asarray(overdue_invoices, dtype=float)
+    sessions = np.asarray(session_count, dtype=float)
+    score = np.where(days >= 30, 40, np.where(days >= 14, 20, 0))
+    score = score + np.where(sessions < 3, 15, 0)
+    score = score + np.where(overdue > 0, np.minimum(30, overdue * 10), 0)
+    return np.clip(score, 0, 100) / 100.0
+
+
+def churn_risk_factors(days_since_login: Optional[int], overdue_invoices: int, session_count: int) -> List[Dict[str, Any]]:
+    days = 999 if days_since_login is None else days_since_login
+    factors: List[Dict[str, Any]] = []
+    if days >= 30:
+        factors.append({"factor": "no_recent_login", "impact": 0.4})
+    elif days >= 14:
+        factors.append({"factor": "low_recent_login", "impact": 0.2})
+    if session_count < 3:
+        factors.append({"factor": "low_engagement", "impact": 0.15})
+    if overdue_invoices > 0:
+        factors.append({"factor": "payment_issues", "impact": 0.3})
+    return factors
+
+
+def risk_level(probability: float) -> str:
+    if probability >= 0.7:
+        return "high"
+    if probability >= 0.4:
+        return "medium"
+    return "low"
+
+
+def anomaly_threshold(sensitivity: float, points: int = ANOMALY_REPORT_DAYS) -> float:
+    """Score threshold at which ``points`` normal days raise no alarm with probability ``sensitivity``.
+
+    Two-sided normal quantile with a Bonferroni correction over the reported
+    window (0.95 -> 3.14, 0.99 -> 3.59 for 30 days), so the default setting
+    flags about one false anomaly in twenty months rather than one a month.
+    """
+    sensitivity = min(max(sensitivity, 0.5), 0.9999)
+    return NormalDist().inv_cdf(1 - (1 - sensitivity) / (2 * max(points, 1)))
+
+
+# ----------------------------------------------------------------------
+# Snapshot payloads
+# ----------------------------------------------------------------------
+def revenue_payloads(tenants: List[str], matrix: np.ndarray, end: int) -> Dict[str, Dict[str, Any]]:
+    counts = observed_counts(matrix)
+    _, seasonal, _ = seasonal_decompose(matrix, REVENUE_SERIES.period)
+    forecast, sigma, seasonal_used = holt_winters(
+        matrix, REVENUE_SERIES.period, REVENUE_HORIZON_MONTHS, seasonal=seasonal
+    )
+    forecast = np.maximum(forecast, 0.0)
+    lower, upper, confidence = interval(forecast, sigma)
+    columns = {
+        "predicted_revenue": np.round(forecast, 2),
+        "lower": np.round(np.maximum(lower, 0.0), 2),
+        "upper": np.round(upper, 2),
+        "confidence": np.round(confidence, 3),
+    }
+    history = np.round(matrix, 2)
+    growth = np.round(growth_rates(matrix), 4)
+    length = matrix.shape[1]
+    first = length - counts
+    history_months = [month_start(end - length + 1 + i).strftime("%Y-%m") for i in range(length)]
+    forecast_months = [month_start(end + h).strftime("%Y-%m") for h in range(1, REVENUE_HORIZON_MONTHS + 1)]
+
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for row, tenant_id in enumerate(tenants):
+        # Series have no gaps after their first period (see build_series_matrix).
+        historical = {"month": history_months[first[row]:], "revenue": history[row, first[row]:].tolist()}
+        if counts[row] < 2:
+            payloads[tenant_id] = {**_empty_payload(KIND_REVENUE), "historical": historical}
+            continue
+        payloads[tenant_id] = {
+            "available": True,
+            "model": "holt_winters" if seasonal_used[row] else "holt",
+            "avg_monthly_growth_rate": float(growth[row]),
+            "historical": historical,
+            "predictions": {"month": forecast_months, **{k: v[row].tolist() for k, v in columns.items()}},
+        }
+    return payloads
+
+
+def demand_payloads(tenants: List[str], matrix: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    forecast, sigma, _ = holt_winters(matrix, None, DEMAND_HORIZON_WEEKS)
+    forecast = np.maximum(forecast, 0.0)
+    _, _, confidence = interval(forecast, sigma)
+    demand = np.rint(forecast).astype(int)
+    confidence = np.round(confidence, 3)
+    return {
+        tenant_id: {
+            "available": True,
+            "predicted_demand": demand[row].tolist(),
+            "confidence": confidence[row].tolist(),
+        }
+        for row, tenant_id in enumerate(tenants)
+    }
+
+
+def anomaly_payloads(tenants: List[str], matrix: np.ndarray, end: int) -> Dict[str, Dict[str, Any]]:
+    counts = observed_counts(matrix)
+    trend, seasonal, residual = seasonal_decompose(matrix, DAILY_REVENUE_SERIES.period)
+    length = matrix.shape[1]
+    report = slice(max(length - ANOMALY_REPORT_DAYS, 0), length)
+    columns = {
+        "expected_value": np.round((trend + seasonal)[:, report], 2),
+        "actual_value": np.round(matrix[:, report], 2),
+        "score": np.round(robust_scores(residual)[:, report], 3),
+    }
+    present = ~np.isnan(columns["score"])
+    complete = present.all(axis=1)
+    lists = {key: values.tolist() for key, values in columns.items()}
+    days = [date.fromordinal(end - length + 1 + i).isoformat() for i in range(length)][report]
+
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for row, tenant_id in enumerate(tenants):
+        if counts[row] < 5:
+            payloads[tenant_id] = _empty_payload(KIND_ANOMALIES)
+        elif complete[row]:
+            payloads[tenant_id] = {"timestamp": days, **{key: values[row] for key, values in lists.items()}}
+        else:
+            # Days before the tenant's first invoice have no score.
+            mask = present[row].tolist()
+            payloads[tenant_id] = {
+                "timestamp": list(compress(days, mask)),
+                **{key: list(compress(values[row], mask)) for key, values in lists.items()},
+            }
+    return payloads
+
+
+def churn_payloads(rows: Sequence[Any]) -> Dict[str, Dict[str, Any]]:
+    if not rows:
+        return {}
+    tenant_ids = [str(row["tenant_id"]) for row in rows]
+    tenants, inverse = np.unique(np.asarray(tenant_ids), return_inverse=True)
+    days = np.array([np.nan if row["days_since_login"] is None else row["days_since_login"] for row in rows], dtype=float)
+    overdue = np.array([row["overdue_invoices"] or 0 for row in rows], dtype=float)
+    sessions = np.array([row["session_count"] or 0 for row in rows], dtype=float)
+    probability = churn_scores(days, overdue, sessions)
+
+    size = len(tenants)
+    total = np.bincount(inverse, minlength=size)
+    high = np.bincount(inverse, weights=(probability >= 0.7).astype(float), minlength=size)
+    medium = np.bincount(inverse, weights=((probability >= 0.4) & (probability < 0.7)).astype(float), minlength=size)
+    sums = np.bincount(inverse, weights=probability, minlength=size)
+    return {
+        str(tenant_id): {
+            "total_customers_analyzed": int(total[i]),
+            "high_risk": int(high[i]),
+            "medium_risk": int(medium[i]),
+            "low_risk": int(total[i] - high[i] - medium[i]),
+            "avg_churn_probability": round(float(sums[i] / total[i]), 3),
+        }
+        for i, tenant_id in enumerate(tenants)
+    }
+
+
+def _empty_payload(kind: str) -> Dict[str, Any]:
+    return {
+        KIND_REVENUE: {
+            "available": False,
+            "model": "trend",
+            "historical": {"month": [], "revenue": []},
+        },
+        KIND_DEMAND: {"available": False, "predicted_demand": [], "confidence": []},
+        KIND_ANOMALIES: {"timestamp": [], "expected_value": [], "actual_value": [], "score": []},
+        KIND_CHURN: {
+            "total_customers_analyzed": 0,
+            "high_risk": 0,
+            "medium_risk": 0,
+            "low_risk": 0,
+            "avg_churn_probability": None,
+        },
+    }[kind]
+
+
+# ----------------------------------------------------------------------
+# Engine
+# ----------------------------------------------------------------------
+class ForecastEngine:
+    """Batch refresh of every tenant's forecasts plus snapshot reads for the endpoints."""
+
+    def __init__(
+        self,
+        pool: Any = None,
+        *,
+        refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+    ):
+        self._pool = pool
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self._running = False
+        self._wake = asyncio.Event()
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._table_available = True
+        self._stats: Dict[str, Any] = {
+            "refreshes": 0,
+            "refreshes_skipped_locked": 0,
+            "tenants": 0,
+            "snapshot_hits": 0,
+            "on_demand": 0,
+            "shared_waits": 0,
+            "errors": 0,
+            "last_refresh_ms": 0.0,
+            "last_compute_ms": 0.0,
+        }
+
+    async def compute(self, conn: Any, tenant_ids: Optional[List[str]] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Fetch every series for ``tenant_ids`` (``None`` = all tenants) and score them in one pass."""
+        today = datetime.now(timezone.utc).date()
+        fetched: Dict[str, Tuple[List[Any], int]] = {}
+        for spec in (REVENUE_SERIES, DAILY_REVENUE_SERIES, DEMAND_SERIES):
+            end, start_at, end_at = spec.window(today)
+            try:
+                rows = await conn.fetch(spec.query, tenant_ids, start_at, end_at)
+            except asyncpg.exceptions.UndefinedTableError:
+                rows = []
+            fetched[spec.kind] = (rows, end)
+        try:
+            churn_rows = await conn.fetch(_CHURN_QUERY, tenant_ids)
+        except asyncpg.exceptions.UndefinedTableError:
+            churn_rows = []
+        started = time.perf_counter()
+        results = await asyncio.to_thread(_score_all, fetched, churn_rows)
+        self._stats["last_compute_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return results
+
+    async def _persist(self, conn: Any, snapshots: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        if not self._table_available or not snapshots:
+            return
+        records = [
+            {"tenant_id": tenant_id, "kind": kind, "payload": payload}
+            for (tenant_id, kind), payload in snapshots.items()
+        ]
+        try:
+            await conn.execute(_UPSERT, json.dumps(records))
+        except asyncpg.exceptions.UndefinedTableError:
+            logger.warning("%s missing; forecasts are computed per request", SNAPSHOT_TABLE)
+            self._table_available = False
+
+    async def refresh(self) -> int:
+        """Recompute and persist snapshots for every tenant; returns the tenant count.
+
+        Skipped (returns 0) while another instance holds the refresh lock.
+        """
+        started = time.perf_counter()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", REFRESH_LOCK_KEY):
+                self._stats["refreshes_skipped_locked"] += 1
+                return 0
+            try:
+                snapshots = await self.compute(conn)
+                await self._persist(conn, snapshots)
+            finally:
+                await conn.execute("SELECT pg_advisory_unlock($1)", REFRESH_LOCK_KEY)
+        tenants = len({tenant_id for tenant_id, _ in snapshots})
+        self._stats["refreshes"] += 1
+        self._stats["tenants"] = tenants
+        self._stats["last_refresh_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return tenants
+
+    async def snapshot(self, pool: Any, tenant_id: str, kind: str) -> Dict[str, Any]:
+        """Stored payload for (tenant, kind); computed for this tenant alone when missing or stale."""
+        tenant_id = str(tenant_id)
+        if self._table_available:
+            try:
+                async with pool.acquire() as conn:
+                    row = await conn.fetchrow(
+                        f"""
+                        SELECT payload, EXTRACT(EPOCH FROM (NOW() - computed_at)) AS age_seconds
+                        FROM {SNAPSHOT_TABLE}
+                        WHERE tenant_id = $1 AND kind = $2
+                        """,
+                        tenant_id,
+                        kind,
+                    )
+            except asyncpg.exceptions.UndefinedTableError:
+                logger.warning("%s missing; forecasts are computed per request", SNAPSHOT_TABLE)
+                self._table_available = False
+                row = None
+            if row is not None and row["age_seconds"] is not None and float(row["age_seconds"]) < self.max_age_seconds:
+                self._stats["snapshot_hits"] += 1
+                payload = row["payload"]
+                return json.loads(payload) if isinstance(payload, str) else payload
+
+        task = self._inflight.get((tenant_id, kind))
+        if task is not None:
+            self._stats["shared_waits"] += 1
+        else:
+            task = asyncio.ensure_future(self._compute_tenant(pool, tenant_id))
+            # One computation produces every kind, so it serves all of them.
+            for key in KINDS:
+                self._inflight[(tenant_id, key)] = task
+            task.add_done_callback(lambda _t, t=tenant_id: self._release(t))
+        snapshots = await asyncio.shield(task)
+        return snapshots.get((tenant_id, kind)) or _empty_payload(kind)
+
+    def _release(self, tenant_id: str) -> None:
+        for kind in KINDS:
+            self._inflight.pop((tenant_id, kind), None)
+
+    async def _compute_tenant(self, pool: Any, tenant_id: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        self._stats["on_demand"] += 1
+        try:
+            async with pool.acquire() as conn:
+                snapshots = await self.compute(conn, [tenant_id])
+                for kind in KINDS:
+                    snapshots.setdefault((tenant_id, kind), _empty_payload(kind))
+                await self._persist(conn, snapshots)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        return snapshots
+
+    async def run(self) -> None:
+        """Refresh every ``refresh_seconds`` until ``stop()``."""
+        self._running = True
+        logger.info("Forecast refresher started (every %ss)", self.refresh_seconds)
+        try:
+            while self._running:
+                self._wake.clear()
+                try:
+                    await self.refresh()
+                except Exception as exc:
+                    self._stats["errors"] += 1
+                    logger.error("Forecast refresh failed: %s", exc)
+                if not self._running:
+                    break
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.refresh_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("Forecast refresher stopped")
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._running,
+            "refresh_secs": self.refresh_seconds,
+            "snapshot_table": self._table_available,
+        }
+
+
+def _score_all(
+    fetched: Dict[str, Tuple[List[Any], int]], churn_rows: Sequence[Any]
+) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    snapshots: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    rows, end = fetched[KIND_REVENUE]
+    tenants, matrix = build_series_matrix(rows, end, REVENUE_SERIES.history)
+    for tenant_id, payload in revenue_payloads(tenants, matrix, end).items():
+        snapshots[(tenant_id, KIND_REVENUE)] = payload
+
+    rows, end = fetched[KIND_DEMAND]
+    tenants, matrix = build_series_matrix(rows, end, DEMAND_SERIES.history)
+    for tenant_id, payload in demand_payloads(tenants, matrix).items():
+        snapshots[(tenant_id, KIND_DEMAND)] = payload
+
+    rows, end = fetched[KIND_ANOMALIES]
+    tenants, matrix = build_series_matrix(rows, end, DAILY_REVENUE_SERIES.history)
+    for tenant_id, payload in anomaly_payloads(tenants, matrix, end).items():
+        snapshots[(tenant_id, KIND_ANOMALIES)] = payload
+
+    for tenant_id, payload in churn_payloads(churn_rows).items():
+        snapshots[(tenant_id, KIND_CHURN)] = payload
+    return snapshots
+
+
+_engine: Optional[ForecastEngine] = None
+_engine_task: Optional[asyncio.Task] = None
+
+
+def get_forecast_engine() -> ForecastEngine:
+    global _engine
+    if _engine is None:
+        _engine = ForecastEngine()
+    return _engine
+
+
+def start_forecast_refresher() -> Optional[asyncio.Task]:
+    global _engine_task
+    if os.getenv("FORECAST_REFRESHER", "true").lower() in ("0", "false", "no"):
+        return None
+    if _engine_task is None or _engine_task.done():
+        _engine_task = asyncio.create_task(get_forecast_engine().run())
+    return _engine_task
+
+
+async def stop_forecast_refresher() -> None:
+    global _engine_task
+    task, _engine_task = _engine_task, None
+    if task is None:
+        return
+    get_forecast_engine().stop()
+    try:
+        await asyncio.wait_for(task, timeout=30)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        task.cancel()
+
+
+def get_forecast_stats() -> Dict[str, Any]:
+    return get_forecast_engine().stats()
@@ -3,7 +3,6 @@ Monitoring Service - Comprehensive System Health and Performance Monitoring
 Monitors MCP servers, AI agents, database, and system performance
 """
 import asyncio
-import psutil
 import httpx
 import logging
 from typing import Dict, List, Any, Optional
@@ -15,6 +14,7 @@ from sqlalchemy.orm import sessionmaker
 import os
 import json
 
+from core.host_metrics import host_metrics
 from services.mcp_service import mcp_service
 from services.ai_agent_service import ai_agent_service
 
@@ -78,28 +78,22 @@ class MonitoringService:
     async def get_system_metrics(self) -> SystemMetrics:
         """Get current system performance metrics"""
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            
-            # Memory usage
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-            
-            # Disk usage
-            disk = psutil.disk_usage('/')
-            disk_percent = (disk.used / disk.total) * 100
+            # Latest sample from the shared host sampler (no blocking CPU window)
+            host = host_metrics()
+            cpu_percent = host.cpu_percent
+            memory_percent = host.memory_percent
+            disk_percent = (host.disk_used / host.disk_total) * 100 if host.disk_total else 0.0
             
             # Network I/O
-            network = psutil.net_io_counters()
             network_io = {
-                "bytes_sent": network.bytes_sent,
-                "bytes_recv": network.bytes_recv,
-                "packets_sent": network.packets_sent,
-                "packets_recv": network.packets_recv
+                "bytes_sent": host.net_bytes_sent,
+                "bytes_recv": host.net_bytes_recv,
+                "packets_sent": host.net_packets_sent,
+                "packets_recv": host.net_packets_recv
             }
             
             # Process count
-            process_count = len(psutil.pids())
+            process_count = host.process_count
             
             metrics = SystemMetrics(
                 cpu_percent=cpu_percent,
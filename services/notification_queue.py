@@ -0,0 +1,393 @@
+"""
+Notification Queue Worker
+Postgres-backed work queue for ``notification_queue``, replacing the 30-second
+polling loop in ``NotificationScheduler``.
+
+- Claims batches with ``FOR UPDATE SKIP LOCKED``, so any number of workers
+  (or API replicas) can drain the queue without sending a row twice.
+- A claimed row is ``sending`` with ``locked_until`` = now + visibility
+  timeout; rows whose worker died are reclaimed once that passes. Delivery is
+  at-least-once: a send that outlives the timeout may be repeated.
+- Wakes on ``LISTEN notification_queue`` (an insert trigger NOTIFYs) instead of
+  a fixed sleep, falling back to polling every ``poll_interval`` seconds or at
+  the next retry/visibility deadline, whichever comes first.
+- Up to ``concurrency`` sends run at once; a failed send goes back to
+  ``pending`` with exponential backoff and jitter, and is marked ``failed``
+  (the status NotificationScheduler used) after ``max_attempts``.
+
+The worker is opt-in: set ``NOTIFICATION_QUEUE_WORKER=true`` on the replicas
+that should deliver. ``migrations/20261016_notification_queue_worker.sql``
+marks ``pending`` rows that were already long overdue as ``cancelled``, so
+turning it on does not send the backlog the old scheduler never delivered.
+
+LISTEN needs a session-mode connection: pgBouncer in transaction mode accepts
+the command but never delivers notifications, so set
+``NOTIFICATION_QUEUE_LISTEN_URL`` to the direct (5432) database URL there.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import asyncpg
+
+from database import DATABASE_URL, get_pool
+from database.pool_manager import PURPOSE_BACKGROUND, _ssl_for_url
+from services.notifications import (
+    _default_email_config,
+    _default_push_config,
+    _default_sms_config,
+    _merge_config,
+    send_email_message,
+    send_push_message,
+    send_sms_message,
+)
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "notification_queue"
+QUEUE_TABLE = "notification_queue"
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+DEFAULT_CONCURRENCY = int(os.getenv("NOTIFICATION_WORKER_CONCURRENCY", "16"))
+DEFAULT_BATCH_SIZE = int(os.getenv("NOTIFICATION_WORKER_BATCH_SIZE", "100"))
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("NOTIFICATION_VISIBILITY_TIMEOUT_SECS", "120"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", "5"))
+DEFAULT_BACKOFF_BASE_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_BASE_SECS", "30"))
+DEFAULT_BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFICATION_BACKOFF_MAX_SECS", "3600"))
+DEFAULT_POLL_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_POLL_INTERVAL_SECS", "5"))
+LISTEN_RETRY_SECONDS = 30.0
+
+_CLAIM = """
+    WITH claimable AS (
+        SELECT id FROM {table}
+        WHERE (status = 'pending' AND scheduled_for <= NOW())
+           OR (status = 'sending' AND locked_until < NOW())
+        ORDER BY scheduled_for
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    ),
+    claimed AS (
+        UPDATE {table} q
+        SET status = 'sending',
+            attempts = COALESCE(q.attempts, 0) + 1,
+            locked_until = NOW() + make_interval(secs => $2)
+        FROM claimable
+        WHERE q.id = claimable.id
+        RETURNING q.id, q.notification_type, q.recipient_email, q.recipient_phone,
+                  q.subject, q.message, q.data, q.template_id, q.attempts
+    )
+    SELECT claimed.*, t.subject AS template_subject,
+           t.html_body AS template_html, t.text_body AS template_text
+    FROM claimed
+    LEFT JOIN {templates} t ON t.id = claimed.template_id
+"""
+
+# Only rows this worker still owns are updated: if the visibility timeout ran
+# out and another worker reclaimed the row, its outcome wins.
+_COMPLETE = """
+    UPDATE {table}
+    SET status = $2,
+        sent_at = CASE WHEN $2 = 'sent' THEN NOW() ELSE sent_at END,
+        scheduled_for = CASE WHEN $2 = 'pending' THEN NOW() + make_interval(secs => $3) ELSE scheduled_for END,
+        locked_until = NULL,
+        error_message = $4
+    WHERE id = $1 AND status = 'sending' AND attempts = $5
+"""
+
+_NEXT_DUE = """
+    SELECT EXTRACT(EPOCH FROM LEAST(
+        MIN(scheduled_for) FILTER (WHERE status = 'pending'),
+        MIN(locked_until) FILTER (WHERE status = 'sending')
+    ) - NOW())
+    FROM {table}
+    WHERE status IN ('pending', 'sending')
+"""
+
+Sender = Callable[[Dict[str, Any]], Awaitable[bool]]
+
+
+def retry_delay(attempts: int, base: float, cap: float, jitter: bool = True) -> float:
+    """Exponential backoff for the ``attempts``-th failure, with up to 50% jitter."""
+    delay = min(base * (2 ** max(attempts - 1, 0)), cap)
+    if jitter:
+        delay *= 0.5 + random.random() / 2
+    return delay
+
+
+def render_template(template: Optional[str], data: Any) -> str:
+    """Replace ``{{variable}}`` placeholders with values from ``data``."""
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            data = {}
+    data = data if isinstance(data, dict) else {}
+    return re.sub(r"\{\{(\w+)\}\}", lambda match: str(data.get(match.group(1), "")), template or "")
+
+
+class NotificationQueueWorker:
+    def __init__(
+        self,
+        pool: Any = None,
+        *,
+        sender: Optional[Sender] = None,
+        config: Optional[Dict[str, Any]] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+        backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+        listen_dsn: Optional[str] = None,
+        table: str = QUEUE_TABLE,
+        templates_table: str = "email_templates",
+    ):
+        config = config or {}
+        self._pool = pool
+        self.table = table
+        self._claim_sql = _CLAIM.format(table=table, templates=templates_table)
+        self._complete_sql = _COMPLETE.format(table=table)
+        self._next_due_sql = _NEXT_DUE.format(table=table)
+        self.sender = sender or self.deliver
+        self.email_config = _merge_config(_default_email_config(), config.get("email"))
+        self.sms_config = _merge_config(_default_sms_config(), config.get("sms"))
+        self.push_config = _merge_config(_default_push_config(), config.get("push"))
+        self.concurrency = max(concurrency, 1)
+        self.batch_size = max(batch_size, 1)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self.listen_dsn = listen_dsn
+        self._running = False
+        self._wake = asyncio.Event()
+        self._listen_conn: Optional[asyncpg.Connection] = None
+        self._listen_retry_at = 0.0
+        self._stats = {
+            "batches": 0,
+            "claimed": 0,
+            "sent": 0,
+            "retried": 0,
+            "failed": 0,
+            "notifications_received": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Delivery
+    # ------------------------------------------------------------------
+    async def deliver(self, notification: Dict[str, Any]) -> bool:
+        """Default sender: email (with optional template), SMS or push."""
+        kind = notification.get("notification_type")
+        data = notification.get("data")
+        message = notification.get("message") or ""
+        if kind == "email":
+            recipient = notification.get("recipient_email")
+            if not recipient:
+                raise ValueError("Notification missing recipient_email")
+            if notification.get("template_subject") is not None or notification.get("template_html") is not None:
+                subject = render_template(notification.get("template_subject"), data)
+                html_body = render_template(notification.get("template_html"), data)
+                text_body = render_template(notification.get("template_text"), data)
+            else:
+                subject = notification.get("subject") or "Notification"
+                html_body = text_body = message
+            return await asyncio.to_thread(
+                send_email_message, recipient, subject, html_body, text_body, self.email_config
+            )
+        if kind == "sms":
+            phone = notification.get("recipient_phone")
+            if not phone or not message:
+                raise ValueError("Notification missing recipient_phone or message")
+            return await send_sms_message(phone, message, self.sms_config)
+        if kind == "push":
+            if not message:
+                raise ValueError("Notification missing message for push")
+            if isinstance(data, str):
+                try:
+                    data = json.loads(data)
+                except json.JSONDecodeError:
+                    data = None
+            return await send_push_message(message, data if isinstance(data, dict) else {}, self.push_config)
+        raise ValueError(f"Unknown notification type: {kind}")
+
+    async def _process(self, row: Dict[str, Any], slots: asyncio.Semaphore) -> Tuple:
+        attempts = int(row.get("attempts") or 1)
+        if attempts > self.max_attempts:
+            # Reclaimed after its visibility timeout more often than allowed.
+            return (row["id"], STATUS_FAILED, 0.0, "Visibility timeout expired on every attempt", attempts)
+
+        async with slots:
+            try:
+                ok = await self.sender(row)
+                error = None if ok else "Failed to send notification"
+            except Exception as exc:
+                ok, error = False, str(exc)[:500]
+
+        if ok:
+            return (row["id"], STATUS_SENT, 0.0, None, attempts)
+        if attempts >= self.max_attempts:
+            logger.warning("Notification %s failed after %s attempts: %s", row["id"], attempts, error)
+            return (row["id"], STATUS_FAILED, 0.0, error, attempts)
+        delay = retry_delay(attempts, self.backoff_base, self.backoff_max)
+        return (row["id"], STATUS_PENDING, delay, error, attempts)
+
+    # ------------------------------------------------------------------
+    # Queue operations
+    # ------------------------------------------------------------------
+    async def run_once(self) -> int:
+        """Claim one batch of due notifications, send it and record the outcomes."""
+        started = time.perf_counter()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(self._claim_sql, self.batch_size, float(self.visibility_timeout))
+        if not rows:
+            return 0
+
+        slots = asyncio.Semaphore(self.concurrency)
+        outcomes = await asyncio.gather(*(self._process(dict(row), slots) for row in rows))
+        async with pool.acquire() as conn:
+            await conn.executemany(self._complete_sql, outcomes)
+
+        self._stats["batches"] += 1
+        self._stats["claimed"] += len(rows)
+        for outcome in outcomes:
+            key = {STATUS_SENT: "sent", STATUS_PENDING: "retried", STATUS_FAILED: "failed"}[outcome[1]]
+            self._stats[key] += 1
+        self._stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return len(rows)
+
+    async def _seconds_until_next_due(self) -> Optional[float]:
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            value = await conn.fetchval(self._next_due_sql)
+        return None if value is None else max(float(value), 0.0)
+
+    async def run(self) -> None:
+        """Drain the queue until ``stop()``, sleeping on LISTEN between batches."""
+        self._running = True
+        logger.info(
+            "Notification queue worker started (concurrency=%s batch=%s)", self.concurrency, self.batch_size
+        )
+        try:
+            while self._running:
+                await self._ensure_listener()
+                # Cleared before claiming so a NOTIFY that lands mid-batch is kept.
+                self._wake.clear()
+                try:
+                    processed = await self.run_once()
+                    if processed >= self.batch_size:
+                        continue
+                    timeout = self.poll_interval
+                    next_due = await self._seconds_until_next_due()
+                    if next_due is not None:
+                        timeout = min(timeout, next_due + 0.05)
+                except Exception as exc:
+                    logger.error("Notification queue worker error: %s", exc)
+                    timeout = max(self.poll_interval, 5.0)
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            await self._close_listener()
+            logger.info("Notification queue worker stopped")
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    # ------------------------------------------------------------------
+    # LISTEN / NOTIFY
+    # ------------------------------------------------------------------
+    def _on_notify(self, *_args: Any) -> None:
+        self._stats["notifications_received"] += 1
+        self._wake.set()
+
+    async def _ensure_listener(self) -> None:
+        if self._listen_conn is not None and not self._listen_conn.is_closed():
+            return
+        if time.monotonic() < self._listen_retry_at:
+            return
+        dsn = self.listen_dsn or os.getenv("NOTIFICATION_QUEUE_LISTEN_URL")
+        if not dsn:
+            dsn = DATABASE_URL
+        try:
+            conn = await asyncpg.connect(dsn, statement_cache_size=0, ssl=_ssl_for_url(dsn), timeout=10)
+            await conn.add_listener(CHANNEL, self._on_notify)
+            self._listen_conn = conn
+        except Exception as exc:
+            self._listen_retry_at = time.monotonic() + LISTEN_RETRY_SECONDS
+            logger.warning("Notification queue LISTEN unavailable, polling every %ss: %s", self.poll_interval, exc)
+
+    async def _close_listener(self) -> None:
+        conn, self._listen_conn = self._listen_conn, None
+        if conn is not None and not conn.is_closed():
+            try:
+                await conn.close(timeout=5)
+            except Exception:
+                conn.terminate()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._running,
+            "listening": self._listen_conn is not None and not self._listen_conn.is_closed(),
+            "concurrency": self.concurrency,
+            "batch_size": self.batch_size,
+        }
+
+
+_worker: Optional[NotificationQueueWorker] = None
+_worker_task: Optional[asyncio.Task] = None
+
+
+def get_notification_worker() -> NotificationQueueWorker:
+    global _worker
+    if _worker is None:
+        _worker = NotificationQueueWorker()
+    return _worker
+
+
+def start_notification_worker() -> Optional[asyncio.Task]:
+    global _worker_task
+    if os.getenv("NOTIFICATION_QUEUE_WORKER", "false").lower() not in ("1", "true", "yes"):
+        return None
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(get_notification_worker().run())
+    return _worker_task
+
+
+async def stop_notification_worker() -> None:
+    global _worker_task
+    task, _worker_task = _worker_task, None
+    if task is None:
+        return
+    get_notification_worker().stop()
+    try:
+        await asyncio.wait_for(task, timeout=10)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        task.cancel()
+
+
+def get_notification_queue_stats() -> Dict[str, Any]:
+    return get_notification_worker().stats()
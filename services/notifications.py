@@ -5,10 +5,10 @@ import asyncio
 import logging
 import os
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Dict, Any, List, Optional
-from datetime import datetime
 import json
 
 from sqlalchemy import text
@@ -226,6 +226,59 @@ async def send_push_message(
         logger.error("Push webhook failed: %s", exc)
         return False
 
+
+class TokenBucket:
+    """Async token bucket: ``rate`` sends per second with bursts up to ``capacity``.
+
+    Waiters queue on a lock, so they are served in arrival order. A rate of
+    zero or less disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def available(self) -> float:
+        if self.rate <= 0:
+            return float("inf")
+        self._refill()
+        return self._tokens
+
+    def take(self, tokens: int) -> int:
+        """Take up to ``tokens`` whole tokens without waiting; returns how many were granted."""
+        if self.rate <= 0:
+            return tokens
+        self._refill()
+        granted = max(min(int(self._tokens), tokens), 0)
+        self._tokens -= granted
+        return granted
+
+    def set_available(self, tokens: float) -> None:
+        """Lower the balance to ``tokens`` (e.g. after reconciling with a shared counter)."""
+        self._refill()
+        self._tokens = max(min(self._tokens, tokens), 0.0)
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
 class NotificationService:
     """Comprehensive notification service for all communication channels"""
     
@@ -237,60 +290,16 @@ class NotificationService:
         self.push_config = _merge_config(_default_push_config(), self.config.get('push'))
     
     async def process_queue(self):
-        """Process pending notifications from queue"""
+        """Claim and send one batch of due notifications (see services.notification_queue)."""
+        # Deferred: services.notification_queue imports this module.
+        from services.notification_queue import NotificationQueueWorker
+
         try:
-            # Get pending notifications
-            query = """
-            SELECT * FROM notification_queue
-            WHERE status = 'pending'
-            AND scheduled_for <= NOW()
-            ORDER BY scheduled_for
-            LIMIT 50
-            """
-            
-            result = self.db.execute(text(query))
-            notifications = [dict(row) for row in result]
-            
-            for notification in notifications:
-                await self._process_notification(notification)
-            
-            return len(notifications)
-            
+            return await NotificationQueueWorker(config=self.config).run_once()
         except Exception as e:
             logger.error(f"Error processing notification queue: {e}")
             return 0
     
-    async def _process_notification(self, notification: Dict):
-        """Process a single notification"""
-        try:
-            # Update status to sending
-            self._update_notification_status(notification['id'], 'sending')
-            
-            # Send based on type
-            if notification['notification_type'] == 'email':
-                success = await self._send_email(notification)
-            elif notification['notification_type'] == 'sms':
-                success = await self._send_sms(notification)
-            elif notification['notification_type'] == 'push':
-                success = await self._send_push(notification)
-            else:
-                logger.warning(f"Unknown notification type: {notification['notification_type']}")
-                success = False
-            
-            # Update status
-            if success:
-                self._update_notification_status(notification['id'], 'sent', sent_at=datetime.now())
-            else:
-                self._update_notification_status(
-                    notification['id'], 
-                    'failed', 
-                    error="Failed to send notification"
-                )
-            
-        except Exception as e:
-            logger.error(f"Error processing notification {notification['id']}: {e}")
-            self._update_notification_status(notification['id'], 'failed', error=str(e))
-    
     async def _send_email(self, notification: Dict) -> bool:
         """Send email notification"""
         try:
@@ -396,31 +405,6 @@ class NotificationService:
         
         return re.sub(pattern, replace, template)
     
-    def _update_notification_status(
-        self, 
-        notification_id: str, 
-        status: str, 
-        sent_at: Optional[datetime] = None,
-        error: Optional[str] = None
-    ):
-        """Update notification status in database"""
-        query = """
-        UPDATE notification_queue
-        SET status = :status,
-            sent_at = :sent_at,
-            error_message = :error,
-            attempts = attempts + 1
-        WHERE id = :id
-        """
-        
-        self.db.execute(text(query), {
-            'id': notification_id,
-            'status': status,
-            'sent_at': sent_at,
-            'error': error
-        })
-        self.db.commit()
-    
     async def send_lead_notification(self, lead_id: str, notification_type: str):
         """Send notification for lead events"""
         # Get lead data
@@ -587,33 +571,30 @@ class NotificationService:
 
 
 class NotificationScheduler:
-    """Background scheduler for notification processing"""
+    """Background notification processing, backed by ``NotificationQueueWorker``.
+
+    Kept for callers of the old polling scheduler: the worker claims batches
+    with SKIP LOCKED and wakes on LISTEN/NOTIFY instead of sleeping 30s.
+    """
     
     def __init__(self, notification_service: NotificationService):
         self.service = notification_service
         self.running = False
+        self.worker = None
     
     async def start(self):
         """Start the notification scheduler"""
+        # Deferred: services.notification_queue imports this module.
+        from services.notification_queue import NotificationQueueWorker
+
         self.running = True
+        self.worker = NotificationQueueWorker(config=self.service.config)
         logger.info("Notification scheduler started")
-        
-        while self.running:
-            try:
-                # Process queue
-                count = await self.service.process_queue()
-                
-                if count > 0:
-                    logger.info(f"Processed {count} notifications")
-                
-                # Wait before next check
-                await asyncio.sleep(30)  # Check every 30 seconds
-                
-            except Exception as e:
-                logger.error(f"Error in notification scheduler: {e}")
-                await asyncio.sleep(60)  # Wait longer on error
+        await self.worker.run()
     
     def stop(self):
         """Stop the notification scheduler"""
         self.running = False
+        if self.worker is not None:
+            self.worker.stop()
         logger.info("Notification scheduler stopped")
@@ -0,0 +1,436 @@
+"""
+Bulk Payment Reminder Engine
+Set-based reminder creation and rate-limited delivery for
+/api/v1/payment-reminders/send-bulk and the scheduled reminder sweep.
+
+- Eligible invoices are selected and their reminder rows written by one
+  ``INSERT ... SELECT`` statement, so reminding 20k invoices is a single
+  round trip and the request connection is released before any delivery.
+- Every row carries an idempotency key (``<type>:<run date>:<invoice id>``)
+  backed by a unique index: re-running the same bulk send on the same day
+  queues nothing new and the response reports the duplicates.
+- Rows are written already claimed (status ``sending`` plus a per-run
+  ``claim_token``); the scheduled sweep claims due rows with ``FOR UPDATE SKIP
+  LOCKED`` and reclaims claims older than ``claim_timeout`` so a crashed run
+  is retried, not resent twice.
+- Delivery walks the claimed rows in chunks sized to finish well inside
+  ``claim_timeout`` and renews ``claimed_at`` before each chunk; rows whose
+  token changed (reclaimed by the sweep) are skipped, and status writes are
+  guarded by the token, so a long paced run is never delivered twice.
+- Delivery runs on ``workers`` concurrent tasks, each channel paced by its
+  own token bucket, and final statuses are written back with ``executemany``
+  in batches of ``flush_size``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+from database import get_pool
+from database.pool_manager import PURPOSE_BACKGROUND
+from services.notifications import TokenBucket, send_email_message, send_sms_message
+
+logger = logging.getLogger(__name__)
+
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+DEFAULT_WORKERS = int(os.getenv("REMINDER_DELIVERY_WORKERS", "8"))
+DEFAULT_CHANNEL_RATES = {
+    "email": float(os.getenv("REMINDER_EMAIL_RATE_PER_SEC", "10")),
+    "sms": float(os.getenv("REMINDER_SMS_RATE_PER_SEC", "1")),
+}
+DEFAULT_FLUSH_SIZE = int(os.getenv("REMINDER_STATUS_FLUSH_SIZE", "500"))
+DEFAULT_CLAIM_BATCH = int(os.getenv("REMINDER_CLAIM_BATCH", "500"))
+DEFAULT_CLAIM_TIMEOUT_SECONDS = int(os.getenv("REMINDER_CLAIM_TIMEOUT_SECS", "900"))
+
+DEFAULT_SUBJECT = "Payment reminder for invoice {invoice_number}"
+DEFAULT_BODY = (
+    "Hello {customer_name}, your invoice {invoice_number} has an outstanding balance of {amount_due}."
+)
+DEFAULT_SMS = "Reminder: invoice {invoice_number} balance {amount_due}."
+
+_ELIGIBLE_COLUMNS = """
+    i.id AS invoice_id, i.invoice_number, i.balance_cents, i.due_date,
+    c.customer_name, c.email, c.phone
+"""
+
+_STATUS_UPDATE = """
+    UPDATE payment_reminders
+    SET status = $2,
+        sent_at = CASE WHEN $2 = 'sent' THEN NOW() ELSE sent_at END,
+        error_message = $3
+    WHERE id = $1 AND claim_token = $4 AND status = 'sending'
+"""
+
+_RENEW_CLAIMS = """
+    UPDATE payment_reminders r
+    SET claimed_at = NOW()
+    FROM unnest($1::uuid[], $2::uuid[]) AS claim(id, token)
+    WHERE r.id = claim.id AND r.claim_token = claim.token AND r.status = 'sending'
+    RETURNING r.id
+"""
+
+
+def generate_reminder_message(template: str, invoice_data: Dict[str, Any]) -> str:
+    """Generate reminder message from template"""
+    # Replace placeholders in template
+    message = template
+    frontend_base = (settings.frontend_url or "").rstrip("/")
+    invoice_id = invoice_data.get("id", "")
+    replacements = {
+        "{customer_name}": invoice_data.get('customer_name', 'Customer'),
+        "{invoice_number}": invoice_data.get('invoice_number', ''),
+        "{amount_due}": f"${invoice_data.get('balance_cents', 0) / 100:.2f}",
+        "{due_date}": invoice_data.get('due_date', '').isoformat() if invoice_data.get('due_date') else '',
+        "{days_overdue}": str((date.today() - invoice_data.get('due_date')).days) if invoice_data.get('due_date') and invoice_data.get('due_date') < date.today() else '0',
+        "{payment_link}": f"{frontend_base}/invoices/{invoice_id}" if frontend_base and invoice_id else ""
+    }
+
+    for key, value in replacements.items():
+        message = message.replace(key, value)
+
+    return message
+
+
+def build_eligible_filter(tenant_id: str, criteria: Any) -> Tuple[str, List[Any]]:
+    """WHERE clause and params selecting invoices for a ``BulkReminderRequest``."""
+    clauses = ["i.balance_cents > 0", "i.tenant_id = $1"]
+    params: List[Any] = [uuid.UUID(str(tenant_id))]
+
+    def _add(clause: str, value: Any) -> None:
+        params.append(value)
+        clauses.append(clause.format(p=f"${len(params)}"))
+
+    if getattr(criteria, "filter_status", None):
+        _add("i.status = {p}", criteria.filter_status)
+    if getattr(criteria, "days_overdue_min", None) is not None:
+        _add("i.due_date <= CURRENT_DATE - {p}::int", criteria.days_overdue_min)
+    if getattr(criteria, "days_overdue_max", None) is not None:
+        _add("i.due_date >= CURRENT_DATE - {p}::int", criteria.days_overdue_max)
+    if getattr(criteria, "min_amount", None):
+        _add("i.balance_cents >= {p}", int(criteria.min_amount * 100))
+    if getattr(criteria, "customer_ids", None):
+        _add("i.customer_id = ANY({p}::uuid[])", [uuid.UUID(cid) for cid in criteria.customer_ids])
+    if getattr(criteria, "exclude_customer_ids", None):
+        _add("i.customer_id != ALL({p}::uuid[])", [uuid.UUID(cid) for cid in criteria.exclude_customer_ids])
+    return " AND ".join(clauses), params
+
+
+def _parse_channels(value: Any) -> List[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return []
+    return list(value or [])
+
+
+class BulkReminderEngine:
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        channel_rates: Optional[Dict[str, float]] = None,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        claim_timeout: int = DEFAULT_CLAIM_TIMEOUT_SECONDS,
+        claim_batch: int = DEFAULT_CLAIM_BATCH,
+        pool: Any = None,
+    ):
+        self.workers = max(workers, 1)
+        rates = dict(DEFAULT_CHANNEL_RATES)
+        rates.update(channel_rates or {})
+        self._buckets = {channel: TokenBucket(rate) for channel, rate in rates.items()}
+        self.flush_size = max(flush_size, 1)
+        self.claim_timeout = claim_timeout
+        self.claim_batch = max(claim_batch, 1)
+        self._pool = pool
+        self._stats = {
+            "queued": 0,
+            "duplicates": 0,
+            "claimed": 0,
+            "claims_lost": 0,
+            "sent": 0,
+            "failed": 0,
+            "status_flushes": 0,
+            "last_delivery_secs": 0.0,
+        }
+
+    async def preview(self, conn, tenant_id: str, criteria: Any, limit: int = 10) -> Dict[str, Any]:
+        """Counts and the first ``limit`` invoices a bulk send would target."""
+        where, params = build_eligible_filter(tenant_id, criteria)
+        params.append(limit)
+        rows = await conn.fetch(f"""
+            SELECT {_ELIGIBLE_COLUMNS},
+                   COUNT(*) OVER () AS total_invoices,
+                   SUM(i.balance_cents) OVER () AS total_cents
+            FROM invoices i
+            JOIN customers c ON i.customer_id = c.id
+            WHERE {where}
+            ORDER BY i.due_date
+            LIMIT ${len(params)}
+        """, *params)
+        return {
+            "total_invoices": rows[0]["total_invoices"] if rows else 0,
+            "total_cents": int(rows[0]["total_cents"] or 0) if rows else 0,
+            "invoices": [dict(row) for row in rows],
+        }
+
+    async def enqueue(
+        self,
+        conn,
+        tenant_id: str,
+        criteria: Any,
+        reminder_type: str,
+        channels: List[str],
+        run_date: Optional[date] = None,
+    ) -> Dict[str, Any]:
+        """Write reminder rows for every eligible invoice in one statement.
+
+        Returns the newly claimed rows (ready for ``deliver``) and how many
+        eligible invoices already had this reminder for ``run_date``.
+        """
+        where, params = build_eligible_filter(tenant_id, criteria)
+        key_prefix = f"{reminder_type}:{(run_date or date.today()).isoformat()}:"
+        params.extend([reminder_type, json.dumps(channels), key_prefix, STATUS_SENDING, uuid.uuid4()])
+        type_p, channels_p, key_p, status_p, token_p = (f"${len(params) - n}" for n in (4, 3, 2, 1, 0))
+        rows = await conn.fetch(f"""
+            WITH eligible AS (
+                SELECT {_ELIGIBLE_COLUMNS}
+                FROM invoices i
+                JOIN customers c ON i.customer_id = c.id
+                WHERE {where}
+            ),
+            inserted AS (
+                INSERT INTO payment_reminders (
+                    invoice_id, reminder_type, scheduled_time, channels,
+                    status, tenant_id, idempotency_key, claimed_at, claim_token
+                )
+                SELECT invoice_id, {type_p}::text, NOW(), {channels_p}::jsonb,
+                       {status_p}::text, $1, {key_p}::text || invoice_id::text, NOW(),
+                       {token_p}::uuid
+                FROM eligible
+                ON CONFLICT (tenant_id, idempotency_key) WHERE idempotency_key IS NOT NULL
+                DO NOTHING
+                RETURNING id, invoice_id, channels, idempotency_key, claim_token
+            )
+            SELECT eligible.*, inserted.id AS reminder_id, inserted.channels,
+                   inserted.idempotency_key, inserted.claim_token
+            FROM eligible
+            LEFT JOIN inserted USING (invoice_id)
+        """, *params)
+        queued = [dict(row) for row in rows if row["reminder_id"] is not None]
+        duplicates = len(rows) - len(queued)
+        self._stats["queued"] += len(queued)
+        self._stats["duplicates"] += duplicates
+        return {"queued": queued, "duplicates": duplicates}
+
+    async def claim_due(self, conn, limit: int = DEFAULT_CLAIM_BATCH) -> List[Dict[str, Any]]:
+        """Claim scheduled reminders that are due (and stale claims) for delivery."""
+        rows = await conn.fetch("""
+            WITH claimed AS (
+                UPDATE payment_reminders r
+                SET status = $1, claimed_at = NOW(), claim_token = $4
+                WHERE r.id IN (
+                    SELECT id FROM payment_reminders
+                    WHERE (status = 'scheduled' AND scheduled_time <= NOW())
+                       OR (status = $1 AND claimed_at < NOW() - make_interval(secs => $2))
+                    ORDER BY scheduled_time
+                    LIMIT $3
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING r.id, r.invoice_id, r.channels, r.template_id,
+                          r.custom_message, r.idempotency_key, r.claim_token
+            )
+            SELECT claimed.id AS reminder_id, claimed.invoice_id, claimed.channels,
+                   claimed.custom_message, claimed.idempotency_key, claimed.claim_token,
+                   i.invoice_number, i.balance_cents, i.due_date,
+                   c.customer_name, c.email, c.phone,
+                   t.subject, t.body, t.sms_message
+            FROM claimed
+            JOIN invoices i ON claimed.invoice_id = i.id
+            JOIN customers c ON i.customer_id = c.id
+            LEFT JOIN reminder_templates t ON t.id = claimed.template_id AND t.is_active = true
+        """, STATUS_SENDING, float(self.claim_timeout), limit, uuid.uuid4())
+        self._stats["claimed"] += len(rows)
+        return [dict(row) for row in rows]
+
+    async def process_due(self, batch_size: int = DEFAULT_CLAIM_BATCH) -> Dict[str, int]:
+        """Claim and deliver due reminders until a claim comes back short."""
+        totals = {"sent": 0, "failed": 0}
+        pool = await self._get_pool()
+        while True:
+            conn = await pool.lease()
+            try:
+                rows = await self.claim_due(conn, batch_size)
+            finally:
+                await conn.close()
+            if rows:
+                result = await self.deliver(rows)
+                totals["sent"] += result["sent"]
+                totals["failed"] += result["failed"]
+            if len(rows) < batch_size:
+                return totals
+
+    async def deliver(self, reminders: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Send claimed reminders on ``workers`` tasks and write back their status.
+
+        Rows are delivered in chunks of ``_chunk_size()``; each chunk's claims
+        are renewed first and only rows still held by this run are sent.
+        """
+        started = time.perf_counter()
+        unique: List[Dict[str, Any]] = []
+        seen = set()
+        for reminder in reminders:
+            key = reminder.get("idempotency_key") or reminder["reminder_id"]
+            if key not in seen:
+                seen.add(key)
+                unique.append(reminder)
+
+        pending: List[Tuple[Any, str, Optional[str], Any]] = []
+        counts = {"sent": 0, "failed": 0}
+        flush_lock = asyncio.Lock()
+
+        async def _flush(force: bool = False) -> None:
+            async with flush_lock:
+                while pending and (force or len(pending) >= self.flush_size):
+                    batch = pending[:self.flush_size]
+                    del pending[:self.flush_size]
+                    await self._write_statuses(batch)
+
+        async def _worker(queue: asyncio.Queue) -> None:
+            while True:
+                try:
+                    reminder = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                status, error = await self._deliver_one(reminder)
+                counts[status] += 1
+                pending.append((reminder["reminder_id"], status, error, reminder.get("claim_token")))
+                if len(pending) >= self.flush_size:
+                    await _flush()
+
+        chunk_size = self._chunk_size()
+        for start in range(0, len(unique), chunk_size):
+            queue: asyncio.Queue = asyncio.Queue()
+            for reminder in await self._renew_claims(unique[start:start + chunk_size]):
+                queue.put_nowait(reminder)
+            if queue.empty():
+                continue
+            await asyncio.gather(*(_worker(queue) for _ in range(min(self.workers, queue.qsize()))))
+            # Record this chunk before its renewed claims can expire.
+            await _flush(force=True)
+
+        self._stats["sent"] += counts["sent"]
+        self._stats["failed"] += counts["failed"]
+        self._stats["last_delivery_secs"] = round(time.perf_counter() - started, 3)
+        return counts
+
+    def _chunk_size(self) -> int:
+        """Rows per claim renewal: at most half the claim timeout at the slowest paced rate."""
+        rates = [bucket.rate for bucket in self._buckets.values() if bucket.rate > 0]
+        if not rates:
+            return self.claim_batch
+        return max(1, min(self.claim_batch, int(min(rates) * self.claim_timeout / 2)))
+
+    async def _renew_claims(self, reminders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Refresh ``claimed_at`` and keep only the rows this run still holds."""
+        pool = await self._get_pool()
+        conn = await pool.lease()
+        try:
+            rows = await conn.fetch(
+                _RENEW_CLAIMS,
+                [reminder["reminder_id"] for reminder in reminders],
+                [reminder.get("claim_token") for reminder in reminders],
+            )
+        finally:
+            await conn.close()
+        held = {row["id"] for row in rows}
+        owned = [reminder for reminder in reminders if reminder["reminder_id"] in held]
+        if len(owned) < len(reminders):
+            lost = len(reminders) - len(owned)
+            self._stats["claims_lost"] += lost
+            logger.warning("Skipping %s reminders reclaimed by another run", lost)
+        return owned
+
+    async def _deliver_one(self, reminder: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+        channels = _parse_channels(reminder.get("channels"))
+        invoice_number = reminder.get("invoice_number") or str(reminder.get("invoice_id"))
+        invoice_data = {
+            "id": reminder.get("invoice_id"),
+            "customer_name": reminder.get("customer_name"),
+            "invoice_number": invoice_number,
+            "balance_cents": reminder.get("balance_cents") or 0,
+            "due_date": reminder.get("due_date"),
+        }
+        custom_message = reminder.get("custom_message")
+        attempted: List[Tuple[str, bool]] = []
+        try:
+            if "email" in channels and reminder.get("email"):
+                subject = generate_reminder_message(reminder.get("subject") or DEFAULT_SUBJECT, invoice_data)
+                body = generate_reminder_message(reminder.get("body") or DEFAULT_BODY, invoice_data)
+                if custom_message:
+                    body = f"{body}\n\n{custom_message}"
+                await self._buckets["email"].acquire()
+                sent = await asyncio.to_thread(
+                    send_email_message, reminder["email"], subject, body.replace("\n", "<br>"), body
+                )
+                attempted.append(("email", sent))
+            if "sms" in channels and reminder.get("phone"):
+                sms = generate_reminder_message(reminder.get("sms_message") or DEFAULT_SMS, invoice_data)
+                if custom_message:
+                    sms = f"{sms} {custom_message}"
+                await self._buckets["sms"].acquire()
+                attempted.append(("sms", await send_sms_message(reminder["phone"], sms)))
+        except Exception as exc:
+            logger.error("Reminder %s delivery failed: %s", reminder.get("reminder_id"), exc)
+            return STATUS_FAILED, str(exc)[:500]
+
+        if not attempted:
+            return STATUS_FAILED, "No deliverable channel"
+        failed = [channel for channel, sent in attempted if not sent]
+        if failed:
+            return STATUS_FAILED, f"Delivery failed: {', '.join(failed)}"
+        return STATUS_SENT, None
+
+    async def _write_statuses(self, batch: Sequence[Tuple[Any, str, Optional[str], Any]]) -> None:
+        pool = await self._get_pool()
+        conn = await pool.lease()
+        try:
+            await conn.executemany(_STATUS_UPDATE, batch)
+            self._stats["status_flushes"] += 1
+        except Exception as exc:
+            # Rows stay claimed and are retried by the sweep after claim_timeout.
+            logger.error("Failed to record %s reminder statuses: %s", len(batch), exc)
+        finally:
+            await conn.close()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "channel_rates": {channel: bucket.rate for channel, bucket in self._buckets.items()},
+        }
+
+
+_engine: Optional[BulkReminderEngine] = None
+
+
+def get_reminder_engine() -> BulkReminderEngine:
+    global _engine
+    if _engine is None:
+        _engine = BulkReminderEngine()
+    return _engine
@@ -0,0 +1,579 @@
+"""
+Report Export Engine
+Constant-memory CSV/XLSX exports of tenant financial rows.
+
+- Rows are read through a server-side cursor (asyncpg ``conn.cursor`` inside a
+  read-only transaction, ``fetch_size`` rows per round-trip) instead of one
+  ``fetch()`` of the whole range.
+- CSV is encoded in small chunks and handed to ``StreamingResponse`` as it is
+  produced; memory is bounded by ``flush_rows``, not by the export size.
+- XLSX uses openpyxl's write-only workbook, which spools rows to disk as they
+  are appended. The finished file is then streamed from disk.
+- Exports above ``BACKGROUND_ROW_THRESHOLD`` (planner estimate), or any export
+  requested with ``background=true``, run as an ``ExportJob``: the file is
+  written under ``REPORT_EXPORT_DIR`` and served with HTTP Range support
+  (Starlette ``FileResponse``), so an interrupted download can resume.
+
+Jobs live in this process (files on local disk, ``REPORT_EXPORT_JOB_TTL_SECS``
+retention), so status and download requests must reach the instance that
+accepted the job. Exports read from the background pool so a long download
+never holds a request-pool connection. Streaming exports hold that connection
+for as long as the client takes to read the body, so at most
+``max_concurrent_streams`` of them read at once; while all slots are taken
+the route turns new exports into background jobs. Queued/running jobs are
+capped per tenant and overall, and finished files by total bytes on disk;
+past either limit ``submit`` answers 429.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+from database import get_pool
+from database.pool_manager import PURPOSE_BACKGROUND
+
+logger = logging.getLogger(__name__)
+
+FORMAT_CSV = "csv"
+FORMAT_XLSX = "xlsx"
+CONTENT_TYPES = {
+    FORMAT_CSV: "text/csv; charset=utf-8",
+    FORMAT_XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+DEFAULT_FETCH_SIZE = int(os.getenv("REPORT_EXPORT_FETCH_SIZE", "2000"))
+DEFAULT_FLUSH_ROWS = int(os.getenv("REPORT_EXPORT_FLUSH_ROWS", "500"))
+BACKGROUND_ROW_THRESHOLD = int(os.getenv("REPORT_EXPORT_BACKGROUND_ROWS", "200000"))
+DEFAULT_MAX_CONCURRENT_JOBS = int(os.getenv("REPORT_EXPORT_MAX_JOBS", "2"))
+DEFAULT_MAX_CONCURRENT_STREAMS = int(os.getenv("REPORT_EXPORT_MAX_STREAMS", "4"))
+DEFAULT_MAX_PENDING_JOBS = int(os.getenv("REPORT_EXPORT_MAX_PENDING", "20"))
+DEFAULT_MAX_PENDING_JOBS_PER_TENANT = int(os.getenv("REPORT_EXPORT_MAX_PENDING_PER_TENANT", "3"))
+DEFAULT_MAX_DISK_BYTES = int(os.getenv("REPORT_EXPORT_MAX_DISK_BYTES", str(5 * 1024 ** 3)))
+DEFAULT_JOB_TTL_SECONDS = float(os.getenv("REPORT_EXPORT_JOB_TTL_SECS", "86400"))
+DEFAULT_EXPORT_DIR = os.getenv("REPORT_EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "report_exports")
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    name: str
+    columns: Tuple[str, ...]
+    # $1 tenant_id, $2 range start, $3 range end (inclusive)
+    query: str
+
+
+EXPORT_DATASETS: Dict[str, ExportDataset] = {
+    spec.name: spec
+    for spec in (
+        ExportDataset(
+            "invoices",
+            ("id", "invoice_number", "customer_id", "job_id", "status", "total_amount", "created_at"),
+            """
+            SELECT id, invoice_number, customer_id, job_id, status, total_amount, created_at
+            FROM invoices
+            WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+            ORDER BY created_at, id
+            """,
+        ),
+        ExportDataset(
+            "payments",
+            ("id", "invoice_id", "customer_id", "status", "amount", "created_at"),
+            """
+            SELECT id, invoice_id, customer_id, status, amount, created_at
+            FROM payments
+            WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+            ORDER BY created_at, id
+            """,
+        ),
+        ExportDataset(
+            "job_costs",
+            ("id", "job_id", "material_cost", "labor_cost", "other_costs", "created_at"),
+            """
+            SELECT id, job_id, material_cost, labor_cost, other_costs, created_at
+            FROM job_costs
+            WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+            ORDER BY created_at, id
+            """,
+        ),
+        ExportDataset(
+            "transactions",
+            ("type", "id", "reference", "customer_id", "job_id", "status", "amount", "created_at"),
+            """
+            SELECT 'invoice' AS type, id, invoice_number AS reference, customer_id, job_id,
+                   status, total_amount AS amount, created_at
+            FROM invoices
+            WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+            UNION ALL
+            SELECT 'payment', id, invoice_id::text, customer_id, NULL, status, amount, created_at
+            FROM payments
+            WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+            UNION ALL
+            SELECT 'job_cost', id, NULL, NULL, job_id, NULL,
+                   -(COALESCE(material_cost, 0) + COALESCE(labor_cost, 0) + COALESCE(other_costs, 0)),
+                   created_at
+            FROM job_costs
+            WHERE tenant_id = $1 AND created_at >= $2 AND created_at <= $3
+            ORDER BY created_at, id
+            """,
+        ),
+    )
+}
+
+
+def get_dataset(name: str) -> ExportDataset:
+    dataset = EXPORT_DATASETS.get(name)
+    if dataset is None:
+        raise HTTPException(status_code=404, detail=f"Unknown export dataset: {name}")
+    return dataset
+
+
+def query_args(tenant_id: str, start_date: date, end_date: date) -> Tuple[Any, datetime, datetime]:
+    return (
+        uuid.UUID(str(tenant_id)),
+        datetime.combine(start_date, dt_time.min),
+        datetime.combine(end_date, dt_time.max),
+    )
+
+
+def export_filename(dataset: str, start_date: date, end_date: date, fmt: str) -> str:
+    return f"{dataset}_{start_date.isoformat()}_{end_date.isoformat()}.{fmt}"
+
+
+# ---------------------------------------------------------------------------
+# Row sources and encoders
+# ---------------------------------------------------------------------------
+
+async def iter_records(
+    pool: Any,
+    query: str,
+    args: Sequence[Any],
+    fetch_size: int = DEFAULT_FETCH_SIZE,
+) -> AsyncIterator[Any]:
+    """Yield rows from a server-side cursor; closing the iterator releases the connection."""
+    async with pool.acquire() as conn:
+        async with conn.transaction(readonly=True):
+            async for record in conn.cursor(query, *args, prefetch=fetch_size):
+                yield record
+
+
+async def estimate_rows(pool: Any, query: str, args: Sequence[Any]) -> int:
+    async with pool.acquire() as conn:
+        plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *args)
+    if isinstance(plan, (str, bytes)):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _xlsx_value(value: Any) -> Any:
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        # Excel has no time zones; write UTC wall-clock time.
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    if value is None or isinstance(value, (int, float, Decimal, str, bool, date)):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+def _row_values(record: Any, columns: Sequence[str]) -> List[Any]:
+    return [record[column] for column in columns]
+
+
+async def iter_csv(
+    records: AsyncIterator[Any],
+    columns: Sequence[str],
+    flush_rows: int = DEFAULT_FLUSH_ROWS,
+) -> AsyncIterator[bytes]:
+    """Encode rows as CSV, yielding a chunk every ``flush_rows`` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    async for record in records:
+        writer.writerow([_csv_value(value) for value in _row_values(record, columns)])
+        pending += 1
+        if pending >= flush_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _load_workbook_class():
+    try:
+        from openpyxl import Workbook
+    except ImportError as exc:  # pragma: no cover - depends on the deployment
+        raise HTTPException(status_code=501, detail="XLSX export requires openpyxl") from exc
+    return Workbook
+
+
+def _append_rows(worksheet: Any, rows: List[List[Any]]) -> None:
+    for row in rows:
+        worksheet.append(row)
+
+
+async def write_xlsx(
+    records: AsyncIterator[Any],
+    columns: Sequence[str],
+    path: str,
+    sheet_title: str = "Export",
+    flush_rows: int = DEFAULT_FLUSH_ROWS,
+) -> int:
+    """Write rows to ``path`` with a write-only workbook; returns the row count.
+
+    openpyxl calls run in a worker thread, one batch at a time, so the event
+    loop is never blocked on cell serialization.
+    """
+    workbook = _load_workbook_class()(write_only=True)
+    worksheet = workbook.create_sheet(title=sheet_title[:31])
+    worksheet.append(list(columns))
+    batch: List[List[Any]] = []
+    total = 0
+    async for record in records:
+        batch.append([_xlsx_value(value) for value in _row_values(record, columns)])
+        if len(batch) >= flush_rows:
+            await asyncio.to_thread(_append_rows, worksheet, batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(_append_rows, worksheet, batch)
+        total += len(batch)
+    await asyncio.to_thread(workbook.save, path)
+    return total
+
+
+async def iter_file(path: str, chunk_size: int = 64 * 1024, remove: bool = False) -> AsyncIterator[bytes]:
+    try:
+        with open(path, "rb") as handle:
+            while True:
+                chunk = await asyncio.to_thread(handle.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        if remove:
+            _remove_file(path)
+
+
+def _remove_file(path: Optional[str]) -> None:
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as exc:
+        logger.warning("Could not remove export file %s: %s", path, exc)
+
+
+# ---------------------------------------------------------------------------
+# Background jobs
+# ---------------------------------------------------------------------------
+
+@dataclass
+class ExportJob:
+    id: str
+    tenant_id: str
+    dataset: str
+    format: str
+    start_date: date
+    end_date: date
+    status: str = JOB_QUEUED
+    rows: int = 0
+    size: Optional[int] = None
+    path: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    completed_at: Optional[float] = None
+
+    @property
+    def filename(self) -> str:
+        return export_filename(self.dataset, self.start_date, self.end_date, self.format)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "dataset": self.dataset,
+            "format": self.format,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat(),
+            "status": self.status,
+            "rows": self.rows,
+            "size": self.size,
+            "error": self.error,
+            "filename": self.filename,
+            "created_at": datetime.fromtimestamp(self.created_at, timezone.utc).isoformat(),
+            "completed_at": (
+                datetime.fromtimestamp(self.completed_at, timezone.utc).isoformat() if self.completed_at else None
+            ),
+        }
+
+
+class ReportExporter:
+    def __init__(
+        self,
+        pool: Any = None,
+        *,
+        export_dir: str = DEFAULT_EXPORT_DIR,
+        max_concurrent_jobs: int = DEFAULT_MAX_CONCURRENT_JOBS,
+        max_concurrent_streams: int = DEFAULT_MAX_CONCURRENT_STREAMS,
+        max_pending_jobs: int = DEFAULT_MAX_PENDING_JOBS,
+        max_pending_jobs_per_tenant: int = DEFAULT_MAX_PENDING_JOBS_PER_TENANT,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+        job_ttl: float = DEFAULT_JOB_TTL_SECONDS,
+        fetch_size: int = DEFAULT_FETCH_SIZE,
+        flush_rows: int = DEFAULT_FLUSH_ROWS,
+    ):
+        self._pool = pool
+        self.export_dir = export_dir
+        self.job_ttl = job_ttl
+        self.fetch_size = fetch_size
+        self.flush_rows = flush_rows
+        self.max_pending_jobs = max(max_pending_jobs, 1)
+        self.max_pending_jobs_per_tenant = max(max_pending_jobs_per_tenant, 1)
+        self.max_disk_bytes = max_disk_bytes
+        self._semaphore = asyncio.Semaphore(max(max_concurrent_jobs, 1))
+        self.max_concurrent_streams = max(max_concurrent_streams, 1)
+        self._stream_semaphore = asyncio.Semaphore(self.max_concurrent_streams)
+        self._streams_active = 0
+        self._jobs: Dict[str, ExportJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "streamed": 0,
+            "jobs_submitted": 0,
+            "jobs_rejected": 0,
+            "jobs_completed": 0,
+            "jobs_failed": 0,
+            "rows": 0,
+        }
+
+    async def get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_BACKGROUND)
+        return self._pool
+
+    async def records(self, dataset: ExportDataset, args: Sequence[Any]) -> AsyncIterator[Any]:
+        pool = await self.get_pool()
+        async for record in iter_records(pool, dataset.query, args, self.fetch_size):
+            yield record
+
+    async def should_run_in_background(self, dataset: ExportDataset, args: Sequence[Any]) -> bool:
+        try:
+            return await estimate_rows(await self.get_pool(), dataset.query, args) > BACKGROUND_ROW_THRESHOLD
+        except Exception as exc:
+            logger.warning("Export row estimate failed for %s: %s", dataset.name, exc)
+            return False
+
+    # -- request mode ---------------------------------------------------
+    @property
+    def streams_saturated(self) -> bool:
+        """True while every streaming slot is reading from the database."""
+        return self._stream_semaphore.locked()
+
+    async def stream(self, dataset: ExportDataset, args: Sequence[Any], fmt: str) -> AsyncIterator[bytes]:
+        """Body iterator for ``StreamingResponse``.
+
+        A streaming slot is held while rows are read (the whole body for CSV,
+        the file build for XLSX), bounding background-pool connections held by
+        request-mode exports.
+        """
+        self._stats["streamed"] += 1
+        if fmt == FORMAT_CSV:
+            async with self._stream_slot():
+                async for chunk in iter_csv(self.records(dataset, args), dataset.columns, self.flush_rows):
+                    yield chunk
+            return
+        path = self._new_path(fmt)
+        try:
+            async with self._stream_slot():
+                rows = await write_xlsx(
+                    self.records(dataset, args), dataset.columns, path, dataset.name, self.flush_rows
+                )
+            self._stats["rows"] += rows
+        except BaseException:
+            _remove_file(path)
+            raise
+        async for chunk in iter_file(path, remove=True):
+            yield chunk
+
+    @asynccontextmanager
+    async def _stream_slot(self) -> AsyncIterator[None]:
+        async with self._stream_semaphore:
+            self._streams_active += 1
+            try:
+                yield
+            finally:
+                self._streams_active -= 1
+
+    # -- background mode ------------------------------------------------
+    def submit(self, tenant_id: str, dataset: ExportDataset, fmt: str, start_date: date, end_date: date) -> ExportJob:
+        self.purge_expired()
+        pending = [job for job in self._jobs.values() if job.status in (JOB_QUEUED, JOB_RUNNING)]
+        if len(pending) >= self.max_pending_jobs:
+            self._reject("Too many exports in progress; retry later")
+        if sum(job.tenant_id == str(tenant_id) for job in pending) >= self.max_pending_jobs_per_tenant:
+            self._reject(f"At most {self.max_pending_jobs_per_tenant} exports per tenant may be in progress")
+        if self.disk_bytes() >= self.max_disk_bytes:
+            self._reject("Export storage is full; retry after older exports expire")
+        job = ExportJob(
+            id=str(uuid.uuid4()),
+            tenant_id=str(tenant_id),
+            dataset=dataset.name,
+            format=fmt,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, dataset))
+        self._stats["jobs_submitted"] += 1
+        return job
+
+    def _reject(self, detail: str) -> None:
+        self._stats["jobs_rejected"] += 1
+        raise HTTPException(status_code=429, detail=detail, headers={"Retry-After": "60"})
+
+    def disk_bytes(self) -> int:
+        """Bytes held by finished export files still retained for download."""
+        return sum(job.size or 0 for job in self._jobs.values() if job.path)
+
+    def get_job(self, job_id: str, tenant_id: str) -> Optional[ExportJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.tenant_id != str(tenant_id):
+            return None
+        return job
+
+    async def _run(self, job: ExportJob, dataset: ExportDataset) -> None:
+        path = self._new_path(job.format)
+        try:
+            async with self._semaphore:
+                job.status = JOB_RUNNING
+                args = query_args(job.tenant_id, job.start_date, job.end_date)
+                if job.format == FORMAT_CSV:
+                    job.rows = await self._write_csv(dataset, args, path)
+                else:
+                    job.rows = await write_xlsx(
+                        self.records(dataset, args), dataset.columns, path, dataset.name, self.flush_rows
+                    )
+            size = os.path.getsize(path)
+            if self.disk_bytes() + size > self.max_disk_bytes:
+                raise RuntimeError("Export storage is full; retry after older exports expire")
+            job.path = path
+            job.size = size
+            job.status = JOB_COMPLETED
+            self._stats["jobs_completed"] += 1
+            self._stats["rows"] += job.rows
+        except asyncio.CancelledError:
+            _remove_file(path)
+            job.status = JOB_FAILED
+            job.error = "cancelled"
+            raise
+        except Exception as exc:
+            _remove_file(path)
+            job.status = JOB_FAILED
+            job.error = str(exc)[:500]
+            self._stats["jobs_failed"] += 1
+            logger.error("Export job %s (%s) failed: %s", job.id, job.dataset, exc)
+        finally:
+            job.completed_at = time.time()
+            self._tasks.pop(job.id, None)
+
+    async def _write_csv(self, dataset: ExportDataset, args: Sequence[Any], path: str) -> int:
+        rows = 0
+
+        async def counted():
+            nonlocal rows
+            async for record in self.records(dataset, args):
+                rows += 1
+                yield record
+
+        with open(path, "wb") as handle:
+            async for chunk in iter_csv(counted(), dataset.columns, self.flush_rows):
+                await asyncio.to_thread(handle.write, chunk)
+        return rows
+
+    def _new_path(self, fmt: str) -> str:
+        os.makedirs(self.export_dir, exist_ok=True)
+        return os.path.join(self.export_dir, f"{uuid.uuid4().hex}.{fmt}")
+
+    def purge_expired(self) -> int:
+        cutoff = time.time() - self.job_ttl
+        expired = [
+            job for job in self._jobs.values()
+            if job.completed_at is not None and job.completed_at < cutoff
+        ]
+        for job in expired:
+            _remove_file(job.path)
+            self._jobs.pop(job.id, None)
+        return len(expired)
+
+    async def close(self) -> None:
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            _remove_file(job.path)
+        self._jobs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "jobs_active": len(self._tasks),
+            "streams_active": self._streams_active,
+            "max_concurrent_streams": self.max_concurrent_streams,
+            "jobs_retained": len(self._jobs),
+            "disk_bytes": self.disk_bytes(),
+            "max_disk_bytes": self.max_disk_bytes,
+            "background_row_threshold": BACKGROUND_ROW_THRESHOLD,
+        }
+
+
+_exporter: Optional[ReportExporter] = None
+
+
+def get_report_exporter() -> ReportExporter:
+    global _exporter
+    if _exporter is None:
+        _exporter = ReportExporter()
+    return _exporter
+
+
+async def stop_report_exporter() -> None:
+    global _exporter
+    exporter, _exporter = _exporter, None
+    if exporter is not None:
+        await exporter.close()
+
+
+def get_report_export_stats() -> Dict[str, Any]:
+    return get_report_exporter().stats()
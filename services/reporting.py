@@ -593,48 +593,36 @@ class ReportingEngine:
     # ============================================================================
     
     def export_to_excel(self, report_data: Dict, report_name: str) -> bytes:
-        """Export report data to Excel format"""
+        """Export report data to Excel format (write-only workbook, rows appended in order)"""
         try:
             import io
             from openpyxl import Workbook
             
-            wb = Workbook()
-            ws = wb.active
-            ws.title = report_name
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(title=report_name[:31])
             
             # Write report data
-            row = 1
             for key, value in report_data.items():
                 if isinstance(value, dict):
-                    ws.cell(row=row, column=1, value=key)
-                    row += 1
+                    ws.append([key])
                     for sub_key, sub_value in value.items():
-                        ws.cell(row=row, column=2, value=sub_key)
-                        ws.cell(row=row, column=3, value=str(sub_value))
-                        row += 1
+                        ws.append([None, sub_key, str(sub_value)])
                 elif isinstance(value, list) and value:
                     # Write list as table
-                    ws.cell(row=row, column=1, value=key)
-                    row += 1
+                    ws.append([key])
                     
                     # Write headers
                     if isinstance(value[0], dict):
                         headers = list(value[0].keys())
-                        for col, header in enumerate(headers, 1):
-                            ws.cell(row=row, column=col, value=header)
-                        row += 1
+                        ws.append(headers)
                         
                         # Write data
                         for item in value:
-                            for col, header in enumerate(headers, 1):
-                                ws.cell(row=row, column=col, value=str(item.get(header, '')))
-                            row += 1
+                            ws.append([str(item.get(header, '')) for header in headers])
                 else:
-                    ws.cell(row=row, column=1, value=key)
-                    ws.cell(row=row, column=2, value=str(value))
-                    row += 1
+                    ws.append([key, str(value)])
                 
-                row += 1  # Add blank row between sections
+                ws.append([])  # Add blank row between sections
             
             # Save to bytes
             excel_file = io.BytesIO()
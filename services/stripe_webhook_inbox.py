@@ -0,0 +1,366 @@
+"""
+Stripe Webhook Inbox
+Durable inbox for ``/api/v1/stripe/webhook`` so the endpoint can acknowledge
+Stripe as soon as the event is stored.
+
+- ``ingest`` persists a verified event into ``webhook_events`` with a single
+  ``INSERT ... ON CONFLICT (stripe_event_id)``: a new event is ``pending``, a
+  redelivery of an event that ended ``failed`` (or has no status, e.g. one
+  written by a replica still on the inline handler) is re-queued, anything
+  else is a duplicate. No DDL or attempt-counter queries run on the request path.
+- The worker claims due events with ``FOR UPDATE SKIP LOCKED`` and processes
+  them off the event loop (sync-DB thread pool). Events are ordered per
+  ``ordering_key`` (the Stripe customer): each key maps to one of
+  ``concurrency`` shards that run their events one at a time in
+  ``event_created_at`` order, and an event is not claimed while an earlier
+  event for the same key is in flight or backing off after a failure.
+- Across replicas the claim is serialised per key: one statement takes
+  ``pg_try_advisory_xact_lock`` on each due key (keys another replica is
+  claiming are skipped), and the claim runs as a second statement in the
+  same transaction, so its snapshot already sees any claim committed for
+  those keys before the lock was granted.
+- Failures are retried with exponential backoff and end ``failed`` after
+  ``max_attempts``; a claim whose worker died is reclaimed after
+  ``visibility_timeout``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from database import get_pool
+from database.pool_manager import PURPOSE_WEBHOOK
+from database.sync_sessions import run_sync_db
+from services.notification_queue import retry_delay
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_PROCESSED = "processed"
+STATUS_FAILED = "failed"
+
+INGEST_NEW = "new"
+INGEST_REQUEUED = "requeued"
+INGEST_DUPLICATE = "duplicate"
+
+DEFAULT_CONCURRENCY = int(os.getenv("STRIPE_WEBHOOK_WORKERS", "4"))
+DEFAULT_BATCH_SIZE = int(os.getenv("STRIPE_WEBHOOK_BATCH_SIZE", "50"))
+DEFAULT_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("STRIPE_WEBHOOK_VISIBILITY_TIMEOUT_SECS", "300"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", "8"))
+DEFAULT_BACKOFF_BASE_SECONDS = float(os.getenv("STRIPE_WEBHOOK_BACKOFF_BASE_SECS", "10"))
+DEFAULT_BACKOFF_MAX_SECONDS = float(os.getenv("STRIPE_WEBHOOK_BACKOFF_MAX_SECS", "1800"))
+DEFAULT_POLL_INTERVAL_SECONDS = float(os.getenv("STRIPE_WEBHOOK_POLL_INTERVAL_SECS", "2"))
+
+_INGEST = """
+    INSERT INTO webhook_events (
+        id, event_type, stripe_event_id, data, ordering_key, event_created_at,
+        status, attempts, next_attempt_at, created_at
+    ) VALUES ($1, $2, $3, $4::jsonb, $5, $6, 'pending', 0, NOW(), NOW())
+    ON CONFLICT (stripe_event_id) DO UPDATE
+    SET status = 'pending', attempts = 0, next_attempt_at = NOW(), last_error = NULL,
+        ordering_key = EXCLUDED.ordering_key, event_created_at = EXCLUDED.event_created_at
+    WHERE webhook_events.status = 'failed' OR webhook_events.status IS NULL
+    RETURNING (xmax = 0) AS inserted
+"""
+
+# Due ordering keys, oldest first, that no other replica is claiming right now.
+# The LIMIT subquery keeps the lock call to the keys actually returned.
+_LOCK_KEYS = """
+    SELECT COALESCE(array_agg(due.ordering_key), ARRAY[]::text[])
+    FROM (
+        SELECT ordering_key, MIN(event_created_at) AS first_created_at
+        FROM webhook_events
+        WHERE (status = 'pending' AND next_attempt_at <= NOW())
+           OR (status = 'processing' AND locked_until < NOW())
+        GROUP BY ordering_key
+        ORDER BY first_created_at
+        LIMIT $1
+    ) due
+    WHERE pg_try_advisory_xact_lock(hashtext('webhook_events'), hashtext(due.ordering_key))
+"""
+
+_CLAIM = """
+    WITH claimable AS (
+        SELECT w.id FROM webhook_events w
+        WHERE ((w.status = 'pending' AND w.next_attempt_at <= NOW())
+            OR (w.status = 'processing' AND w.locked_until < NOW()))
+          AND w.ordering_key = ANY($3::text[])
+          AND NOT EXISTS (
+              SELECT 1 FROM webhook_events prior
+              WHERE prior.ordering_key = w.ordering_key
+                AND prior.id <> w.id
+                AND prior.event_created_at <= w.event_created_at
+                AND ((prior.status = 'processing' AND prior.locked_until >= NOW())
+                  OR (prior.status = 'pending' AND prior.next_attempt_at > NOW()))
+          )
+        ORDER BY w.event_created_at, w.created_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE webhook_events w
+    SET status = 'processing',
+        attempts = COALESCE(w.attempts, 0) + 1,
+        locked_until = NOW() + make_interval(secs => $2)
+    FROM claimable
+    WHERE w.id = claimable.id
+    RETURNING w.id, w.stripe_event_id, w.event_type, w.data, w.ordering_key,
+              w.event_created_at, w.created_at, w.attempts
+"""
+
+# Only rows this worker still owns are updated (see notification_queue._COMPLETE).
+# $6 gives back the attempt of an event deferred behind a failed earlier one.
+_COMPLETE = """
+    UPDATE webhook_events
+    SET status = $2,
+        processed_at = CASE WHEN $2 = 'processed' THEN NOW() ELSE processed_at END,
+        next_attempt_at = NOW() + make_interval(secs => $3),
+        locked_until = NULL,
+        last_error = $4,
+        attempts = attempts - $6
+    WHERE id = $1 AND status = 'processing' AND attempts = $5
+"""
+
+Processor = Callable[[Dict[str, Any], int], None]
+
+
+def ordering_key(event: Dict[str, Any]) -> str:
+    """Key whose events must be applied in order: the Stripe customer when known."""
+    obj = (event.get("data") or {}).get("object") or {}
+    customer = obj.get("customer")
+    if isinstance(customer, dict):
+        customer = customer.get("id")
+    if not customer and str(obj.get("object")) == "customer":
+        customer = obj.get("id")
+    return str(customer or event.get("id") or "")
+
+
+def _default_processor(event: Dict[str, Any], attempt_no: int) -> None:
+    # Deferred: routes.stripe_webhooks imports this module.
+    from routes.stripe_webhooks import process_stripe_event
+
+    process_stripe_event(event, attempt_no)
+
+
+class StripeWebhookInbox:
+    def __init__(
+        self,
+        pool: Any = None,
+        *,
+        processor: Optional[Processor] = None,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT_SECONDS,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff_base: float = DEFAULT_BACKOFF_BASE_SECONDS,
+        backoff_max: float = DEFAULT_BACKOFF_MAX_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+    ):
+        self._pool = pool
+        self.processor = processor or _default_processor
+        self.concurrency = max(concurrency, 1)
+        self.batch_size = max(batch_size, 1)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        self._running = False
+        self._wake = asyncio.Event()
+        self._stats = {
+            "ingested": 0,
+            "requeued": 0,
+            "duplicates": 0,
+            "batches": 0,
+            "processed": 0,
+            "retried": 0,
+            "deferred": 0,
+            "failed": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+    async def ingest(self, event: Dict[str, Any]) -> str:
+        """Store a verified event; returns ``new``, ``requeued`` or ``duplicate``."""
+        created = event.get("created")
+        event_created_at = (
+            datetime.fromtimestamp(float(created), tz=timezone.utc).replace(tzinfo=None)
+            if created
+            else datetime.utcnow()
+        )
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                _INGEST,
+                str(uuid.uuid4()),
+                event.get("type", ""),
+                event["id"],
+                json.dumps(event),
+                ordering_key(event),
+                event_created_at,
+            )
+        if row is None:
+            self._stats["duplicates"] += 1
+            return INGEST_DUPLICATE
+        self._wake.set()
+        if row["inserted"]:
+            self._stats["ingested"] += 1
+            return INGEST_NEW
+        self._stats["requeued"] += 1
+        return INGEST_REQUEUED
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    async def _process(self, row: Dict[str, Any]) -> Tuple[Any, str, float, Optional[str], int, int]:
+        attempts = int(row.get("attempts") or 1)
+        event = row["data"]
+        if isinstance(event, str):
+            event = json.loads(event)
+        try:
+            await run_sync_db(self.processor, event, attempts)
+        except Exception as exc:
+            error = str(exc)[:500]
+            if attempts >= self.max_attempts:
+                logger.error("Stripe event %s failed after %s attempts: %s", row["stripe_event_id"], attempts, error)
+                return (row["id"], STATUS_FAILED, 0.0, error, attempts, 0)
+            delay = retry_delay(attempts, self.backoff_base, self.backoff_max)
+            return (row["id"], STATUS_PENDING, delay, error, attempts, 0)
+        return (row["id"], STATUS_PROCESSED, 0.0, None, attempts, 0)
+
+    async def _run_shard(self, rows: List[Dict[str, Any]]) -> List[Tuple]:
+        """Process one shard's events in order; later events of a failed key wait behind it."""
+        outcomes: List[Tuple] = []
+        blocked: Dict[str, float] = {}
+        for row in rows:
+            key = row["ordering_key"]
+            if key in blocked:
+                outcomes.append(
+                    (row["id"], STATUS_PENDING, blocked[key], "Deferred behind an earlier failed event", row["attempts"], 1)
+                )
+                continue
+            outcome = await self._process(row)
+            if outcome[1] == STATUS_PENDING:
+                blocked[key] = outcome[2]
+            outcomes.append(outcome)
+        return outcomes
+
+    def _shard(self, key: str) -> int:
+        return zlib.crc32(key.encode("utf-8")) % self.concurrency
+
+    async def run_once(self) -> int:
+        """Claim one batch of due events and process it."""
+        started = time.perf_counter()
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                keys = await conn.fetchval(_LOCK_KEYS, self.batch_size)
+                rows = (
+                    await conn.fetch(_CLAIM, self.batch_size, float(self.visibility_timeout), keys)
+                    if keys
+                    else []
+                )
+        if not rows:
+            return 0
+
+        shards: Dict[int, List[Dict[str, Any]]] = {}
+        for row in sorted((dict(row) for row in rows), key=lambda r: (r["event_created_at"], r["created_at"])):
+            shards.setdefault(self._shard(row["ordering_key"] or ""), []).append(row)
+        results = await asyncio.gather(*(self._run_shard(shard_rows) for shard_rows in shards.values()))
+        outcomes = [outcome for shard_outcomes in results for outcome in shard_outcomes]
+        async with pool.acquire() as conn:
+            await conn.executemany(_COMPLETE, outcomes)
+
+        self._stats["batches"] += 1
+        for outcome in outcomes:
+            if outcome[5]:
+                self._stats["deferred"] += 1
+            else:
+                key = {STATUS_PROCESSED: "processed", STATUS_PENDING: "retried", STATUS_FAILED: "failed"}[outcome[1]]
+                self._stats[key] += 1
+        self._stats["last_batch_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        return len(rows)
+
+    async def run(self) -> None:
+        """Process the inbox until ``stop()``; ingest wakes it, otherwise it polls."""
+        self._running = True
+        logger.info("Stripe webhook inbox worker started (shards=%s)", self.concurrency)
+        try:
+            while self._running:
+                self._wake.clear()
+                try:
+                    if await self.run_once() >= self.batch_size:
+                        continue
+                except Exception as exc:
+                    logger.error("Stripe webhook inbox batch failed: %s", exc)
+                if not self._running:
+                    break
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            logger.info("Stripe webhook inbox worker stopped")
+
+    def stop(self) -> None:
+        self._running = False
+        self._wake.set()
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await get_pool(PURPOSE_WEBHOOK)
+        return self._pool
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "running": self._running,
+            "shards": self.concurrency,
+            "batch_size": self.batch_size,
+        }
+
+
+_inbox: Optional[StripeWebhookInbox] = None
+_inbox_task: Optional[asyncio.Task] = None
+
+
+def get_stripe_webhook_inbox() -> StripeWebhookInbox:
+    global _inbox
+    if _inbox is None:
+        _inbox = StripeWebhookInbox()
+    return _inbox
+
+
+def start_stripe_webhook_worker() -> Optional[asyncio.Task]:
+    global _inbox_task
+    if os.getenv("STRIPE_WEBHOOK_WORKER", "true").lower() in ("0", "false", "no"):
+        return None
+    if _inbox_task is None or _inbox_task.done():
+        _inbox_task = asyncio.create_task(get_stripe_webhook_inbox().run())
+    return _inbox_task
+
+
+async def stop_stripe_webhook_worker() -> None:
+    global _inbox_task
+    task, _inbox_task = _inbox_task, None
+    if task is None:
+        return
+    get_stripe_webhook_inbox().stop()
+    try:
+        await asyncio.wait_for(task, timeout=30)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        task.cancel()
+
+
+def get_stripe_webhook_inbox_stats() -> Dict[str, Any]:
+    return get_stripe_webhook_inbox().stats()
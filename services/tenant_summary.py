@@ -0,0 +1,399 @@
+"""
+Tenant Dashboard Summary Engine
+Shared per-tenant aggregate counts for the dashboard endpoints
+(/api/v1/dashboard/stats, /api/v1/erp/dashboard and the live WebSocket feed).
+
+Three layers, cheapest first:
+
+1. In-process TTL cache with single-flight: concurrent requests for the same
+   tenant share one computation instead of each running their own.
+2. ``tenant_dashboard_summary`` table: statement-level triggers on the source
+   tables bump a per-tenant ``version``; a stored summary is reused while its
+   ``source_version`` matches and it is younger than ``max_age_seconds`` (which
+   bounds staleness of time-relative figures such as "this month"). Only the
+   first write after a recompute is armed bumps the row, so writers within a
+   tenant do not serialize on it; see the migration for the arming barrier.
+3. One combined aggregate query (one CTE per source table) on a single
+   connection, replacing the per-table ``fetchrow`` round-trips.
+
+The ``tenant_id`` column type of each source table is discovered once so the
+combined query can compare against an index-friendly typed parameter.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TABLE = "tenant_dashboard_summary"
+
+# How long a recompute waits for in-flight writers to commit before giving up
+# on storing its result (the computed summary is still returned).
+BARRIER_LOCK_TIMEOUT = "2s"
+
+# Source table -> aggregate select list. ``{tenant}`` is replaced with the
+# typed tenant predicate for that table.
+_SECTIONS: Dict[str, str] = {
+    "customers": """
+        SELECT
+            COUNT(*) AS customers_total,
+            COUNT(*) FILTER (
+                WHERE created_at >= date_trunc('month', NOW())
+            ) AS customers_new_this_month
+        FROM customers WHERE {tenant}
+    """,
+    "jobs": """
+        SELECT
+            COUNT(*) AS jobs_total,
+            COUNT(*) FILTER (WHERE status IN ('in_progress', 'scheduled')) AS jobs_active,
+            COUNT(*) FILTER (WHERE status = 'completed') AS jobs_completed
+        FROM jobs WHERE {tenant}
+    """,
+    "invoices": """
+        SELECT
+            COUNT(*) AS invoices_total,
+            COUNT(*) FILTER (
+                WHERE COALESCE(LOWER(payment_status), '') <> 'paid'
+            ) AS invoices_unpaid,
+            COUNT(*) FILTER (
+                WHERE COALESCE(LOWER(payment_status), '') <> 'paid'
+                  AND due_date IS NOT NULL
+                  AND due_date < NOW()
+            ) AS invoices_overdue,
+            COUNT(*) FILTER (WHERE status IN ('pending', 'overdue')) AS invoices_pending_status,
+            COALESCE(SUM(
+                CASE
+                    WHEN LOWER(payment_status) = 'paid'
+                        THEN COALESCE(total_amount, amount, 0)
+                    ELSE 0
+                END
+            ), 0) AS revenue_total,
+            COALESCE(SUM(
+                CASE
+                    WHEN COALESCE(LOWER(payment_status), '') <> 'paid'
+                        THEN COALESCE(total_amount, amount, 0)
+                    ELSE 0
+                END
+            ), 0) AS revenue_pending,
+            COALESCE(SUM(total_amount) FILTER (
+                WHERE status = 'paid' AND created_at >= date_trunc('month', CURRENT_DATE)
+            ), 0) AS revenue_mtd,
+            COALESCE(SUM(total_amount) FILTER (
+                WHERE status = 'paid' AND created_at >= date_trunc('year', CURRENT_DATE)
+            ), 0) AS revenue_ytd,
+            COALESCE(SUM(total_amount) FILTER (
+                WHERE status = 'paid' AND created_at >= CURRENT_DATE
+            ), 0) AS revenue_today
+        FROM invoices WHERE {tenant}
+    """,
+    "estimates": """
+        SELECT
+            COUNT(*) AS estimates_total,
+            COUNT(*) FILTER (WHERE status = 'pending') AS estimates_pending
+        FROM estimates WHERE {tenant}
+    """,
+    "employees": """
+        SELECT
+            COUNT(*) AS employees_total,
+            COUNT(*) FILTER (WHERE employment_status = 'active') AS employees_active
+        FROM employees WHERE {tenant}
+    """,
+    "equipment": """
+        SELECT COUNT(*) AS equipment_total
+        FROM equipment WHERE {tenant}
+    """,
+    "inventory_items": """
+        SELECT
+            COUNT(*) AS inventory_total_items,
+            COALESCE(SUM(
+                COALESCE(cost, unit_price, 0)::numeric
+                * COALESCE(quantity, 0)::numeric
+            ), 0) AS inventory_total_value
+        FROM inventory_items WHERE {tenant}
+    """,
+    "leads": """
+        SELECT
+            COUNT(*) AS leads_total,
+            COUNT(*) FILTER (WHERE COALESCE(status, 'active') <> 'lost') AS leads_active,
+            COUNT(*) FILTER (WHERE source = 'estimate') AS leads_estimates,
+            COUNT(*) FILTER (WHERE source = 'service_ticket') AS leads_service_tickets
+        FROM leads WHERE {tenant}
+    """,
+    "service_tickets": """
+        SELECT
+            COUNT(*) FILTER (
+                WHERE COALESCE(stage, '') NOT IN ('completed', 'cancelled', 'void')
+            ) AS service_tickets_open
+        FROM service_tickets WHERE {tenant}
+    """,
+}
+
+# Every summary key with its zero value, used when a source table is absent.
+SUMMARY_FIELDS: Dict[str, Any] = {
+    "customers_total": 0,
+    "customers_new_this_month": 0,
+    "jobs_total": 0,
+    "jobs_active": 0,
+    "jobs_completed": 0,
+    "invoices_total": 0,
+    "invoices_unpaid": 0,
+    "invoices_overdue": 0,
+    "invoices_pending_status": 0,
+    "revenue_total": 0.0,
+    "revenue_pending": 0.0,
+    "revenue_mtd": 0.0,
+    "revenue_ytd": 0.0,
+    "revenue_today": 0.0,
+    "estimates_total": 0,
+    "estimates_pending": 0,
+    "employees_total": 0,
+    "employees_active": 0,
+    "equipment_total": 0,
+    "inventory_total_items": 0,
+    "inventory_total_value": 0.0,
+    "leads_total": 0,
+    "leads_active": 0,
+    "leads_estimates": 0,
+    "leads_service_tickets": 0,
+    "service_tickets_open": 0,
+}
+
+_TENANT_TYPE_QUERY = """
+    SELECT table_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = 'public'
+      AND column_name = 'tenant_id'
+      AND table_name = ANY($1::text[])
+"""
+
+
+def _tenant_predicate(data_type: str) -> str:
+    if data_type == "uuid":
+        return "tenant_id = $1::uuid"
+    if data_type in {"text", "character varying"}:
+        return "tenant_id = $1::text"
+    return "tenant_id::text = $1::text"
+
+
+def build_summary_query(tenant_column_types: Dict[str, str]) -> Optional[str]:
+    """Combined aggregate query over the source tables that exist."""
+    ctes = []
+    for table, body in _SECTIONS.items():
+        data_type = tenant_column_types.get(table)
+        if data_type is None:
+            continue
+        ctes.append(f"{table}_summary AS ({body.format(tenant=_tenant_predicate(data_type))})")
+    if not ctes:
+        return None
+    names = [cte.split(" AS ", 1)[0] for cte in ctes]
+    return "WITH " + ",\n".join(ctes) + "\nSELECT * FROM " + " CROSS JOIN ".join(names)
+
+
+def _normalize(row: Optional[Any]) -> Dict[str, Any]:
+    summary = dict(SUMMARY_FIELDS)
+    if row is None:
+        return summary
+    for key, value in dict(row).items():
+        if key not in summary or value is None:
+            continue
+        # Decimal sums become floats, counts ints, so the summary is JSON-safe.
+        summary[key] = float(value) if isinstance(summary[key], float) else int(value)
+    return summary
+
+
+class TenantSummaryEngine:
+    """Per-tenant dashboard aggregates with a TTL cache, single-flight and a summary table."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: Optional[float] = None,
+        max_age_seconds: Optional[float] = None,
+        max_entries: int = 1024,
+    ):
+        self.ttl_seconds = float(
+            ttl_seconds if ttl_seconds is not None else os.getenv("TENANT_SUMMARY_CACHE_TTL_SECS", "10")
+        )
+        self.max_age_seconds = float(
+            max_age_seconds
+            if max_age_seconds is not None
+            else os.getenv("TENANT_SUMMARY_MAX_AGE_SECS", "300")
+        )
+        self.max_entries = max(int(max_entries), 1)
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._query: Optional[str] = None
+        self._query_loaded = False
+        self._table_available = True
+        self._stats: Dict[str, int] = {
+            "cache_hits": 0,
+            "shared_waits": 0,
+            "table_hits": 0,
+            "computes": 0,
+            "barrier_timeouts": 0,
+            "errors": 0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "cached_tenants": len(self._cache),
+            "inflight": len(self._inflight),
+            "summary_table": self._table_available,
+        }
+
+    def invalidate(self, tenant_id: Optional[str] = None) -> None:
+        """Drop cached summaries (one tenant, or all) from this process."""
+        if tenant_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(str(tenant_id), None)
+
+    async def get(self, pool: Any, tenant_id: str) -> Dict[str, Any]:
+        """Summary for ``tenant_id``; concurrent callers share one computation."""
+        key = str(tenant_id)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            self._cache.move_to_end(key)
+            self._stats["cache_hits"] += 1
+            return dict(cached[1])
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats["shared_waits"] += 1
+        else:
+            task = asyncio.ensure_future(self._load(pool, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        # shield: a cancelled caller must not cancel the shared computation.
+        summary = await asyncio.shield(task)
+        return dict(summary)
+
+    async def _load(self, pool: Any, tenant_id: str) -> Dict[str, Any]:
+        try:
+            async with pool.acquire() as conn:
+                summary = await self._load_on(conn, tenant_id)
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        if self.ttl_seconds > 0:
+            self._cache[tenant_id] = (time.monotonic() + self.ttl_seconds, summary)
+            self._cache.move_to_end(tenant_id)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return summary
+
+    async def _load_on(self, conn: Any, tenant_id: str) -> Dict[str, Any]:
+        if self._table_available:
+            try:
+                row = await conn.fetchrow(
+                    f"""
+                    SELECT summary, version, source_version,
+                           EXTRACT(EPOCH FROM (NOW() - computed_at)) AS age_seconds
+                    FROM {SUMMARY_TABLE}
+                    WHERE tenant_id = $1
+                    """,
+                    tenant_id,
+                )
+            except asyncpg.exceptions.UndefinedTableError:
+                logger.warning("%s missing; computing dashboard summaries directly", SUMMARY_TABLE)
+                self._table_available = False
+                row = None
+            if row is not None:
+                fresh = (
+                    row["summary"] is not None
+                    and row["source_version"] == row["version"]
+                    and row["age_seconds"] is not None
+                    and float(row["age_seconds"]) < self.max_age_seconds
+                )
+                if fresh:
+                    self._stats["table_hits"] += 1
+                    stored = row["summary"]
+                    return _normalize(json.loads(stored) if isinstance(stored, str) else stored)
+
+        armed_version = await self._arm(conn, tenant_id) if self._table_available else None
+        summary = await self._compute(conn, tenant_id)
+
+        if armed_version is not None:
+            # The summary reflects every write up to armed_version; a write that
+            # landed after arming bumped version past it and leaves the row stale.
+            await conn.execute(
+                f"""
+                UPDATE {SUMMARY_TABLE}
+                SET summary = $2::jsonb,
+                    computed_at = NOW(),
+                    source_version = $3
+                WHERE tenant_id = $1
+                  AND source_version <= $3
+                """,
+                tenant_id,
+                json.dumps(summary),
+                armed_version,
+            )
+        return summary
+
+    async def _arm(self, conn: Any, tenant_id: str) -> Optional[int]:
+        """Arm the summary row for a recompute; returns the version it covers.
+
+        After ``armed_version = version`` is committed, the next write bumps the
+        row again. Writers that checked the row before it was armed still hold
+        the shared per-tenant advisory lock; taking it exclusively waits for
+        them to commit, so the aggregate query that follows sees their rows.
+        Returns None (compute without storing) if that wait times out.
+        """
+        armed_version = await conn.fetchval(
+            f"""
+            INSERT INTO {SUMMARY_TABLE} (tenant_id, version, armed_version, source_version)
+            VALUES ($1, 1, 1, 0)
+            ON CONFLICT (tenant_id) DO UPDATE
+            SET armed_version = {SUMMARY_TABLE}.version
+            RETURNING version
+            """,
+            tenant_id,
+        )
+        try:
+            async with conn.transaction():
+                await conn.execute(f"SET LOCAL lock_timeout = '{BARRIER_LOCK_TIMEOUT}'")
+                await conn.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext($1), hashtext($2))",
+                    SUMMARY_TABLE,
+                    tenant_id,
+                )
+        except asyncpg.exceptions.LockNotAvailableError:
+            self._stats["barrier_timeouts"] += 1
+            return None
+        return armed_version
+
+    async def _compute(self, conn: Any, tenant_id: str) -> Dict[str, Any]:
+        if not self._query_loaded:
+            rows = await conn.fetch(_TENANT_TYPE_QUERY, list(_SECTIONS))
+            self._query = build_summary_query({r["table_name"]: r["data_type"] for r in rows})
+            self._query_loaded = True
+        self._stats["computes"] += 1
+        if self._query is None:
+            return _normalize(None)
+        return _normalize(await conn.fetchrow(self._query, tenant_id))
+
+
+_engine: Optional[TenantSummaryEngine] = None
+
+
+def get_tenant_summary_engine() -> TenantSummaryEngine:
+    global _engine
+    if _engine is None:
+        _engine = TenantSummaryEngine()
+    return _engine
+
+
+async def get_tenant_summary(pool: Any, tenant_id: str) -> Dict[str, Any]:
+    """Shared dashboard aggregates for ``tenant_id`` (see module docstring)."""
+    return await get_tenant_summary_engine().get(pool, tenant_id)
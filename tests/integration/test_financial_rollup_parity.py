@@ -0,0 +1,243 @@
+"""
+Integration Tests - Financial Rollup Parity
+Applies the rollup migration to a scratch schema, drives a random mix of
+invoice / payment / job cost inserts, updates and deletes through the triggers,
+and checks every report figure read from the rollups against the raw query.
+"""
+
+import random
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, time, timedelta, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from services import financial_rollups
+from services.financial_rollups import FinancialRollups
+
+MIGRATION = Path(__file__).resolve().parents[2] / "migrations" / "20261016_financial_rollups.sql"
+TENANTS = [uuid.UUID(int=i + 1) for i in range(3)]
+JOB_TYPES = ["Repair", "Install", "Inspection", None]
+STATUSES = ["draft", "sent", "paid", "overdue", "cancelled", None]
+DAYS = 150
+
+
+class _SchemaPool:
+    """Pool whose connections resolve unqualified names in the scratch schema."""
+
+    def __init__(self, pool, schema):
+        self.pool = pool
+        self.schema = schema
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self.pool.acquire() as conn:
+            await conn.execute(f"SET search_path TO {self.schema}")
+            try:
+                yield conn
+            finally:
+                await conn.execute("RESET search_path")
+
+
+@pytest.fixture
+async def rollup_pool(async_db_pool):
+    schema = f"fr_test_{uuid.uuid4().hex[:8]}"
+    migration = (
+        MIGRATION.read_text()
+        .replace("search_path = public", f"search_path = {schema}")
+        .replace("public.", f"{schema}.")
+    )
+    async with async_db_pool.acquire() as conn:
+        await conn.execute(f"""
+            CREATE SCHEMA {schema};
+            CREATE TABLE {schema}.jobs (id uuid PRIMARY KEY, job_type text);
+            CREATE TABLE {schema}.invoices (
+                id uuid PRIMARY KEY, tenant_id uuid, job_id uuid, status text,
+                total_amount numeric(12,2), balance_cents bigint, due_date date, created_at timestamptz
+            );
+            CREATE TABLE {schema}.invoice_payments (
+                id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+                invoice_id uuid NOT NULL REFERENCES {schema}.invoices(id) ON DELETE CASCADE,
+                payment_date date NOT NULL, amount numeric(12,2) NOT NULL
+            );
+            CREATE TABLE {schema}.job_costs (
+                id uuid PRIMARY KEY DEFAULT gen_random_uuid(), tenant_id uuid,
+                material_cost numeric(12,2), labor_cost numeric(12,2), other_costs numeric(12,2),
+                created_at timestamptz
+            );
+        """)
+        await conn.execute(migration)
+    yield _SchemaPool(async_db_pool, schema)
+    async with async_db_pool.acquire() as conn:
+        await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+def _money(rng, allow_null=False):
+    if allow_null and rng.random() < 0.1:
+        return None
+    return Decimal(rng.randint(0, 500_000)) / 100
+
+
+def _when(rng, today):
+    moment = datetime.combine(today - timedelta(days=rng.randint(0, DAYS)), time(), tzinfo=timezone.utc)
+    return moment + timedelta(seconds=rng.randint(0, 86_399))
+
+
+async def _workload(conn, rng, today):
+    jobs = [(uuid.uuid4(), rng.choice(JOB_TYPES)) for _ in range(12)]
+    await conn.executemany("INSERT INTO jobs (id, job_type) VALUES ($1, $2)", jobs)
+
+    invoices = [
+        (
+            uuid.uuid4(),
+            rng.choice(TENANTS + [None]) if rng.random() < 0.05 else rng.choice(TENANTS),
+            rng.choice(jobs)[0] if rng.random() < 0.8 else uuid.uuid4(),
+            rng.choice(STATUSES),
+            _money(rng, allow_null=True),
+            rng.randint(0, 500_000) if rng.random() > 0.05 else None,
+            today + timedelta(days=rng.randint(-120, 30)) if rng.random() > 0.05 else None,
+            _when(rng, today) if rng.random() > 0.02 else None,
+        )
+        for _ in range(400)
+    ]
+    # Several statements so the triggers see multi-row and single-row batches.
+    for chunk in range(0, len(invoices), 97):
+        await conn.executemany(
+            "INSERT INTO invoices (id, tenant_id, job_id, status, total_amount, balance_cents, due_date, created_at) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7, $8)",
+            invoices[chunk:chunk + 97],
+        )
+    ids = [row[0] for row in invoices]
+
+    payments = [
+        (rng.choice(ids), today - timedelta(days=rng.randint(0, DAYS)), _money(rng))
+        for _ in range(250)
+    ]
+    await conn.executemany(
+        "INSERT INTO invoice_payments (invoice_id, payment_date, amount) VALUES ($1, $2, $3)", payments
+    )
+    await conn.executemany(
+        "INSERT INTO job_costs (tenant_id, material_cost, labor_cost, other_costs, created_at) "
+        "VALUES ($1, $2, $3, $4, $5)",
+        [
+            (rng.choice(TENANTS), _money(rng, True), _money(rng, True), _money(rng, True), _when(rng, today))
+            for _ in range(300)
+        ],
+    )
+
+    # Status / balance / amount / date changes, in bulk and one at a time.
+    await conn.execute("UPDATE invoices SET status = 'paid', balance_cents = 0 WHERE status = 'sent' AND random() < 0.5")
+    await conn.execute("UPDATE invoices SET total_amount = total_amount * 1.1 WHERE random() < 0.2")
+    await conn.execute("UPDATE invoices SET created_at = created_at - interval '20 days' WHERE random() < 0.1")
+    await conn.execute("UPDATE invoices SET due_date = NULL WHERE random() < 0.05")
+    for invoice_id in rng.sample(ids, 20):
+        await conn.execute(
+            "UPDATE invoices SET status = $2, balance_cents = $3 WHERE id = $1",
+            invoice_id, rng.choice(STATUSES), rng.randint(0, 100_000),
+        )
+    await conn.execute(
+        "UPDATE invoices i SET tenant_id = $1 WHERE random() < 0.03 "
+        "AND NOT EXISTS (SELECT 1 FROM invoice_payments p WHERE p.invoice_id = i.id)",
+        TENANTS[0],
+    )
+    # Only invoices without payments: a cascade is the nightly rebuild's job.
+    await conn.execute(
+        "DELETE FROM invoices i WHERE random() < 0.1 "
+        "AND NOT EXISTS (SELECT 1 FROM invoice_payments p WHERE p.invoice_id = i.id)"
+    )
+
+    await conn.execute("UPDATE invoice_payments SET amount = amount + 10 WHERE random() < 0.2")
+    await conn.execute("UPDATE invoice_payments SET payment_date = payment_date - 3 WHERE random() < 0.1")
+    await conn.execute("DELETE FROM invoice_payments WHERE random() < 0.1")
+
+    await conn.execute("UPDATE job_costs SET labor_cost = labor_cost + 5 WHERE random() < 0.2")
+    await conn.execute("UPDATE job_costs SET other_costs = NULL WHERE random() < 0.05")
+    await conn.execute("UPDATE job_costs SET created_at = created_at + interval '1 day' WHERE random() < 0.1")
+    await conn.execute("DELETE FROM job_costs WHERE random() < 0.1")
+
+
+def _assert_same(raw, rollup, where):
+    if isinstance(raw, dict):
+        assert raw.keys() == rollup.keys(), where
+        for key in raw:
+            _assert_same(raw[key], rollup[key], f"{where}.{key}")
+    elif isinstance(raw, list):
+        assert len(raw) == len(rollup), where
+        for index, (left, right) in enumerate(zip(raw, rollup)):
+            _assert_same(left, right, f"{where}[{index}]")
+    elif isinstance(raw, float):
+        assert rollup == pytest.approx(raw, abs=1e-6), where
+    else:
+        assert raw == rollup, where
+
+
+def _ranges(rng, today):
+    yield today - timedelta(days=DAYS + 30), today
+    yield today, today
+    for _ in range(12):
+        start = today - timedelta(days=rng.randint(0, DAYS))
+        yield start, start + timedelta(days=rng.randint(0, 45))
+
+
+async def _check_parity(conn, rng, today):
+    for tenant in TENANTS:
+        tenant_id = str(tenant)
+        for start, end in _ranges(rng, today):
+            where = f"{tenant_id} {start}..{end}"
+            for name in ("revenue", "expenses", "cash_flow"):
+                raw = await getattr(financial_rollups, f"raw_{name}")(conn, tenant_id, start, end)
+                rollup = await getattr(financial_rollups, f"rollup_{name}")(conn, tenant_id, start, end)
+                _assert_same(raw, rollup, f"{name} {where}")
+        for as_of in (today, today - timedelta(days=30), today - timedelta(days=DAYS + 1)):
+            _assert_same(
+                await financial_rollups.raw_ar_aging(conn, tenant_id, as_of),
+                await financial_rollups.rollup_ar_aging(conn, tenant_id, as_of),
+                f"ar_aging {tenant_id} {as_of}",
+            )
+        _assert_same(
+            await financial_rollups.raw_ar_outstanding(conn, tenant_id),
+            await financial_rollups.rollup_ar_outstanding(conn, tenant_id),
+            f"ar_outstanding {tenant_id}",
+        )
+        months = [today.replace(day=1) - relativedelta(months=i) for i in range(6)]
+        periods = [(first, first + relativedelta(months=1) - timedelta(days=1)) for first in months]
+        _assert_same(
+            await financial_rollups.raw_trends(conn, tenant_id, periods),
+            await financial_rollups.rollup_trends(conn, tenant_id, periods),
+            f"trends {tenant_id}",
+        )
+
+
+@pytest.mark.integration
+@pytest.mark.database
+async def test_trigger_maintained_rollups_match_raw_reports(rollup_pool):
+    rng = random.Random(23)
+    async with rollup_pool.acquire() as conn:
+        today = await conn.fetchval("SELECT CURRENT_DATE")
+        await _workload(conn, rng, today)
+        await _check_parity(conn, rng, today)
+
+
+@pytest.mark.integration
+@pytest.mark.database
+async def test_nightly_rebuild_corrects_what_deltas_cannot_see(rollup_pool):
+    rng = random.Random(24)
+    async with rollup_pool.acquire() as conn:
+        today = await conn.fetchval("SELECT CURRENT_DATE")
+        await _workload(conn, rng, today)
+        # Category drift and payments dropped by an invoice delete cascade.
+        await conn.execute("UPDATE jobs SET job_type = 'Roofing' WHERE job_type IS DISTINCT FROM 'Roofing'")
+        await conn.execute(
+            "DELETE FROM invoices WHERE id IN (SELECT invoice_id FROM invoice_payments LIMIT 10)"
+        )
+
+    rollups = FinancialRollups(rollup_pool, batch_size=2)
+    assert await rollups.rebuild() == len(TENANTS)
+
+    async with rollup_pool.acquire() as conn:
+        await _check_parity(conn, rng, today)
+        revenue = await financial_rollups.rollup_revenue(conn, str(TENANTS[0]), today - timedelta(days=DAYS), today)
+    assert "Roofing" in {row["category"] for row in revenue["by_category"]}
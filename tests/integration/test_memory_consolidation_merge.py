@@ -0,0 +1,117 @@
+"""
+Integration Tests - Memory Consolidation
+Applies the consolidation migration to a scratch unified_ai_memory, merges
+injected near-duplicates in small pages, then adds memories and checks that a
+second run only indexes the new ones and merges them into existing memories.
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import asyncpg
+import numpy as np
+import pytest
+
+from brainops_ai_os.memory_consolidation import MemoryConsolidator, normalize
+
+MIGRATIONS = Path(__file__).resolve().parents[2] / "migrations"
+MIGRATION = MIGRATIONS / "20261016_memory_consolidation.sql"
+INDEX_MIGRATION = MIGRATIONS / "20261016_memory_consolidation_index.sql"
+DIM = 32
+
+
+class _SchemaPool:
+    """Pool whose connections resolve unqualified names in the scratch schema."""
+
+    def __init__(self, pool, schema):
+        self.pool = pool
+        self.schema = schema
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self.pool.acquire() as conn:
+            await conn.execute(f"SET search_path TO {self.schema}, public")
+            try:
+                yield conn
+            finally:
+                await conn.execute("RESET search_path")
+
+
+@pytest.fixture
+async def memory_pool(async_db_pool):
+    schema = f"mc_test_{uuid.uuid4().hex[:8]}"
+    async with async_db_pool.acquire() as conn:
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        except asyncpg.PostgresError as e:
+            pytest.skip(f"pgvector unavailable: {e}")
+        await conn.execute(f"""
+            CREATE SCHEMA {schema};
+            CREATE TABLE {schema}.unified_ai_memory (
+                id uuid PRIMARY KEY, memory_type text, content jsonb,
+                embedding vector({DIM}), importance_score float8,
+                access_count int DEFAULT 0, last_accessed timestamptz,
+                related_memories uuid[], metadata jsonb,
+                archived boolean DEFAULT false, archived_at timestamptz,
+                created_at timestamptz DEFAULT now()
+            );
+        """)
+        await conn.execute(MIGRATION.read_text().replace("public.", f"{schema}."))
+        await conn.execute(INDEX_MIGRATION.read_text().replace("public.", f"{schema}."))
+    yield _SchemaPool(async_db_pool, schema)
+    async with async_db_pool.acquire() as conn:
+        await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+async def _insert(conn, vectors, importance, minutes_ago):
+    ids = [uuid.uuid4() for _ in range(len(vectors))]
+    await conn.executemany(
+        "INSERT INTO unified_ai_memory (id, memory_type, content, embedding, importance_score, access_count, "
+        "metadata, created_at) VALUES ($1, 'episodic', '{}'::jsonb, $2::vector, $3, 1, '{}'::jsonb, "
+        "NOW() - make_interval(mins => $4))",
+        [
+            (ids[k], "[" + ",".join(map(str, vectors[k])) + "]", float(importance[k]), int(minutes_ago[k]))
+            for k in range(len(vectors))
+        ],
+    )
+    return ids
+
+
+def _copies(rng, sources):
+    noise = normalize(rng.normal(size=sources.shape))
+    noise = normalize(noise - (noise * sources).sum(axis=1, keepdims=True) * sources)
+    return normalize(0.98 * sources + np.sqrt(1 - 0.98**2) * noise)
+
+
+@pytest.mark.integration
+@pytest.mark.database
+async def test_paged_merge_then_incremental_run(memory_pool):
+    rng = np.random.default_rng(25)
+    base = normalize(rng.normal(size=(300, DIM)))
+    copies = _copies(rng, base[:30])
+    vectors = np.vstack([base, copies])
+    importance = np.r_[np.full(300, 0.8), np.full(30, 0.2)]
+
+    async with memory_pool.acquire() as conn:
+        ids = await _insert(conn, vectors, importance, rng.integers(60, 6000, len(vectors)))
+
+    consolidator = MemoryConsolidator(memory_pool, page_size=40, settle_seconds=0)
+    first = await consolidator.run()
+
+    assert first["caught_up"] and first["indexed"] == len(vectors) and first["merged"] == 30
+    async with memory_pool.acquire() as conn:
+        rows = {r["id"]: r for r in await conn.fetch("SELECT * FROM unified_ai_memory")}
+        indexed = await conn.fetchval("SELECT count(*) FROM unified_memory_lsh")
+    for k in range(30):
+        duplicate, original = rows[ids[300 + k]], rows[ids[k]]
+        assert duplicate["archived"] and original["access_count"] == 2
+        assert ids[300 + k] in original["related_memories"]
+    assert indexed == 300
+
+    later = _copies(rng, base[30:40])
+    async with memory_pool.acquire() as conn:
+        await _insert(conn, later, np.full(10, 0.1), np.full(10, 1))
+    second = await consolidator.run()
+
+    assert second == {"indexed": 10, "merged": 10, "pages": 1, "caught_up": True}
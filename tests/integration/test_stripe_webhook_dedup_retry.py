@@ -1,7 +1,7 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from types import SimpleNamespace
 from typing import Any, Dict, List, Optional
 
 import pytest
@@ -18,36 +18,17 @@ class _Result:
 
 @dataclass
 class _FakeStripeDB:
-    webhook_events: set
+    """Sync Session used by process_stripe_event (attempt audit trail only)."""
+
     attempts: List[Dict[str, Any]]
 
     def __init__(self):
-        self.webhook_events = set()
         self.attempts = []
 
     def execute(self, query, params: Optional[Dict[str, Any]] = None):
         sql = str(query).lower()
         params = params or {}
 
-        if "insert into webhook_events" in sql:
-            event_id = params.get("stripe_event_id")
-            if event_id in self.webhook_events:
-                return _Result(None)
-            self.webhook_events.add(event_id)
-            return _Result(SimpleNamespace(stripe_event_id=event_id))
-
-        if "select status" in sql and "from webhook_event_attempts" in sql:
-            event_id = params.get("stripe_event_id")
-            found = [row for row in self.attempts if row["stripe_event_id"] == event_id]
-            if not found:
-                return _Result(None)
-            return _Result(SimpleNamespace(status=found[-1]["status"]))
-
-        if "select coalesce(max(attempt_no)" in sql:
-            event_id = params.get("stripe_event_id")
-            matching = [row["attempt_no"] for row in self.attempts if row["stripe_event_id"] == event_id]
-            return _Result(SimpleNamespace(last_attempt=max(matching) if matching else 0))
-
         if "insert into webhook_event_attempts" in sql:
             self.attempts.append(
                 {
@@ -58,9 +39,6 @@ class _FakeStripeDB:
                     "error_message": params.get("error_message"),
                 }
             )
-            return _Result(None)
-
-        # DDL and indexes are no-ops.
         return _Result(None)
 
     def commit(self):
@@ -70,6 +48,68 @@ class _FakeStripeDB:
         return None
 
 
+class _FakeInboxConn:
+    """Emulates the inbox statements against an in-memory webhook_events table."""
+
+    def __init__(self, events: Dict[str, Dict[str, Any]]):
+        self.events = events
+
+    async def fetchrow(self, query, row_id, event_type, stripe_event_id, data, key, created_at):
+        existing = self.events.get(stripe_event_id)
+        if existing is not None and existing["status"] != "failed":
+            return None
+        self.events[stripe_event_id] = {
+            "id": existing["id"] if existing else row_id,
+            "stripe_event_id": stripe_event_id,
+            "event_type": event_type,
+            "data": data,
+            "ordering_key": key,
+            "event_created_at": created_at,
+            "created_at": created_at,
+            "status": "pending",
+            "attempts": 0,
+        }
+        return {"inserted": existing is None}
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def fetchval(self, query, limit):
+        assert "pg_try_advisory_xact_lock" in query
+        keys = []
+        for row in self.events.values():
+            if row["status"] == "pending" and row["ordering_key"] not in keys:
+                keys.append(row["ordering_key"])
+        return keys[:limit]
+
+    async def fetch(self, query, limit, visibility_timeout, keys):
+        claimed = []
+        for row in self.events.values():
+            if row["status"] == "pending" and row["ordering_key"] in keys and len(claimed) < limit:
+                row["status"] = "processing"
+                row["attempts"] += 1
+                claimed.append(dict(row))
+        return claimed
+
+    async def executemany(self, query, outcomes):
+        by_id = {row["id"]: row for row in self.events.values()}
+        for row_id, status, _delay, _error, attempts, refund in outcomes:
+            row = by_id[row_id]
+            if row["status"] == "processing" and row["attempts"] == attempts:
+                row["status"] = status
+                row["attempts"] -= refund
+
+
+class _FakeInboxPool:
+    def __init__(self, events: Dict[str, Dict[str, Any]]):
+        self.events = events
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield _FakeInboxConn(self.events)
+
+
 class _SessionCtx:
     def __init__(self, db: _FakeStripeDB):
         self._db = db
@@ -106,25 +146,35 @@ def _build_request(payload: bytes, signature: str) -> Request:
     return Request(scope, _receive)
 
 
+def _install(monkeypatch, mod, db, events, event):
+    from services.stripe_webhook_inbox import StripeWebhookInbox
+
+    inbox = StripeWebhookInbox(_FakeInboxPool(events))
+    monkeypatch.setattr(mod, "STRIPE_WEBHOOK_SECRET", "whsec_test")
+    monkeypatch.setattr(mod, "SessionLocal", lambda: _SessionCtx(db))
+    monkeypatch.setattr(mod, "get_stripe_webhook_inbox", lambda: inbox)
+    monkeypatch.setattr(mod.stripe.Webhook, "construct_event", lambda *_args, **_kwargs: event)
+    return inbox
+
+
 @pytest.mark.asyncio
 async def test_webhook_event_deduplicates_after_success(monkeypatch):
     from routes import stripe_webhooks as mod
 
     db = _FakeStripeDB()
+    events: Dict[str, Dict[str, Any]] = {}
     event = {"id": "evt_dedup", "type": "unknown.event", "data": {"object": {}}}
+    inbox = _install(monkeypatch, mod, db, events, event)
 
-    monkeypatch.setattr(mod, "STRIPE_WEBHOOK_SECRET", "whsec_test")
-    monkeypatch.setattr(mod, "SessionLocal", lambda: _SessionCtx(db))
-    monkeypatch.setattr(mod.stripe.Webhook, "construct_event", lambda *_args, **_kwargs: event)
-
-    req_1 = _build_request(b"{}", "sig_test")
-    req_2 = _build_request(b"{}", "sig_test")
-
-    first = await mod.handle_stripe_webhook(req_1, stripe_signature="sig_test")
-    second = await mod.handle_stripe_webhook(req_2, stripe_signature="sig_test")
+    first = await mod.handle_stripe_webhook(_build_request(b"{}", "sig_test"), stripe_signature="sig_test")
+    assert await inbox.run_once() == 1
+    second = await mod.handle_stripe_webhook(_build_request(b"{}", "sig_test"), stripe_signature="sig_test")
 
     assert first["received"] is True
+    assert first["retry"] is False
     assert second["duplicate"] is True
+    assert events["evt_dedup"]["status"] == "processed"
+    assert [attempt["status"] for attempt in db.attempts] == ["processed"]
 
 
 @pytest.mark.asyncio
@@ -132,26 +182,22 @@ async def test_webhook_retries_when_previous_attempt_failed(monkeypatch):
     from routes import stripe_webhooks as mod
 
     db = _FakeStripeDB()
-    db.webhook_events.add("evt_retry")
-    db.attempts.append(
-        {
+    events: Dict[str, Dict[str, Any]] = {
+        "evt_retry": {
+            "id": "row-1",
             "stripe_event_id": "evt_retry",
-            "event_type": "unknown.event",
-            "attempt_no": 1,
             "status": "failed",
-            "error_message": "transient",
+            "attempts": 8,
         }
-    )
-
+    }
     event = {"id": "evt_retry", "type": "unknown.event", "data": {"object": {}}}
-
-    monkeypatch.setattr(mod, "STRIPE_WEBHOOK_SECRET", "whsec_test")
-    monkeypatch.setattr(mod, "SessionLocal", lambda: _SessionCtx(db))
-    monkeypatch.setattr(mod.stripe.Webhook, "construct_event", lambda *_args, **_kwargs: event)
+    inbox = _install(monkeypatch, mod, db, events, event)
 
     req = _build_request(b"{}", "sig_test")
     response = await mod.handle_stripe_webhook(req, stripe_signature="sig_test")
+    await inbox.run_once()
 
     assert response["received"] is True
     assert response["retry"] is True
     assert any(attempt["status"] == "processed" for attempt in db.attempts)
+    assert events["evt_retry"]["status"] == "processed"
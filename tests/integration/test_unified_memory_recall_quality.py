@@ -0,0 +1,128 @@
+"""
+Integration Tests - Unified Memory Recall Quality
+Applies the HNSW migrations to a scratch unified_ai_memory, loads clustered
+vectors and checks that HNSW recall (with and without selective filters)
+returns at least 95% of the exact nearest neighbours computed in numpy.
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import asyncpg
+import numpy as np
+import pytest
+
+from brainops_ai_os.unified_memory import UnifiedMemorySubstrate
+
+MIGRATIONS = [
+    Path(__file__).resolve().parents[2] / "migrations" / name
+    for name in ("20261016_unified_memory_ann.sql", "20261016_unified_memory_ann_index.sql")
+]
+DIM = 64
+ROWS = 6000
+QUERIES = 40
+K = 10
+
+
+class _SchemaPool:
+    """Pool whose connections resolve unqualified names in the scratch schema."""
+
+    def __init__(self, pool, schema):
+        self.pool = pool
+        self.schema = schema
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self.pool.acquire() as conn:
+            await conn.execute(f"SET search_path TO {self.schema}, public")
+            try:
+                yield conn
+            finally:
+                await conn.execute("RESET search_path")
+
+
+def _clustered(rng, count):
+    centres = rng.normal(size=(40, DIM))
+    points = centres[rng.integers(0, len(centres), count)] + rng.normal(scale=0.35, size=(count, DIM))
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+@pytest.fixture
+async def memory_pool(async_db_pool):
+    schema = f"um_test_{uuid.uuid4().hex[:8]}"
+    async with async_db_pool.acquire() as conn:
+        try:
+            await conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        except asyncpg.PostgresError as e:
+            pytest.skip(f"pgvector unavailable: {e}")
+        await conn.execute(f"""
+            CREATE SCHEMA {schema};
+            CREATE TABLE {schema}.unified_ai_memory (
+                id uuid PRIMARY KEY, memory_type text, content jsonb,
+                embedding vector({DIM}), importance_score float8,
+                access_count int DEFAULT 0, last_accessed timestamptz,
+                related_memories uuid[], metadata jsonb,
+                archived boolean DEFAULT false, created_at timestamptz DEFAULT now()
+            );
+        """)
+    yield _SchemaPool(async_db_pool, schema), schema
+    async with async_db_pool.acquire() as conn:
+        await conn.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+async def _load(pool, schema, vectors, importance, archived):
+    ids = [uuid.uuid4() for _ in range(len(vectors))]
+    async with pool.acquire() as conn:
+        await conn.executemany(
+            "INSERT INTO unified_ai_memory (id, memory_type, content, embedding, importance_score, archived) "
+            "VALUES ($1, 'semantic', '{}'::jsonb, $2::vector, $3, $4)",
+            [
+                (ids[i], "[" + ",".join(map(str, vectors[i])) + "]", float(importance[i]), bool(archived[i]))
+                for i in range(len(vectors))
+            ],
+        )
+        for migration in MIGRATIONS:
+            await conn.execute(
+                migration.read_text()
+                .replace("CREATE EXTENSION IF NOT EXISTS vector;", "")
+                .replace("public.", f"{schema}.")
+            )
+        await conn.execute("ANALYZE unified_ai_memory")
+        plan = await conn.fetch(
+            "EXPLAIN SELECT id FROM unified_ai_memory WHERE archived = false "
+            "ORDER BY embedding <=> $1::vector LIMIT 10",
+            "[" + ",".join(["0.1"] * DIM) + "]",
+        )
+    return np.array(ids), "\n".join(row[0] for row in plan)
+
+
+@pytest.mark.integration
+@pytest.mark.database
+async def test_hnsw_recall_matches_exact_neighbours(memory_pool):
+    pool, schema = memory_pool
+    rng = np.random.default_rng(24)
+    vectors = _clustered(rng, ROWS)
+    importance = rng.random(ROWS)
+    archived = rng.random(ROWS) < 0.1
+    ids, plan = await _load(pool, schema, vectors, importance, archived)
+    assert "idx_unified_ai_memory_embedding_hnsw" in plan
+
+    substrate = UnifiedMemorySubstrate(MagicMock())
+    substrate.db_pool = pool
+    queries = _clustered(rng, QUERIES)
+
+    for min_importance in (0.0, 0.6):
+        if min_importance and substrate._ann_iterative_scan_supported is False:
+            continue  # pgvector < 0.8 post-filters a single ef_search window
+        live = ~archived & (importance >= min_importance)
+        hits = 0
+        for query in queries:
+            exact = ids[live][np.argsort(-(vectors[live] @ query))[:K]]
+            found = await substrate.recall_by_embedding(query.tolist(), K, min_importance=min_importance)
+            assert len(found) == K
+            similarities = [m["similarity"] for m in found]
+            assert similarities == sorted(similarities, reverse=True)
+            hits += len({uuid.UUID(m["id"]) for m in found} & set(exact))
+        assert hits / (QUERIES * K) >= 0.95, f"recall@{K} with min_importance={min_importance}"
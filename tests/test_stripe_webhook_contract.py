@@ -145,9 +145,9 @@ class TestQuarantineBehavior:
 class TestHandlerExceptionRecording:
     """When a handler raises, the webhook attempt must be recorded as 'failed'."""
 
-    # This is tested indirectly — the try/except at lines 328-378 in
-    # stripe_webhooks.py wraps all handler calls. If a handler raises,
-    # line 366-378 catches it and records "failed" status.
+    # This is tested indirectly — the try/except in
+    # stripe_webhooks.process_stripe_event wraps all handler calls. If a
+    # handler raises, it records "failed" status and re-raises for a retry.
     # We verify the control flow pattern is correct.
 
     def test_exception_flow_structure(self):
@@ -156,7 +156,7 @@ class TestHandlerExceptionRecording:
         import inspect
         from routes import stripe_webhooks
 
-        source = inspect.getsource(stripe_webhooks.handle_stripe_webhook)
+        source = inspect.getsource(stripe_webhooks.process_stripe_event)
         # The except block must record "failed" status
         assert '"failed"' in source
         # The processed status must be INSIDE the try block (not unconditional)
@@ -0,0 +1,215 @@
+"""
+Unit Tests - Batched Audit Writer
+Validates buffered multi-row flushes, per-event-type durability, hash chaining
+across batches, bad-row isolation, the shutdown drain, wait mode on the event
+loop and the chained synchronous fallback.
+"""
+
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+import asyncpg
+import pytest
+
+from services import audit_service
+from services.audit_writer import (
+    GENESIS_HASH,
+    AuditWriter,
+    build_audit_record,
+    verify_chain,
+)
+
+
+class _FakeConn:
+    def __init__(self, store):
+        self.store = store
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def fetchrow(self, query, *args):
+        return dict(self.store["head"])
+
+    async def execute(self, query, *args):
+        if "INSERT INTO audit_logs" in query:
+            columns = [
+                "id", "event_type", "action", "user_id", "resource_type", "resource_id",
+                "details", "severity", "ip_address", "user_agent", "request_method",
+                "request_path", "created_at", "chain_seq", "prev_hash", "row_hash",
+            ]
+            rows = [dict(zip(columns, values)) for values in zip(*args)]
+            if any(row["user_id"] in self.store["unknown_users"] for row in rows):
+                raise asyncpg.exceptions.ForeignKeyViolationError.new(
+                    {"C": "23503", "M": "violates fk_audit_user", "n": "fk_audit_user"}
+                )
+            if any(row["action"] == "BAD" for row in rows):
+                raise asyncpg.exceptions.DataError("invalid input")
+            self.store["rows"].extend(rows)
+            self.store["inserts"] += 1
+        else:
+            self.store["head"] = {"seq": args[0], "row_hash": args[1]}
+
+
+class _FakePool:
+    def __init__(self):
+        self.store = {
+            "head": {"seq": 0, "row_hash": GENESIS_HASH},
+            "rows": [],
+            "inserts": 0,
+            "unknown_users": set(),
+        }
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield _FakeConn(self.store)
+
+
+def _record(action, event_type="DATA", **overrides):
+    return build_audit_record(
+        event_type=event_type,
+        action=action,
+        details={"n": action},
+        severity="INFO",
+        **overrides,
+    )
+
+
+@pytest.mark.asyncio
+async def test_buffered_events_flush_as_one_chained_batch():
+    pool = _FakePool()
+    writer = AuditWriter(pool, batch_size=100, flush_interval=60)
+    writer.start()
+
+    for index in range(10):
+        assert writer.submit(_record(f"A{index}")) is True
+    await writer.stop()
+
+    rows = pool.store["rows"]
+    assert pool.store["inserts"] == 1
+    assert [row["chain_seq"] for row in rows] == list(range(1, 11))
+    assert rows[0]["prev_hash"] == GENESIS_HASH
+    assert verify_chain(rows) is None
+    assert pool.store["head"] == {"seq": 10, "row_hash": rows[-1]["row_hash"]}
+
+
+@pytest.mark.asyncio
+async def test_chain_continues_across_batches_and_detects_tampering():
+    pool = _FakePool()
+    writer = AuditWriter(pool, batch_size=3, flush_interval=60)
+    writer.start()
+    for index in range(7):
+        writer.submit(_record(f"B{index}"))
+    await writer.stop()
+
+    rows = pool.store["rows"]
+    assert pool.store["inserts"] == 3
+    assert verify_chain(rows, prev_hash=GENESIS_HASH) is None
+
+    tampered = [dict(row) for row in rows]
+    details = json.loads(tampered[4]["details"])
+    details["n"] = "edited"
+    tampered[4]["details"] = json.dumps(details)
+    assert verify_chain(tampered) == 5
+
+
+@pytest.mark.asyncio
+async def test_bad_rows_are_isolated_instead_of_failing_the_batch():
+    pool = _FakePool()
+    ghost = str(uuid.uuid4())
+    pool.store["unknown_users"].add(ghost)
+    writer = AuditWriter(pool, batch_size=100, flush_interval=60)
+    writer.start()
+
+    for index in range(8):
+        action = "BAD" if index == 2 else f"C{index}"
+        writer.submit(_record(action, user_id=ghost if index == 5 else None))
+    await writer.stop()
+
+    rows = pool.store["rows"]
+    assert [row["action"] for row in rows] == ["C0", "C1", "C3", "C4", "C5", "C6", "C7"]
+    assert rows[4]["user_id"] is None
+    assert json.loads(rows[4]["details"])["user_ref"] == ghost
+    assert verify_chain(rows, prev_hash=GENESIS_HASH) is None
+    stats = writer.stats()
+    assert (stats["written"], stats["rows_rejected"], stats["dropped"], stats["users_detached"]) == (7, 1, 1, 1)
+    assert stats["flush_failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_wait_mode_blocks_worker_thread_until_commit():
+    pool = _FakePool()
+    writer = AuditWriter(pool, batch_size=100, flush_interval=60, wait_event_types=["SECURITY"])
+    writer.start()
+
+    result = await asyncio.to_thread(writer.submit, _record("BREACH", event_type="SECURITY"))
+
+    assert result is True
+    assert [row["action"] for row in pool.store["rows"]] == ["BREACH"]
+    assert writer.durability_for("DATA") == "async"
+    await writer.stop()
+
+
+def test_records_keep_non_uuid_ids_in_details():
+    record = _record("X", user_id="system", resource_id="not-a-uuid", ip_address="bad-ip")
+
+    assert record["user_id"] is None
+    assert record["resource_id"] is None
+    assert record["ip_address"] is None
+    assert json.loads(record["details"])["user_ref"] == "system"
+
+
+@pytest.mark.asyncio
+async def test_wait_mode_on_loop_is_handed_back_or_awaited():
+    pool = _FakePool()
+    writer = AuditWriter(pool, batch_size=100, flush_interval=60, wait_event_types=["SECURITY"])
+    writer.start()
+
+    assert writer.submit(_record("ON_LOOP", event_type="SECURITY")) is None
+    assert await writer.submit_async(_record("AWAITED", event_type="SECURITY")) is True
+
+    assert [row["action"] for row in pool.store["rows"]] == ["AWAITED"]
+    assert writer.stats()["handed_back"] == 1
+    await writer.stop()
+
+
+class _FakeSession:
+    def __init__(self, head):
+        self.head = head
+        self.rows = []
+        self.commits = 0
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        result = MagicMock()
+        if "FOR UPDATE" in sql:
+            result.mappings.return_value.first.return_value = dict(self.head)
+        elif "INSERT INTO audit_logs" in sql:
+            self.rows.append(dict(params))
+        else:
+            self.head = {"seq": params["seq"], "row_hash": params["row_hash"]}
+        return result
+
+    def commit(self):
+        self.commits += 1
+
+
+@pytest.mark.asyncio
+async def test_sync_fallback_continues_the_writers_chain():
+    pool = _FakePool()
+    writer = AuditWriter(pool, batch_size=100, flush_interval=60)
+    writer.start()
+    writer.submit(_record("BATCHED"))
+    await writer.stop()
+
+    db = _FakeSession(pool.store["head"])
+    assert audit_service.log_event(db, "DATA", "LIST_JOBS", user_id="u1") is True
+
+    rows = pool.store["rows"] + db.rows
+    assert [row["chain_seq"] for row in rows] == [1, 2]
+    assert verify_chain(rows, GENESIS_HASH) is None
+    assert db.head == {"seq": 2, "row_hash": db.rows[0]["row_hash"]}
+    assert db.commits == 1
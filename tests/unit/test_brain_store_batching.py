@@ -0,0 +1,121 @@
+"""
+Unit Tests - Brain Store Batched Delivery
+Validates the bounded telemetry queue: one shared client, size-triggered
+batches, drop-oldest backpressure counters and the shutdown drain.
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import core.brain_store as brain_store
+
+
+class _RecordingClient:
+    def __init__(self):
+        self.posted = []
+        self.is_closed = False
+
+    async def post(self, url, json=None, headers=None):
+        self.posted.append(json["key"])
+        response = MagicMock()
+        response.is_success = True
+        response.headers = {}
+        return response
+
+    async def aclose(self):
+        self.is_closed = True
+
+
+@pytest.fixture
+def client(monkeypatch):
+    created = []
+
+    def _factory(*args, **kwargs):
+        created.append(_RecordingClient())
+        return created[-1]
+
+    monkeypatch.setattr(brain_store, "_queue", brain_store.deque())
+    monkeypatch.setattr(brain_store, "_queue_dropped", 0)
+    monkeypatch.setattr(brain_store, "_queue_enqueued", 0)
+    monkeypatch.setattr(brain_store, "_batches_sent", 0)
+    monkeypatch.setattr(brain_store, "_worker_task", None)
+    monkeypatch.setattr(brain_store, "_http_client", None)
+    with patch("core.brain_store.httpx.AsyncClient", side_effect=_factory):
+        yield created
+
+
+def _dispatch(idx):
+    brain_store.dispatch_brain_store(key=f"k{idx}", value={"i": idx})
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_sent_over_one_shared_client(client, monkeypatch):
+    monkeypatch.setattr(brain_store, "BATCH_SIZE", 5)
+    monkeypatch.setattr(brain_store, "FLUSH_INTERVAL_SECONDS", 60)
+
+    for idx in range(10):
+        _dispatch(idx)
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+    assert len(client) == 1
+    assert client[0].posted == [f"k{idx}" for idx in range(10)]
+    health = brain_store.get_brain_store_health()
+    assert health["batches_sent"] == 2
+    assert health["queue_depth"] == 0
+    await brain_store.shutdown_brain_store()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_and_shutdown_flushes(client, monkeypatch):
+    monkeypatch.setattr(brain_store, "QUEUE_MAX", 3)
+    monkeypatch.setattr(brain_store, "BATCH_SIZE", 100)
+    monkeypatch.setattr(brain_store, "FLUSH_INTERVAL_SECONDS", 60)
+
+    for idx in range(5):
+        _dispatch(idx)
+    health = brain_store.get_brain_store_health()
+    assert health["queue_depth"] == 3
+    assert health["dropped"] == 2
+    assert health["enqueued"] == 5
+
+    await brain_store.shutdown_brain_store()
+    assert client[0].posted == ["k2", "k3", "k4"]
+    assert client[0].is_closed
+    assert brain_store._worker_task is None
+
+
+@pytest.mark.asyncio
+async def test_shutdown_waits_for_the_in_flight_batch(client, monkeypatch):
+    monkeypatch.setattr(brain_store, "BATCH_SIZE", 2)
+    monkeypatch.setattr(brain_store, "FLUSH_INTERVAL_SECONDS", 60)
+    release = asyncio.Event()
+
+    for idx in range(3):
+        _dispatch(idx)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    recording = client[0]
+    original_post = recording.post
+
+    async def _slow_post(url, json=None, headers=None):
+        await release.wait()
+        return await original_post(url, json=json, headers=headers)
+
+    recording.post = _slow_post
+    _dispatch(3)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    asyncio.get_running_loop().call_later(0.05, release.set)
+
+    await brain_store.shutdown_brain_store(timeout=2.0)
+
+    assert recording.posted == ["k0", "k1", "k2", "k3"]
+    assert brain_store.get_brain_store_health()["dropped"] == 0
+
+
+def test_dispatch_without_running_loop_is_a_no_op(client):
+    _dispatch(1)
+    assert brain_store.get_brain_store_health()["queue_depth"] == 0
@@ -0,0 +1,325 @@
+"""
+Unit Tests - CenterPoint Incremental Sync
+Runs CenterPointSync against a local fake CenterPoint HTTP server and checks
+keyset pagination, per-entity high-water marks, batched upserts, hash-based
+skips, references to parents that have not synced yet, and the full-fetch
+fallback for an API that ignores the keyset parameters.
+"""
+
+import json
+import re
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from centerpoint_sync import CenterPointSync, build_upsert_sql, content_hash, ENTITIES
+
+REFERENCE = re.compile(r"LEFT JOIN (\w+) ref\d+ ON ref\d+\.centerpoint_id = r\.(\w+)")
+
+
+def _customer(index, updated_at, name=None):
+    return {
+        "id": f"cp-c{index}",
+        "company_name": name or f"Customer {index}",
+        "email": f"c{index}@example.com",
+        "updated_at": updated_at,
+    }
+
+
+def _project(index, updated_at, customer):
+    return {"id": f"cp-p{index}", "name": f"Project {index}", "customer_id": customer, "updated_at": updated_at}
+
+
+def _key(item):
+    return datetime.fromisoformat(item["updated_at"]), item["id"]
+
+
+class _FakeCenterPoint:
+    def __init__(self):
+        self.records = {"customers": [], "projects": [], "invoices": []}
+        self.requests = []
+        self.on_request = None
+        self.ignores_params = False
+        self.failing = set()
+        self.app = web.Application()
+        self.app.router.add_post("/auth/token", self.token)
+        self.app.router.add_get("/api/v1/{entity}", self.list_entity)
+
+    async def token(self, request):
+        return web.json_response({"access_token": "token"})
+
+    async def list_entity(self, request):
+        entity = request.match_info["entity"]
+        self.requests.append((entity, dict(request.query)))
+        if self.on_request is not None:
+            self.on_request(len(self.requests))
+        if entity in self.failing:
+            return web.json_response({"error": "unavailable"}, status=503)
+        if self.ignores_params:
+            return web.json_response({"data": self.records[entity]})
+        items = sorted(self.records[entity], key=_key)
+        since = request.query.get("updated_since")
+        if since:
+            after = (datetime.fromisoformat(since), request.query.get("after_id", ""))
+            items = [item for item in items if _key(item) > after]
+        per_page = int(request.query["per_page"])
+        return web.json_response({"data": items[:per_page], "meta": {"has_more": len(items) > per_page}})
+
+
+class _FakeConn:
+    def __init__(self, db):
+        self.db = db
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def fetch(self, query, payload):
+        table = re.search(r"INSERT INTO (\w+)", query).group(1)
+        self.db["upserts"] += 1
+        stored = self.db["tables"].setdefault(table, {})
+        rows = []
+        for record in json.loads(payload):
+            # Resolved reference ids, None where the parent is not stored yet.
+            record["refs"] = {
+                ref_key: record[ref_key] if record[ref_key] in self.db["tables"].get(parent, {}) else None
+                for parent, ref_key in REFERENCE.findall(query)
+                if ref_key in record
+            }
+            unresolved = any(record[k] is not None and v is None for k, v in record["refs"].items())
+            previous = stored.get(record["centerpoint_id"])
+            inserted = None
+            if previous is None or (previous["content_hash"], previous["refs"]) != (
+                record["content_hash"],
+                record["refs"],
+            ):
+                inserted = previous is None
+                stored[record["centerpoint_id"]] = record
+            rows.append({"centerpoint_id": record["centerpoint_id"], "inserted": inserted, "unresolved": unresolved})
+        return rows
+
+    async def fetchrow(self, query, entity):
+        watermark = self.db["watermarks"].get(entity)
+        return None if watermark is None else {"high_water_mark": watermark[0], "high_water_id": watermark[1]}
+
+    async def execute(self, query, entity, watermark, watermark_id):
+        self.db["watermarks"][entity] = (watermark, watermark_id)
+
+
+class _FakePool:
+    def __init__(self):
+        self.db = {"tables": {}, "watermarks": {}, "upserts": 0}
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield _FakeConn(self.db)
+
+
+@pytest.fixture
+async def centerpoint():
+    fake = _FakeCenterPoint()
+    server = TestServer(fake.app)
+    await server.start_server()
+    yield fake, str(server.make_url("")).rstrip("/")
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_sync_pages_through_source_and_upserts_in_batches(centerpoint):
+    fake, base_url = centerpoint
+    fake.records["customers"] = [_customer(i, f"2026-10-01T00:00:{i:02d}+00:00") for i in range(7)]
+    pool = _FakePool()
+    sync = CenterPointSync({"base_url": base_url}, pool, page_size=3, batch_size=2)
+
+    try:
+        progress = await sync.sync_entity("customers")
+    finally:
+        await sync.close()
+
+    assert progress["pages"] == 3
+    assert progress["fetched"] == 7
+    assert progress["inserted"] == 7
+    assert pool.db["upserts"] == 5  # pages of 3/3/1 split into batches of 2
+    assert len(pool.db["tables"]["weathercraft_customers"]) == 7
+    watermark, watermark_id = pool.db["watermarks"]["customers"]
+    assert (watermark.isoformat(), watermark_id) == ("2026-10-01T00:00:06+00:00", "cp-c6")
+    assert progress["lag_seconds"] is not None
+
+
+@pytest.mark.asyncio
+async def test_keyset_paging_does_not_skip_records_edited_mid_run(centerpoint):
+    fake, base_url = centerpoint
+    # Several records share a timestamp, so the key needs the id tie-breaker.
+    fake.records["customers"] = [_customer(i, f"2026-10-01T00:00:0{i // 2}+00:00") for i in range(6)]
+
+    def _edit_first_record(request_number):
+        if request_number == 2:
+            fake.records["customers"][0] = _customer(0, "2026-10-03T00:00:00+00:00", name="Edited")
+
+    fake.on_request = _edit_first_record
+    pool = _FakePool()
+    sync = CenterPointSync({"base_url": base_url}, pool, page_size=2)
+
+    try:
+        progress = await sync.sync_entity("customers")
+    finally:
+        await sync.close()
+
+    stored = pool.db["tables"]["weathercraft_customers"]
+    assert sorted(stored) == [f"cp-c{i}" for i in range(6)]
+    assert stored["cp-c0"]["company_name"] == "Edited"
+    assert progress["fetched"] == 7
+    assert [query.get("after_id") for _, query in fake.requests] == [None, "cp-c1", "cp-c3", "cp-c5"]
+
+
+@pytest.mark.asyncio
+async def test_second_run_resumes_from_watermark_and_skips_unchanged(centerpoint):
+    fake, base_url = centerpoint
+    fake.records["customers"] = [_customer(i, f"2026-10-01T00:00:{i:02d}+00:00") for i in range(4)]
+    pool = _FakePool()
+    sync = CenterPointSync({"base_url": base_url}, pool, page_size=10)
+
+    try:
+        await sync.sync_entity("customers")
+        fake.records["customers"][2] = _customer(2, "2026-10-02T00:00:00+00:00", name="Renamed")
+        fake.requests.clear()
+        progress = await sync.sync_entity("customers")
+    finally:
+        await sync.close()
+
+    assert fake.requests[0][1]["updated_since"] == "2026-10-01T00:00:03+00:00"
+    assert fake.requests[0][1]["after_id"] == "cp-c3"
+    # Only the record edited after the watermark is fetched and written.
+    assert progress["fetched"] == 1
+    assert progress["updated"] == 1
+    assert progress["unchanged"] == 0
+    stored = pool.db["tables"]["weathercraft_customers"]["cp-c2"]
+    assert stored["company_name"] == "Renamed"
+
+
+def test_upsert_resolves_references_by_join_and_skips_equal_hashes():
+    projects = next(spec for spec in ENTITIES if spec.name == "projects")
+    sql = build_upsert_sql(projects)
+
+    assert "jsonb_to_recordset($1::jsonb)" in sql
+    assert "LEFT JOIN weathercraft_customers ref0 ON ref0.centerpoint_id = r.customer_ref" in sql
+    assert (
+        "WHERE t.content_hash IS DISTINCT FROM EXCLUDED.content_hash "
+        "OR t.customer_id IS DISTINCT FROM EXCLUDED.customer_id"
+    ) in sql
+    assert "(r.customer_ref IS NOT NULL AND ref0.id IS NULL) AS unresolved" in sql
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+
+
+@pytest.mark.asyncio
+async def test_watermark_waits_for_unsynced_parents(centerpoint):
+    fake, base_url = centerpoint
+    fake.records["customers"] = [_customer(0, "2026-10-01T00:00:00+00:00")]
+    fake.records["projects"] = [
+        _project(0, "2026-10-01T00:00:00+00:00", "cp-c0"),
+        _project(1, "2026-10-01T00:00:01+00:00", "cp-c1"),
+        _project(2, "2026-10-01T00:00:02+00:00", "cp-c0"),
+    ]
+    pool = _FakePool()
+    sync = CenterPointSync({"base_url": base_url}, pool, page_size=10, unresolved_grace_seconds=10**9)
+
+    try:
+        await sync.sync_entity("customers")
+        progress = await sync.sync_entity("projects")
+        assert progress["held_back"] and progress["unresolved"] == 1
+        # Stopped before the project whose customer is missing.
+        assert pool.db["watermarks"]["projects"][1] == "cp-p0"
+
+        # The customer arrives mid-run; the next pass fills in the reference.
+        fake.records["customers"].append(_customer(1, "2026-10-01T00:00:05+00:00"))
+        await sync.sync_entity("customers")
+        progress = await sync.sync_entity("projects")
+    finally:
+        await sync.close()
+
+    assert not progress["held_back"] and progress["unresolved"] == 0
+    assert progress["updated"] == 1 and progress["unchanged"] == 1
+    assert pool.db["tables"]["weathercraft_projects"]["cp-p1"]["refs"] == {"customer_ref": "cp-c1"}
+    assert pool.db["watermarks"]["projects"][1] == "cp-p2"
+
+
+@pytest.mark.asyncio
+async def test_references_missing_past_the_grace_period_do_not_hold_the_watermark(centerpoint):
+    fake, base_url = centerpoint
+    fake.records["projects"] = [_project(0, "2026-10-01T00:00:00+00:00", "cp-gone")]
+    pool = _FakePool()
+    sync = CenterPointSync({"base_url": base_url}, pool, page_size=10, unresolved_grace_seconds=0)
+
+    try:
+        progress = await sync.sync_entity("projects")
+    finally:
+        await sync.close()
+
+    assert not progress["held_back"] and progress["orphaned"] == 1
+    assert pool.db["watermarks"]["projects"][1] == "cp-p0"
+
+
+class _LogPool(_FakePool):
+    """Adds the sync log statements used by sync_all."""
+
+    @asynccontextmanager
+    async def acquire(self):
+        conn = _FakeConn(self.db)
+        writes = conn.execute
+
+        async def fetchval(query, *args):
+            return 1
+
+        async def execute(query, *args):
+            if "centerpoint_sync_log" not in query:
+                await writes(query, *args)
+
+        conn.fetchval = fetchval
+        conn.execute = execute
+        yield conn
+
+
+@pytest.mark.asyncio
+async def test_dependents_of_a_failed_entity_are_skipped(centerpoint):
+    fake, base_url = centerpoint
+    fake.records["projects"] = [_project(0, "2026-10-01T00:00:00+00:00", "cp-c0")]
+    fake.failing.add("customers")
+    pool = _LogPool()
+    sync = CenterPointSync({"base_url": base_url}, pool)
+
+    try:
+        await sync.sync_all()
+    finally:
+        await sync.close()
+
+    assert [entity for entity, _ in fake.requests] == ["customers"]
+    assert sync.sync_status["errors"][1:] == [
+        "projects: skipped, weathercraft_customers sync failed",
+        "invoices: skipped, weathercraft_projects, weathercraft_customers sync failed",
+    ]
+    assert "projects" not in pool.db["watermarks"]
+
+
+@pytest.mark.asyncio
+async def test_api_ignoring_keyset_parameters_falls_back_to_full_fetches(centerpoint):
+    fake, base_url = centerpoint
+    fake.records["customers"] = [_customer(i, f"2026-10-01T00:00:0{5 - i}+00:00") for i in range(5)]
+    fake.ignores_params = True
+    pool = _FakePool()
+    sync = CenterPointSync({"base_url": base_url}, pool, page_size=2)
+
+    try:
+        progress = await sync.sync_entity("customers")
+        fake.requests.clear()
+        again = await sync.sync_entity("customers")
+    finally:
+        await sync.close()
+
+    assert progress["full_fetch"] and progress["inserted"] == 5
+    assert len(pool.db["tables"]["weathercraft_customers"]) == 5
+    # Later runs go straight to the unparameterised fetch.
+    assert fake.requests == [("customers", {})]
+    assert again["fetched"] == 5 and again["unchanged"] == 5
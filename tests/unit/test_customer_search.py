@@ -0,0 +1,174 @@
+"""
+Unit Tests - Customer Search Engine
+Validates keyset cursors, placeholder rendering for the three drivers, total
+resolution (estimate vs exact) and the single-query customer listing.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from routes import customers_full_crud, erp_complete
+from services import customer_search
+from services.customer_search import Params, decode_cursor, encode_cursor, resolve_total
+
+
+def test_cursor_round_trips_typed_values_and_rejects_other_sorts():
+    created = datetime(2026, 10, 16, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor("created_at", True, created, "c-1")
+    assert decode_cursor(cursor, "created_at", True) == (created, "c-1")
+
+    spent = encode_cursor("total_spent", False, Decimal("1250.50"), "c-2")
+    assert decode_cursor(spent, "total_spent", False) == (Decimal("1250.50"), "c-2")
+
+    for bad in (cursor, "not-a-cursor!"):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(bad, "name", True)
+        assert exc.value.status_code == 400
+
+
+def test_nullable_email_sort_is_coalesced_in_query_and_cursor():
+    key, expr = customer_search.sort_expression("email")
+    assert expr == "COALESCE(c.email, '')"
+    rows = [{"id": "c-1", "email": "a@example.com"}, {"id": "c-2", "email": None}, {"id": "c-3", "email": None}]
+
+    page, cursor = customer_search.split_page(rows, 2, key, False)
+
+    assert [row["id"] for row in page] == ["c-1", "c-2"]
+    assert decode_cursor(cursor, "email", False) == ("", "c-2")
+    keyset = customer_search.keyset_condition(expr, False, "", "c-2", Params())
+    assert keyset == "(COALESCE(c.email, ''), c.id) > ($1, $2)"
+
+
+def test_params_render_each_driver_style():
+    numeric = Params(customer_search.STYLE_NUMERIC)
+    condition = customer_search.search_condition("50%  Off_Roof", numeric)
+    assert condition.startswith("(c.search_text LIKE $1 OR c.search_vector @@ plainto_tsquery('simple', $2))")
+    assert numeric.values == ["%50\\% off\\_roof%", "50% off_roof"]
+
+    named = Params(customer_search.STYLE_NAMED)
+    assert named.add(1) == ":cs0"
+    pyformat = Params(customer_search.STYLE_PYFORMAT)
+    assert pyformat.add(1) == "%(cs0)s" and pyformat.values == {"cs0": 1}
+
+    keyset = customer_search.keyset_condition("c.name", False, "Acme", "c-9", numeric)
+    assert keyset == "(c.name, c.id) > ($3, $4)"
+
+
+def test_resolve_total_prefers_free_exact_answers():
+    assert resolve_total(None, 42, None, 11, 10) == (42, False)
+    # Short page at a known offset: exact without any count query.
+    assert resolve_total(None, None, 20, 7, 10) == (27, False)
+    # Full page or cursor page: planner estimate, never below what we have seen.
+    assert resolve_total(5000, None, 0, 11, 10) == (5000, True)
+    assert resolve_total(3, None, None, 4, 10) == (4, True)
+    assert customer_search.parse_plan_rows('[{"Plan": {"Plan Rows": 812}}]') == 812
+
+
+class _FakeConn:
+    def __init__(self, rows, plan_rows):
+        self.rows = rows
+        self.plan_rows = plan_rows
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        return self.rows
+
+    async def fetchval(self, query, *args):
+        self.queries.append((query, args))
+        return f'[{{"Plan": {{"Plan Rows": {self.plan_rows}}}}}]'
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def acquire(self):
+        conn = self.conn
+
+        class _Ctx:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+
+def _erp_row(index):
+    return {
+        "id": f"c-{index}", "name": f"Customer {index}", "email": None, "phone": None, "company": None,
+        "status": "active", "created_at": datetime(2026, 10, 16 - index), "updated_at": None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_erp_customers_follow_cursor_without_offset_or_count():
+    conn = _FakeConn([_erp_row(i) for i in range(3)], plan_rows=900)
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(db_pool=_FakePool(conn))))
+    user = {"tenant_id": "t-1"}
+
+    first = await erp_complete.get_erp_customers(
+        request, skip=0, limit=2, status=None, search="roof", cursor=None, exact_count=False, current_user=user
+    )
+    assert [c["id"] for c in first["customers"]] == ["c-0", "c-1"]
+    assert first["total"] == 900 and first["total_is_estimate"] is True
+    assert conn.queries[1][0].startswith("EXPLAIN (FORMAT JSON) SELECT 1 FROM customers c")
+
+    conn.queries.clear()
+    await erp_complete.get_erp_customers(
+        request, skip=0, limit=2, status=None, search=None, cursor=first["next_cursor"],
+        exact_count=False, current_user=user,
+    )
+    page_query, page_args = conn.queries[0]
+    assert "OFFSET" not in page_query
+    assert "(c.created_at, c.id) < ($2, $3)" in page_query
+    assert page_args == ("t-1", datetime(2026, 10, 15), "c-1", 3)
+
+
+class _FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def _crud_row(index):
+    stamp = datetime(2026, 10, 1 + index)
+    return {
+        "id": f"00000000-0000-0000-0000-00000000000{index}", "name": f"Customer {index}",
+        "email": f"c{index}@example.com", "phone": None, "company": None, "address": None, "city": None,
+        "state": None, "zip_code": None, "status": "active", "credit_limit": None, "payment_terms": 30,
+        "tax_exempt": False, "notes": None, "source": None, "lead_source": None, "referred_by": None,
+        "total_spent": Decimal("10"), "job_count": 1, "last_interaction": None, "history_count": 0,
+        "created_at": stamp, "updated_at": stamp, "tag_list": ["vip"] if index == 0 else None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_customers_aggregates_tags_in_the_page_query():
+    db_cursor = _FakeCursor([_crud_row(0), _crud_row(1)])
+    db = SimpleNamespace(cursor=lambda: db_cursor)
+
+    result = await customers_full_crud.list_customers(
+        page=1, per_page=5, cursor=None, exact_count=False, search=None, status=None, city=None,
+        state=None, min_spent=None, max_spent=None, tags=["vip"], sort_by="name", sort_order="asc",
+        db=db, current_user={},
+    )
+
+    assert len(db_cursor.executed) == 1
+    query, params = db_cursor.executed[0]
+    assert "array_agg(t.tag ORDER BY t.tag)" in query
+    assert "ft.tag = ANY(%(cs0)s)" in query and params["cs0"] == ["vip"]
+    assert [c.tags for c in result.customers] == [["vip"], []]
+    assert (result.total, result.total_is_estimate, result.next_cursor) == (2, False, None)
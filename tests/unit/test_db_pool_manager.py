@@ -0,0 +1,232 @@
+"""
+Unit Tests - Database Pool Manager
+Validates per-purpose sub-quotas, queue-wait metrics, backpressure, the
+pool-shaped facades handed to routes and background subsystems, statement
+timeouts and leak detection.
+"""
+
+import asyncio
+import gc
+
+import pytest
+
+from database.pool_manager import (
+    PURPOSE_BACKGROUND,
+    PURPOSE_REQUEST,
+    PoolBackpressureError,
+    PoolManager,
+)
+
+
+class _FakeConn:
+    def __init__(self, idx):
+        self.idx = idx
+        self.closed = False
+        self.timeouts = []
+
+    async def fetchval(self, query, *args, column=0, timeout=None):
+        self.timeouts.append(timeout)
+        return 1
+
+    def is_closed(self):
+        return self.closed
+
+
+class _FakePool:
+    """Minimal stand-in for asyncpg.Pool with an unbounded supply of connections."""
+
+    def __init__(self):
+        self.created = 0
+        self.idle = []
+        self.released = 0
+
+    async def acquire(self, timeout=None):
+        if self.idle:
+            return self.idle.pop()
+        self.created += 1
+        return _FakeConn(self.created)
+
+    async def release(self, conn, timeout=None):
+        self.released += 1
+        self.idle.append(conn)
+
+    def get_size(self):
+        return self.created
+
+    def get_idle_size(self):
+        return len(self.idle)
+
+    def get_min_size(self):
+        return 0
+
+    def get_max_size(self):
+        return 10
+
+    async def close(self):
+        pass
+
+
+def _manager(**kwargs):
+    kwargs.setdefault("min_size", 0)
+    kwargs.setdefault("max_size", 10)
+    manager = PoolManager("postgresql://u:p@localhost/db", **kwargs)
+    manager._pool = _FakePool()
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_quota_limits_concurrent_connections_per_purpose():
+    manager = _manager(shares={PURPOSE_BACKGROUND: 0.2}, acquire_timeout=0.05)
+    background = manager.for_purpose(PURPOSE_BACKGROUND)
+
+    first = await background.acquire()
+    second = await background.acquire()
+    with pytest.raises(PoolBackpressureError):
+        await background.acquire()
+
+    stats = manager.stats()["purposes"][PURPOSE_BACKGROUND]
+    assert stats["limit"] == 2
+    assert stats["in_use"] == 2
+    assert stats["timeouts"] == 1
+
+    # The request path is unaffected by a saturated background quota.
+    async with manager.for_purpose(PURPOSE_REQUEST).acquire() as conn:
+        assert await conn.fetchval("SELECT 1") == 1
+
+    await background.release(first)
+    await background.release(second)
+    assert manager.stats()["purposes"][PURPOSE_BACKGROUND]["in_use"] == 0
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_turn_and_wait_time_recorded():
+    manager = _manager(shares={PURPOSE_REQUEST: 0.1}, acquire_timeout=1.0)
+    pool = manager.for_purpose(PURPOSE_REQUEST)
+
+    held = await pool.acquire()
+
+    async def _waiter():
+        async with pool.acquire():
+            return True
+
+    task = asyncio.create_task(_waiter())
+    await asyncio.sleep(0.02)
+    assert manager.stats()["purposes"][PURPOSE_REQUEST]["waiting"] == 1
+
+    await pool.release(held)
+    assert await task is True
+
+    stats = manager.stats()["purposes"][PURPOSE_REQUEST]
+    assert stats["acquired"] == 2
+    assert stats["max_wait_ms"] > 0
+
+
+@pytest.mark.asyncio
+async def test_slot_is_returned_when_the_connection_does_not_arrive():
+    manager = _manager(shares={PURPOSE_REQUEST: 0.1}, acquire_timeout=0.05)
+    pool = manager.for_purpose(PURPOSE_REQUEST)
+    fake = manager._pool
+    real_acquire = fake.acquire
+
+    async def _stalled(timeout=None):
+        await asyncio.sleep(1)
+
+    fake.acquire = _stalled
+    with pytest.raises(PoolBackpressureError, match="no connection"):
+        await pool.acquire()
+
+    fake.acquire = real_acquire
+    async with pool.acquire() as conn:
+        assert await conn.fetchval("SELECT 1") == 1
+    stats = manager.stats()["purposes"][PURPOSE_REQUEST]
+    assert stats["timeouts"] == 1 and stats["in_use"] == 0 and stats["waiting"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_wait_queue_rejects_immediately():
+    manager = _manager(shares={PURPOSE_REQUEST: 0.1}, max_waiters=1, acquire_timeout=1.0)
+    pool = manager.for_purpose(PURPOSE_REQUEST)
+
+    held = await pool.acquire()
+
+    async def _queue():
+        return await pool.acquire()
+
+    queued = asyncio.create_task(_queue())
+    await asyncio.sleep(0)
+
+    with pytest.raises(PoolBackpressureError):
+        await pool.acquire()
+    assert manager.stats()["purposes"][PURPOSE_REQUEST]["rejected"] == 1
+
+    await pool.release(held)
+    await pool.release(await queued)
+
+
+@pytest.mark.asyncio
+async def test_facade_close_does_not_close_shared_pool_and_lease_returns_connection():
+    manager = _manager()
+    pool = manager.for_purpose(PURPOSE_BACKGROUND)
+
+    await pool.close()
+    assert manager.started
+
+    conn = await pool.lease()
+    assert await conn.fetchval("SELECT 1") == 1
+    await conn.close()
+    await conn.close()  # idempotent
+    assert manager._pool.released == 1
+    assert manager.stats()["purposes"][PURPOSE_BACKGROUND]["in_use"] == 0
+
+
+def test_unknown_purpose_rejected():
+    manager = _manager()
+    with pytest.raises(ValueError):
+        manager.for_purpose("nope")
+
+
+@pytest.mark.asyncio
+async def test_statement_timeout_defaults_per_purpose():
+    manager = _manager(statement_timeouts={PURPOSE_REQUEST: 5.0})
+
+    conn = await manager.for_purpose(PURPOSE_REQUEST).lease()
+    await conn.fetchval("SELECT 1")
+    await conn.fetchval("SELECT 1", timeout=1.0)
+    assert conn.timeouts == [5.0, 1.0]
+    await conn.close()
+
+    background = manager.for_purpose(PURPOSE_BACKGROUND)
+    await background.fetchval("SELECT 1")
+    assert manager._pool.idle[-1].timeouts[-1] == background.statement_timeout
+
+
+@pytest.mark.asyncio
+async def test_long_held_connection_is_reported_once_with_origin():
+    manager = _manager(leak_threshold=0.01)
+    pool = manager.for_purpose(PURPOSE_REQUEST)
+
+    held = await pool.acquire()
+    await asyncio.sleep(0.02)
+
+    leaks = manager.check_leaks()
+    assert len(leaks) == 1
+    assert "test_db_pool_manager.py" in leaks[0]["origin"]
+    manager.check_leaks()
+    assert manager.stats()["leaks_detected"] == 1
+
+    await pool.release(held)
+    assert manager.check_leaks() == []
+    assert manager.stats()["checked_out"] == 0
+
+
+@pytest.mark.asyncio
+async def test_abandoned_lease_is_returned_to_the_pool():
+    manager = _manager()
+    conn = await manager.for_purpose(PURPOSE_REQUEST).lease()
+    del conn
+    gc.collect()
+    await asyncio.sleep(0)
+
+    assert manager.stats()["leases_abandoned"] == 1
+    assert manager._pool.released == 1
+    assert manager.stats()["purposes"][PURPOSE_REQUEST]["in_use"] == 0
@@ -0,0 +1,166 @@
+"""
+Unit Tests - Email Engine Send Path
+Validates one-time schema verification, the reconciled in-process rate limiter,
+compiled template caching and the single-round-trip batch send.
+"""
+
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import brainops_ai_os._resilience as resilience
+from services.email_engine import EmailEngine
+
+TENANT = str(uuid.uuid4())
+
+TEMPLATE = {
+    "subject_template": "Hello {name}",
+    "html_template": "<p>{name} owes {amount:.2f}{missing}</p>",
+    "text_template": "{name!r} {{literal}}",
+}
+
+
+class _FakeConn:
+    def __init__(self, *, tables_present=True, sent_last_minute=0, bounced=()):
+        self.tables_present = tables_present
+        self.sent_last_minute = sent_last_minute
+        self.bounced = list(bounced)
+        self.queries = []
+
+    def _log(self, query, args):
+        self.queries.append((" ".join(query.split()), args))
+
+    async def fetchrow(self, query, *args):
+        self._log(query, args)
+        if "to_regclass" in query:
+            present = self.tables_present
+            return {table: present for table in ("email_templates", "email_send_events", "email_bounces")}
+        if "INSERT INTO email_templates" in query:
+            return {"id": uuid.uuid4(), "template_name": args[2], "updated_at": None}
+        if "FROM email_templates" in query:
+            return TEMPLATE
+        return None
+
+    async def fetchval(self, query, *args):
+        self._log(query, args)
+        return self.sent_last_minute
+
+    async def fetch(self, query, *args):
+        self._log(query, args)
+        return [{"recipient_email": email} for email in self.bounced if email in args[1]]
+
+    async def execute(self, query, *args):
+        self._log(query, args)
+        return "INSERT 0 1"
+
+    def count(self, fragment):
+        return sum(1 for query, _ in self.queries if fragment in query)
+
+
+async def _send(engine, conn, email="a@example.com", **context):
+    return await engine.queue_send(
+        conn,
+        tenant_id=TENANT,
+        recipient_email=email,
+        template_name="invoice",
+        context={"name": "Ann", "amount": 12.5, **context},
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_sends_skip_ddl_rate_queries_and_template_reads():
+    engine = EmailEngine(max_emails_per_minute=100, reconcile_interval=60)
+    conn = _FakeConn()
+
+    for index in range(5):
+        result = await _send(engine, conn, email=f"user{index}@example.com")
+
+    assert result["subject"] == "Hello Ann"
+    assert result["html_body"] == "<p>Ann owes 12.50</p>"
+    assert result["text_body"] == "'Ann' {literal}"
+    assert conn.count("CREATE") == 0
+    assert conn.count("to_regclass") == 1
+    assert conn.count("SELECT COUNT(*) FROM email_send_events") == 1
+    assert conn.count("FROM email_templates") == 1
+    assert conn.count("INSERT INTO email_send_events") == 5
+
+
+@pytest.mark.asyncio
+async def test_limiter_is_reconciled_with_db_count():
+    engine = EmailEngine(max_emails_per_minute=10, reconcile_interval=60)
+    conn = _FakeConn(sent_last_minute=9)
+
+    await _send(engine, conn)
+    with pytest.raises(HTTPException) as exc:
+        await _send(engine, conn, email="b@example.com")
+
+    assert exc.value.status_code == 429
+    assert engine.stats()["rate_limited"] == 1
+
+
+@pytest.mark.asyncio
+async def test_upsert_invalidates_cached_template():
+    engine = EmailEngine()
+    conn = _FakeConn()
+
+    await _send(engine, conn)
+    await engine.upsert_template(
+        conn,
+        tenant_id=TENANT,
+        template_name="invoice",
+        subject_template="New {name}",
+        html_template="<p/>",
+    )
+    await _send(engine, conn)
+
+    assert conn.count("FROM email_templates") == 2
+
+
+@pytest.mark.asyncio
+async def test_queue_send_many_uses_one_insert_and_reports_skips():
+    engine = EmailEngine(max_emails_per_minute=3)
+    conn = _FakeConn(bounced=["bounced@example.com"])
+    recipients = [
+        {"recipient_email": "one@example.com", "context": {"name": "One", "amount": 1}},
+        {"recipient_email": "ONE@example.com", "context": {"name": "Dup", "amount": 1}},
+        {"recipient_email": "bounced@example.com", "context": {"name": "B", "amount": 1}},
+        {"recipient_email": "", "context": {}},
+        {"recipient_email": "two@example.com", "context": {"name": "Two", "amount": 2}},
+        {"recipient_email": "three@example.com", "context": {"name": "Three", "amount": 3}},
+        {"recipient_email": "four@example.com", "context": {"name": "Four", "amount": 4}},
+    ]
+
+    result = await engine.queue_send_many(
+        conn, tenant_id=TENANT, template_name="invoice", recipients=recipients
+    )
+
+    reasons = {item["recipient_email"]: item["reason"] for item in result["skipped"]}
+    assert reasons == {
+        "ONE@example.com": "duplicate",
+        "bounced@example.com": "suppressed",
+        "": "invalid",
+        "four@example.com": "rate_limited",
+    }
+    assert [item["subject"] for item in result["queued"]] == ["Hello One", "Hello Two", "Hello Three"]
+    inserts = [args for query, args in conn.queries if "INSERT INTO email_send_events" in query]
+    assert len(inserts) == 1
+    assert "unnest" in next(q for q, _ in conn.queries if "INSERT INTO email_send_events" in q)
+    assert inserts[0][4] == ["one@example.com", "two@example.com", "three@example.com"]
+    assert json.loads(inserts[0][5][1])["context"]["name"] == "Two"
+    assert conn.count("FROM email_bounces") == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_tables_are_not_created_when_runtime_ddl_is_blocked(monkeypatch):
+    monkeypatch.setattr(resilience, "_ENVIRONMENT", "production")
+    engine = EmailEngine()
+    conn = _FakeConn(tables_present=False)
+
+    with pytest.raises(HTTPException) as exc:
+        await _send(engine, conn)
+
+    assert exc.value.status_code == 503
+    assert conn.count("CREATE") == 0
+    assert engine.stats()["schema_verified"] is False
@@ -0,0 +1,234 @@
+"""
+Unit Tests - Financial Rollups
+Validates the raw-query fallback, single-query trends, the batched nightly
+rebuild (one instance at a time) and that every report endpoint reads
+tenant-scoped figures.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import asyncpg
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.supabase_auth import get_authenticated_user
+from database import get_db_connection
+from routes import financial_reporting
+from services import financial_rollups
+from services.financial_rollups import FinancialRollups, seconds_until_rebuild
+
+TENANT = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+
+
+class _FakeConn:
+    def __init__(self, rollups=True, rows=None):
+        self.rollups = rollups
+        self.rows = rows or []
+        self.queries = []
+        self.executed = []
+
+    def _check(self, query, args):
+        self.queries.append((query, args))
+        if not self.rollups and "financial_" in query:
+            raise asyncpg.exceptions.UndefinedTableError("missing")
+
+    async def fetchrow(self, query, *args):
+        self._check(query, args)
+        if "FROM job_costs" in query or "financial_ledger_daily" in query:
+            return {"expense_count": 2, "total_expenses": Decimal("90.00"), "material_expenses": Decimal("50.00"),
+                    "labor_expenses": Decimal("30.00"), "other_expenses": Decimal("10.00")}
+        return {"transaction_count": 3, "total_revenue": Decimal("300.00"), "collected_revenue": Decimal("100.00"),
+                "pending_revenue": Decimal("200.00"), "avg_transaction_value": Decimal("100.00")}
+
+    async def fetch(self, query, *args):
+        self._check(query, args)
+        return self.rows
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_raw_queries_until_rollups_exist():
+    rollups = FinancialRollups()
+    conn = _FakeConn(rollups=False, rows=[{"category": "Repair", "count": 3, "amount": Decimal("300.00")}])
+
+    first = await rollups.revenue(conn, TENANT, date(2026, 9, 1), date(2026, 9, 30))
+    conn.queries.clear()
+    second = await rollups.revenue(conn, TENANT, date(2026, 9, 1), date(2026, 9, 30))
+
+    assert first == second == {
+        "total": 300.0,
+        "collected": 100.0,
+        "pending": 200.0,
+        "transaction_count": 3,
+        "avg_value": 100.0,
+        "by_category": [{"category": "Repair", "count": 3, "amount": 300.0}],
+    }
+    # The missing table is remembered; later reads go straight to the raw rows.
+    assert all("FROM invoices" in query for query, _ in conn.queries)
+    assert conn.queries[0][1][1] == datetime(2026, 9, 1)
+    assert rollups.stats()["rollup_tables"] is False and rollups.stats()["raw_reads"] == 2
+
+
+@pytest.mark.asyncio
+async def test_rollup_reads_use_day_bounds_on_the_ledger():
+    rollups = FinancialRollups()
+    conn = _FakeConn()
+
+    expenses = await rollups.expenses(conn, TENANT, date(2026, 9, 1), date(2026, 9, 30))
+
+    query, args = conn.queries[0]
+    assert "financial_ledger_daily" in query
+    assert args == (financial_rollups._tenant(TENANT), date(2026, 9, 1), date(2026, 9, 30))
+    assert expenses == {"total": 90.0, "materials": 50.0, "labor": 30.0, "other": 10.0, "count": 2}
+    assert rollups.stats()["rollup_reads"] == 1
+
+
+@pytest.mark.asyncio
+async def test_trends_read_every_period_in_one_query():
+    periods = [(date(2026, 8, 1), date(2026, 8, 31)), (date(2026, 9, 1), date(2026, 9, 30))]
+    conn = _FakeConn(rows=[
+        {"idx": 1, "revenue": Decimal("10.50"), "expenses": Decimal("4"), "transactions": 2},
+        {"idx": 2, "revenue": Decimal("0"), "expenses": Decimal("0"), "transactions": 0},
+    ])
+
+    trends = await FinancialRollups().trends(conn, TENANT, periods)
+
+    assert len(conn.queries) == 1
+    _, args = conn.queries[0]
+    assert args[1] == [date(2026, 8, 1), date(2026, 9, 1)] and args[2] == [date(2026, 8, 31), date(2026, 9, 30)]
+    assert trends == [
+        {"revenue": 10.5, "expenses": 4.0, "transactions": 2},
+        {"revenue": 0, "expenses": 0, "transactions": 0},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_rebuild_batches_tenants_and_retries_a_deadlock():
+    tenants = [f"00000000-0000-0000-0000-00000000000{i}" for i in range(5)]
+    conn = _FakeConn()
+    calls = []
+
+    async def execute(query, *args):
+        calls.append(args[0])
+        if len(calls) == 2:
+            raise asyncpg.exceptions.DeadlockDetectedError("deadlock")
+
+    conn.execute = execute
+    rollups = FinancialRollups(_FakePool(conn), batch_size=2)
+
+    assert await rollups.rebuild(tenants) == 5
+    assert [len(batch) for batch in calls] == [2, 2, 2, 1]
+    assert calls[1] == calls[2]
+    stats = rollups.stats()
+    assert stats["deadlock_retries"] == 1 and stats["rebuilds"] == 1 and stats["rebuilt_tenants"] == 5
+
+
+@pytest.mark.asyncio
+async def test_full_rebuild_runs_on_one_instance_at_a_time():
+    conn = _FakeConn(rows=[{"tenant_id": TENANT}])
+    held = {"locked": False}
+
+    async def fetchval(query, *args):
+        assert args == (financial_rollups.REBUILD_LOCK_KEY,)
+        return not held["locked"]
+
+    conn.fetchval = fetchval
+    rollups = FinancialRollups(_FakePool(conn))
+
+    assert await rollups.rebuild() == 1
+    assert [query for query, _ in conn.executed] == [
+        "SELECT rebuild_financial_rollups($1::uuid[])",
+        "SELECT pg_advisory_unlock($1)",
+    ]
+
+    held["locked"] = True
+    conn.executed.clear()
+    assert await rollups.rebuild() == 0
+    assert conn.executed == []
+    assert rollups.stats()["rebuilds_skipped_locked"] == 1 and rollups.stats()["rebuilds"] == 1
+
+
+def test_rebuild_is_scheduled_for_the_next_configured_hour():
+    assert seconds_until_rebuild(datetime(2026, 10, 16, 1, 30, tzinfo=timezone.utc), 3) == 5400
+    assert seconds_until_rebuild(datetime(2026, 10, 16, 3, 0, tzinfo=timezone.utc), 3) == 86400
+    assert seconds_until_rebuild(datetime(2026, 10, 16, 23, 0, tzinfo=timezone.utc), 3) == 4 * 3600
+
+
+class _StubRollups:
+    def __init__(self):
+        self.tenants = []
+
+    async def revenue(self, conn, tenant_id, start_date, end_date):
+        self.tenants.append(tenant_id)
+        return {"total": 1000.0, "collected": 600.0, "pending": 400.0, "transaction_count": 4, "avg_value": 250.0,
+                "by_category": [{"category": "Repair", "count": 4, "amount": 1000.0}]}
+
+    async def expenses(self, conn, tenant_id, start_date, end_date):
+        self.tenants.append(tenant_id)
+        return {"total": 600.0, "materials": 300.0, "labor": 200.0, "other": 100.0, "count": 3}
+
+    async def cash_flow(self, conn, tenant_id, start_date, end_date):
+        self.tenants.append(tenant_id)
+        return {"collections": 500.0, "payments": 200.0}
+
+    async def ar_aging(self, conn, tenant_id, as_of_date):
+        self.tenants.append(tenant_id)
+        return {"current": 100.0, "days_1_30": 50.0, "days_31_60": 0.0, "days_61_90": 0.0, "days_over_90": 50.0,
+                "total": 200.0, "avg_days": 20.0}
+
+    async def ar_outstanding(self, conn, tenant_id):
+        self.tenants.append(tenant_id)
+        return {"total_ar": 200.0, "avg_days_outstanding": 20.0}
+
+    async def trends(self, conn, tenant_id, periods):
+        self.tenants.append(tenant_id)
+        return [{"revenue": 100.0 * i, "expenses": 10.0, "transactions": i} for i in range(len(periods))]
+
+
+def test_report_endpoints_read_tenant_scoped_figures(monkeypatch):
+    stub = _StubRollups()
+    monkeypatch.setattr(financial_reporting, "get_financial_rollups", lambda: stub)
+    app = FastAPI()
+    app.include_router(financial_reporting.router)
+    app.dependency_overrides[get_db_connection] = lambda: object()
+    app.dependency_overrides[get_authenticated_user] = lambda: {"tenant_id": TENANT}
+    dates = {"start_date": "2026-09-01", "end_date": "2026-09-30"}
+
+    with TestClient(app) as client:
+        pl = client.get("/reports/profit-loss", params={**dates, "comparison": "period_over_period"})
+        aging = client.get("/reports/accounts-receivable", params={"as_of_date": "2026-09-30"})
+        cash = client.get("/reports/cash-flow", params=dates)
+        kpi = client.get("/reports/kpi", params=dates)
+        summary = client.get("/reports/summary")
+        trends = client.get("/reports/trends", params={"periods": 3})
+
+    for response in (pl, aging, cash, kpi, summary, trends):
+        assert response.status_code == 200, response.text
+    assert pl.json()["current_period"]["operating_income"] == 400.0
+    assert "previous_period" in pl.json()
+    assert aging.json()["aging"]["days_over_90"] == 50.0
+    assert cash.json()["net_change"] == 300.0
+    assert kpi.json()["days_sales_outstanding"] == 20.0
+    assert summary.json()["accounts_receivable"] == 200.0
+    data = trends.json()["data"]
+    assert [row["revenue"] for row in data] == [200.0, 100.0, 0.0]
+    assert data[0]["period"] < data[-1]["period"]
+    assert set(stub.tenants) == {TENANT}
@@ -0,0 +1,248 @@
+"""
+Unit Tests - Forecasting Engine
+Validates the batched series matrix, robust decomposition and anomaly scores,
+Holt-Winters batching, churn aggregation and snapshot-backed endpoints.
+"""
+
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from core.supabase_auth import get_authenticated_user
+from routes import predictive_analytics
+from services import forecasting
+from services.forecasting import (
+    ForecastEngine,
+    build_series_matrix,
+    churn_payloads,
+    holt_winters,
+    robust_scores,
+    seasonal_decompose,
+)
+
+TENANT = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+
+
+def test_series_matrix_marks_unstarted_periods_and_zero_fills_gaps():
+    rows = [
+        {"tenant_id": "a", "period": 100, "value": 5.0},
+        {"tenant_id": "a", "period": 103, "value": 7.0},
+        {"tenant_id": "b", "period": 102, "value": 1.0},
+        {"tenant_id": "b", "period": 102, "value": 2.0},
+        {"tenant_id": "c", "period": 90, "value": 9.0},
+    ]
+
+    tenants, matrix = build_series_matrix(rows, end=103, length=4)
+
+    assert tenants == ["a", "b"]
+    np.testing.assert_array_equal(matrix[0], [5.0, 0.0, 0.0, 7.0])
+    assert np.isnan(matrix[1, :2]).all()
+    np.testing.assert_array_equal(matrix[1, 2:], [3.0, 0.0])
+
+
+def _weekly_series(rows, days=90, seed=3):
+    rng = np.random.default_rng(seed)
+    weekday = np.where(np.arange(days) % 7 == 0, -40.0, 0.0)
+    return 100.0 + weekday + rng.normal(0, 2, (rows, days))
+
+
+def test_spike_stays_in_residual_without_disturbing_neighbours():
+    matrix = _weekly_series(3)
+    matrix[1, 60] += 300.0
+    matrix[2, :40] = np.nan
+
+    trend, seasonal, residual = seasonal_decompose(matrix, 7)
+    scores = robust_scores(residual)
+
+    np.testing.assert_allclose(seasonal[0, :7], seasonal[1, :7], atol=3)
+    assert seasonal[0, 0] == pytest.approx(-40 * 6 / 7, abs=3)
+    assert scores[1, 60] > 20
+    threshold = forecasting.anomaly_threshold(0.95)
+    assert np.sum(np.abs(scores[1]) >= threshold) == 1
+    assert np.isnan(scores[2, :40]).all() and not np.isnan(scores[2, 40:]).any()
+
+
+def test_holt_winters_is_identical_batched_and_per_series():
+    months = np.arange(36)
+    matrix = np.vstack([
+        1000 + 20 * months + 150 * np.sin(2 * np.pi * months / 12),
+        np.r_[np.full(30, np.nan), np.linspace(500, 600, 6)],
+    ])
+    _, seasonal, _ = seasonal_decompose(matrix, 12)
+
+    batched, sigma, seasonal_used = holt_winters(matrix, 12, 6, seasonal=seasonal)
+    for row in range(2):
+        single, single_sigma, _ = holt_winters(matrix[row:row + 1], 12, 6, seasonal=seasonal[row:row + 1])
+        np.testing.assert_allclose(batched[row], single[0])
+        assert sigma[row] == pytest.approx(single_sigma[0])
+
+    assert seasonal_used.tolist() == [True, False]
+    truth = 1000 + 20 * np.arange(36, 42) + 150 * np.sin(2 * np.pi * np.arange(36, 42) / 12)
+    assert np.max(np.abs(batched[0] - truth) / truth) < 0.1
+
+
+def test_churn_summary_matches_per_customer_rules():
+    rows = [
+        {"tenant_id": "a", "days_since_login": None, "overdue_invoices": 2, "session_count": 0},
+        {"tenant_id": "a", "days_since_login": 20, "overdue_invoices": 0, "session_count": 1},
+        {"tenant_id": "a", "days_since_login": 1, "overdue_invoices": 0, "session_count": 9},
+        {"tenant_id": "b", "days_since_login": 45, "overdue_invoices": 0, "session_count": 5},
+    ]
+
+    summary = churn_payloads(rows)
+
+    assert summary["a"] == {
+        "total_customers_analyzed": 3,
+        "high_risk": 1,
+        "medium_risk": 0,
+        "low_risk": 2,
+        "avg_churn_probability": round((0.75 + 0.35 + 0.0) / 3, 3),
+    }
+    assert summary["b"]["medium_risk"] == 1 and summary["b"]["avg_churn_probability"] == 0.4
+
+
+class _FakeConn:
+    def __init__(self, snapshot_row, series, lock_free=True):
+        self.snapshot_row = snapshot_row
+        self.series = series
+        self.lock_free = lock_free
+        self.fetches = []
+        self.executed = []
+
+    async def fetchrow(self, query, *args):
+        return self.snapshot_row
+
+    async def fetch(self, query, *args):
+        self.fetches.append((query, args))
+        if "FROM customers" in query:
+            return []
+        for table, rows in self.series.items():
+            if f"FROM {table}" in query:
+                return rows
+        return []
+
+    async def fetchval(self, query, *args):
+        assert "pg_try_advisory_lock" in query
+        acquired, self.lock_free = self.lock_free, False
+        return acquired
+
+    async def execute(self, query, *args):
+        if "pg_advisory_unlock" in query:
+            self.lock_free = True
+            return
+        self.executed.append((query, args))
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def _revenue_rows():
+    end, _, _ = forecasting.REVENUE_SERIES.window(datetime.now(timezone.utc).date())
+    return [{"tenant_id": TENANT, "period": end - i, "value": 1000.0 + 10 * i} for i in range(24)]
+
+
+@pytest.mark.asyncio
+async def test_missing_snapshot_is_computed_for_the_tenant_and_persisted():
+    conn = _FakeConn(None, {"invoices": _revenue_rows()})
+    engine = ForecastEngine()
+
+    payload = await engine.snapshot(_FakePool(conn), TENANT, forecasting.KIND_REVENUE)
+
+    assert payload["available"] is True and len(payload["predictions"]["month"]) == 36
+    assert all(args[0] == [TENANT] for _, args in conn.fetches)
+    query, args = conn.executed[0]
+    assert "jsonb_to_recordset($1::jsonb)" in query
+    assert {(r["tenant_id"], r["kind"]) for r in json.loads(args[0])} == {
+        (TENANT, kind) for kind in forecasting.KINDS
+    }
+
+    conn.snapshot_row = {"payload": json.dumps(payload), "age_seconds": 5.0}
+    conn.fetches.clear()
+    assert await engine.snapshot(_FakePool(conn), TENANT, forecasting.KIND_REVENUE) == payload
+    assert conn.fetches == [] and engine.stats()["snapshot_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_scores_all_tenants_in_one_pass():
+    rows = _revenue_rows() + [dict(row, tenant_id="other") for row in _revenue_rows()]
+    conn = _FakeConn(None, {"invoices": rows})
+    engine = ForecastEngine(_FakePool(conn))
+
+    assert await engine.refresh() == 2
+    assert all(args[0] is None for _, args in conn.fetches)
+    assert len(conn.executed) == 1
+    assert conn.lock_free
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_skipped_while_another_instance_holds_the_lock():
+    conn = _FakeConn(None, {"invoices": _revenue_rows()}, lock_free=False)
+    engine = ForecastEngine(_FakePool(conn))
+
+    assert await engine.refresh() == 0
+    assert conn.fetches == [] and conn.executed == []
+    assert engine.stats()["refreshes_skipped_locked"] == 1
+
+
+class _StubEngine:
+    def __init__(self, payloads):
+        self.payloads = payloads
+
+    async def snapshot(self, pool, tenant_id, kind):
+        return self.payloads[kind]
+
+
+def test_endpoints_serve_snapshot_slices(monkeypatch):
+    months = [f"2026-{m:02d}" for m in range(10, 13)] + ["2027-01"]
+    payloads = {
+        forecasting.KIND_REVENUE: {
+            "available": True,
+            "model": "holt_winters",
+            "avg_monthly_growth_rate": 0.02,
+            "historical": {"month": ["2026-08", "2026-09"], "revenue": [900.0, 950.0]},
+            "predictions": {
+                "month": months,
+                "predicted_revenue": [1000.0, 1010.0, 1020.0, 1030.0],
+                "lower": [900.0, 890.0, 880.0, 870.0],
+                "upper": [1100.0, 1130.0, 1160.0, 1190.0],
+                "confidence": [0.9, 0.85, 0.8, 0.75],
+            },
+        },
+        forecasting.KIND_ANOMALIES: {
+            "timestamp": ["2026-10-14", "2026-10-15"],
+            "expected_value": [100.0, 100.0],
+            "actual_value": [101.0, 400.0],
+            "score": [0.4, 25.0],
+        },
+    }
+    monkeypatch.setattr(predictive_analytics, "get_forecast_engine", lambda: _StubEngine(payloads))
+    app = FastAPI()
+    app.include_router(predictive_analytics.router)
+    app.state.db_pool = object()
+    app.dependency_overrides[get_authenticated_user] = lambda: {"tenant_id": TENANT}
+
+    with TestClient(app) as client:
+        forecast = client.get("/forecast/revenue", params={"months": 2}).json()
+        anomalies = client.get("/anomalies").json()
+
+    assert forecast["historical_months"] == 2
+    assert forecast["predictions"] == [
+        {"month": "2026-10", "predicted_revenue": 1000.0,
+         "confidence_interval": {"lower": 900.0, "upper": 1100.0}, "confidence": 0.9},
+        {"month": "2026-11", "predicted_revenue": 1010.0,
+         "confidence_interval": {"lower": 890.0, "upper": 1130.0}, "confidence": 0.85},
+    ]
+    assert anomalies["anomalies_detected"] == 1
+    assert anomalies["anomalies"][0]["timestamp"] == "2026-10-15"
+    assert anomalies["anomalies"][0]["severity"] == "high"
@@ -0,0 +1,95 @@
+"""
+Unit Tests - Host Metrics Sampler
+Validates the ring buffer, non-blocking CPU reads, on-demand refresh of stale
+samples, delta-based I/O rates and the background sampling thread.
+"""
+
+import time
+from types import SimpleNamespace
+
+import psutil
+
+from core import host_metrics
+from core.host_metrics import HostMetricsSampler
+
+
+def test_ring_buffer_keeps_latest_samples():
+    sampler = HostMetricsSampler(interval=1, history=3)
+
+    for _ in range(5):
+        sampler.sample()
+
+    history = sampler.history()
+    assert len(history) == 3
+    assert sampler.latest() is history[-1]
+    assert [s.timestamp for s in history] == sorted(s.timestamp for s in history)
+    assert sampler.history(seconds=3600) == history
+
+
+def test_cpu_is_never_read_with_a_blocking_interval(monkeypatch):
+    intervals = []
+    real_cpu_percent = psutil.cpu_percent
+
+    def spy(interval=None, percpu=False):
+        intervals.append(interval)
+        return real_cpu_percent(interval=None, percpu=percpu)
+
+    monkeypatch.setattr(psutil, "cpu_percent", spy)
+    sampler = HostMetricsSampler(interval=1, history=5)
+
+    started = time.perf_counter()
+    sampler.latest()
+    sampler.latest()
+
+    assert time.perf_counter() - started < 0.5
+    assert intervals and all(value is None for value in intervals)
+    # The second read is served from the buffer.
+    assert sampler.stats()["samples"] == 1
+
+
+def test_stale_sample_is_refreshed_when_the_sampler_is_not_running():
+    sampler = HostMetricsSampler(interval=0.05, history=5)
+    first = sampler.latest()
+
+    assert sampler.latest() is first
+    time.sleep(0.1)
+    refreshed = sampler.latest()
+
+    assert refreshed is not first
+    assert refreshed.timestamp > first.timestamp
+    assert sampler.stats()["samples"] == 2
+
+
+def test_network_rates_are_deltas_between_samples(monkeypatch):
+    counters = iter([(1000, 5000), (1000, 5000), (3000, 9000)])
+
+    def fake_net_io():
+        sent, recv = next(counters)
+        return SimpleNamespace(bytes_sent=sent, bytes_recv=recv, packets_sent=1, packets_recv=1)
+
+    clock = iter([100.0, 100.0, 102.0])
+    monkeypatch.setattr(psutil, "net_io_counters", fake_net_io)
+    monkeypatch.setattr(host_metrics.time, "monotonic", lambda: next(clock))
+
+    sampler = HostMetricsSampler(interval=1)
+    sampler.sample()
+    second = sampler.sample()
+
+    assert second.net_bytes_sent == 3000
+    assert second.net_sent_per_sec == 1000.0
+    assert second.net_recv_per_sec == 2000.0
+
+
+def test_background_thread_fills_buffer_and_stops():
+    sampler = HostMetricsSampler(interval=0.05, history=10)
+    sampler.start()
+    try:
+        deadline = time.monotonic() + 2
+        while sampler.stats()["samples"] < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        sampler.stop()
+
+    stats = sampler.stats()
+    assert stats["samples"] >= 2
+    assert stats["running"] is False
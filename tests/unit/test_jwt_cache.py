@@ -0,0 +1,93 @@
+"""
+Unit Tests - Verified JWT Cache
+Validates that get_current_user verifies a bearer token once, serves later
+calls from the digest-keyed cache until the token's exp, and stays bounded.
+"""
+
+import time
+from unittest.mock import patch
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from core import supabase_auth
+from core.supabase_auth import clear_jwt_cache, get_current_user, get_jwt_cache_stats
+
+
+def _token(sub="user-1", exp_delta=3600, **claims):
+    payload = {
+        "sub": sub,
+        "email": f"{sub}@example.com",
+        "aud": "authenticated",
+        "exp": int(time.time()) + exp_delta,
+        "user_metadata": {"tenant_id": "tenant-1"},
+        **claims,
+    }
+    return jwt.encode(payload, supabase_auth.SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    clear_jwt_cache()
+    yield
+    clear_jwt_cache()
+
+
+@pytest.mark.asyncio
+async def test_second_call_is_served_from_cache_without_decoding():
+    header = f"Bearer {_token()}"
+    first = await get_current_user(authorization=header)
+
+    with patch.object(supabase_auth.jwt, "decode", side_effect=AssertionError("decoded")):
+        second = await get_current_user(authorization=header)
+
+    assert second == first
+    # Callers get their own copy, nested metadata included.
+    first["user_metadata"]["tenant_id"] = "mutated"
+    second["tenant_id"] = "mutated"
+    second["user_metadata"]["role"] = "admin"
+    third = await get_current_user(authorization=header)
+    assert third["tenant_id"] == "tenant-1"
+    assert third["user_metadata"] == {"tenant_id": "tenant-1"}
+
+    stats = get_jwt_cache_stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+
+@pytest.mark.asyncio
+async def test_entry_expires_at_token_exp():
+    token = _token(exp_delta=5)
+    await get_current_user(authorization=f"Bearer {token}")
+
+    later = time.time() + 10
+    with patch.object(supabase_auth.time, "time", return_value=later):
+        with patch.object(supabase_auth.jwt, "decode", side_effect=jwt.ExpiredSignatureError):
+            with pytest.raises(HTTPException) as exc_info:
+                await get_current_user(authorization=f"Bearer {token}")
+    assert exc_info.value.status_code == 401
+    stats = get_jwt_cache_stats()
+    assert stats["expired"] == 1
+    assert stats["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_invalid_tokens_are_not_cached():
+    bad = jwt.encode({"sub": "x", "aud": "authenticated"}, "wrong-secret", algorithm="HS256")
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            await get_current_user(authorization=f"Bearer {bad}")
+    assert get_jwt_cache_stats()["size"] == 0
+    assert get_jwt_cache_stats()["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(supabase_auth, "JWT_CACHE_MAX_ENTRIES", 2)
+    for idx in range(4):
+        await get_current_user(authorization=f"Bearer {_token(sub=f'user-{idx}')}")
+    stats = get_jwt_cache_stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 2
@@ -0,0 +1,44 @@
+"""
+Unit Tests - Event Loop Lag Monitor
+Validates stall detection and attribution of blocking calls to the route
+handler or project frame that held the loop.
+"""
+
+import asyncio
+import sys
+import time
+
+from core.loop_monitor import ROUTES_DIR, LoopLagMonitor, attribute_frame
+
+
+def _block_loop(seconds):
+    time.sleep(seconds)
+
+
+def test_attribution_prefers_route_handler():
+    namespace = {}
+    code = compile("def handler(callback):\n    return callback()\n", ROUTES_DIR + "fake_api.py", "exec")
+    exec(code, namespace)
+
+    assert namespace["handler"](lambda: attribute_frame(sys._getframe())) == "routes/fake_api.py:handler"
+    assert attribute_frame(sys._getframe()) == "tests/unit/test_loop_monitor.py:test_attribution_prefers_route_handler"
+
+
+async def test_blocking_call_is_attributed():
+    monitor = LoopLagMonitor(threshold_ms=50, interval=0.02)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        _block_loop(0.3)
+        await asyncio.sleep(0.1)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1
+    assert stats["max_lag_ms"] >= 250
+    culprit = stats["culprits"][0]
+    assert culprit["culprit"] == "tests/unit/test_loop_monitor.py:_block_loop"
+    assert culprit["count"] == 1
+    assert culprit["total_ms"] >= 250
+    assert not monitor.running
@@ -0,0 +1,278 @@
+"""
+Unit Tests - Memory Consolidation Engine
+Validates LSH candidate recall against exact all-pairs similarity, the
+Hamming pre-filter bound, oversized bucket reporting, canonical selection,
+and that paged merges resume from the cursor after an interrupted run.
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from brainops_ai_os import memory_consolidation
+from brainops_ai_os.memory_consolidation import (
+    MemoryConsolidator,
+    SimHashLSH,
+    candidate_pairs,
+    hamming_filter,
+    merge_groups,
+    near_duplicate_pairs,
+    normalize,
+)
+
+DIM = 64
+
+
+def _with_duplicates(rng, count, duplicates, low=0.955, high=0.995):
+    """Random unit rows plus perturbed copies at a known cosine to their source."""
+    base = normalize(rng.normal(size=(count, DIM)))
+    sources = rng.choice(count, duplicates, replace=False)
+    noise = rng.normal(size=(duplicates, DIM))
+    noise -= (noise * base[sources]).sum(axis=1, keepdims=True) * base[sources]
+    cosine = rng.uniform(low, high, duplicates)[:, None]
+    copies = cosine * base[sources] + np.sqrt(1 - cosine**2) * normalize(noise)
+    return normalize(np.vstack([base, copies])), sources
+
+
+def test_lsh_pairs_match_exact_all_pairs_search():
+    rng = np.random.default_rng(25)
+    vectors, _ = _with_duplicates(rng, 3000, 150)
+
+    i, j, similarity = near_duplicate_pairs(vectors, SimHashLSH(DIM))
+
+    exact = np.triu(vectors @ vectors.T, k=1)
+    truth = {tuple(pair) for pair in np.argwhere(exact >= 0.95).tolist()}
+    found = set(zip(i.tolist(), j.tolist()))
+    assert found <= truth
+    assert len(found) / len(truth) >= 0.97
+    assert (similarity >= 0.95).all()
+
+
+def test_hamming_bound_keeps_true_duplicates():
+    rng = np.random.default_rng(3)
+    vectors, sources = _with_duplicates(rng, 500, 500, low=0.95, high=0.951)
+    lsh = SimHashLSH(DIM)
+    _, signatures = lsh.hash(vectors)
+
+    distance = np.unpackbits(signatures[sources] ^ signatures[500:], axis=1).sum(axis=1)
+
+    assert (distance <= lsh.max_hamming(0.95)).mean() > 0.999
+    assert lsh.max_hamming(0.95) < lsh.signature_bits / 4
+
+
+def test_candidate_pairs_only_involve_new_rows():
+    keys = np.array([[1, 10], [1, 11], [2, 10], [1, 12]], dtype=np.int64)
+    new = np.array([False, False, False, True])
+
+    i, j, _ = candidate_pairs(keys)
+    assert set(zip(i.tolist(), j.tolist())) == {(0, 1), (0, 2), (0, 3), (1, 3)}
+
+    i, j, _ = candidate_pairs(keys, new)
+    assert set(zip(i.tolist(), j.tolist())) == {(0, 3), (1, 3)}
+
+
+def test_buckets_beyond_the_offset_window_are_counted():
+    keys = np.array([[7]] * 5 + [[8]] * 3 + [[9]], dtype=np.int64)
+
+    i, j, oversized = candidate_pairs(keys, max_offset=2)
+
+    pairs = set(zip(i.tolist(), j.tolist()))
+    assert {(2, 4), (5, 7)} <= pairs and (0, 4) not in pairs
+    assert oversized == 1
+    assert candidate_pairs(keys, max_offset=4)[2] == 0
+
+
+def test_hamming_filter_counts_differing_bits():
+    signatures = np.array([[0b1011_0000, 0xFF], [0b0001_0000, 0x0F], [0b1011_0000, 0xFF]], dtype=np.uint8)
+
+    keep = hamming_filter(signatures, np.array([0, 0]), np.array([1, 2]), max_distance=6)
+
+    assert keep.tolist() == [True, True]
+    assert hamming_filter(signatures, np.array([0]), np.array([1]), max_distance=5).tolist() == [False]
+
+
+def test_merge_groups_pick_the_most_important_then_oldest():
+    rank = [(-0.5, False, 3), (-0.9, False, 5), (-0.9, False, 1), (-0.1, False, 0), (-0.2, False, 0)]
+
+    groups = merge_groups([0, 1, 3], [1, 2, 4], rank)
+
+    assert groups == {2: [1, 0], 4: [3]}
+
+
+class _Store:
+    """Just enough of unified_ai_memory and the consolidation tables."""
+
+    def __init__(self, vectors, importance):
+        start = datetime(2026, 10, 1, tzinfo=timezone.utc)
+        # Duplicates arrive interleaved with everything else.
+        order = np.random.default_rng(len(vectors)).permutation(len(vectors))
+        self.memories = {
+            uuid.UUID(int=k + 1): {
+                "created_at": start + timedelta(minutes=int(order[k])),
+                "importance_score": float(importance[k]),
+                "embedding": vectors[k].tolist(),
+                "archived": False,
+                "absorbed": [],
+            }
+            for k in range(len(vectors))
+        }
+        self.lsh = {}
+        self.cursor = None
+        self.fail_on_merge = None
+        self.merge_calls = 0
+
+    def live(self, memory_id):
+        return not self.memories[memory_id]["archived"]
+
+
+class _FakeConn:
+    def __init__(self, store):
+        self.store = store
+
+    async def fetchval(self, query, *args):
+        if "pg_try_advisory_lock" in query:
+            return True
+        if "WITH merges" in query:
+            self.store.merge_calls += 1
+            if self.store.merge_calls == self.store.fail_on_merge:
+                raise ConnectionError("connection dropped")
+            merged = 0
+            for duplicate, canonical in zip(*args):
+                if self.store.live(duplicate):
+                    self.store.memories[duplicate]["archived"] = True
+                    self.store.memories[canonical]["absorbed"].append(duplicate)
+                    self.store.lsh.pop(duplicate, None)
+                    merged += 1
+            return merged
+        raise AssertionError(query)
+
+    async def fetchrow(self, query, *args):
+        return self.store.cursor
+
+    async def fetch(self, query, *args):
+        memories = self.store.memories
+        if "FROM unified_memory_lsh l" in query:
+            wanted = set(args[0])
+            return [
+                {"memory_id": memory_id, "band_keys": keys, "signature": signature}
+                for memory_id, (keys, signature) in self.store.lsh.items()
+                if self.store.live(memory_id) and wanted & set(keys)
+            ]
+        if "id = ANY" in query:
+            return [{"id": memory_id, **memories[memory_id]} for memory_id in args[0] if self.store.live(memory_id)]
+        limit, _, *position = args
+        rows = sorted(
+            ({"id": memory_id, **memory} for memory_id, memory in memories.items() if not memory["archived"]),
+            key=lambda row: (row["created_at"], row["id"]),
+        )
+        if position:
+            rows = [row for row in rows if (row["created_at"], row["id"]) > tuple(position)]
+        return rows[:limit]
+
+    async def execute(self, query, *args):
+        if "INSERT INTO unified_memory_lsh" in query:
+            ids, flat, signatures, bands = args
+            for k, memory_id in enumerate(ids):
+                self.store.lsh[memory_id] = (flat[k * bands:(k + 1) * bands], signatures[k])
+        elif "INSERT INTO unified_memory_consolidation_cursor" in query:
+            params = args[1]
+            position = args[2:] if len(args) > 2 else (None, None)
+            self.store.cursor = {"params": params, "last_created_at": position[0], "last_id": position[1]}
+        elif "DELETE FROM unified_memory_lsh" in query:
+            self.store.lsh.clear()
+
+    @asynccontextmanager
+    async def transaction(self):
+        # Stage writes so a failure inside the block leaves the store untouched.
+        snapshot = (
+            {k: dict(v, absorbed=list(v["absorbed"])) for k, v in self.store.memories.items()},
+            dict(self.store.lsh),
+            self.store.cursor,
+        )
+        try:
+            yield
+        except BaseException:
+            self.store.memories, self.store.lsh, self.store.cursor = snapshot
+            raise
+
+
+class _FakePool:
+    def __init__(self, store):
+        self.store = store
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield _FakeConn(self.store)
+
+
+def _fixture(seed=9):
+    rng = np.random.default_rng(seed)
+    vectors, sources = _with_duplicates(rng, 400, 40)
+    importance = rng.random(len(vectors))
+    return vectors, sources, importance
+
+
+def _outcome(store):
+    return (
+        {memory_id for memory_id, memory in store.memories.items() if memory["archived"]},
+        {memory_id: sorted(memory["absorbed"]) for memory_id, memory in store.memories.items() if memory["absorbed"]},
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_merges_duplicates_into_the_more_important_memory():
+    vectors, sources, importance = _fixture()
+    store = _Store(vectors, importance)
+    consolidator = MemoryConsolidator(_FakePool(store), page_size=64, settle_seconds=0)
+
+    result = await consolidator.run()
+
+    assert result["caught_up"] and result["indexed"] == len(vectors)
+    archived, absorbed = _outcome(store)
+    assert len(archived) == result["merged"] >= 38
+    for k, source in enumerate(sources):
+        pair = {uuid.UUID(int=int(source) + 1), uuid.UUID(int=400 + k + 1)}
+        if pair & archived:
+            loser = (pair & archived).pop()
+            winner = (pair - {loser}).pop()
+            assert store.memories[winner]["importance_score"] >= store.memories[loser]["importance_score"]
+    assert not archived & set(store.lsh)
+    assert store.cursor["params"] == SimHashLSH(DIM).fingerprint
+
+    # Caught up: a second run has nothing to do.
+    again = await consolidator.run()
+    assert again == {"indexed": 0, "merged": 0, "pages": 0, "caught_up": True}
+
+
+@pytest.mark.asyncio
+async def test_interrupted_run_resumes_from_the_cursor():
+    vectors, _, importance = _fixture()
+    reference = _Store(vectors, importance)
+    await MemoryConsolidator(_FakePool(reference), page_size=64, settle_seconds=0).run()
+
+    store = _Store(vectors, importance)
+    store.fail_on_merge = 3
+    with pytest.raises(ConnectionError):
+        await MemoryConsolidator(_FakePool(store), page_size=64, settle_seconds=0).run()
+    assert store.cursor is not None and store.cursor["last_id"] is not None
+
+    resumed = await MemoryConsolidator(_FakePool(store), page_size=64, settle_seconds=0).run()
+
+    assert resumed["caught_up"] and resumed["indexed"] < len(vectors)
+    assert _outcome(store) == _outcome(reference)
+
+
+@pytest.mark.asyncio
+async def test_time_budget_stops_between_pages(monkeypatch):
+    vectors, _, importance = _fixture()
+    store = _Store(vectors, importance)
+    clock = iter(range(0, 10_000, 7))
+    monkeypatch.setattr(memory_consolidation.time, "monotonic", lambda: next(clock))
+
+    result = await MemoryConsolidator(_FakePool(store), page_size=64, max_seconds=25, settle_seconds=0).run()
+
+    assert result["pages"] == 2 and not result["caught_up"]
+    assert len(store.lsh) + result["merged"] == 128
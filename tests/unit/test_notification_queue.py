@@ -0,0 +1,162 @@
+"""
+Unit Tests - Notification Queue Worker
+Validates batch claiming, bounded concurrent sends, retry backoff, terminal
+failure transitions, opt-in start-up and NOTIFY wake-ups.
+"""
+
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+
+from services import notification_queue
+from services.notification_queue import (
+    STATUS_FAILED,
+    STATUS_PENDING,
+    STATUS_SENT,
+    NotificationQueueWorker,
+    render_template,
+    retry_delay,
+)
+
+
+class _FakeConn:
+    def __init__(self, batches):
+        self.batches = list(batches)
+        self.completed = []
+        self.claim_args = []
+
+    async def fetch(self, query, *args):
+        assert "FOR UPDATE SKIP LOCKED" in query
+        self.claim_args.append(args)
+        return self.batches.pop(0) if self.batches else []
+
+    async def fetchval(self, query, *args):
+        return None
+
+    async def executemany(self, query, rows):
+        assert "AND status = 'sending' AND attempts = $5" in query
+        self.completed.extend(rows)
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def _row(attempts=1, kind="email"):
+    return {
+        "id": uuid.uuid4(),
+        "notification_type": kind,
+        "recipient_email": "ops@example.com",
+        "recipient_phone": None,
+        "subject": "Hi",
+        "message": "Body",
+        "data": None,
+        "template_id": None,
+        "attempts": attempts,
+    }
+
+
+def test_retry_delay_doubles_and_caps():
+    assert [retry_delay(n, 30, 200, jitter=False) for n in (1, 2, 3, 4)] == [30, 60, 120, 200]
+    assert 15 <= retry_delay(1, 30, 200) <= 30
+
+
+def test_render_template_fills_placeholders():
+    assert render_template("Job {{job_number}} for {{name}}", '{"job_number": 7}') == "Job 7 for "
+
+
+async def test_run_once_sends_concurrently_and_records_outcomes():
+    rows = [_row() for _ in range(6)] + [_row(attempts=3), _row(attempts=4)]
+    failing = {rows[6]["id"], rows[7]["id"]}
+    conn = _FakeConn([rows])
+    active = peak = 0
+
+    async def _sender(notification):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return notification["id"] not in failing
+
+    worker = NotificationQueueWorker(
+        _FakePool(conn), sender=_sender, concurrency=3, batch_size=50, max_attempts=4, backoff_base=10, backoff_max=60
+    )
+
+    assert await worker.run_once() == 8
+    assert peak == 3
+    assert conn.claim_args == [(50, worker.visibility_timeout)]
+    outcomes = {row[0]: row for row in conn.completed}
+    assert {outcomes[r["id"]][1] for r in rows[:6]} == {STATUS_SENT}
+    retry = outcomes[rows[6]["id"]]
+    assert retry[1] == STATUS_PENDING and 20 <= retry[2] <= 40 and retry[4] == 3
+    assert outcomes[rows[7]["id"]][1:4] == (STATUS_FAILED, 0.0, "Failed to send notification")
+    stats = worker.stats()
+    assert (stats["sent"], stats["retried"], stats["failed"]) == (6, 1, 1)
+
+
+async def test_reclaimed_past_max_attempts_is_failed_without_sending():
+    conn = _FakeConn([[_row(attempts=6)]])
+    sent = []
+
+    async def _sender(notification):
+        sent.append(notification)
+        return True
+
+    worker = NotificationQueueWorker(_FakePool(conn), sender=_sender, max_attempts=5)
+    await worker.run_once()
+
+    assert sent == []
+    assert conn.completed[0][1] == STATUS_FAILED
+
+
+async def test_unknown_type_fails_with_reason():
+    conn = _FakeConn([[_row(kind="fax")]])
+    worker = NotificationQueueWorker(_FakePool(conn), max_attempts=1)
+    await worker.run_once()
+
+    assert conn.completed[0][1:4] == (STATUS_FAILED, 0.0, "Unknown notification type: fax")
+
+
+async def test_notify_wakes_idle_worker(monkeypatch):
+    conn = _FakeConn([[], [_row()]])
+    delivered = asyncio.Event()
+
+    async def _sender(notification):
+        delivered.set()
+        return True
+
+    worker = NotificationQueueWorker(_FakePool(conn), sender=_sender, poll_interval=30)
+
+    async def _no_listener():
+        return None
+
+    monkeypatch.setattr(worker, "_ensure_listener", _no_listener)
+    task = asyncio.create_task(worker.run())
+    await asyncio.sleep(0.05)
+    assert not delivered.is_set()
+
+    worker._on_notify(None, 0, "notification_queue", "")
+    await asyncio.wait_for(delivered.wait(), timeout=1)
+    worker.stop()
+    await asyncio.wait_for(task, timeout=1)
+    assert worker.stats()["notifications_received"] == 1
+
+
+def test_worker_only_starts_when_enabled(monkeypatch):
+    started = []
+    monkeypatch.setattr(notification_queue.asyncio, "create_task", lambda coro: started.append(coro.close()))
+    monkeypatch.setattr(notification_queue, "_worker_task", None)
+
+    monkeypatch.delenv("NOTIFICATION_QUEUE_WORKER", raising=False)
+    assert notification_queue.start_notification_worker() is None
+    assert started == []
+
+    monkeypatch.setenv("NOTIFICATION_QUEUE_WORKER", "true")
+    notification_queue.start_notification_worker()
+    assert len(started) == 1
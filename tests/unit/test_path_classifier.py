@@ -0,0 +1,99 @@
+"""
+Unit Tests - Request Path Classifier
+Validates that the compiled matchers agree with the per-middleware prefix
+scans they replace and that the classification is stored in and reused from
+the ASGI scope.
+"""
+
+import pytest
+
+from middleware.path_classifier import (
+    DEFAULT_EXEMPT_PATHS,
+    DEFAULT_EXEMPT_PREFIXES,
+    DEFAULT_PUBLIC_PATHS,
+    PATH_CLASS_SCOPE_KEY,
+    RATE_LIMIT_EXCLUDED_PATHS,
+    TENANT_EXEMPT_PREFIXES,
+    WEBHOOK_PREFIXES,
+    PathMatcher,
+    classify_path,
+    get_path_class,
+)
+from middleware.tenant import _is_exempt_path
+
+SAMPLE_PATHS = sorted(
+    {
+        "/",
+        "",
+        "/healthz",
+        "/health/deep",
+        "/docsxyz",
+        "/docs/swagger",
+        "/capabilities",
+        "/capabilitiesx",
+        "/api/v1/cns/tasks",
+        "/api/v1/customers/123",
+        "/api/v1/products/public/list",
+        "/api/v1/gumroad-revenue/webhook/gumroad",
+        "/api/v1/gumroad-revenue/webhook/other",
+        "/static/app.css",
+        *DEFAULT_EXEMPT_PATHS,
+        *DEFAULT_EXEMPT_PREFIXES,
+        *DEFAULT_PUBLIC_PATHS,
+        *TENANT_EXEMPT_PREFIXES,
+        *(path + "/x" for path in TENANT_EXEMPT_PREFIXES),
+        *(path + "x" for path in DEFAULT_PUBLIC_PATHS),
+    }
+)
+
+
+def _legacy_tenant_exempt(path):
+    for prefix in TENANT_EXEMPT_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return True
+    return path == "/"
+
+
+@pytest.mark.parametrize("path", SAMPLE_PATHS)
+def test_classification_matches_legacy_scans(path):
+    result = classify_path(path)
+    assert result.auth_exempt == (
+        path in DEFAULT_EXEMPT_PATHS
+        or any(path.startswith(prefix) for prefix in DEFAULT_EXEMPT_PREFIXES)
+    )
+    assert result.api_key_public == any(path.startswith(p) for p in DEFAULT_PUBLIC_PATHS)
+    assert result.rate_limit_excluded == any(
+        path.startswith(p) for p in RATE_LIMIT_EXCLUDED_PATHS
+    )
+    assert result.webhook == any(path.startswith(p) for p in WEBHOOK_PREFIXES)
+    assert result.tenant_exempt == _legacy_tenant_exempt(path)
+    assert _is_exempt_path(path) == _legacy_tenant_exempt(path)
+
+
+def test_kind():
+    assert classify_path("/api/v1/stripe/webhook").kind == "webhook"
+    assert classify_path("/health").kind == "public"
+    assert classify_path("/api/v1/customers").kind == "authenticated"
+
+
+def test_scope_result_is_reused_and_refreshed_on_path_change():
+    scope = {"type": "http", "path": "/health"}
+    first = get_path_class(scope)
+    assert scope[PATH_CLASS_SCOPE_KEY] is first
+    assert get_path_class(scope, "/health") is first
+
+    second = get_path_class(scope, "/api/v1/customers")
+    assert second.path == "/api/v1/customers"
+    assert scope[PATH_CLASS_SCOPE_KEY] is second
+
+
+def test_empty_matcher_matches_nothing():
+    assert not PathMatcher().matches("/anything")
+
+
+def test_regex_metacharacters_are_literal():
+    matcher = PathMatcher(exact=("/a.b",), segment_prefixes=("/c+d",))
+    assert matcher.matches("/a.b")
+    assert not matcher.matches("/axb")
+    assert matcher.matches("/c+d/e")
+    assert not matcher.matches("/ccd")
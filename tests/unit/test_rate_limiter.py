@@ -0,0 +1,148 @@
+"""
+Unit Tests - Sliding-Window Rate Limiter
+Validates the fixed-size per-client counters, LRU eviction under the client
+cap, the single-call Redis path and its in-memory fallback.
+"""
+
+import pytest
+from starlette.requests import Request
+
+from middleware.rate_limiter import RateLimiter
+
+
+def _request(ip="1.2.3.4"):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/items",
+        "headers": [(b"x-forwarded-for", ip.encode())],
+        "query_string": b"",
+        "client": (ip, 1234),
+    }
+    return Request(scope)
+
+
+class _Clock:
+    def __init__(self, now=1_000_020.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _limiter(**kwargs):
+    limiter = RateLimiter(**kwargs)
+    limiter._clock = _Clock()
+    return limiter
+
+
+@pytest.mark.asyncio
+async def test_limit_enforced_and_state_stays_fixed_size():
+    limiter = _limiter(requests_per_minute=100, requests_per_hour=10_000, requests_per_day=100_000)
+    for _ in range(100):
+        request = _request()
+        allowed, _ = await limiter.check_limit(request)
+        assert allowed
+
+    state = limiter._clients["ip:1.2.3.4"]
+    assert sorted(state.windows) == [60, 3600, 86400]
+    assert state.windows[60].current == 100
+
+    limits = limiter.get_limits_for_client(request)
+    assert limits["usage"]["minute"] == 100
+    assert limits["remaining"]["minute"] == 0
+
+    rejected = _request()
+    allowed, message = await limiter.check_limit(rejected)
+    assert not allowed
+    assert message == "Rate limit exceeded: 100 requests per minute"
+    # A rejected request does not consume quota in any window.
+    assert state.windows[3600].current == 100
+    assert limiter.get_limits_for_client(rejected)["remaining"]["minute"] == 0
+
+
+@pytest.mark.asyncio
+async def test_previous_bucket_is_weighted_by_overlap():
+    limiter = _limiter(requests_per_minute=10)
+    clock = limiter._clock
+    clock.now = 60 * 1000.0  # start of a bucket
+    for _ in range(10):
+        assert (await limiter.check_limit(_request()))[0]
+
+    # Half-way through the next bucket, half of the previous count remains.
+    clock.now += 90
+    for _ in range(5):
+        assert (await limiter.check_limit(_request()))[0]
+    assert not (await limiter.check_limit(_request()))[0]
+
+
+@pytest.mark.asyncio
+async def test_violation_blocks_client_temporarily():
+    limiter = _limiter()
+    checks = [(1, 60, "minute")]
+    assert (await limiter.check_limit(_request(), checks=checks))[0]
+    assert not (await limiter.check_limit(_request(), checks=checks))[0]
+
+    limiter._clock.now += 120
+    allowed, message = await limiter.check_limit(_request(), checks=checks)
+    assert not allowed
+    assert "temporarily blocked" in message
+
+    limiter._clock.now += 300
+    assert (await limiter.check_limit(_request(), checks=checks))[0]
+
+
+@pytest.mark.asyncio
+async def test_client_table_is_lru_capped():
+    limiter = _limiter(max_clients=3)
+    for idx in range(5):
+        await limiter.check_limit(_request(f"10.0.0.{idx}"))
+    # Touch the oldest survivor so it is not the next one evicted.
+    await limiter.check_limit(_request("10.0.0.2"))
+    await limiter.check_limit(_request("10.0.0.9"))
+
+    assert list(limiter._clients) == ["ip:10.0.0.4", "ip:10.0.0.2", "ip:10.0.0.9"]
+    assert limiter.stats()["evictions"] == 3
+
+
+class _FakeScript:
+    def __init__(self, result=None, error=None):
+        self.calls = []
+        self.result = result
+        self.error = error
+
+    async def __call__(self, keys, args):
+        self.calls.append((keys, args))
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_redis_path_uses_one_script_call_per_check():
+    limiter = _limiter()
+    limiter.redis_client = object()
+    limiter._redis_script = _FakeScript(result=[1, 0, 3, 40, 500])
+
+    request = _request()
+    assert (await limiter.check_limit(request))[0]
+    assert len(limiter._redis_script.calls) == 1
+    keys, args = limiter._redis_script.calls[0]
+    assert len(keys) == 6
+    assert keys[0] == "ratelimit:ip:1.2.3.4:60:16667"
+    assert limiter.get_limits_for_client(request)["usage"] == {"minute": 3, "hour": 40, "day": 500}
+
+    limiter._redis_script.result = [0, 2]
+    allowed, message = await limiter.check_limit(_request("5.6.7.8"))
+    assert not allowed
+    assert message.endswith("per hour")
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_memory_counters():
+    limiter = _limiter()
+    limiter.redis_client = object()
+    limiter._redis_script = _FakeScript(error=ConnectionError("down"))
+
+    assert (await limiter.check_limit(_request(), checks=[(1, 60, "minute")]))[0]
+    assert not (await limiter.check_limit(_request(), checks=[(1, 60, "minute")]))[0]
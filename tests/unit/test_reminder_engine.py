@@ -0,0 +1,185 @@
+"""
+Unit Tests - Bulk Reminder Engine
+Validates the set-based eligibility filter, idempotent enqueue reporting,
+bounded concurrent delivery with per-channel pacing, chunked claim renewal
+and batched status writes.
+"""
+
+import time
+import uuid
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+import services.reminder_engine as reminder_engine
+from services.notifications import TokenBucket
+from services.reminder_engine import BulkReminderEngine, build_eligible_filter
+
+TENANT = str(uuid.uuid4())
+CLAIM = uuid.uuid4()
+
+
+class _FakeConn:
+    def __init__(self, rows=None, lost=()):
+        self.rows = rows or []
+        self.lost = set(lost)
+        self.queries = []
+        self.renewals = []
+        self.executemany_calls = []
+
+    async def fetch(self, query, *args):
+        if "unnest($1::uuid[], $2::uuid[])" in query:
+            ids, tokens = args
+            self.renewals.append(len(ids))
+            return [{"id": reminder_id} for reminder_id in ids if reminder_id not in self.lost]
+        self.queries.append((query, args))
+        return self.rows
+
+    async def executemany(self, query, args):
+        self.executemany_calls.append(list(args))
+
+    async def close(self):
+        pass
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.leases = 0
+
+    async def lease(self):
+        self.leases += 1
+        return self.conn
+
+
+def _criteria(**overrides):
+    values = {
+        "filter_status": None,
+        "days_overdue_min": None,
+        "days_overdue_max": None,
+        "min_amount": None,
+        "customer_ids": None,
+        "exclude_customer_ids": None,
+    }
+    values.update(overrides)
+    return SimpleNamespace(**values)
+
+
+def _reminder(idx, channels=("email",)):
+    return {
+        "reminder_id": uuid.uuid4(),
+        "invoice_id": uuid.uuid4(),
+        "invoice_number": f"INV-{idx}",
+        "balance_cents": 12_500,
+        "due_date": date(2026, 9, 1),
+        "customer_name": "Acme",
+        "email": f"billing{idx}@example.com",
+        "phone": "+15550100",
+        "channels": list(channels),
+        "idempotency_key": f"overdue:2026-10-16:{idx}",
+        "claim_token": CLAIM,
+    }
+
+
+def test_eligible_filter_numbers_params_in_order():
+    customer = str(uuid.uuid4())
+    where, params = build_eligible_filter(
+        TENANT, _criteria(filter_status="sent", days_overdue_min=30, min_amount=10.5, customer_ids=[customer])
+    )
+
+    assert where == (
+        "i.balance_cents > 0 AND i.tenant_id = $1 AND i.status = $2"
+        " AND i.due_date <= CURRENT_DATE - $3::int AND i.balance_cents >= $4"
+        " AND i.customer_id = ANY($5::uuid[])"
+    )
+    assert params == [uuid.UUID(TENANT), "sent", 30, 1050, [uuid.UUID(customer)]]
+
+
+async def test_enqueue_is_one_statement_and_reports_duplicates():
+    new, dup = _reminder(1), _reminder(2)
+    dup["reminder_id"] = None
+    conn = _FakeConn([new, dup])
+    engine = BulkReminderEngine(pool=_FakePool(conn))
+
+    batch = await engine.enqueue(conn, TENANT, _criteria(), "overdue", ["email"], run_date=date(2026, 10, 16))
+
+    assert len(conn.queries) == 1
+    query, args = conn.queries[0]
+    assert "INSERT INTO payment_reminders" in query and "ON CONFLICT (tenant_id, idempotency_key)" in query
+    assert args[1:5] == ("overdue", '["email"]', "overdue:2026-10-16:", "sending")
+    assert isinstance(args[5], uuid.UUID)
+    assert "claim_token" in query
+    assert batch == {"queued": [new], "duplicates": 1}
+
+
+async def test_deliver_bounds_concurrency_and_batches_statuses(monkeypatch):
+    active = 0
+    peak = 0
+    sent_to = []
+
+    def _send_email(to_email, subject, html, text):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        time.sleep(0.01)
+        active -= 1
+        sent_to.append(to_email)
+        return not to_email.startswith("billing3@")
+
+    monkeypatch.setattr(reminder_engine, "send_email_message", _send_email)
+    conn = _FakeConn()
+    engine = BulkReminderEngine(workers=3, channel_rates={"email": 0}, flush_size=4, pool=_FakePool(conn))
+    reminders = [_reminder(idx) for idx in range(10)]
+    reminders.append(dict(reminders[0]))  # same idempotency key: delivered once
+
+    result = await engine.deliver(reminders)
+
+    assert result == {"sent": 9, "failed": 1}
+    assert len(sent_to) == 10
+    assert peak <= 3
+    assert [len(batch) for batch in conn.executemany_calls] == [4, 4, 2]
+    statuses = {row[1] for batch in conn.executemany_calls for row in batch}
+    assert statuses == {"sent", "failed"}
+    assert {row[3] for batch in conn.executemany_calls for row in batch} == {CLAIM}
+    assert engine.stats()["status_flushes"] == 3
+
+
+async def test_channel_without_contact_fails_reminder(monkeypatch):
+    conn = _FakeConn()
+    engine = BulkReminderEngine(pool=_FakePool(conn))
+    reminder = _reminder(1, channels=("sms",))
+    reminder["phone"] = None
+
+    assert await engine.deliver([reminder]) == {"sent": 0, "failed": 1}
+    assert conn.executemany_calls[0][0][1:] == ("failed", "No deliverable channel", CLAIM)
+
+
+async def test_paced_delivery_renews_claims_per_chunk_and_skips_reclaimed_rows(monkeypatch):
+    sent_to = []
+    monkeypatch.setattr(reminder_engine, "send_email_message", lambda to, *_: sent_to.append(to) or True)
+    reminders = [_reminder(idx) for idx in range(7)]
+    conn = _FakeConn(lost={reminders[5]["reminder_id"]})
+    # 100/s email pacing with a 60ms claim timeout: chunks of 3 rows (30ms each).
+    engine = BulkReminderEngine(channel_rates={"email": 100, "sms": 100}, claim_timeout=0.06, pool=_FakePool(conn))
+
+    result = await engine.deliver(reminders)
+
+    assert result == {"sent": 6, "failed": 0}
+    assert "billing5@example.com" not in sent_to
+    assert conn.renewals == [3, 3, 1]
+    assert [len(batch) for batch in conn.executemany_calls] == [3, 2, 1]
+    assert engine.stats()["claims_lost"] == 1
+
+
+def test_status_update_is_guarded_by_the_claim():
+    assert "claim_token = $4 AND status = 'sending'" in reminder_engine._STATUS_UPDATE
+
+
+async def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate=50, capacity=2)
+    started = time.perf_counter()
+    for _ in range(5):
+        await bucket.acquire()
+    # Two tokens of burst, then three more at 50/s.
+    assert time.perf_counter() - started == pytest.approx(0.06, abs=0.03)
@@ -0,0 +1,211 @@
+"""
+Unit Tests - Report Export Engine
+Validates chunked CSV streaming from a server-side cursor, background export
+jobs with resumable (Range) downloads, the streaming slot cap, the job queue
+and disk caps, and write-only XLSX output.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from core.supabase_auth import get_authenticated_user
+from routes import financial_reporting
+from services import report_export
+from services.report_export import EXPORT_DATASETS, ReportExporter, iter_csv
+
+TENANT = "7c9e6679-7425-40de-944b-e07fc1f90ae7"
+
+
+def _invoice(index):
+    return {
+        "id": f"inv-{index}",
+        "invoice_number": f"INV-{index:05d}",
+        "customer_id": "cust-1",
+        "job_id": None,
+        "status": "paid",
+        "total_amount": Decimal("125.50"),
+        "created_at": datetime(2026, 1, 1, 9, 30),
+    }
+
+
+class _FakeConn:
+    def __init__(self, rows, calls):
+        self.rows = rows
+        self.calls = calls
+
+    @asynccontextmanager
+    async def transaction(self, readonly=False):
+        self.calls.append(("transaction", readonly))
+        yield
+
+    async def cursor(self, query, *args, prefetch=None):
+        self.calls.append(("cursor", prefetch, args))
+        for row in self.rows:
+            yield row
+
+    async def fetchval(self, query, *args):
+        return '[{"Plan": {"Plan Rows": 10}}]'
+
+
+class _FakePool:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield _FakeConn(self.rows, self.calls)
+
+
+async def _records(rows):
+    for row in rows:
+        yield row
+
+
+@pytest.mark.asyncio
+async def test_csv_is_yielded_in_bounded_chunks():
+    columns = EXPORT_DATASETS["invoices"].columns
+    chunks = [chunk async for chunk in iter_csv(_records([_invoice(i) for i in range(1200)]), columns, flush_rows=500)]
+
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert lines[0] == ",".join(columns)
+    assert lines[1] == "inv-0,INV-00000,cust-1,,paid,125.50,2026-01-01T09:30:00"
+    assert len(lines) == 1201
+
+
+@pytest.mark.asyncio
+async def test_stream_reads_through_a_readonly_server_side_cursor():
+    pool = _FakePool([_invoice(i) for i in range(3)])
+    exporter = ReportExporter(pool, fetch_size=250)
+    args = report_export.query_args(TENANT, date(2026, 1, 1), date(2026, 12, 31))
+
+    body = b"".join([chunk async for chunk in exporter.stream(EXPORT_DATASETS["invoices"], args, "csv")])
+
+    assert body.decode().count("\n") == 4
+    assert pool.calls[0] == ("transaction", True)
+    assert pool.calls[1][1] == 250
+    assert pool.calls[1][2][1] == datetime(2026, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_streams_share_a_bounded_number_of_reading_slots():
+    exporter = ReportExporter(_FakePool([_invoice(i) for i in range(3)]), max_concurrent_streams=1)
+    args = report_export.query_args(TENANT, date(2026, 1, 1), date(2026, 12, 31))
+    first = exporter.stream(EXPORT_DATASETS["invoices"], args, "csv")
+
+    await first.__anext__()
+    assert exporter.streams_saturated
+    assert exporter.stats()["streams_active"] == 1
+
+    await first.aclose()
+    assert not exporter.streams_saturated
+    assert exporter.stats()["streams_active"] == 0
+
+
+def test_busy_stream_slots_turn_exports_into_background_jobs(tmp_path, monkeypatch):
+    exporter = ReportExporter(_FakePool([_invoice(i) for i in range(5)]), export_dir=str(tmp_path))
+    monkeypatch.setattr(report_export, "get_report_exporter", lambda: exporter)
+    monkeypatch.setattr(ReportExporter, "streams_saturated", property(lambda self: True))
+    app = FastAPI()
+    app.include_router(financial_reporting.router)
+    app.dependency_overrides[get_authenticated_user] = lambda: {"tenant_id": TENANT}
+
+    with TestClient(app) as client:
+        response = client.get("/reports/export/invoices", params={"start_date": "2026-01-01"})
+
+    assert response.status_code == 202
+
+
+def test_background_job_download_supports_range_resume(tmp_path, monkeypatch):
+    exporter = ReportExporter(_FakePool([_invoice(i) for i in range(50)]), export_dir=str(tmp_path))
+    monkeypatch.setattr(report_export, "get_report_exporter", lambda: exporter)
+    app = FastAPI()
+    app.include_router(financial_reporting.router)
+    app.dependency_overrides[get_authenticated_user] = lambda: {"tenant_id": TENANT}
+
+    with TestClient(app) as client:
+        accepted = client.get(
+            "/reports/export/invoices",
+            params={"start_date": "2026-01-01", "end_date": "2026-12-31", "background": "true"},
+        )
+        assert accepted.status_code == 202
+        job_id = accepted.json()["job_id"]
+
+        for _ in range(50):
+            status = client.get(f"/reports/exports/{job_id}").json()
+            if status["status"] == "completed":
+                break
+            time.sleep(0.02)
+        assert status["rows"] == 50
+
+        full = client.get(f"/reports/exports/{job_id}/download")
+        resumed = client.get(f"/reports/exports/{job_id}/download", headers={"Range": "bytes=100-"})
+
+    assert full.status_code == 200 and full.content.count(b"\n") == 51
+    assert resumed.status_code == 206
+    assert resumed.content == full.content[100:]
+    assert exporter.get_job(job_id, "another-tenant") is None
+
+
+@pytest.mark.asyncio
+async def test_pending_jobs_and_disk_usage_are_capped(tmp_path):
+    exporter = ReportExporter(
+        _FakePool([_invoice(i) for i in range(5)]),
+        export_dir=str(tmp_path),
+        max_pending_jobs=3,
+        max_pending_jobs_per_tenant=2,
+        max_disk_bytes=600,
+    )
+    spec = EXPORT_DATASETS["invoices"]
+    day = date(2026, 1, 1)
+
+    jobs = [exporter.submit(TENANT, spec, "csv", day, day) for _ in range(2)]
+    with pytest.raises(HTTPException) as per_tenant:
+        exporter.submit(TENANT, spec, "csv", day, day)
+    jobs.append(exporter.submit("other-tenant", spec, "csv", day, day))
+    with pytest.raises(HTTPException) as overall:
+        exporter.submit("third-tenant", spec, "csv", day, day)
+    assert per_tenant.value.status_code == overall.value.status_code == 429
+
+    await asyncio.gather(*exporter._tasks.values())
+    # Each file is ~400 bytes, so only the first one fits the 600-byte budget.
+    assert [job.status for job in jobs].count("completed") == 1
+    exporter.max_disk_bytes = exporter.disk_bytes()
+    with pytest.raises(HTTPException) as storage:
+        exporter.submit(TENANT, spec, "csv", day, day)
+    assert storage.value.status_code == 429
+    assert exporter.stats()["jobs_rejected"] == 3
+
+
+@pytest.mark.asyncio
+async def test_xlsx_uses_a_write_only_workbook(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = str(tmp_path / "invoices.xlsx")
+    columns = EXPORT_DATASETS["invoices"].columns
+
+    rows = await report_export.write_xlsx(_records([_invoice(i) for i in range(5)]), columns, path, flush_rows=2)
+
+    sheet = openpyxl.load_workbook(path, read_only=True).active
+    values = list(sheet.iter_rows(values_only=True))
+    assert rows == 5
+    assert values[0] == columns
+    assert values[1][1] == "INV-00000"
+
+
+def test_report_csv_keeps_field_value_layout():
+    data = {"period": "2026-Q1", "revenue": {"total": 10.5}, "lines": [{"a": 1}]}
+
+    assert financial_reporting.convert_to_csv(data).splitlines() == [
+        "Field,Value",
+        "period,2026-Q1",
+        "revenue.total,10.5",
+        "lines[0].a,1",
+    ]
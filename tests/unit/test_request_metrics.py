@@ -0,0 +1,100 @@
+"""
+Unit Tests - Per-Route Request Metrics
+Validates histogram bucketing and quantiles, route cardinality capping,
+Prometheus exposition and the windowed per-route brain-store summaries.
+"""
+
+import pytest
+
+from core.request_metrics import (
+    BUCKET_BOUNDS_MS,
+    OVERFLOW_ROUTE,
+    RequestMetrics,
+    bucket_index,
+    emit_route_summaries,
+)
+
+
+@pytest.mark.parametrize("value", [0.01, 0.25, 0.3, 1.0, 7.5, 120.0, 4000.0])
+def test_bucket_bounds_contain_value(value):
+    idx = bucket_index(value)
+    assert value <= BUCKET_BOUNDS_MS[idx]
+    if idx:
+        assert value > BUCKET_BOUNDS_MS[idx - 1]
+        # Log-linear buckets keep the relative error under ~9%.
+        assert BUCKET_BOUNDS_MS[idx] / value < 1.1
+
+
+def test_overflow_bucket_for_very_slow_requests():
+    metrics = RequestMetrics()
+    metrics.observe("GET", "/slow", 200, 10_000_000.0)
+    assert metrics.routes()[0]["p99_ms"] == 10_000_000.0
+
+
+def test_quantiles_and_counters_per_route():
+    metrics = RequestMetrics()
+    for idx in range(100):
+        status = 500 if idx >= 98 else 200
+        metrics.observe("GET", "/api/v1/items/{item_id}", status, float(idx + 1), 0, 10)
+    metrics.observe("POST", "/api/v1/items", 201, 5.0, 40, 2)
+
+    busiest = metrics.routes()[0]
+    assert busiest["route"] == "/api/v1/items/{item_id}"
+    assert busiest["count"] == 100
+    assert busiest["status"] == {"2xx": 98, "5xx": 2}
+    assert busiest["bytes_out"] == 1000
+    assert 50 <= busiest["p50_ms"] <= 55
+    assert 95 <= busiest["p95_ms"] <= 100
+    assert busiest["max_ms"] == 100.0
+    assert metrics.total_requests == 101
+
+
+def test_route_cardinality_is_capped():
+    metrics = RequestMetrics(max_routes=2)
+    for idx in range(5):
+        metrics.observe("GET", f"/scan/{idx}", 404, 1.0)
+    routes = {row["route"]: row["count"] for row in metrics.routes()}
+    assert routes == {"/scan/0": 1, "/scan/1": 1, OVERFLOW_ROUTE: 3}
+
+
+def test_prometheus_exposition():
+    metrics = RequestMetrics()
+    metrics.observe("GET", '/a"b', 200, 0.9, 5, 11)
+    metrics.observe("GET", '/a"b', 404, 3.0)
+    text = metrics.render_prometheus()
+
+    labels = 'method="GET",route="/a\\"b"'
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.001"}} 1' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="0.004"}} 2' in text
+    assert f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in text
+    assert f'http_requests_total{{{labels},status="4xx"}} 1' in text
+    assert f"http_response_bytes_total{{{labels}}} 11" in text
+    assert f"http_request_bytes_total{{{labels}}} 5" in text
+    # Every family's samples follow its own TYPE line.
+    families = [line.split()[2] for line in text.splitlines() if line.startswith("# TYPE")]
+    assert len(families) == len(set(families)) == 4
+
+
+def test_summaries_cover_every_route_in_the_window():
+    metrics = RequestMetrics()
+    metrics.observe("GET", "/a", 200, 1.0)
+    metrics.observe("GET", "/a", 503, 2.0)
+    metrics.observe("GET", "/b", 200, 1.0)
+    insights, events = [], []
+
+    rows = emit_route_summaries(
+        metrics,
+        store_event=lambda **kw: events.append(kw),
+        store_api_insight=lambda **kw: insights.append(kw),
+    )
+
+    assert [row["route"] for row in rows] == ["/a", "/b"]
+    assert {i["route"]: i["status_code"] for i in insights} == {"summary:/a": 500, "summary:/b": 200}
+    assert events[0]["data"]["window_size"] == 3
+
+    # The window is drained; cumulative counters are not.
+    assert emit_route_summaries(
+        metrics, store_event=events.append, store_api_insight=insights.append
+    ) == []
+    assert metrics.routes()[0]["count"] == 2
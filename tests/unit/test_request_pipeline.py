@@ -0,0 +1,141 @@
+"""
+Unit Tests - Pure-ASGI Request Pipeline
+Validates that RequestPipelineMiddleware keeps the semantics of the old
+BaseHTTPMiddleware stack (exempt paths, auth rejection, API keys, rate limit
+headers, correlation IDs) and does not buffer streaming responses.
+"""
+
+from typing import Any, Optional
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware.pipeline import RequestPipelineMiddleware
+
+
+@pytest.fixture(autouse=True)
+def patch_get_current_user(monkeypatch):
+    async def _fake_get_current_user(authorization: Optional[str] = None, **_: Any):
+        if authorization != "Bearer good-token":
+            raise HTTPException(status_code=401, detail="Missing authorization header")
+        return {"id": "user-1", "tenant_id": "tenant-1"}
+
+    monkeypatch.setattr("middleware.authentication.get_current_user", _fake_get_current_user)
+
+
+def _build_app(completions=None, sizes=None, **rate_limit):
+    app = FastAPI()
+    sizes = sizes if sizes is not None else []
+    app.state.db_pool = None
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    @app.get("/ready")
+    async def ready():
+        return {"ready": True}
+
+    @app.get("/api/v1/items/{item_id}")
+    async def item(item_id: str, request: Request):
+        return {
+            "item_id": item_id,
+            "user_id": request.state.user_id,
+            "tenant_id": request.state.tenant_id,
+            "correlation_id": request.state.correlation_id,
+        }
+
+    @app.get("/api/v1/stream")
+    async def stream():
+        async def _chunks():
+            for idx in range(3):
+                yield f"chunk-{idx}\n"
+
+        return StreamingResponse(_chunks(), media_type="text/plain")
+
+    def _on_complete(scope, method, route, status_code, elapsed_ms, request_bytes, response_bytes):
+        if completions is not None:
+            completions.append((method, route, status_code))
+            sizes.append((request_bytes, response_bytes))
+
+    app.add_middleware(
+        RequestPipelineMiddleware,
+        rate_limit={"requests_per_minute": 1000, **rate_limit},
+        on_complete=_on_complete,
+    )
+    return app
+
+
+def test_exempt_path_passes_without_token_and_gets_correlation_id():
+    client = TestClient(_build_app())
+    response = client.get("/health", headers={"X-Request-ID": "req-123"})
+    assert response.status_code == 200
+    assert response.headers["X-Correlation-ID"] == "req-123"
+    assert response.headers["X-Request-ID"] == "req-123"
+    assert "X-RateLimit-Limit" not in response.headers
+
+
+def test_protected_path_rejected_without_token():
+    completions = []
+    client = TestClient(_build_app(completions))
+    response = client.get("/api/v1/items/1")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Missing authorization header"
+    assert "X-Correlation-ID" in response.headers
+    # Rejected before routing: no template, so the constant unmatched label.
+    assert completions == [("GET", "__unmatched__", 401)]
+
+
+def test_unknown_paths_share_one_route_label():
+    completions = []
+    client = TestClient(_build_app(completions))
+    for path in ("/wp-admin.php", "/.env", "/api/v1/nope"):
+        client.get(path, headers={"Authorization": "Bearer good-token"})
+    client.get("/api/v1/items/7", headers={"Authorization": "Bearer good-token"})
+    assert [route for _, route, _ in completions] == ["__unmatched__"] * 3 + ["/api/v1/items/{item_id}"]
+
+
+def test_authenticated_request_sets_state_and_rate_limit_headers():
+    completions = []
+    sizes = []
+    client = TestClient(_build_app(completions, sizes))
+    response = client.get("/api/v1/items/42", headers={"Authorization": "Bearer good-token"})
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["user_id"] == "user-1"
+    assert payload["tenant_id"] == "tenant-1"
+    assert payload["correlation_id"] == response.headers["X-Correlation-ID"]
+    assert response.headers["X-RateLimit-Limit"] == "1000"
+    # The route template, not the concrete path, is reported to the hook.
+    assert completions == [("GET", "/api/v1/items/{item_id}", 200)]
+    assert sizes == [(0, len(response.content))]
+
+
+def test_rate_limit_rejection_for_public_clients():
+    client = TestClient(_build_app(public_requests_per_minute=1))
+    # /ready is exempt from auth but not from rate limiting.
+    assert client.get("/ready").status_code == 200
+    response = client.get("/ready")
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "60"
+
+
+def test_invalid_api_key_rejected(monkeypatch):
+    monkeypatch.setenv("MASTER_API_KEY", "master-key-value-123")
+    client = TestClient(_build_app())
+    response = client.get(
+        "/api/v1/items/1", headers={"Authorization": "ApiKey not-a-valid-key-000"}
+    )
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid API key"
+
+
+def test_streaming_response_passes_through():
+    client = TestClient(_build_app())
+    with client.stream(
+        "GET", "/api/v1/stream", headers={"Authorization": "Bearer good-token"}
+    ) as response:
+        chunks = [line for line in response.iter_lines() if line]
+    assert chunks == ["chunk-0", "chunk-1", "chunk-2"]
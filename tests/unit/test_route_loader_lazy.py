@@ -0,0 +1,118 @@
+"""
+Unit Tests - Lazy Route Loading
+Validates manifest generation, first-request imports that keep route
+precedence, eager fallback for changed modules and the import profile.
+"""
+
+import sys
+import textwrap
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.route_loader as route_loader
+
+_MODULES = {
+    "alpha_api": """
+        from fastapi import APIRouter
+        router = APIRouter(prefix="/api/v1/alpha")
+
+        @router.get("/items/{item_id}")
+        async def item(item_id: int):
+            return {"module": "alpha", "item": item_id}
+    """,
+    "beta": """
+        from fastapi import APIRouter
+        router = APIRouter()
+
+        @router.get("/ping")
+        async def ping():
+            return {"module": "beta"}
+    """,
+}
+
+
+@pytest.fixture
+def route_pkg(tmp_path, monkeypatch):
+    package = "lazy_routes_pkg"
+    pkg_dir = tmp_path / package
+    pkg_dir.mkdir()
+    (pkg_dir / "__init__.py").write_text("")
+    for name, source in _MODULES.items():
+        (pkg_dir / f"{name}.py").write_text(textwrap.dedent(source))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delenv("SKIP_ROUTE_LOADING", raising=False)
+    monkeypatch.setattr(route_loader, "_import_profile", [])
+    monkeypatch.setattr(
+        route_loader, "_lazy_state", {"mode": "eager", "pending": {}, "loaded": [], "failed": []}
+    )
+    yield package, pkg_dir
+    for name in [m for m in sys.modules if m.startswith(package)]:
+        del sys.modules[name]
+
+
+def _write_manifest(package, pkg_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv("ROUTE_LOADING_MODE", "eager")
+    assert route_loader.load_all_routes(FastAPI(), routes_dir=str(pkg_dir), package=package) == (2, 0)
+    manifest = tmp_path / "manifest.json"
+    assert route_loader.write_route_manifest(str(manifest), routes_dir=str(pkg_dir)) == 2
+    for name in [m for m in sys.modules if m.startswith(f"{package}.")]:
+        del sys.modules[name]
+    monkeypatch.setattr(route_loader, "_import_profile", [])
+    monkeypatch.setenv("ROUTE_LOADING_MODE", "lazy")
+    monkeypatch.setenv("ROUTE_MANIFEST_PATH", str(manifest))
+    return manifest
+
+
+def test_modules_import_on_first_matching_request(route_pkg, tmp_path, monkeypatch):
+    package, pkg_dir = route_pkg
+    _write_manifest(package, pkg_dir, tmp_path, monkeypatch)
+
+    app = FastAPI()
+    assert route_loader.load_all_routes(app, routes_dir=str(pkg_dir), package=package) == (2, 0)
+    assert f"{package}.alpha_api" not in sys.modules
+
+    client = TestClient(app)
+    assert client.get("/nope").status_code == 404
+    assert f"{package}.alpha_api" not in sys.modules
+
+    assert client.get("/api/v1/alpha/items/7").json() == {"module": "alpha", "item": 7}
+    assert client.post("/api/v1/alpha/items/7").status_code == 405
+    assert f"{package}.alpha_api" in sys.modules
+    assert f"{package}.beta" not in sys.modules
+
+    report = route_loader.get_route_loading_report()
+    assert report["mode"] == "lazy"
+    assert report["lazy_loaded"] == ["alpha_api"]
+    assert report["lazy_pending"] == 1
+    assert report["slowest_imports"][0]["lazy"] is True
+
+    # The schema covers every route, loading whatever is still pending.
+    paths = client.get("/openapi.json").json()["paths"]
+    assert "/api/v1/beta/ping" in paths
+    assert not any(isinstance(r, route_loader.LazyModuleRoute) for r in app.router.routes)
+
+
+def test_changed_module_is_loaded_eagerly(route_pkg, tmp_path, monkeypatch):
+    package, pkg_dir = route_pkg
+    _write_manifest(package, pkg_dir, tmp_path, monkeypatch)
+    (pkg_dir / "beta.py").write_text((pkg_dir / "beta.py").read_text() + "\n# edited\n")
+
+    app = FastAPI()
+    route_loader.load_all_routes(app, routes_dir=str(pkg_dir), package=package)
+
+    assert f"{package}.beta" in sys.modules
+    assert f"{package}.alpha_api" not in sys.modules
+    assert [row["module"] for row in route_loader.get_import_profile()] == ["beta"]
+
+
+def test_missing_manifest_falls_back_to_eager(route_pkg, tmp_path, monkeypatch):
+    package, pkg_dir = route_pkg
+    monkeypatch.setenv("ROUTE_LOADING_MODE", "lazy")
+    monkeypatch.setenv("ROUTE_MANIFEST_PATH", str(tmp_path / "missing.json"))
+
+    app = FastAPI()
+    assert route_loader.load_all_routes(app, routes_dir=str(pkg_dir), package=package) == (2, 0)
+    assert route_loader.get_route_loading_report()["mode"] == "eager"
+    assert TestClient(app).get("/api/v1/beta/ping").json() == {"module": "beta"}
@@ -0,0 +1,115 @@
+"""
+Unit Tests - Stripe Webhook Inbox
+Validates per-customer ordering keys, in-order shard processing with deferral
+behind a failed event, per-key advisory locking ahead of the claim, and the
+cached tenant resolution used by the handlers.
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from routes import stripe_webhooks
+from services.stripe_webhook_inbox import (
+    STATUS_PENDING,
+    STATUS_PROCESSED,
+    StripeWebhookInbox,
+    ordering_key,
+)
+
+
+def test_ordering_key_prefers_the_stripe_customer():
+    assert ordering_key({"id": "evt_1", "data": {"object": {"customer": "cus_1"}}}) == "cus_1"
+    assert ordering_key({"id": "evt_2", "data": {"object": {"object": "customer", "id": "cus_2"}}}) == "cus_2"
+    assert ordering_key({"id": "evt_3", "data": {"object": {}}}) == "evt_3"
+
+
+@pytest.mark.asyncio
+async def test_shard_runs_in_order_and_defers_behind_failed_event():
+    seen = []
+
+    def processor(event, attempt_no):
+        seen.append(event["id"])
+        if event["id"] == "evt_a1":
+            raise RuntimeError("boom")
+
+    inbox = StripeWebhookInbox(object(), processor=processor, concurrency=2)
+    base = datetime(2026, 10, 16)
+    rows = [
+        {"id": index, "stripe_event_id": event_id, "ordering_key": key, "attempts": 1,
+         "event_created_at": base + timedelta(seconds=index), "created_at": base,
+         "data": {"id": event_id, "type": "invoice.paid"}}
+        for index, (event_id, key) in enumerate([("evt_a1", "cus_a"), ("evt_b1", "cus_b"), ("evt_a2", "cus_a")])
+    ]
+
+    outcomes = await inbox._run_shard(rows)
+
+    assert seen == ["evt_a1", "evt_b1"]
+    statuses = {outcome[0]: (outcome[1], outcome[5]) for outcome in outcomes}
+    assert statuses[0] == (STATUS_PENDING, 0)
+    assert statuses[1] == (STATUS_PROCESSED, 0)
+    assert statuses[2] == (STATUS_PENDING, 1)
+
+
+class _ClaimConn:
+    def __init__(self, keys):
+        self.keys = keys
+        self.calls = []
+        self.in_transaction = False
+
+    @asynccontextmanager
+    async def transaction(self):
+        self.in_transaction = True
+        try:
+            yield
+        finally:
+            self.in_transaction = False
+
+    async def fetchval(self, query, limit):
+        self.calls.append(("lock", "pg_try_advisory_xact_lock" in query, self.in_transaction))
+        return self.keys
+
+    async def fetch(self, query, limit, visibility_timeout, keys):
+        self.calls.append(("claim", keys, self.in_transaction))
+        return []
+
+
+class _ClaimPool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+@pytest.mark.asyncio
+async def test_claim_locks_keys_first_in_the_same_transaction():
+    conn = _ClaimConn(["cus_a", "cus_b"])
+    inbox = StripeWebhookInbox(_ClaimPool(conn), processor=lambda event, attempt: None)
+
+    assert await inbox.run_once() == 0
+    assert conn.calls == [("lock", True, True), ("claim", ["cus_a", "cus_b"], True)]
+
+    # Every due key is being claimed by another replica: nothing to claim.
+    conn.keys, conn.calls = [], []
+    assert await inbox.run_once() == 0
+    assert conn.calls == [("lock", True, True)]
+
+
+def test_tenant_resolution_uses_one_query_then_cache():
+    db = MagicMock()
+    result = MagicMock()
+    result.first = MagicMock(return_value=SimpleNamespace(tenant_id="tenant-1", priority=3))
+    db.execute = MagicMock(return_value=result)
+
+    first = stripe_webhooks._resolve_tenant_id(db, metadata={}, subscription_id="sub_x9", customer_id="cus_x9")
+    second = stripe_webhooks._resolve_tenant_id(db, metadata={}, customer_id="cus_x9")
+
+    assert first == second == "tenant-1"
+    assert db.execute.call_count == 1
+    # Resolved via the customer, so the subscription key is not cached.
+    assert stripe_webhooks._cached_tenant(("subscription", "sub_x9")) is None
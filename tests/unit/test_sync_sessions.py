@@ -0,0 +1,82 @@
+"""
+Unit Tests - Sync Session Execution
+Validates that sync-Session handlers run on the dedicated thread pool with
+their dependencies intact and that blocking DB work leaves the loop free.
+"""
+
+import asyncio
+import time
+
+import anyio
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import database.sync_sessions as sync_sessions
+from database.sync_sessions import SyncDBRoute, get_db, get_sync_db_stats, run_sync_db
+
+
+class _FakeSession:
+    def __init__(self):
+        self.closed = False
+
+
+def _build_app(sessions):
+    router = APIRouter(prefix="/api/v1/things", route_class=SyncDBRoute)
+
+    @router.get("/{thing_id}")
+    def read_thing(thing_id: int, db=Depends(get_db)):
+        return {"thing": thing_id, "session": id(db)}
+
+    def _override():
+        session = _FakeSession()
+        sessions.append(session)
+        try:
+            yield session
+        finally:
+            session.closed = True
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_db] = _override
+    return app
+
+
+def test_sync_handler_runs_on_sync_db_pool(monkeypatch):
+    monkeypatch.setattr(sync_sessions, "_limiter", None)
+    sessions = []
+    before = get_sync_db_stats()["completed"]
+
+    response = TestClient(_build_app(sessions)).get("/api/v1/things/7")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["thing"] == 7
+    assert body["session"] == id(sessions[0])
+    assert sessions[0].closed
+    assert get_sync_db_stats()["completed"] == before + 1
+    assert get_sync_db_stats()["threads"] == sync_sessions.SYNC_DB_THREADS
+
+
+async def test_blocking_db_work_leaves_loop_responsive(monkeypatch):
+    monkeypatch.setattr(sync_sessions, "_limiter", anyio.CapacityLimiter(1))
+    ticks = 0
+
+    async def _ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.create_task(_ticker())
+    try:
+        results = await asyncio.gather(
+            run_sync_db(time.sleep, 0.1), run_sync_db(lambda: "done")
+        )
+    finally:
+        ticker.cancel()
+
+    assert results == [None, "done"]
+    assert ticks >= 5
+    stats = get_sync_db_stats()
+    assert stats["max_ms"] >= 100
+    assert stats["max_queue_ms"] >= 50
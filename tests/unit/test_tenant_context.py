@@ -0,0 +1,116 @@
+"""
+Unit Tests - Tenant Context Round-Trips
+Validates that tenant/user RLS context is set in a single statement, that no
+RESET round-trips are issued on release, and that Database reuses context
+across queries inside a connection() scope.
+"""
+
+import pytest
+
+from database import Database, get_tenant_connection
+from database.tenant_context import (
+    apply_tenant_context,
+    get_tenant_context_stats,
+    reset_tenant_context_stats,
+)
+
+
+class _RecordingConn:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, query, *args):
+        self.statements.append(query)
+        return "OK"
+
+    async def fetchrow(self, query, *args):
+        self.statements.append(query)
+        return {"ok": 1}
+
+    async def fetch(self, query, *args):
+        self.statements.append(query)
+        return []
+
+
+class _Acquire:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        self.pool.acquired += 1
+        return self.pool.conn
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Pool:
+    def __init__(self):
+        self.conn = _RecordingConn()
+        self.acquired = 0
+
+    def acquire(self):
+        return _Acquire(self)
+
+
+@pytest.fixture(autouse=True)
+def _reset_stats():
+    reset_tenant_context_stats()
+
+
+@pytest.mark.asyncio
+async def test_tenant_and_user_set_in_one_statement_without_reset():
+    pool = _Pool()
+    async with get_tenant_connection(pool, tenant_id="t-1", user_id="u-1") as conn:
+        await conn.fetch("SELECT * FROM customers")
+
+    statements = pool.conn.statements
+    assert len(statements) == 2
+    assert "app.current_tenant_id" in statements[0]
+    assert "app.current_user_id" in statements[0]
+    assert not any(s.startswith("RESET") for s in statements)
+
+    stats = get_tenant_context_stats()
+    assert stats["round_trips"] == 1
+    assert stats["round_trips_saved"] == 3
+
+
+@pytest.mark.asyncio
+async def test_transaction_mode_piggybacks_set_local_on_begin():
+    pool = _Pool()
+    async with get_tenant_connection(pool, tenant_id="t-1", transaction=True) as conn:
+        await conn.fetch("SELECT 1")
+
+    first, _, last = pool.conn.statements
+    assert first.startswith("BEGIN; SELECT set_config('app.current_tenant_id', 't-1', true)")
+    assert last == "COMMIT"
+
+
+@pytest.mark.asyncio
+async def test_database_reuses_context_within_connection_scope():
+    pool = _Pool()
+    db = Database(pool, tenant_id="t-1", user_id="u-1")
+
+    async with db.connection():
+        await db.fetch_one("SELECT 1")
+        await db.fetch_all("SELECT 2")
+        await db.execute("UPDATE x SET y = 1")
+
+    assert pool.acquired == 1
+    context_statements = [s for s in pool.conn.statements if "set_config" in s]
+    assert len(context_statements) == 1
+    assert get_tenant_context_stats()["context_reuses"] == 3
+
+
+@pytest.mark.asyncio
+async def test_literals_are_quoted():
+    conn = _RecordingConn()
+    await apply_tenant_context(conn, tenant_id="a'b")
+    assert "'a''b'" in conn.statements[0]
+
+
+@pytest.mark.asyncio
+async def test_no_context_means_no_round_trip():
+    conn = _RecordingConn()
+    await apply_tenant_context(conn)
+    assert conn.statements == []
@@ -0,0 +1,150 @@
+"""
+Unit Tests - Tenant Dashboard Summary
+Validates the combined aggregate query builder, single-flight sharing, the
+TTL cache, summary-table reuse, the arming barrier and the fallback when the table is missing.
+"""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+from services.tenant_summary import (
+    SUMMARY_FIELDS,
+    TenantSummaryEngine,
+    build_summary_query,
+)
+
+_TYPES = [
+    {"table_name": "jobs", "data_type": "uuid"},
+    {"table_name": "invoices", "data_type": "text"},
+]
+
+
+class _FakeConn:
+    def __init__(self, summary_row=None, table_missing=False, delay=0.0, barrier_blocked=False):
+        self.summary_row = summary_row
+        self.table_missing = table_missing
+        self.delay = delay
+        self.barrier_blocked = barrier_blocked
+        self.aggregate_queries = 0
+        self.events = []
+        self.upserts = []
+
+    async def fetch(self, query, *args):
+        return _TYPES
+
+    async def fetchrow(self, query, *args):
+        if "FROM tenant_dashboard_summary" in query:
+            if self.table_missing:
+                raise asyncpg.exceptions.UndefinedTableError("missing")
+            return self.summary_row
+        self.aggregate_queries += 1
+        self.events.append("compute")
+        await asyncio.sleep(self.delay)
+        return {"jobs_total": 4, "jobs_active": 2, "revenue_today": 12.5}
+
+    async def fetchval(self, query, *args):
+        self.events.append("arm")
+        return self.summary_row["version"] if self.summary_row else 1
+
+    async def execute(self, query, *args):
+        if "pg_advisory_xact_lock" in query:
+            if self.barrier_blocked:
+                raise asyncpg.exceptions.LockNotAvailableError("lock timeout")
+            self.events.append("barrier")
+        elif "SET summary" in query:
+            self.events.append("store")
+            self.upserts.append(args)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+def test_query_covers_only_present_tables_with_typed_predicates():
+    query = build_summary_query({"jobs": "uuid", "invoices": "text", "leads": "integer"})
+    assert "tenant_id = $1::uuid" in query
+    assert "tenant_id = $1::text" in query
+    assert "tenant_id::text = $1::text" in query
+    assert "FROM customers" not in query
+    assert query.count("CROSS JOIN") == 2
+    assert build_summary_query({}) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_computation():
+    conn = _FakeConn(delay=0.01)
+    engine = TenantSummaryEngine(ttl_seconds=30)
+
+    results = await asyncio.gather(*(engine.get(_FakePool(conn), "t1") for _ in range(10)))
+
+    assert conn.aggregate_queries == 1
+    assert all(r["jobs_active"] == 2 and r["revenue_today"] == 12.5 for r in results)
+    assert results[0]["customers_total"] == SUMMARY_FIELDS["customers_total"]
+    assert engine.stats()["shared_waits"] == 9
+
+    await engine.get(_FakePool(conn), "t1")
+    assert conn.aggregate_queries == 1
+    assert engine.stats()["cache_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_fresh_summary_row_is_reused():
+    stored = dict(SUMMARY_FIELDS, jobs_total=9)
+    conn = _FakeConn(
+        summary_row={"summary": json.dumps(stored), "version": 3, "source_version": 3, "age_seconds": 5}
+    )
+    engine = TenantSummaryEngine(ttl_seconds=0, max_age_seconds=60)
+
+    assert (await engine.get(_FakePool(conn), "t1"))["jobs_total"] == 9
+    assert conn.aggregate_queries == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_row_is_recomputed_against_observed_version():
+    conn = _FakeConn(
+        summary_row={"summary": "{}", "version": 5, "source_version": 4, "age_seconds": 1}
+    )
+    engine = TenantSummaryEngine(ttl_seconds=0)
+
+    assert (await engine.get(_FakePool(conn), "t1"))["jobs_total"] == 4
+    assert conn.aggregate_queries == 1
+    tenant, payload, version = conn.upserts[0]
+    assert (tenant, version) == ("t1", 5)
+    assert json.loads(payload)["jobs_active"] == 2
+    assert conn.events == ["arm", "barrier", "compute", "store"]
+
+
+@pytest.mark.asyncio
+async def test_barrier_timeout_returns_summary_without_storing_it():
+    conn = _FakeConn(barrier_blocked=True)
+    engine = TenantSummaryEngine(ttl_seconds=0)
+
+    assert (await engine.get(_FakePool(conn), "t1"))["jobs_total"] == 4
+    assert conn.upserts == []
+    assert engine.stats()["barrier_timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_summary_table_falls_back_to_direct_query():
+    conn = _FakeConn(table_missing=True)
+    engine = TenantSummaryEngine(ttl_seconds=0)
+
+    await engine.get(_FakePool(conn), "t1")
+    await engine.get(_FakePool(conn), "t1")
+
+    assert conn.aggregate_queries == 2
+    assert conn.upserts == []
+    assert engine.stats()["summary_table"] is False
@@ -0,0 +1,192 @@
+"""
+Unit Tests - Unified Memory ANN Recall
+Validates the content-hash embedding cache, HNSW-ordered recall with
+transaction-local search settings, and batched automatic associations with
+bounded retries.
+"""
+
+import types
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+import pytest
+
+from brainops_ai_os import unified_memory
+from brainops_ai_os.unified_memory import UnifiedMemorySubstrate
+
+
+class _FakeConn:
+    def __init__(self, vector_version="0.8.0", persisted=None):
+        self.vector_version = vector_version
+        self.persisted = persisted or {}
+        self.executed = []
+        self.fetches = []
+        self.rows = []
+
+    async def fetchval(self, query, *args):
+        if "pg_extension" in query:
+            return self.vector_version
+        if "unified_memory_embedding_cache" in query:
+            return self.persisted.get(args[0])
+        return None
+
+    async def fetch(self, query, *args):
+        self.fetches.append((query, args))
+        return self.rows
+
+    async def execute(self, query, *args):
+        self.executed.append((query, args))
+        return "UPDATE 0"
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+class _FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        yield self.conn
+
+
+class _FakeEmbeddings:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def create(self, model, input):
+        self.calls.append(input)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return types.SimpleNamespace(data=[types.SimpleNamespace(embedding=[0.5, 0.25, 0.125])])
+
+
+def _substrate(conn, embeddings=None):
+    substrate = UnifiedMemorySubstrate(MagicMock())
+    substrate.db_pool = _FakePool(conn)
+    if embeddings is not None:
+        substrate._openai_client = types.SimpleNamespace(embeddings=embeddings)
+    return substrate
+
+
+@pytest.mark.asyncio
+async def test_repeated_content_is_embedded_once_and_persisted():
+    conn = _FakeConn()
+    embeddings = _FakeEmbeddings()
+    substrate = _substrate(conn, embeddings)
+
+    first = await substrate._generate_embedding("roof leak on job 42")
+    second = await substrate._generate_embedding("roof leak on job 42")
+
+    assert first == second == [0.5, 0.25, 0.125]
+    assert embeddings.calls == ["roof leak on job 42"]
+    assert substrate.metrics["embedding_cache_hits"] == 1
+    query, args = conn.executed[-1]
+    assert "INSERT INTO unified_memory_embedding_cache" in query
+    assert args[0] == unified_memory.content_hash(unified_memory.EMBEDDING_MODEL, "roof leak on job 42")
+
+    # A fresh process finds it in the table instead of calling the API again.
+    other = _substrate(_FakeConn(persisted={args[0]: args[2]}), embeddings)
+    assert await other._generate_embedding("roof leak on job 42") == [0.5, 0.25, 0.125]
+    assert len(embeddings.calls) == 1 and other.metrics["embedding_db_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_api_failure_falls_back_without_caching_the_fallback():
+    conn = _FakeConn()
+    embeddings = _FakeEmbeddings(fail=True)
+    substrate = _substrate(conn, embeddings)
+
+    first = await substrate._generate_embedding("hello")
+    await substrate._generate_embedding("hello")
+
+    assert first == substrate._generate_fallback_embedding("hello")
+    assert len(embeddings.calls) == 2
+    assert not any("INSERT" in query for query, _ in conn.executed)
+
+
+@pytest.mark.asyncio
+async def test_recall_walks_the_hnsw_index_with_local_search_settings():
+    conn = _FakeConn()
+    conn.rows = [
+        {"id": f"00000000-0000-0000-0000-00000000000{i}", "memory_type": "episodic", "content": {},
+         "importance_score": 0.5, "access_count": 1, "related_memories": None, "metadata": None,
+         "created_at": None, "similarity": 0.9 - i / 10}
+        for i in range(3)
+    ]
+    substrate = _substrate(conn)
+
+    memories = await substrate.recall("leak", limit=3, min_importance=0.2)
+
+    query, args = conn.fetches[0]
+    assert "ORDER BY embedding <=> $1::vector" in query
+    assert "ORDER BY similarity" not in query
+    assert args[1:] == (3, 0.2)
+    settings_query, settings = conn.executed[0]
+    assert "set_config" in settings_query
+    assert settings == ("hnsw.ef_search", "100", "hnsw.iterative_scan", "relaxed_order")
+    # One UPDATE for every recalled row's access statistics.
+    access_updates = [(q, a) for q, a in conn.executed if "access_count + 1" in q]
+    assert len(access_updates) == 1
+    assert access_updates[0][1][0] == [row["id"] for row in conn.rows]
+    assert [m["similarity"] for m in memories] == [0.9, 0.8, 0.7]
+
+
+@pytest.mark.asyncio
+async def test_older_pgvector_gets_a_wider_ef_search_but_no_iterative_scan():
+    conn = _FakeConn(vector_version="0.7.4")
+    substrate = _substrate(conn)
+
+    await substrate.recall_by_embedding([1.0, 0.0], limit=250)
+
+    assert conn.executed[0][1] == ("hnsw.ef_search", "250")
+
+
+@pytest.mark.asyncio
+async def test_stored_memories_are_associated_in_one_batched_statement():
+    conn = _FakeConn()
+    conn.rows = [{"id": "a", "matched": 2}, {"id": "b", "matched": 1}]
+    substrate = _substrate(conn)
+    substrate.association_batch_size = 3
+
+    ids = [await substrate.store({"note": f"gutter {i}"}, importance=0.1) for i in range(3)]
+
+    association_queries = [(q, a) for q, a in conn.fetches if "CROSS JOIN LATERAL" in q]
+    assert len(association_queries) == 1
+    query, args = association_queries[0]
+    assert "ORDER BY m.embedding <=> p.embedding" in query
+    assert args[0] == ids and len(args[1]) == 3
+    assert args[2:] == (unified_memory.ASSOCIATION_NEIGHBOURS, unified_memory.ASSOCIATION_MIN_SIMILARITY)
+    assert substrate._pending_associations == []
+    assert substrate.metrics["associations_created"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_association_batch_is_retried_then_dropped():
+    conn = _FakeConn()
+    substrate = _substrate(conn)
+    substrate.association_batch_size = 2
+    substrate._pending_associations = [("a", "[1,0]", 0), ("b", "[0,1]", 0), ("c", "[1,1]", 0)]
+    failures = []
+
+    async def failing_fetch(query, *args):
+        failures.append(args[0])
+        raise ConnectionError("connection dropped")
+
+    conn.fetch = failing_fetch
+    for _ in range(unified_memory.ASSOCIATION_MAX_ATTEMPTS):
+        assert await substrate._flush_associations() == 0
+
+    # Each flush stops at the failing batch and keeps everything queued behind it.
+    assert failures == [["a", "b"]] * unified_memory.ASSOCIATION_MAX_ATTEMPTS
+    assert substrate._pending_associations == [("c", "[1,1]", 0)]
+    assert substrate.metrics["associations_dropped"] == 2
+    assert substrate.metrics["association_batches_failed"] == unified_memory.ASSOCIATION_MAX_ATTEMPTS
+
+    del conn.fetch
+    conn.rows = [{"id": "c", "matched": 1}]
+    assert await substrate._flush_associations() == 1
+    assert substrate._pending_associations == []